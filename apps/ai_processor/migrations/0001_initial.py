@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMResponseCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(help_text='SHA-256 de modelo + temperatura + prompts', max_length=64, unique=True, verbose_name='Clave de cache')),
+                ('model', models.CharField(max_length=100, verbose_name='Modelo')),
+                ('response', models.TextField(verbose_name='Respuesta')),
+                ('total_tokens', models.IntegerField(blank=True, null=True, verbose_name='Tokens consumidos')),
+                ('hits', models.PositiveIntegerField(default=0, verbose_name='Aciertos')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Expira el')),
+            ],
+            options={
+                'verbose_name': 'Respuesta de IA en cache',
+                'verbose_name_plural': 'Respuestas de IA en cache',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
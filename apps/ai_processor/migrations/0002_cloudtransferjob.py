@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_processor', '0001_initial'),
+        ('presentaciones', '0019_presentation_cloud_transfer_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CloudTransferJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('RUNNING', 'En curso'), ('DONE', 'Completada'), ('FAILED', 'Fallida')], db_index=True, default='PENDING', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Intentos')),
+                ('next_attempt_at', models.DateTimeField(db_index=True, verbose_name='Próximo intento')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Tomada por un worker el')),
+                ('upload_id', models.CharField(max_length=64, verbose_name='ID de subida por chunks')),
+                ('bytes_total', models.BigIntegerField(default=0, verbose_name='Tamaño (bytes)')),
+                ('bytes_acknowledged', models.BigIntegerField(default=0, verbose_name='Bytes confirmados')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último error')),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('presentation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cloud_transfer_jobs', to='presentaciones.presentation', verbose_name='Presentación')),
+            ],
+            options={
+                'verbose_name': 'Transferencia a Cloudinary',
+                'verbose_name_plural': 'Transferencias a Cloudinary',
+                'ordering': ['next_attempt_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_processor', '0002_cloudtransferjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CloudinaryAsset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('public_id', models.CharField(max_length=255, verbose_name='Public ID')),
+                ('resource_type', models.CharField(default='video', max_length=10, verbose_name='Tipo de recurso')),
+                ('account_name', models.CharField(db_index=True, max_length=50, verbose_name='Cuenta')),
+                ('cloud_name', models.CharField(max_length=100, verbose_name='Cloud name')),
+                ('bytes', models.BigIntegerField(default=0, verbose_name='Tamaño (bytes)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archivo en Cloudinary',
+                'verbose_name_plural': 'Archivos en Cloudinary',
+                'unique_together': {('public_id', 'resource_type')},
+            },
+        ),
+    ]
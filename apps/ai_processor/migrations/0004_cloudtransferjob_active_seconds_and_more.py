@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_processor', '0003_cloudinaryasset'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cloudtransferjob',
+            name='active_seconds',
+            field=models.FloatField(default=0, verbose_name='Segundos subiendo (sin esperas entre intentos)'),
+        ),
+        migrations.AddField(
+            model_name='cloudtransferjob',
+            name='attempt_started_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Inicio del intento actual'),
+        ),
+    ]
@@ -1,3 +1,98 @@
 from django.db import models
 
-# Create your models here.
+
+class LLMResponseCache(models.Model):
+    """
+    Cache persistente de respuestas de modelos de lenguaje (Groq).
+
+    La clave es un hash SHA-256 del modelo, la temperatura y los mensajes
+    enviados, de modo que la misma petición no vuelve a consumir cuota.
+    """
+    cache_key = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name="Clave de cache",
+        help_text="SHA-256 de modelo + temperatura + prompts"
+    )
+    model = models.CharField(max_length=100, verbose_name="Modelo")
+    response = models.TextField(verbose_name="Respuesta")
+    total_tokens = models.IntegerField(null=True, blank=True, verbose_name="Tokens consumidos")
+    hits = models.PositiveIntegerField(default=0, verbose_name="Aciertos")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Expira el")
+
+    class Meta:
+        verbose_name = 'Respuesta de IA en cache'
+        verbose_name_plural = 'Respuestas de IA en cache'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.model} - {self.cache_key[:12]}"
+
+
+class CloudTransferJob(models.Model):
+    """
+    Subida en segundo plano de un video a Cloudinary.
+
+    La subida se hace por chunks con un X-Unique-Upload-Id fijo: si el proceso
+    se interrumpe, el siguiente intento continúa desde el último byte
+    confirmado (bytes_acknowledged) en lugar de empezar de cero.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pendiente'),
+        ('RUNNING', 'En curso'),
+        ('DONE', 'Completada'),
+        ('FAILED', 'Fallida'),
+    ]
+
+    presentation = models.ForeignKey(
+        'presentaciones.Presentation',
+        on_delete=models.CASCADE,
+        related_name='cloud_transfer_jobs',
+        verbose_name="Presentación"
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING', db_index=True)
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Intentos")
+    next_attempt_at = models.DateTimeField(db_index=True, verbose_name="Próximo intento")
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name="Tomada por un worker el")
+    upload_id = models.CharField(max_length=64, verbose_name="ID de subida por chunks")
+    bytes_total = models.BigIntegerField(default=0, verbose_name="Tamaño (bytes)")
+    bytes_acknowledged = models.BigIntegerField(default=0, verbose_name="Bytes confirmados")
+    last_error = models.TextField(blank=True, verbose_name="Último error")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    attempt_started_at = models.DateTimeField(null=True, blank=True, verbose_name="Inicio del intento actual")
+    active_seconds = models.FloatField(default=0, verbose_name="Segundos subiendo (sin esperas entre intentos)")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Transferencia a Cloudinary'
+        verbose_name_plural = 'Transferencias a Cloudinary'
+        ordering = ['next_attempt_at']
+
+    def __str__(self):
+        return f"{self.presentation_id} - {self.status} ({self.bytes_acknowledged}/{self.bytes_total})"
+
+
+class CloudinaryAsset(models.Model):
+    """
+    Cuenta de Cloudinary en la que quedó cada archivo subido.
+
+    Con varias cuentas configuradas (CLOUDINARY_ACCOUNTS), permite eliminar o
+    consultar un archivo directamente en su cuenta y repartir las subidas según
+    el espacio usado en cada una.
+    """
+    public_id = models.CharField(max_length=255, verbose_name="Public ID")
+    resource_type = models.CharField(max_length=10, default='video', verbose_name="Tipo de recurso")
+    account_name = models.CharField(max_length=50, db_index=True, verbose_name="Cuenta")
+    cloud_name = models.CharField(max_length=100, verbose_name="Cloud name")
+    bytes = models.BigIntegerField(default=0, verbose_name="Tamaño (bytes)")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Archivo en Cloudinary'
+        verbose_name_plural = 'Archivos en Cloudinary'
+        unique_together = [('public_id', 'resource_type')]
+
+    def __str__(self):
+        return f"{self.public_id} ({self.account_name})"
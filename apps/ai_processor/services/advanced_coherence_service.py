@@ -15,12 +15,130 @@ Sistema de rotación automática de API keys incluido.
 
 from groq import Groq
 from django.conf import settings
+import httpx
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import logging
 import json
+import math
 import re
+import threading
+import time
+
+from django.db import connection
+
+from .groq_key_manager import estimate_messages_tokens
+from .llm_cache_service import LLMCacheService
+from .transcript_compactor import TranscriptCompactor
 
 logger = logging.getLogger(__name__)
 
+SCORE_FIELDS = ('thematic_coherence', 'depth_understanding', 'content_relevance', 'structure_clarity')
+
+# Esquema de cada elemento de la respuesta por lotes (campo → tipos aceptados)
+BATCH_ITEM_SCHEMA = {
+    'participant': str,
+    'thematic_coherence': (int, float),
+    'depth_understanding': (int, float),
+    'content_relevance': (int, float),
+    'structure_clarity': (int, float),
+    'feedback': str,
+    'strengths': list,
+    'improvements': list,
+    'key_concepts_covered': list,
+    'missing_elements': list,
+}
+
+# Límite global de peticiones simultáneas a Groq en este proceso
+_request_semaphore = None
+_semaphore_lock = threading.Lock()
+
+
+def weighted_coherence_score(thematic: float, depth: float, relevance: float, structure: float) -> float:
+    """Score final ponderado (40% temática, 30% profundidad, 20% relevancia, 10% estructura), 0-100"""
+    overall_score = (
+        thematic * 0.40 +
+        depth * 0.30 +
+        relevance * 0.20 +
+        structure * 0.10
+    )
+    return max(0, min(100, overall_score))
+
+
+class MalformedResponseError(ValueError):
+    """La respuesta en streaming no sigue el formato JSON esperado"""
+
+
+class IncrementalScoreParser:
+    """
+    Extrae los puntajes del JSON de evaluación a medida que llega por streaming.
+    
+    Solo considera un número completo cuando le sigue un delimitador, de modo
+    que "85" no se lee como "8" a mitad de un chunk. Marca la respuesta como
+    mal formada si no empieza un objeto JSON, si tarda demasiado en aparecer el
+    primer puntaje o si algún puntaje sale del rango 0-100.
+    """
+    
+    FIELD_PATTERN = re.compile(
+        r'"(thematic_coherence|depth_understanding|content_relevance|structure_clarity|overall_coherence)"'
+        r'\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}\n]'
+    )
+    MAX_PREAMBLE_CHARS = 300  # Texto permitido antes de '{' (p. ej. ```json)
+    MAX_CHARS_TO_FIRST_SCORE = 600  # Los puntajes son los primeros campos del formato
+    
+    def __init__(self):
+        self.buffer = ''
+        self.scores = {}
+        self.malformed_reason = None
+        self._scan_pos = 0
+        self._json_start = None
+    
+    def feed(self, text: str):
+        """Agrega texto recibido y actualiza los puntajes detectados"""
+        if not text or self.malformed_reason:
+            return
+        
+        self.buffer += text
+        
+        if self._json_start is None:
+            self._json_start = self.buffer.find('{')
+            if self._json_start == -1:
+                self._json_start = None
+                if len(self.buffer) > self.MAX_PREAMBLE_CHARS:
+                    self.malformed_reason = "La respuesta no contiene un objeto JSON"
+                return
+            self._scan_pos = self._json_start
+        
+        for match in self.FIELD_PATTERN.finditer(self.buffer, self._scan_pos):
+            value = float(match.group(2))
+            if not 0 <= value <= 100:
+                self.malformed_reason = f"Puntaje fuera de rango en '{match.group(1)}': {value}"
+                return
+            self.scores[match.group(1)] = value
+            self._scan_pos = match.end() - 1
+        
+        if not self.scores and len(self.buffer) - self._json_start > self.MAX_CHARS_TO_FIRST_SCORE:
+            self.malformed_reason = "No se encontraron puntajes al inicio del JSON"
+    
+    @property
+    def coherence_score(self):
+        """Score ponderado en cuanto están los 4 criterios (o overall_coherence), si no None"""
+        if all(field in self.scores for field in SCORE_FIELDS):
+            return round(weighted_coherence_score(*(self.scores[field] for field in SCORE_FIELDS)), 1)
+        if 'overall_coherence' in self.scores:
+            return self.scores['overall_coherence']
+        return None
+
+
+def _get_request_semaphore(max_concurrent: int) -> threading.BoundedSemaphore:
+    """Obtiene el semáforo global de peticiones (se crea en el primer uso)."""
+    global _request_semaphore
+    
+    with _semaphore_lock:
+        if _request_semaphore is None:
+            _request_semaphore = threading.BoundedSemaphore(max_concurrent)
+    
+    return _request_semaphore
+
 
 class AdvancedCoherenceService:
     """
@@ -42,6 +160,9 @@ class AdvancedCoherenceService:
         self.config = settings.COHERENCE_CONFIG
         self.client = None  # Se inicializa dinámicamente
         
+        # Resumen extractivo de transcripciones que superan el presupuesto de tokens
+        self.compactor = TranscriptCompactor(token_budget=self.config.get('transcript_token_budget', 900))
+        
         # Verificar que hay al menos una key disponible
         current_key = self.key_manager.get_current_key()
         if not current_key:
@@ -52,18 +173,45 @@ class AdvancedCoherenceService:
         
         logger.info(f"✅ AdvancedCoherenceService inicializado con {len(self.key_manager.keys)} API keys")
     
-    def _get_client(self) -> Groq:
+    def _get_client(self, api_key: str = None) -> Groq:
         """
-        Obtiene un cliente de Groq con la API key actual.
+        Obtiene un cliente de Groq para la API key indicada (o la actual).
         
-        Se actualiza dinámicamente según la rotación de keys.
+        Los clientes se reutilizan por key (en el gestor compartido) para
+        aprovechar las conexiones HTTP abiertas.
         """
-        current_key = self.key_manager.get_current_key()
-        if not current_key:
-            raise ValueError("No hay API keys disponibles actualmente")
+        return self.key_manager.get_client(api_key)
+    
+    def set_embedding_model(self, model):
+        """Usa el modelo de embeddings ya cargado para compactar transcripciones"""
+        self.compactor.model = model
+    
+    def _resolve_strictness_level(self, assignment=None) -> str:
+        """
+        Obtiene el nivel de estrictez con orden de prioridad:
+        1. Nivel específico del assignment (si está configurado)
+        2. Nivel global del teacher (si está disponible)
+        3. Default 'moderate'
+        """
+        strictness_level = 'moderate'  # Default
+        
+        if assignment:
+            # Prioridad 1: Nivel específico del assignment
+            if assignment.strictness_level:
+                strictness_level = assignment.strictness_level
+                logger.info(f"📊 Usando nivel de estrictez del assignment: {strictness_level}")
+            # Prioridad 2: Nivel global del teacher
+            elif assignment.course and assignment.course.teacher:
+                try:
+                    from apps.presentaciones.models import AIConfiguration
+                    config = AIConfiguration.objects.filter(teacher=assignment.course.teacher).first()
+                    if config:
+                        strictness_level = config.strictness_level
+                        logger.info(f"📊 Usando nivel de estrictez global del teacher: {strictness_level}")
+                except Exception as e:
+                    logger.warning(f"⚠️ No se pudo obtener configuración de IA: {e}")
         
-        # Crear nuevo cliente con la key actual
-        return Groq(api_key=current_key)
+        return strictness_level
     
     def analyze_participant_coherence(
         self,
@@ -71,7 +219,11 @@ class AdvancedCoherenceService:
         transcribed_text: str,
         assignment_title: str,
         assignment_description: str,
-        assignment=None
+        assignment=None,
+        strictness_level: str = None,
+        api_key: str = None,
+        on_partial_score=None,
+        deadline: float = None
     ) -> dict:
         """
         Analiza la coherencia de un participante individual.
@@ -82,6 +234,12 @@ class AdvancedCoherenceService:
             assignment_title: Título de la asignación
             assignment_description: Descripción completa de la asignación
             assignment: Objeto Assignment completo (opcional, para obtener configuración de IA)
+            strictness_level: Nivel ya resuelto (evita consultar la BD desde hilos)
+            api_key: Key a usar en el primer intento (si no, se reserva con el rate limiter)
+            on_partial_score: Callback (participant_name, score) llamado en cuanto el
+                streaming entrega el coherence_score, antes de terminar la respuesta
+            deadline: Instante (time.monotonic) límite para todo el análisis; acota
+                la espera del rate limiter y el timeout de cada petición HTTP
         
         Returns:
             dict con:
@@ -95,71 +253,119 @@ class AdvancedCoherenceService:
         if not transcribed_text or len(transcribed_text.strip()) < 20:
             return self._insufficient_text_response(participant_name)
         
-        # Obtener nivel de estrictez con orden de prioridad:
-        # 1. Nivel específico del assignment (si está configurado)
-        # 2. Nivel global del teacher (si está disponible)
-        # 3. Default 'moderate'
-        strictness_level = 'moderate'  # Default
+        if strictness_level is None:
+            strictness_level = self._resolve_strictness_level(assignment)
         
-        if assignment:
-            # Prioridad 1: Nivel específico del assignment
-            if assignment.strictness_level:
-                strictness_level = assignment.strictness_level
-                logger.info(f"📊 Usando nivel de estrictez del assignment: {strictness_level}")
-            # Prioridad 2: Nivel global del teacher
-            elif assignment.course and assignment.course.teacher:
+        # Compactar transcripciones largas antes de construir el prompt
+        compacted_text, compaction = self.compactor.compact(
+            transcribed_text, assignment_title, assignment_description
+        )
+        
+        # Construir prompt optimizado
+        prompt = self._build_evaluation_prompt(
+            participant_name=participant_name,
+            transcribed_text=compacted_text,
+            assignment_title=assignment_title,
+            assignment_description=assignment_description,
+            strictness_level=strictness_level
+        )
+        messages = [
+            {
+                "role": "system",
+                "content": self._get_system_prompt()
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+        
+        # Misma evaluación ya respondida (mismo modelo, temperatura y prompts)
+        cache_key = LLMCacheService.build_key(self.config['model'], self.config['temperature'], messages)
+        cached_response = LLMCacheService.get(cache_key)
+        if cached_response:
+            result = self._parse_ai_response(cached_response, participant_name)
+            result['details']['compaction'] = compaction
+            result['usage'] = {'total_tokens': 0, 'requests': 0, 'latency_seconds': 0.0, 'cached': True}
+            # El progreso parcial se reporta igual que con una respuesta en streaming
+            if on_partial_score:
                 try:
-                    from apps.presentaciones.models import AIConfiguration
-                    config = AIConfiguration.objects.filter(teacher=assignment.course.teacher).first()
-                    if config:
-                        strictness_level = config.strictness_level
-                        logger.info(f"📊 Usando nivel de estrictez global del teacher: {strictness_level}")
+                    on_partial_score(participant_name, result['coherence_score'])
                 except Exception as e:
-                    logger.warning(f"⚠️ No se pudo obtener configuración de IA: {e}")
+                    logger.warning(f"⚠️ Error reportando score parcial: {e}")
+            return result
+        
+        # Tokens a reservar en el rate limiter (prompt + respuesta máxima)
+        estimated_tokens = estimate_messages_tokens(messages, self.config['max_tokens'])
+        wait_timeout = self.config.get('rate_limit_wait', 60)
         
         # Intentar con rotación automática de keys
         max_retries = len(self.key_manager.keys)
+        current_key = None
         
         for attempt in range(max_retries):
             try:
-                # Obtener cliente con key actual
-                client = self._get_client()
-                current_key = self.key_manager.get_current_key()
+                remaining = self._remaining(deadline, participant_name)
                 
-                # Construir prompt optimizado
-                prompt = self._build_evaluation_prompt(
-                    participant_name=participant_name,
-                    transcribed_text=transcribed_text,
-                    assignment_title=assignment_title,
-                    assignment_description=assignment_description,
-                    strictness_level=strictness_level
-                )
+                # Primer intento con la key indicada (si hay); si no, la de mayor margen
+                if attempt == 0 and api_key:
+                    current_key = api_key
+                else:
+                    current_key = self.key_manager.acquire_key(
+                        estimated_tokens,
+                        timeout=wait_timeout if remaining is None else min(wait_timeout, remaining)
+                    )
+                    if not current_key:
+                        return self._fallback_response(participant_name, "Límite de peticiones de Groq alcanzado")
+                client = self._get_client(current_key)
                 
                 # Llamar a Groq API
                 logger.info(f"🤖 Analizando coherencia con Groq para: {participant_name} (intento {attempt + 1}/{max_retries})")
-                logger.info(f"📝 Texto a analizar: {len(transcribed_text)} caracteres")
+                logger.info(f"📝 Texto a analizar: {len(transcribed_text)} caracteres (~{estimated_tokens} tokens)")
                 
-                response = client.chat.completions.create(
+                request_start = time.monotonic()
+                streaming = self.config.get('streaming', True)
+                raw_response = client.chat.completions.with_raw_response.create(
                     model=self.config['model'],
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": self._get_system_prompt()
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
+                    messages=messages,
                     temperature=self.config['temperature'],
                     max_tokens=self.config['max_tokens'],
-                    timeout=self.config.get('timeout', 45)
+                    stream=streaming,
+                    timeout=self._request_timeout(streaming, self._remaining(deadline, participant_name))
                 )
+                self.key_manager.update_from_headers(current_key, raw_response.headers)
+                
+                if streaming:
+                    ai_response, total_tokens = self._consume_stream(
+                        raw_response.parse(), participant_name, on_partial_score, deadline
+                    )
+                else:
+                    response = raw_response.parse()
+                    ai_response = response.choices[0].message.content
+                    total_tokens = getattr(getattr(response, 'usage', None), 'total_tokens', None)
+                latency = time.monotonic() - request_start
+                
+                # Sincronizar los buckets con el consumo real
+                self.key_manager.record_usage(current_key, estimated_tokens, total_tokens)
                 
                 # Parsear respuesta de la IA
-                ai_response = response.choices[0].message.content
                 result = self._parse_ai_response(ai_response, participant_name)
                 
+                # Guardar solo respuestas con JSON válido
+                if 'key_concepts_covered' in result:
+                    LLMCacheService.set(
+                        cache_key, self.config['model'], ai_response,
+                        total_tokens=total_tokens
+                    )
+                
+                result['details']['compaction'] = compaction
+                result['usage'] = {
+                    'total_tokens': total_tokens or 0,
+                    'requests': 1,
+                    'latency_seconds': round(latency, 2),
+                    'cached': False
+                }
+                
                 logger.info(
                     f"✅ Análisis completado para {participant_name}: "
                     f"{result['coherence_score']:.1f}% de coherencia"
@@ -167,13 +373,19 @@ class AdvancedCoherenceService:
                 
                 return result
                 
+            except TimeoutError:
+                raise  # Plazo del participante agotado: el llamador aplica su fallback
             except Exception as e:
                 error_message = str(e).lower()
                 
                 # Detectar errores de rate limit
                 if 'rate_limit' in error_message or 'quota' in error_message or '429' in error_message:
                     logger.warning(f"⚠️ Rate limit alcanzado: {e}")
-                    self.key_manager.mark_key_as_failed(current_key, f"Rate limit: {e}")
+                    error_response = getattr(e, 'response', None)
+                    retry_after = self.key_manager.update_from_headers(
+                        current_key, getattr(error_response, 'headers', None)
+                    )
+                    self.key_manager.mark_key_as_failed(current_key, f"Rate limit: {e}", retry_after=retry_after)
                     
                     # Intentar con siguiente key
                     if attempt < max_retries - 1:
@@ -190,6 +402,87 @@ class AdvancedCoherenceService:
         # Si llegamos aquí, todas las keys fallaron
         return self._fallback_response(participant_name, "Todas las API keys agotadas")
     
+    def _request_timeout(self, streaming: bool, remaining: float = None):
+        """
+        Timeout de la petición.
+        
+        En streaming el límite de lectura se aplica a cada chunk (no a toda la
+        respuesta): una generación larga pero activa no se corta, una conexión
+        que deja de enviar datos sí. Con `remaining` (segundos hasta el plazo
+        del participante) ningún límite lo supera.
+        """
+        def cap(seconds):
+            return seconds if remaining is None else min(seconds, remaining)
+        
+        if not streaming:
+            return cap(self.config.get('timeout', 45))
+        return httpx.Timeout(cap(self.config.get('stream_chunk_timeout', 15)), connect=cap(10.0))
+    
+    @staticmethod
+    def _remaining(deadline: float, participant_name: str):
+        """
+        Segundos hasta el plazo (None si no hay plazo)
+        
+        Raises:
+            TimeoutError: Si el plazo ya pasó
+        """
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Plazo agotado analizando {participant_name}")
+        return remaining
+    
+    def _consume_stream(self, stream, participant_name: str, on_partial_score=None, deadline: float = None):
+        """
+        Lee la respuesta en streaming con el parser incremental.
+        
+        Llama a on_partial_score en cuanto se conoce el coherence_score y
+        corta la generación si el contenido está mal formado (ahorra tokens).
+        
+        Returns:
+            Tupla (texto completo, tokens consumidos o None)
+        
+        Raises:
+            MalformedResponseError: Si la respuesta no sigue el formato esperado
+            TimeoutError: Si se supera `deadline` mientras llegan los chunks
+        """
+        parser = IncrementalScoreParser()
+        parts = []
+        total_tokens = None
+        partial_reported = False
+        
+        try:
+            for chunk in stream:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content or ''
+                    parts.append(delta)
+                    parser.feed(delta)
+                
+                if parser.malformed_reason:
+                    logger.warning(f"✂️ Generación abortada para {participant_name}: {parser.malformed_reason}")
+                    raise MalformedResponseError(parser.malformed_reason)
+                
+                self._remaining(deadline, participant_name)  # Cortar una generación que excede el plazo
+                
+                if not partial_reported and parser.coherence_score is not None:
+                    partial_reported = True
+                    logger.info(f"⚡ Score parcial de {participant_name}: {parser.coherence_score:.1f}%")
+                    if on_partial_score:
+                        try:
+                            on_partial_score(participant_name, parser.coherence_score)
+                        except Exception as e:
+                            logger.warning(f"⚠️ Error reportando score parcial: {e}")
+                
+                # Groq envía el consumo en el último chunk
+                usage = getattr(getattr(chunk, 'x_groq', None), 'usage', None)
+                if usage is not None:
+                    total_tokens = getattr(usage, 'total_tokens', None)
+        finally:
+            stream.close()
+        
+        return ''.join(parts), total_tokens
+    
     def _get_strictness_instructions(self, strictness_level: str) -> str:
         """
         Retorna las instrucciones de evaluación según el nivel de estrictez configurado.
@@ -324,12 +617,6 @@ IMPORTANTE:
     ) -> str:
         """Construye el prompt de evaluación con toda la información"""
         
-        # Truncar texto si es muy largo (para no exceder límites de tokens)
-        max_text_length = 4000
-        if len(transcribed_text) > max_text_length:
-            transcribed_text = transcribed_text[:max_text_length] + "..."
-            logger.warning(f"⚠️ Texto truncado a {max_text_length} caracteres")
-        
         # Definir instrucciones según nivel de estrictez
         strictness_instructions = self._get_strictness_instructions(strictness_level)
         
@@ -356,7 +643,52 @@ Evalúa la coherencia entre lo que el estudiante dijo y las instrucciones de la
 **TRANSCRIPCIÓN:**
 "{transcribed_text}"
 
+(Si aparece [...], la transcripción se resumió con extractos literales; no penalices los saltos.)
+
+{self._build_criteria_section(assignment_title)}━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+📝 FORMATO DE RESPUESTA REQUERIDO
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Responde EXACTAMENTE en este formato JSON (sin texto adicional):
+
+```json
+{{
+  "thematic_coherence": 85.0,
+  "depth_understanding": 75.0,
+  "content_relevance": 90.0,
+  "structure_clarity": 80.0,
+  "overall_coherence": 82.5,
+  "feedback": "Análisis breve (150-250 palabras) que explique la calificación, destacando qué tan bien cumplió con las instrucciones de la asignación.",
+  "strengths": [
+    "Punto fuerte específico 1",
+    "Punto fuerte específico 2",
+    "Punto fuerte específico 3"
+  ],
+  "improvements": [
+    "Sugerencia concreta 1",
+    "Sugerencia concreta 2",
+    "Sugerencia concreta 3"
+  ],
+  "key_concepts_covered": [
+    "Concepto clave 1 mencionado",
+    "Concepto clave 2 mencionado"
+  ],
+  "missing_elements": [
+    "Elemento que faltó según las instrucciones",
+    "Otro aspecto no abordado"
+  ]
+}}
+```
+
+IMPORTANTE: 
+- Sé específico y objetivo
+- Basa tu evaluación en la coherencia entre instrucciones y transcripción
+- El feedback debe ser constructivo y útil para el estudiante
+"""
+    
+    def _build_criteria_section(self, assignment_title: str) -> str:
+        """Criterios de evaluación comunes al prompt individual y al de lote"""
+        return f"""━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 📊 CRITERIOS DE EVALUACIÓN
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
@@ -399,46 +731,82 @@ Evalúa de 0-100 cada criterio:
    - ¿El discurso tiene estructura lógica?
    - ¿Las ideas se expresan claramente?
    - ¿Hay fluidez en la exposición?
+"""
+    
+    def _build_batch_evaluation_prompt(
+        self,
+        participants: list,
+        assignment_title: str,
+        assignment_description: str,
+        strictness_level: str = 'moderate'
+    ) -> str:
+        """
+        Construye un único prompt para evaluar varios participantes.
+        
+        Las instrucciones de estrictez, la asignación y los criterios se
+        incluyen una sola vez; cada participante aporta solo su transcripción
+        (ya compactada).
+        
+        Args:
+            participants: Lista de tuplas (participant_name, transcribed_text)
+        """
+        strictness_instructions = self._get_strictness_instructions(strictness_level)
+        
+        transcripts = "\n\n".join(
+            f"**PARTICIPANTE:** {name}\n\n**TRANSCRIPCIÓN:**\n\"{text}\""
+            for name, text in participants
+        )
+        names = ", ".join(f'"{name}"' for name, _ in participants)
+        
+        return f"""
+Evalúa la coherencia entre lo que CADA estudiante dijo y las instrucciones de la asignación.
+Evalúa a cada participante de forma INDEPENDIENTE, solo con su propia transcripción.
+
+{strictness_instructions}
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+📋 ASIGNACIÓN DADA A LOS ESTUDIANTES
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+**TÍTULO:** {assignment_title}
 
+**INSTRUCCIONES/DESCRIPCIÓN:**
+{assignment_description if assignment_description else "No se proporcionó descripción específica"}
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+🎤 LO QUE DIJO CADA ESTUDIANTE (Transcripciones de Whisper)
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+{transcripts}
+
+(Si aparece [...], la transcripción se resumió con extractos literales; no penalices los saltos.)
+
+{self._build_criteria_section(assignment_title)}━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 📝 FORMATO DE RESPUESTA REQUERIDO
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-Responde EXACTAMENTE en este formato JSON (sin texto adicional):
+Responde EXACTAMENTE con un objeto JSON (sin texto adicional) que contenga
+un elemento en "participants" por cada participante, en el mismo orden
+({names}), copiando el nombre exacto en "participant":
 
 ```json
 {{
-  "thematic_coherence": 85.0,
-  "depth_understanding": 75.0,
-  "content_relevance": 90.0,
-  "structure_clarity": 80.0,
-  "overall_coherence": 82.5,
-  "feedback": "Análisis breve (150-250 palabras) que explique la calificación, destacando qué tan bien cumplió con las instrucciones de la asignación.",
-  "strengths": [
-    "Punto fuerte específico 1",
-    "Punto fuerte específico 2",
-    "Punto fuerte específico 3"
-  ],
-  "improvements": [
-    "Sugerencia concreta 1",
-    "Sugerencia concreta 2",
-    "Sugerencia concreta 3"
-  ],
-  "key_concepts_covered": [
-    "Concepto clave 1 mencionado",
-    "Concepto clave 2 mencionado"
-  ],
-  "missing_elements": [
-    "Elemento que faltó según las instrucciones",
-    "Otro aspecto no abordado"
+  "participants": [
+    {{
+      "participant": "Nombre exacto del participante",
+      "thematic_coherence": 85.0,
+      "depth_understanding": 75.0,
+      "content_relevance": 90.0,
+      "structure_clarity": 80.0,
+      "feedback": "Análisis breve (150-250 palabras) de este participante.",
+      "strengths": ["Punto fuerte específico 1", "Punto fuerte específico 2"],
+      "improvements": ["Sugerencia concreta 1", "Sugerencia concreta 2"],
+      "key_concepts_covered": ["Concepto clave mencionado"],
+      "missing_elements": ["Elemento que faltó según las instrucciones"]
+    }}
   ]
 }}
 ```
-
-IMPORTANTE: 
-- Sé específico y objetivo
-- Basa tu evaluación en la coherencia entre instrucciones y transcripción
-- El feedback debe ser constructivo y útil para el estudiante
 """
     
     def _parse_ai_response(self, response_text: str, participant_name: str) -> dict:
@@ -454,39 +822,7 @@ IMPORTANTE:
             
             data = json.loads(json_match.group())
             
-            # Extraer puntuaciones
-            thematic = float(data.get('thematic_coherence', 70))
-            depth = float(data.get('depth_understanding', 70))
-            relevance = float(data.get('content_relevance', 70))
-            structure = float(data.get('structure_clarity', 70))
-            
-            # Calcular score final ponderado
-            overall_score = (
-                thematic * 0.40 +
-                depth * 0.30 +
-                relevance * 0.20 +
-                structure * 0.10
-            )
-            
-            # Validar que esté en rango 0-100
-            overall_score = max(0, min(100, overall_score))
-            
-            return {
-                'coherence_score': round(overall_score, 1),
-                'feedback': data.get('feedback', 'Análisis completado por IA'),
-                'details': {
-                    'thematic_coherence': thematic,
-                    'depth_understanding': depth,
-                    'content_relevance': relevance,
-                    'structure_clarity': structure
-                },
-                'strengths': data.get('strengths', []),
-                'improvements': data.get('improvements', []),
-                'key_concepts_covered': data.get('key_concepts_covered', []),
-                'missing_elements': data.get('missing_elements', []),
-                'ai_powered': True,
-                'participant_name': participant_name
-            }
+            return self._result_from_data(data, participant_name)
             
         except json.JSONDecodeError as e:
             logger.error(f"❌ Error parseando JSON: {e}")
@@ -515,6 +851,95 @@ IMPORTANTE:
             logger.error(f"❌ Error inesperado parseando respuesta: {e}")
             raise
     
+    def _result_from_data(self, data: dict, participant_name: str) -> dict:
+        """Convierte el JSON de evaluación de un participante al formato de resultado"""
+        # Extraer puntuaciones
+        thematic = float(data.get('thematic_coherence', 70))
+        depth = float(data.get('depth_understanding', 70))
+        relevance = float(data.get('content_relevance', 70))
+        structure = float(data.get('structure_clarity', 70))
+        
+        # Calcular score final ponderado (limitado a 0-100)
+        overall_score = weighted_coherence_score(thematic, depth, relevance, structure)
+        
+        return {
+            'coherence_score': round(overall_score, 1),
+            'feedback': data.get('feedback', 'Análisis completado por IA'),
+            'details': {
+                'thematic_coherence': thematic,
+                'depth_understanding': depth,
+                'content_relevance': relevance,
+                'structure_clarity': structure
+            },
+            'strengths': data.get('strengths', []),
+            'improvements': data.get('improvements', []),
+            'key_concepts_covered': data.get('key_concepts_covered', []),
+            'missing_elements': data.get('missing_elements', []),
+            'ai_powered': True,
+            'participant_name': participant_name
+        }
+    
+    def _validate_batch_item(self, item) -> None:
+        """
+        Valida un elemento de la respuesta por lotes contra BATCH_ITEM_SCHEMA.
+        
+        Raises:
+            ValueError: Si falta un campo, tiene tipo incorrecto o un puntaje fuera de 0-100
+        """
+        if not isinstance(item, dict):
+            raise ValueError("El elemento no es un objeto JSON")
+        
+        for field, expected_type in BATCH_ITEM_SCHEMA.items():
+            value = item.get(field)
+            if not isinstance(value, expected_type) or isinstance(value, bool):
+                raise ValueError(f"Campo '{field}' ausente o con tipo inválido")
+            if field in SCORE_FIELDS and not 0 <= value <= 100:
+                raise ValueError(f"Campo '{field}' fuera de rango: {value}")
+    
+    def _parse_batch_response(self, response_text: str, participant_names: list) -> dict:
+        """
+        Parsea y valida la respuesta por lotes.
+        
+        Los elementos se emparejan por nombre (o por posición si el nombre no
+        coincide); los que no pasan la validación se omiten para reintentarlos
+        de forma individual.
+        
+        Returns:
+            dict {índice del participante: resultado}
+        
+        Raises:
+            ValueError: Si la respuesta no tiene la estructura esperada
+        """
+        json_match = re.search(r'\{[\s\S]*\}', response_text)
+        if not json_match:
+            raise ValueError("No se encontró JSON en la respuesta")
+        
+        data = json.loads(json_match.group())
+        items = data.get('participants') if isinstance(data, dict) else None
+        if not isinstance(items, list):
+            raise ValueError("La respuesta no contiene la lista 'participants'")
+        
+        positions = {name: idx for idx, name in enumerate(participant_names)}
+        results = {}
+        
+        for position, item in enumerate(items):
+            try:
+                self._validate_batch_item(item)
+            except ValueError as e:
+                logger.warning(f"⚠️ Elemento {position + 1} de la respuesta por lotes inválido: {e}")
+                continue
+            
+            idx = positions.get(item['participant'].strip())
+            if idx is None and len(items) == len(participant_names):
+                idx = position
+            if idx is None or idx in results:
+                logger.warning(f"⚠️ Participante desconocido en la respuesta por lotes: {item['participant']}")
+                continue
+            
+            results[idx] = self._result_from_data(item, participant_names[idx])
+        
+        return results
+    
     def _insufficient_text_response(self, participant_name: str) -> dict:
         """Respuesta cuando el texto es insuficiente para análisis"""
         return {
@@ -562,9 +987,338 @@ IMPORTANTE:
             'error': error_message
         }
     
+    def analyze_participants_concurrently(
+        self,
+        participants: list,
+        assignment_title: str,
+        assignment_description: str,
+        assignment=None,
+        on_partial_score=None
+    ) -> list:
+        """
+        Analiza varios participantes en paralelo, cada uno con una API key distinta.
+        
+        Las peticiones se limitan con un semáforo global (max_concurrent_requests).
+        El plazo de cada participante (participant_timeout) empieza cuando obtiene
+        el semáforo y acota también la espera de keys y el timeout HTTP; los que
+        no terminan a tiempo, o no llegan a empezar, se devuelven como
+        TimeoutError para que el llamador aplique su fallback.
+        
+        Args:
+            participants: Lista de tuplas (participant_name, transcribed_text)
+        
+        Returns:
+            Lista en el mismo orden con el dict de resultado o la excepción producida
+        """
+        if not participants:
+            return []
+        
+        # Resolver estrictez una sola vez (las consultas a la BD no se hacen desde los hilos)
+        strictness_level = self._resolve_strictness_level(assignment)
+        
+        max_concurrent = self.config.get('max_concurrent_requests', 5)
+        semaphore = _get_request_semaphore(max_concurrent)
+        request_timeout = self.config.get('timeout', 45)
+        participant_timeout = self.config.get('participant_timeout', request_timeout * 2)
+        max_workers = min(len(participants), max_concurrent)
+        
+        started = {}  # índice -> instante en que el participante obtuvo el semáforo
+        abandoned = threading.Event()
+        
+        def _run(index, name, text):
+            try:
+                # Esperar turno sin quedarse bloqueado si el llamador ya desistió
+                while not semaphore.acquire(timeout=0.5):
+                    if abandoned.is_set():
+                        raise TimeoutError(f"{name} no llegó a empezar")
+                try:
+                    started[index] = time.monotonic()
+                    # Cada hilo reserva su key en el rate limiter (la de mayor margen)
+                    return self.analyze_participant_coherence(
+                        participant_name=name,
+                        transcribed_text=text,
+                        assignment_title=assignment_title,
+                        assignment_description=assignment_description,
+                        strictness_level=strictness_level,
+                        on_partial_score=on_partial_score,
+                        deadline=started[index] + participant_timeout
+                    )
+                finally:
+                    semaphore.release()
+            finally:
+                # La cache de respuestas usa la BD: cerrar la conexión de este hilo
+                connection.close()
+        
+        executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='groq-coherence'
+        )
+        try:
+            futures = [
+                executor.submit(_run, index, name, text)
+                for index, (name, text) in enumerate(participants)
+            ]
+            
+            # Plazo para empezar: una tanda de participant_timeout por cada grupo de hilos
+            start_deadline = time.monotonic() + participant_timeout * math.ceil(len(participants) / max_workers)
+            results = [None] * len(participants)
+            pending = dict(enumerate(futures))
+            
+            while pending:
+                wait(pending.values(), timeout=1.0, return_when=FIRST_COMPLETED)
+                now = time.monotonic()
+                
+                for index, future in list(pending.items()):
+                    name = participants[index][0]
+                    if future.done():
+                        results[index] = future.exception() or future.result()
+                    elif index in started:
+                        # El hilo corta solo al llegar al plazo; margen para que lo haga
+                        if now < started[index] + participant_timeout + 5:
+                            continue
+                        logger.warning(f"⏱️ Timeout analizando {name} ({participant_timeout}s)")
+                        results[index] = TimeoutError(f"Timeout de {participant_timeout}s analizando {name}")
+                    elif now >= start_deadline:
+                        future.cancel()
+                        logger.warning(f"⏱️ {name} no obtuvo turno para analizarse a tiempo")
+                        results[index] = TimeoutError(f"{name} no llegó a empezar en el plazo")
+                    else:
+                        continue
+                    del pending[index]
+            return results
+        finally:
+            # Los hilos que aún esperan turno desisten; no bloquear por los demás
+            abandoned.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def analyze_participants(
+        self,
+        participants: list,
+        assignment_title: str,
+        assignment_description: str,
+        assignment=None,
+        on_partial_score=None
+    ) -> list:
+        """
+        Analiza los participantes de una presentación en el modo configurado.
+        
+        Con COHERENCE_CONFIG['batch_mode'] se envían todos en un solo prompt
+        (analyze_participants_batched); si no, una petición por participante
+        en paralelo. Deja en self.last_run_stats los tokens, peticiones y la
+        latencia de la presentación para comparar ambos modos.
+        
+        Args:
+            participants: Lista de tuplas (participant_name, transcribed_text)
+            on_partial_score: Callback (participant_name, score) para progreso parcial
+        
+        Returns:
+            Lista en el mismo orden con el dict de resultado o la excepción producida
+        """
+        start = time.monotonic()
+        
+        if self.config.get('batch_mode') and len(participants) > 1:
+            mode = 'batch'
+            results = self.analyze_participants_batched(
+                participants, assignment_title, assignment_description,
+                assignment=assignment, on_partial_score=on_partial_score
+            )
+        else:
+            mode = 'individual'
+            results = self.analyze_participants_concurrently(
+                participants, assignment_title, assignment_description,
+                assignment=assignment, on_partial_score=on_partial_score
+            )
+        
+        usages = [r.get('usage', {}) for r in results if isinstance(r, dict)]
+        self.last_run_stats = {
+            'mode': mode,
+            'participants': len(participants),
+            'requests': round(sum(u.get('requests', 0) for u in usages), 2),
+            'total_tokens': sum(u.get('total_tokens', 0) for u in usages),
+            'latency_seconds': round(time.monotonic() - start, 2),
+        }
+        logger.info(
+            f"📊 Coherencia IA ({mode}): {self.last_run_stats['participants']} participantes, "
+            f"{self.last_run_stats['requests']} peticiones, {self.last_run_stats['total_tokens']} tokens, "
+            f"{self.last_run_stats['latency_seconds']}s"
+        )
+        
+        return results
+    
+    def analyze_participants_batched(
+        self,
+        participants: list,
+        assignment_title: str,
+        assignment_description: str,
+        assignment=None,
+        on_partial_score=None
+    ) -> list:
+        """
+        Evalúa varios participantes con un único prompt por lote.
+        
+        El prompt de sistema, las instrucciones de estrictez y los criterios se
+        envían una vez por lote (hasta batch_max_participants participantes).
+        Los participantes cuya evaluación falta o no pasa la validación del
+        esquema se reintentan con peticiones individuales.
+        
+        Args:
+            participants: Lista de tuplas (participant_name, transcribed_text)
+        
+        Returns:
+            Lista en el mismo orden con el dict de resultado o la excepción producida
+        """
+        if not participants:
+            return []
+        
+        strictness_level = self._resolve_strictness_level(assignment)
+        results = [None] * len(participants)
+        
+        # Sin texto suficiente no hace falta enviarlos a la IA
+        evaluable = []
+        for idx, (name, text) in enumerate(participants):
+            if not text or len(text.strip()) < 20:
+                results[idx] = self._insufficient_text_response(name)
+            else:
+                evaluable.append(idx)
+        
+        batch_size = max(1, self.config.get('batch_max_participants', 6))
+        for start in range(0, len(evaluable), batch_size):
+            chunk = evaluable[start:start + batch_size]
+            try:
+                chunk_results = self._analyze_batch(
+                    [participants[idx] for idx in chunk],
+                    assignment_title,
+                    assignment_description,
+                    strictness_level
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Evaluación por lotes fallida, se usará evaluación individual: {e}")
+                chunk_results = {}
+            
+            for position, result in chunk_results.items():
+                results[chunk[position]] = result
+                if on_partial_score:
+                    on_partial_score(participants[chunk[position]][0], result['coherence_score'])
+        
+        # Fallback: peticiones individuales para los que faltan
+        missing = [idx for idx, result in enumerate(results) if result is None]
+        if missing:
+            logger.info(f"🔄 Evaluando individualmente {len(missing)} participante(s) sin resultado válido")
+            fallback_results = self.analyze_participants_concurrently(
+                [participants[idx] for idx in missing],
+                assignment_title,
+                assignment_description,
+                assignment=assignment,
+                on_partial_score=on_partial_score
+            )
+            for idx, result in zip(missing, fallback_results):
+                results[idx] = result
+        
+        return results
+    
+    def _analyze_batch(
+        self,
+        participants: list,
+        assignment_title: str,
+        assignment_description: str,
+        strictness_level: str
+    ) -> dict:
+        """
+        Ejecuta una petición por lotes.
+        
+        Returns:
+            dict {posición en participants: resultado} solo con los elementos válidos
+        """
+        names = [name for name, _ in participants]
+        
+        # Compactar cada transcripción antes de construir el prompt
+        compacted = []
+        compactions = []
+        for name, text in participants:
+            compacted_text, compaction = self.compactor.compact(text, assignment_title, assignment_description)
+            compacted.append((name, compacted_text))
+            compactions.append(compaction)
+        
+        prompt = self._build_batch_evaluation_prompt(
+            compacted, assignment_title, assignment_description, strictness_level
+        )
+        messages = [
+            {"role": "system", "content": self._get_system_prompt()},
+            {"role": "user", "content": prompt}
+        ]
+        
+        cache_key = LLMCacheService.build_key(self.config['model'], self.config['temperature'], messages)
+        cached_response = LLMCacheService.get(cache_key)
+        if cached_response:
+            results = self._parse_batch_response(cached_response, names)
+            for position, result in results.items():
+                result['details']['compaction'] = compactions[position]
+                result['usage'] = {'total_tokens': 0, 'requests': 0, 'latency_seconds': 0.0, 'cached': True}
+            return results
+        
+        max_tokens = min(
+            self.config.get('batch_max_tokens_per_participant', 700) * len(participants),
+            self.config.get('batch_max_tokens', 6000)
+        )
+        estimated_tokens = estimate_messages_tokens(messages, max_tokens)
+        
+        api_key = self.key_manager.acquire_key(estimated_tokens, timeout=self.config.get('rate_limit_wait', 60))
+        if not api_key:
+            raise RuntimeError("Límite de peticiones de Groq alcanzado")
+        
+        logger.info(f"🤖 Evaluando {len(participants)} participantes en un solo prompt (~{estimated_tokens} tokens)")
+        
+        semaphore = _get_request_semaphore(self.config.get('max_concurrent_requests', 5))
+        request_start = time.monotonic()
+        try:
+            with semaphore:
+                raw_response = self._get_client(api_key).chat.completions.with_raw_response.create(
+                    model=self.config['model'],
+                    messages=messages,
+                    temperature=self.config['temperature'],
+                    max_tokens=max_tokens,
+                    response_format={"type": "json_object"},
+                    timeout=self.config.get('participant_timeout', 90)
+                )
+        except Exception as e:
+            if 'rate_limit' in str(e).lower() or '429' in str(e):
+                error_response = getattr(e, 'response', None)
+                retry_after = self.key_manager.update_from_headers(
+                    api_key, getattr(error_response, 'headers', None)
+                )
+                self.key_manager.mark_key_as_failed(api_key, f"Rate limit: {e}", retry_after=retry_after)
+            raise
+        
+        response = raw_response.parse()
+        latency = time.monotonic() - request_start
+        
+        self.key_manager.update_from_headers(api_key, raw_response.headers)
+        usage = getattr(response, 'usage', None)
+        total_tokens = getattr(usage, 'total_tokens', None)
+        self.key_manager.record_usage(api_key, estimated_tokens, total_tokens)
+        
+        ai_response = response.choices[0].message.content
+        results = self._parse_batch_response(ai_response, names)
+        
+        if len(results) == len(participants):
+            LLMCacheService.set(cache_key, self.config['model'], ai_response, total_tokens=total_tokens)
+        
+        # Repartir el costo del lote entre los participantes con resultado válido
+        for position, result in results.items():
+            result['details']['compaction'] = compactions[position]
+            result['usage'] = {
+                'total_tokens': round((total_tokens or 0) / len(results)),
+                'requests': round(1 / len(results), 3),
+                'latency_seconds': round(latency, 2),
+                'cached': False
+            }
+        
+        logger.info(f"✅ Lote evaluado: {len(results)}/{len(participants)} participantes válidos en {latency:.1f}s")
+        return results
+    
     def batch_analyze(self, participants_data: list, assignment_info: dict) -> list:
         """
-        Analiza múltiples participantes en batch.
+        Analiza múltiples participantes (modo por lotes o peticiones concurrentes).
         
         Args:
             participants_data: Lista de dicts con 'name' y 'transcription'
@@ -573,21 +1327,19 @@ IMPORTANTE:
         Returns:
             Lista de resultados de análisis
         """
-        results = []
-        
         assignment_title = assignment_info.get('title', 'Sin título')
         assignment_description = assignment_info.get('description', '')
         
-        for participant in participants_data:
-            result = self.analyze_participant_coherence(
-                participant_name=participant['name'],
-                transcribed_text=participant['transcription'],
-                assignment_title=assignment_title,
-                assignment_description=assignment_description
-            )
-            results.append(result)
+        outcomes = self.analyze_participants(
+            [(p['name'], p['transcription']) for p in participants_data],
+            assignment_title,
+            assignment_description
+        )
         
-        return results
+        return [
+            outcome if isinstance(outcome, dict) else self._fallback_response(participant['name'], str(outcome))
+            for participant, outcome in zip(participants_data, outcomes)
+        ]
     
     @staticmethod
     def is_available() -> bool:
@@ -1,6 +1,10 @@
 # apps/ai_processor/services/ai_service.py
 import logging
+import threading
+from django.db import transaction
 from django.utils import timezone
+from apps.presentaciones.analysis_proxy import proxy_file_path
+from apps.presentaciones.progress import publish_progress
 from .transcription_service import TranscriptionService
 from .face_detection_service import FaceDetectionService
 from .liveness_detection_service import LivenessDetectionService
@@ -10,6 +14,19 @@ from .audio_segmentation_service import AudioSegmentationService
 logger = logging.getLogger(__name__)
 
 class AIService:
+    # Campos que escribe el análisis. La subida a Cloudinary corre en paralelo
+    # y guarda sus propios campos (is_stored_in_cloud, cloudinary_*,
+    # cloud_transfer_*): un save() completo con la instancia cargada al
+    # empezar los pisaría con los valores viejos.
+    ANALYSIS_FIELDS = [
+        'status', 'analyzed_at', 'ai_score', 'ai_feedback',
+        'is_live_recording', 'liveness_score', 'liveness_confidence', 'recording_type',
+        'participation_data', 'transcription_text', 'transcription_segments',
+        'audio_duration', 'transcription_completed_at',
+        'group_conclusion', 'group_conclusion_signature', 'updated_at',
+    ]
+    FAILED_FIELDS = ['status', 'ai_feedback', 'updated_at']
+    
     def __init__(self):
         self.transcription_service = TranscriptionService()
         self.face_detection_service = FaceDetectionService(
@@ -29,25 +46,56 @@ class AIService:
         Análisis completo de una presentación con evaluación individual
         """
         try:
-            # Actualizar estado a procesando
+            # Actualizar estado a procesando (update() no dispara post_save; la
+            # presentación se guarda una sola vez al terminar el análisis)
             presentation.status = 'PROCESSING'
-            presentation.save()
+            type(presentation).objects.filter(pk=presentation.pk).update(status='PROCESSING')
+            
+            # Estado de progreso compartido (los scores parciales llegan desde varios hilos)
+            progress_state = {'status': 'PROCESSING', 'progress': 0, 'step': '', 'partial_scores': {}}
+            progress_lock = threading.Lock()
             
             # Función helper para reportar progreso
             def report_progress(progress, step):
-                from django.core.cache import cache
-                cache.set(f'presentation_progress_{presentation.id}', {
-                    'status': 'PROCESSING',
-                    'progress': progress,
-                    'step': step
-                }, timeout=3600)
+                with progress_lock:
+                    progress_state['progress'] = progress
+                    progress_state['step'] = step
+                    publish_progress(presentation.id, {
+                        **progress_state,
+                        'partial_scores': dict(progress_state['partial_scores'])
+                    })
+            
+            # Score parcial de un participante (avanza el progreso de 70% a 88%)
+            def report_partial_score(etiqueta, score, total):
+                with progress_lock:
+                    progress_state['partial_scores'][etiqueta] = round(score, 1)
+                    done = len(progress_state['partial_scores'])
+                report_progress(
+                    70 + int(18 * done / max(total, 1)),
+                    f'Coherencia evaluada: {done}/{total} participantes'
+                )
             
-            video_path = presentation.video_file.path
+            # Original local (se descarga de Cloudinary si storage_lifecycle lo liberó)
+            video_path = presentation.ensure_local_video() or presentation.video_file.path
             
-            # 1. Análisis de liveness (video en vivo vs pregrabado)
+            # Proxy de análisis: video de baja resolución a FPS constantes y audio
+            # 16 kHz para rostros, transcripción y segmentación (si no se puede
+            # generar, las etapas usan el original)
+            report_progress(5, 'Preparando video para análisis...')
+            proxy = presentation.ensure_analysis_proxy()
+            analysis_video_path = proxy_file_path(proxy, 'video') or video_path
+            analysis_audio_path = proxy_file_path(proxy, 'audio')
+            
+            # 1. Análisis de liveness (sobre el original: mide ruido del sensor y
+            # metadatos del contenedor, que el proxy no conserva) (video en vivo vs pregrabado)
             report_progress(15, 'Analizando autenticidad del video...')
             logger.info(f"🎥 Iniciando análisis de liveness para presentación {presentation.id}")
-            liveness_result = self.liveness_detection_service.analyze_video(video_path)
+            liveness_result = self.liveness_detection_service.analyze_video(
+                video_path, probe=presentation.ensure_video_probe()
+            )
+            
+            # Miniaturas WebP y sprite de previsualización (no crítico)
+            presentation.generate_media_derivatives()
             
             # Guardar resultados de liveness
             if liveness_result['success']:
@@ -59,7 +107,9 @@ class AIService:
             # 2. Detección de rostros y análisis de participación
             report_progress(30, 'Detectando rostros y participantes...')
             logger.info(f"👥 Iniciando detección de rostros para presentación {presentation.id}")
-            face_analysis = self.face_detection_service.process_video(video_path, presentation_id=presentation.id)
+            face_analysis = self.face_detection_service.process_video(
+                analysis_video_path, presentation_id=presentation.id
+            )
             
             # Guardar datos de participación básicos
             presentation.participation_data = face_analysis
@@ -67,7 +117,9 @@ class AIService:
             # 3. Transcripción completa del video
             report_progress(50, 'Transcribiendo audio con Whisper...')
             logger.info(f"🎤 Iniciando transcripción completa para presentación {presentation.id}")
-            transcription_result = self.transcription_service.transcribe_video(video_path)
+            transcription_result = self.transcription_service.transcribe_video(
+                video_path, audio_path=analysis_audio_path
+            )
             
             # Guardar transcripción completa
             presentation.transcription_text = transcription_result['full_text']
@@ -86,15 +138,14 @@ class AIService:
                 logger.error(f"Sin audio detectado en presentación {presentation.id}")
                 presentation.status = 'FAILED'
                 presentation.ai_feedback = error_msg
-                presentation.save()
+                presentation.save(update_fields=self.ANALYSIS_FIELDS)
                 
-                from django.core.cache import cache
-                cache.set(f'presentation_progress_{presentation.id}', {
+                publish_progress(presentation.id, {
                     'status': 'FAILED',
                     'progress': 0,
                     'step': 'Sin audio detectado',
                     'error': error_msg
-                }, timeout=3600)
+                })
                 
                 return False
             
@@ -140,7 +191,7 @@ class AIService:
                 participants_data = self._prepare_participants_data(
                     face_analysis['participants'],
                     transcription_result,
-                    video_path
+                    analysis_audio_path or video_path
                 )
                 
                 # Obtener puntaje máximo de la asignación (default 20)
@@ -157,11 +208,14 @@ class AIService:
                     tema,
                     descripcion_tema,
                     max_score=max_score,  # Pasar puntaje máximo
-                    assignment=assignment  # Pasar assignment completo para configuración de estrictez
+                    assignment=assignment,  # Pasar assignment completo para configuración de estrictez
+                    progress_callback=lambda etiqueta, score: report_partial_score(
+                        etiqueta, score, len(participants_data)
+                    )
                 )
                 
-                # Guardar participantes individuales en la BD
-                self._save_participants(presentation, coherence_results)
+                # Participantes individuales (se guardan al final, en una sola transacción)
+                participants = self._build_participants(presentation, coherence_results)
                 
                 # Calcular score promedio de coherencia
                 avg_coherence = sum(r['nota_coherencia'] for r in coherence_results) / len(coherence_results)
@@ -209,15 +263,16 @@ class AIService:
                     tema,
                     descripcion_tema,
                     max_score=max_score,
-                    assignment=assignment
+                    assignment=assignment,
+                    progress_callback=lambda etiqueta, score: report_partial_score(etiqueta, score, 1)
                 )
                 
                 # Marcar que no hay rostro en el resultado
                 coherence_results[0]['sin_rostro'] = True
                 coherence_results[0]['observacion'] += " ⚠️ NOTA: No se detectó ningún rostro en el video, calificación basada únicamente en el análisis de audio."
                 
-                # Guardar participante virtual en la BD
-                self._save_participants(presentation, coherence_results)
+                # Participante virtual (se guarda al final, en una sola transacción)
+                participants = self._build_participants(presentation, coherence_results)
                 
                 # Calcular score
                 avg_coherence = coherence_results[0]['nota_coherencia']
@@ -235,10 +290,19 @@ class AIService:
                 max_score
             )
             
-            # Actualizar estado
+            # Conclusión grupal (se genera una vez y queda persistida)
+            try:
+                from .group_conclusion_service import GroupConclusionService
+                GroupConclusionService.get_or_generate(presentation, participants=participants, save=False)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo generar la conclusión grupal: {e}")
+            
+            # Actualizar estado y guardar todo el resultado de forma atómica
             presentation.status = 'ANALYZED'
             presentation.analyzed_at = timezone.now()
-            presentation.save()
+            with transaction.atomic():
+                self._save_participants(presentation, participants)
+                presentation.save(update_fields=self.ANALYSIS_FIELDS)
             
             report_progress(100, 'Análisis completado ✅')
             logger.info(f"✅ Análisis completado para presentación {presentation.id}")
@@ -248,7 +312,7 @@ class AIService:
             logger.error(f"❌ Error en análisis IA: {str(e)}", exc_info=True)
             presentation.ai_feedback = f"Error en análisis: {str(e)}"
             presentation.status = 'FAILED'
-            presentation.save()
+            presentation.save(update_fields=self.FAILED_FIELDS)
             return False
     
     def analyze_coherence(self, transcription, topic_description):
@@ -366,16 +430,16 @@ class AIService:
             
             return participants_data
     
-    def _save_participants(self, presentation, coherence_results):
+    def _build_participants(self, presentation, coherence_results):
         """
-        Guarda los resultados individuales de participantes en la BD
+        Construye (sin guardar) los participantes a partir de los resultados individuales.
+        
+        El nivel de coherencia se valida en memoria; la escritura se hace después
+        con _save_participants dentro de la transacción del análisis.
         """
         from apps.presentaciones.models import Participant
         
-        # Eliminar participantes anteriores si existen
-        presentation.participants.all().delete()
-        
-        # Crear nuevos participantes
+        participants = []
         for resultado in coherence_results:
             # Buscar la foto si existe
             photo_path = resultado.get('foto_url')
@@ -399,7 +463,7 @@ class AIService:
             if 'feedback_ia_avanzada' in resultado:
                 ai_feedback_text = resultado['feedback_ia_avanzada']
             
-            Participant.objects.create(
+            participant = Participant(
                 presentation=presentation,
                 label=resultado['etiqueta'],
                 photo=photo_path,  # Guardar ruta de la foto
@@ -419,8 +483,27 @@ class AIService:
                 observations=resultado['observacion'],
                 keywords_found=resultado['palabras_clave_encontradas']
             )
+            participant._validate_coherence_level()
+            participants.append(participant)
+        
+        return participants
+    
+    def _save_participants(self, presentation, participants):
+        """
+        Reemplaza los participantes de la presentación en la BD.
+        
+        Debe llamarse dentro de transaction.atomic(): si algo falla no quedan
+        participantes a medio guardar.
+        """
+        from apps.presentaciones.models import Participant
+        
+        # Eliminar participantes anteriores si existen
+        presentation.participants.all().delete()
+        
+        # bulk_create no llama a Participant.save(): la validación ya se hizo en memoria
+        Participant.objects.bulk_create(participants)
         
-        logger.info(f"💾 Guardados {len(coherence_results)} participantes en la BD")
+        logger.info(f"💾 Guardados {len(participants)} participantes en la BD")
     
     def analyze_participation(self, video_path):
         """
@@ -6,7 +6,8 @@ y asigna transcripciones exactas a cada participante.
 
 Métodos disponibles:
 1. Pyannote.audio (RECOMENDADO): Gratuito, preciso, funciona offline
-2. Simple VAD: Detección de actividad de voz básica con Whisper timestamps
+2. Spectral: Diarización ligera offline con embeddings MFCC (librosa + clustering)
+3. Simple VAD: Detección de actividad de voz básica con Whisper timestamps
 """
 
 import os
@@ -14,7 +15,9 @@ import subprocess
 import json
 from pathlib import Path
 from typing import List, Dict, Any, Tuple, Optional
+import importlib.util
 import numpy as np
+from scipy.optimize import linear_sum_assignment
 import logging
 
 
@@ -24,14 +27,26 @@ class AudioSegmentationService:
     
     Estrategias:
     - PYANNOTE: Usa pyannote.audio para diarización profesional (requiere instalación)
+    - SPECTRAL: Embeddings MFCC/log-mel por ventana + clustering (offline, solo CPU)
     - VAD_WHISPER: Usa timestamps de Whisper + heurística de asignación
     - SIMPLE: Distribución proporcional por tiempo de aparición (método actual)
     """
     
     STRATEGY_PYANNOTE = "pyannote"
+    STRATEGY_SPECTRAL = "spectral"
     STRATEGY_VAD_WHISPER = "vad_whisper"
     STRATEGY_SIMPLE = "simple"
     
+    # Parámetros de la diarización espectral
+    SPECTRAL_SAMPLE_RATE = 16000
+    SPECTRAL_HOP_SECONDS = 0.01     # 10 ms por frame MFCC
+    SPECTRAL_WINDOW_SECONDS = 1.5   # Ventana de embedding
+    SPECTRAL_STEP_SECONDS = 0.75    # Salto entre ventanas
+    SPECTRAL_N_MFCC = 20
+    
+    # Pausa (segundos) a partir de la cual se corta un segmento por palabras
+    WORD_GAP_SPLIT_SECONDS = 1.0
+    
     def __init__(self, strategy: str = STRATEGY_VAD_WHISPER):
         """
         Inicializa el servicio de segmentación.
@@ -70,18 +85,27 @@ class AudioSegmentationService:
                 }
             ]
         """
+        diarization_strategies = (self.STRATEGY_PYANNOTE, self.STRATEGY_SPECTRAL, self.STRATEGY_VAD_WHISPER)
+        if self.strategy not in diarization_strategies:
+            return self._segment_simple(participants, transcription_data)
+        
+        # Índice de visibilidad: se construye una vez por ejecución y lo comparten
+        # la estrategia elegida y sus fallbacks
+        visibility_index = self._build_visibility_index(participants)
+        
         if self.strategy == self.STRATEGY_PYANNOTE:
-            return self._segment_with_pyannote(video_path, participants, transcription_data)
-        elif self.strategy == self.STRATEGY_VAD_WHISPER:
-            return self._segment_with_vad_whisper(video_path, participants, transcription_data)
+            return self._segment_with_pyannote(video_path, participants, transcription_data, visibility_index)
+        elif self.strategy == self.STRATEGY_SPECTRAL:
+            return self._segment_with_spectral(video_path, participants, transcription_data, visibility_index)
         else:
-            return self._segment_simple(participants, transcription_data)
+            return self._segment_with_vad_whisper(video_path, participants, transcription_data, visibility_index)
     
     def _segment_with_pyannote(
         self,
         video_path: str,
         participants: List[Dict[str, Any]],
-        transcription_data: Dict[str, Any]
+        transcription_data: Dict[str, Any],
+        visibility_index: Optional[List[Dict[str, np.ndarray]]] = None
     ) -> List[Dict[str, Any]]:
         """
         Segmentación usando pyannote.audio (método más preciso).
@@ -123,21 +147,184 @@ class AudioSegmentationService:
             return self._assign_speakers_to_participants(
                 participants,
                 speaker_segments,
-                transcription_data
+                transcription_data,
+                visibility_index
             )
             
         except ImportError:
             print("⚠️ pyannote.audio no instalado. Usando método alternativo...")
-            return self._segment_with_vad_whisper(video_path, participants, transcription_data)
+            return self._segment_with_vad_whisper(video_path, participants, transcription_data, visibility_index)
         except Exception as e:
             print(f"⚠️ Error en pyannote: {str(e)}. Usando método alternativo...")
-            return self._segment_with_vad_whisper(video_path, participants, transcription_data)
+            return self._segment_with_vad_whisper(video_path, participants, transcription_data, visibility_index)
+    
+    def _segment_with_spectral(
+        self,
+        video_path: str,
+        participants: List[Dict[str, Any]],
+        transcription_data: Dict[str, Any],
+        visibility_index: Optional[List[Dict[str, np.ndarray]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Diarización ligera y offline usando embeddings espectrales.
+        
+        Estrategia:
+        1. Reutilizar el buffer PCM de la transcripción (o decodificarlo con FFmpeg)
+        2. Calcular MFCC por frame y agregarlos en ventanas (media + desviación)
+        3. Descartar ventanas de silencio y agrupar el resto en tantos clusters como participantes
+        4. Convertir clusters en turnos y mapearlos a rostros por solapamiento temporal
+        """
+        logger = logging.getLogger(__name__)
+        
+        try:
+            import librosa
+            from sklearn.cluster import KMeans
+            
+            num_speakers = len(participants)
+            if num_speakers < 2:
+                return self._segment_with_vad_whisper(video_path, participants, transcription_data, visibility_index)
+            
+            audio = self._get_pcm_buffer(video_path, transcription_data)
+            sr = self.SPECTRAL_SAMPLE_RATE
+            if audio is None or audio.size < sr * self.SPECTRAL_WINDOW_SECONDS:
+                logger.warning("⚠️ Audio insuficiente para diarización espectral. Usando método alternativo...")
+                return self._segment_with_vad_whisper(video_path, participants, transcription_data, visibility_index)
+            
+            hop_length = int(sr * self.SPECTRAL_HOP_SECONDS)
+            mfcc = librosa.feature.mfcc(
+                y=audio,
+                sr=sr,
+                n_mfcc=self.SPECTRAL_N_MFCC,
+                n_fft=400,
+                hop_length=hop_length,
+                n_mels=40
+            )
+            rms = librosa.feature.rms(y=audio, frame_length=400, hop_length=hop_length)[0]
+            
+            window_starts, embeddings, energies = self._window_embeddings(mfcc, rms)
+            if embeddings.shape[0] < num_speakers:
+                return self._segment_with_vad_whisper(video_path, participants, transcription_data, visibility_index)
+            
+            # VAD por energía: descartar ventanas por debajo del percentil 20 (silencio)
+            voiced = energies > np.percentile(energies, 20)
+            if voiced.sum() < num_speakers:
+                voiced[:] = True
+            
+            features = embeddings[voiced]
+            features = (features - features.mean(axis=0)) / (features.std(axis=0) + 1e-8)
+            labels = KMeans(n_clusters=num_speakers, n_init=10, random_state=0).fit_predict(features)
+            
+            speaker_segments = self._labels_to_turns(
+                window_starts[voiced],
+                labels,
+                total_duration=audio.size / sr
+            )
+            logger.info(f"🔊 SPECTRAL: {len(speaker_segments)} turnos de habla en {num_speakers} clusters")
+            
+            return self._assign_speakers_to_participants(
+                participants,
+                speaker_segments,
+                transcription_data,
+                visibility_index
+            )
+        
+        except ImportError:
+            print("⚠️ librosa/scikit-learn no instalados. Usando método alternativo...")
+            return self._segment_with_vad_whisper(video_path, participants, transcription_data, visibility_index)
+        except Exception as e:
+            print(f"⚠️ Error en diarización espectral: {str(e)}. Usando método alternativo...")
+            return self._segment_with_vad_whisper(video_path, participants, transcription_data, visibility_index)
+    
+    def _get_pcm_buffer(self, video_path: str, transcription_data: Dict[str, Any]) -> Optional[np.ndarray]:
+        """
+        Obtiene el audio mono 16kHz como float32.
+        
+        Usa el buffer que dejó TranscriptionService si está disponible; si no,
+        lo decodifica del video con FFmpeg.
+        """
+        audio = transcription_data.get('audio_samples')
+        if audio is not None and transcription_data.get('sample_rate', self.SPECTRAL_SAMPLE_RATE) == self.SPECTRAL_SAMPLE_RATE:
+            return np.asarray(audio, dtype=np.float32)
+        
+        import imageio_ffmpeg
+        command = [
+            imageio_ffmpeg.get_ffmpeg_exe(),
+            '-i', video_path,
+            '-f', 's16le',
+            '-acodec', 'pcm_s16le',
+            '-ar', str(self.SPECTRAL_SAMPLE_RATE),
+            '-ac', '1',
+            '-'
+        ]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+    
+    def _window_embeddings(self, mfcc: np.ndarray, rms: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Agrega frames MFCC en ventanas deslizantes de forma vectorizada.
+        
+        Returns:
+            Tupla (inicio de cada ventana en segundos, embeddings [media | desviación], energía media)
+        """
+        frames_per_window = int(round(self.SPECTRAL_WINDOW_SECONDS / self.SPECTRAL_HOP_SECONDS))
+        frames_per_step = int(round(self.SPECTRAL_STEP_SECONDS / self.SPECTRAL_HOP_SECONDS))
+        num_frames = min(mfcc.shape[1], rms.shape[0])
+        
+        if num_frames < frames_per_window:
+            return np.zeros(0), np.zeros((0, 2 * mfcc.shape[0])), np.zeros(0)
+        
+        # Sumas acumuladas: cada ventana se resuelve con una resta (O(frames) en total)
+        features = mfcc[:, :num_frames].T.astype(np.float64)
+        cum = np.vstack([np.zeros((1, features.shape[1])), np.cumsum(features, axis=0)])
+        cum_sq = np.vstack([np.zeros((1, features.shape[1])), np.cumsum(features ** 2, axis=0)])
+        cum_rms = np.concatenate(([0.0], np.cumsum(rms[:num_frames])))
+        
+        starts = np.arange(0, num_frames - frames_per_window + 1, frames_per_step)
+        ends = starts + frames_per_window
+        
+        mean = (cum[ends] - cum[starts]) / frames_per_window
+        mean_sq = (cum_sq[ends] - cum_sq[starts]) / frames_per_window
+        std = np.sqrt(np.maximum(mean_sq - mean ** 2, 0))
+        energy = (cum_rms[ends] - cum_rms[starts]) / frames_per_window
+        
+        return starts * self.SPECTRAL_HOP_SECONDS, np.hstack([mean, std]), energy
+    
+    def _labels_to_turns(
+        self,
+        window_starts: np.ndarray,
+        labels: np.ndarray,
+        total_duration: float
+    ) -> List[Dict[str, Any]]:
+        """
+        Convierte etiquetas de ventana en turnos continuos de habla.
+        
+        Ventanas consecutivas con el mismo cluster se fusionan; cada turno se
+        extiende hasta el inicio del siguiente para cubrir los silencios.
+        """
+        if labels.size == 0:
+            return []
+        
+        change = np.flatnonzero(np.diff(labels)) + 1
+        turn_starts_idx = np.concatenate(([0], change))
+        turn_starts = window_starts[turn_starts_idx]
+        turn_ends = np.append(turn_starts[1:], max(total_duration, turn_starts[-1]))
+        turn_starts[0] = 0.0
+        
+        return [
+            {
+                'start': float(start),
+                'end': float(end),
+                'speaker': f'SPEAKER_{int(labels[idx]):02d}'
+            }
+            for start, end, idx in zip(turn_starts, turn_ends, turn_starts_idx)
+        ]
     
     def _segment_with_vad_whisper(
         self,
         video_path: str,
         participants: List[Dict[str, Any]],
-        transcription_data: Dict[str, Any]
+        transcription_data: Dict[str, Any],
+        visibility_index: Optional[List[Dict[str, np.ndarray]]] = None
     ) -> List[Dict[str, Any]]:
         """
         Segmentación usando timestamps de Whisper + heurística de asignación.
@@ -170,38 +357,54 @@ class AudioSegmentationService:
             participant['speech_segments'] = []
             participant['transcription'] = ''
         
-        # Asignar cada segmento de Whisper al participante más visible
-        unassigned_segments = []  # Segmentos sin asignar
+        # Índice de visibilidad: intervalos ordenados y fusionados por participante
+        if visibility_index is None:
+            visibility_index = self._build_visibility_index(participants)
+        
+        # Atribución por palabra si Whisper entregó timestamps por palabra
+        words = transcription_data.get('words')
+        has_visibility = any(entry['starts'].size for entry in visibility_index)
+        if words is not None and len(words) > 0 and has_visibility:
+            return self._segment_words_by_visibility(participants, transcription_data, visibility_index)
         
+        # Filtrar segmentos con texto
+        valid_segments = []
         for segment in whisper_segments:
-            start_time = segment.get('start', 0)
-            end_time = segment.get('end', 0)
             text = segment.get('text', '').strip()
-            
-            if not text:
-                continue
-            
-            # Encontrar participante más visible en este intervalo
-            best_participant = self._find_most_visible_participant(
-                participants,
-                start_time,
-                end_time
-            )
-
-            if best_participant is None:
-                logger.warning(f"❌ Ningún participante visible para segmento [{start_time:.2f}-{end_time:.2f}] '{text[:40]}...'")
-                unassigned_segments.append({
-                    'start': start_time,
-                    'end': end_time,
+            if text:
+                valid_segments.append({
+                    'start': segment.get('start', 0),
+                    'end': segment.get('end', 0),
                     'text': text
                 })
+        
+        if not valid_segments:
+            for participant in participants:
+                participant['transcription'] = ''
+            return participants
+        
+        seg_starts = np.array([seg['start'] for seg in valid_segments], dtype=np.float64)
+        seg_ends = np.array([seg['end'] for seg in valid_segments], dtype=np.float64)
+        
+        # Solapamiento de todos los segmentos con todos los participantes en un solo barrido
+        overlap_matrix = self._compute_overlap_matrix(visibility_index, seg_starts, seg_ends)
+        best_indices = np.argmax(overlap_matrix, axis=0)
+        best_overlaps = overlap_matrix[best_indices, np.arange(len(valid_segments))]
+        
+        # Asignar cada segmento de Whisper al participante más visible
+        unassigned_segments = []  # Segmentos sin asignar
+        
+        for seg_idx, segment in enumerate(valid_segments):
+            start_time = segment['start']
+            end_time = segment['end']
+            
+            if best_overlaps[seg_idx] <= 0:
+                logger.warning(f"❌ Ningún participante visible para segmento [{start_time:.2f}-{end_time:.2f}] '{segment['text'][:40]}...'")
+                unassigned_segments.append(segment)
             else:
+                best_participant = participants[best_indices[seg_idx]]
                 logger.info(f"➡️ Asignando segmento [{start_time:.2f}-{end_time:.2f}] a participant {best_participant.get('participant_id')}")
-                best_participant['speech_segments'].append({
-                    'start': start_time,
-                    'end': end_time,
-                    'text': text
-                })
+                best_participant['speech_segments'].append(segment)
         
         # FALLBACK: Asignar segmentos no asignados al participante más cercano en el tiempo
         if unassigned_segments:
@@ -212,32 +415,13 @@ class AudioSegmentationService:
                 end_time = segment['end']
                 mid_time = (start_time + end_time) / 2
                 
-                # Buscar participante con aparición más cercana en el tiempo
-                closest_participant = None
-                min_distance = float('inf')
-                
-                for participant in participants:
-                    appearances = participant.get('appearances', [])
-                    
-                    for appearance in appearances:
-                        app_start = appearance.get('start_time', 0)
-                        app_end = appearance.get('end_time', 0)
-                        app_mid = (app_start + app_end) / 2
-                        
-                        # Calcular distancia temporal al centro del segmento
-                        distance = abs(mid_time - app_mid)
-                        
-                        if distance < min_distance:
-                            min_distance = distance
-                            closest_participant = participant
+                # Buscar participante con aparición más cercana en el tiempo (búsqueda binaria)
+                closest_idx, min_distance = self._find_nearest_appearance(visibility_index, mid_time)
                 
-                if closest_participant:
+                if closest_idx is not None:
+                    closest_participant = participants[closest_idx]
                     logger.info(f"✅ FALLBACK: Asignando segmento [{start_time:.2f}-{end_time:.2f}] '{segment['text'][:40]}...' a participant {closest_participant.get('participant_id')} (distancia: {min_distance:.2f}s)")
-                    closest_participant['speech_segments'].append({
-                        'start': start_time,
-                        'end': end_time,
-                        'text': segment['text']
-                    })
+                    closest_participant['speech_segments'].append(segment)
                 else:
                     # Último recurso: distribuir equitativamente entre participantes
                     logger.warning(f"⚠️ No hay participante cercano. Distribuyendo equitativamente...")
@@ -246,11 +430,7 @@ class AudioSegmentationService:
                         participants,
                         key=lambda p: len(p.get('speech_segments', []))
                     )
-                    min_text_participant['speech_segments'].append({
-                        'start': start_time,
-                        'end': end_time,
-                        'text': segment['text']
-                    })
+                    min_text_participant['speech_segments'].append(segment)
                     logger.info(f"✅ Asignado a participant {min_text_participant.get('participant_id')} (tiene menos segmentos)")
         
         # Construir transcripción completa para cada participante
@@ -266,6 +446,61 @@ class AudioSegmentationService:
         
         return participants
     
+    def _segment_words_by_visibility(
+        self,
+        participants: List[Dict[str, Any]],
+        transcription_data: Dict[str, Any],
+        visibility_index: List[Dict[str, np.ndarray]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Atribuye cada palabra de Whisper al participante más visible.
+        
+        Palabras sin rostro visible se asignan a la aparición más cercana. Las
+        palabras consecutivas del mismo participante se reagrupan en speech_segments.
+        """
+        logger = logging.getLogger(__name__)
+        
+        words = transcription_data['words']
+        word_texts = transcription_data.get('word_texts', [])
+        starts = np.asarray(words['start'], dtype=np.float64)
+        ends = np.asarray(words['end'], dtype=np.float64)
+        
+        overlap_matrix = self._compute_overlap_matrix(visibility_index, starts, ends)
+        speakers = np.argmax(overlap_matrix, axis=0)
+        
+        # Palabras sin solapamiento: participante con la aparición más cercana
+        no_overlap = overlap_matrix.max(axis=0) <= 0
+        if no_overlap.any():
+            mids = (starts[no_overlap] + ends[no_overlap]) / 2
+            distances = self._nearest_appearance_distances(visibility_index, mids)
+            speakers[no_overlap] = np.argmin(distances, axis=0)
+            logger.info(f"⚠️ {int(no_overlap.sum())} palabras sin rostro visible asignadas por cercanía")
+        
+        # Reagrupar: nuevo segmento al cambiar de participante o tras una pausa larga
+        breaks = np.flatnonzero(
+            (speakers[1:] != speakers[:-1]) |
+            (starts[1:] - ends[:-1] > self.WORD_GAP_SPLIT_SECONDS)
+        ) + 1
+        bounds = np.concatenate(([0], breaks, [len(words)]))
+        
+        for group_start, group_end in zip(bounds[:-1], bounds[1:]):
+            text = ''.join(word_texts[group_start:group_end]).strip()
+            if not text:
+                continue
+            participants[speakers[group_start]]['speech_segments'].append({
+                'start': float(starts[group_start]),
+                'end': float(ends[group_end - 1]),
+                'text': text
+            })
+        
+        for participant in participants:
+            participant['transcription'] = ' '.join(
+                seg['text'] for seg in participant['speech_segments']
+            )
+            logger.info(f"📄 Participant {participant.get('participant_id')}: {len(participant['speech_segments'])} segmentos (por palabra), {len(participant['transcription'].split())} palabras")
+        
+        return participants
+    
     def _segment_simple(
         self,
         participants: List[Dict[str, Any]],
@@ -320,7 +555,8 @@ class AudioSegmentationService:
         self,
         participants: List[Dict[str, Any]],
         start_time: float,
-        end_time: float
+        end_time: float,
+        visibility_index: Optional[List[Dict[str, np.ndarray]]] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Encuentra el participante más visible durante un intervalo de tiempo.
@@ -329,112 +565,256 @@ class AudioSegmentationService:
             participants: Lista de participantes con sus apariciones
             start_time: Inicio del intervalo (segundos)
             end_time: Fin del intervalo (segundos)
+            visibility_index: Índice ya construido para estos participantes
+                (construirlo en cada llamada repite el ordenado y la fusión)
         
         Returns:
             El participante más visible o None
         """
-        best_participant = None
-        max_overlap = 0
+        if not participants:
+            return None
+        
+        if visibility_index is None:
+            visibility_index = self._build_visibility_index(participants)
+        overlaps = self._compute_overlap_matrix(
+            visibility_index,
+            np.array([start_time], dtype=np.float64),
+            np.array([end_time], dtype=np.float64)
+        )[:, 0]
+        
+        best_idx = int(np.argmax(overlaps))
+        if overlaps[best_idx] <= 0:
+            return None
+        return participants[best_idx]
+    
+    @staticmethod
+    def _merge_intervals(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ordena y fusiona intervalos solapados o contiguos.
         
+        Returns:
+            Tupla (starts, ends) de intervalos disjuntos ordenados por inicio
+        """
+        if starts.size == 0:
+            return starts, ends
+        
+        order = np.argsort(starts, kind='stable')
+        starts = starts[order]
+        ends = np.maximum(ends[order], starts)
+        
+        # Un intervalo abre un bloque nuevo si empieza después del máximo fin acumulado previo
+        running_end = np.maximum.accumulate(ends)
+        new_block = np.empty(starts.size, dtype=bool)
+        new_block[0] = True
+        new_block[1:] = starts[1:] > running_end[:-1]
+        
+        block_ids = np.cumsum(new_block) - 1
+        merged_starts = starts[new_block]
+        merged_ends = np.zeros(merged_starts.size, dtype=np.float64)
+        np.maximum.at(merged_ends, block_ids, ends)
+        return merged_starts, merged_ends
+    
+    def _build_visibility_index(self, participants: List[Dict[str, Any]]) -> List[Dict[str, np.ndarray]]:
+        """
+        Convierte las apariciones de cada participante en arreglos ordenados.
+        
+        Para cada participante se guarda:
+        - starts/ends: intervalos de visibilidad fusionados
+        - coverage: cobertura acumulada antes de cada intervalo
+        - mids: centros ordenados de las apariciones originales (para el fallback)
+        """
+        index = []
         for participant in participants:
-            overlap = 0
             appearances = participant.get('appearances', [])
+            raw_starts = np.array([a.get('start_time', 0) for a in appearances], dtype=np.float64)
+            raw_ends = np.array([a.get('end_time', 0) for a in appearances], dtype=np.float64)
             
-            for appearance in appearances:
-                app_start = appearance.get('start_time', 0)
-                app_end = appearance.get('end_time', 0)
-                
-                # Calcular solapamiento
-                overlap_start = max(start_time, app_start)
-                overlap_end = min(end_time, app_end)
-                
-                if overlap_end > overlap_start:
-                    overlap += (overlap_end - overlap_start)
+            starts, ends = self._merge_intervals(raw_starts, raw_ends)
+            lengths = ends - starts
+            coverage = np.concatenate(([0.0], np.cumsum(lengths)[:-1])) if lengths.size else lengths
             
-            if overlap > max_overlap:
-                max_overlap = overlap
-                best_participant = participant
+            index.append({
+                'starts': starts,
+                'ends': ends,
+                'coverage': coverage,
+                'mids': np.sort((raw_starts + raw_ends) / 2)
+            })
+        return index
+    
+    @staticmethod
+    def _covered_time_until(entry: Dict[str, np.ndarray], times: np.ndarray) -> np.ndarray:
+        """
+        Tiempo visible acumulado en [0, t] para cada t, usando searchsorted
+        sobre los intervalos fusionados.
+        """
+        starts = entry['starts']
+        if starts.size == 0:
+            return np.zeros(times.shape, dtype=np.float64)
+        
+        idx = np.searchsorted(starts, times, side='right') - 1
+        inside = idx >= 0
+        safe_idx = np.clip(idx, 0, None)
+        partial = np.clip(times - starts[safe_idx], 0, entry['ends'][safe_idx] - starts[safe_idx])
+        return np.where(inside, entry['coverage'][safe_idx] + partial, 0.0)
+    
+    def _compute_overlap_matrix(
+        self,
+        visibility_index: List[Dict[str, np.ndarray]],
+        seg_starts: np.ndarray,
+        seg_ends: np.ndarray
+    ) -> np.ndarray:
+        """
+        Calcula el solapamiento (segundos) de cada segmento con cada participante.
+        
+        Returns:
+            Matriz (participantes x segmentos)
+        """
+        seg_ends = np.maximum(seg_ends, seg_starts)
+        overlap = np.zeros((len(visibility_index), seg_starts.size), dtype=np.float64)
+        for p_idx, entry in enumerate(visibility_index):
+            overlap[p_idx] = (
+                self._covered_time_until(entry, seg_ends) -
+                self._covered_time_until(entry, seg_starts)
+            )
+        return overlap
+    
+    @staticmethod
+    def _nearest_appearance_distances(
+        visibility_index: List[Dict[str, np.ndarray]],
+        times: np.ndarray
+    ) -> np.ndarray:
+        """
+        Distancia de cada instante al centro de aparición más cercano de cada participante.
+        
+        Returns:
+            Matriz (participantes x instantes); inf si el participante no tiene apariciones
+        """
+        distances = np.full((len(visibility_index), times.size), np.inf, dtype=np.float64)
+        for p_idx, entry in enumerate(visibility_index):
+            mids = entry['mids']
+            if mids.size == 0:
+                continue
+            
+            pos = np.searchsorted(mids, times)
+            left = mids[np.clip(pos - 1, 0, mids.size - 1)]
+            right = mids[np.clip(pos, 0, mids.size - 1)]
+            distances[p_idx] = np.minimum(np.abs(times - left), np.abs(right - times))
+        return distances
+    
+    def _find_nearest_appearance(
+        self,
+        visibility_index: List[Dict[str, np.ndarray]],
+        time_point: float
+    ) -> Tuple[Optional[int], float]:
+        """
+        Busca el participante cuya aparición (centro) está más cerca de time_point.
+        
+        Returns:
+            Tupla (índice del participante o None, distancia en segundos)
+        """
+        if not visibility_index:
+            return None, float('inf')
         
-        return best_participant
+        distances = self._nearest_appearance_distances(
+            visibility_index,
+            np.array([time_point], dtype=np.float64)
+        )[:, 0]
+        closest_idx = int(np.argmin(distances))
+        if not np.isfinite(distances[closest_idx]):
+            return None, float('inf')
+        return closest_idx, float(distances[closest_idx])
     
     def _assign_speakers_to_participants(
         self,
         participants: List[Dict[str, Any]],
         speaker_segments: List[Dict[str, Any]],
-        transcription_data: Dict[str, Any]
+        transcription_data: Dict[str, Any],
+        visibility_index: Optional[List[Dict[str, np.ndarray]]] = None
     ) -> List[Dict[str, Any]]:
         """
         Asigna speakers detectados por pyannote a participantes detectados por MediaPipe.
         
         Estrategia:
         - Para cada speaker, calcular solapamiento temporal con apariciones de participantes
-        - Asignar speaker al participante con mayor solapamiento
+        - Emparejar speakers y participantes uno a uno maximizando el solapamiento
+          total (linear_sum_assignment), así dos clusters no caen en la misma persona
+        - El texto de speakers sin pareja (o fuera de todo turno) va al participante
+          más visible en ese momento, o al de la aparición más cercana
         """
         whisper_segments = transcription_data.get('segments', [])
         
         # Mapear speakers a participantes
         speaker_to_participant = {}
         
-        for speaker_label in set(seg['speaker'] for seg in speaker_segments):
-            # Obtener todos los segmentos de este speaker
-            speaker_times = [
-                seg for seg in speaker_segments if seg['speaker'] == speaker_label
-            ]
+        spk_starts = np.array([seg['start'] for seg in speaker_segments], dtype=np.float64)
+        spk_ends = np.array([seg['end'] for seg in speaker_segments], dtype=np.float64)
+        spk_labels = [seg['speaker'] for seg in speaker_segments]
+        
+        if participants and visibility_index is None:
+            visibility_index = self._build_visibility_index(participants)
+        
+        if speaker_segments and participants:
+            # Solapamiento de cada turno de speaker con cada participante
+            overlap_matrix = self._compute_overlap_matrix(visibility_index, spk_starts, spk_ends)
             
-            # Calcular solapamiento con cada participante
-            best_participant = None
-            max_overlap = 0
+            # Acumular solapamiento por speaker
+            label_positions = {}
+            label_ids = np.array([
+                label_positions.setdefault(label, len(label_positions)) for label in spk_labels
+            ])
+            unique_labels = list(label_positions)
+            speaker_overlap = np.zeros((len(participants), len(unique_labels)), dtype=np.float64)
+            np.add.at(speaker_overlap, (slice(None), label_ids), overlap_matrix)
             
-            for participant in participants:
-                overlap = 0
-                appearances = participant.get('appearances', [])
-                
-                for speaker_seg in speaker_times:
-                    for appearance in appearances:
-                        app_start = appearance.get('start_time', 0)
-                        app_end = appearance.get('end_time', 0)
-                        
-                        overlap_start = max(speaker_seg['start'], app_start)
-                        overlap_end = min(speaker_seg['end'], app_end)
-                        
-                        if overlap_end > overlap_start:
-                            overlap += (overlap_end - overlap_start)
-                
-                if overlap > max_overlap:
-                    max_overlap = overlap
-                    best_participant = participant
-            
-            if best_participant:
-                speaker_to_participant[speaker_label] = best_participant
+            # Emparejamiento uno a uno con el mayor solapamiento total
+            rows, cols = linear_sum_assignment(speaker_overlap, maximize=True)
+            for p_idx, label_idx in zip(rows, cols):
+                if speaker_overlap[p_idx, label_idx] > 0:
+                    speaker_to_participant[unique_labels[label_idx]] = participants[p_idx]
         
         # Inicializar transcripciones
         for participant in participants:
             participant['speech_segments'] = []
             participant['transcription'] = ''
         
-        # Asignar texto de Whisper según speakers
-        for segment in whisper_segments:
-            start_time = segment.get('start', 0)
-            end_time = segment.get('end', 0)
-            text = segment.get('text', '').strip()
+        valid_segments = [
+            seg for seg in whisper_segments if seg.get('text', '').strip()
+        ]
+        
+        if valid_segments and speaker_segments:
+            seg_starts = np.array([seg.get('start', 0) for seg in valid_segments], dtype=np.float64)
+            seg_ends = np.array([seg.get('end', 0) for seg in valid_segments], dtype=np.float64)
             
-            if not text:
-                continue
+            # Turno activo al inicio del segmento (o, si no hay, al final)
+            active = self._active_turns(spk_starts, spk_ends, np.concatenate((seg_starts, seg_ends)))
+            active_turns = np.where(active[:seg_starts.size] >= 0, active[:seg_starts.size], active[seg_starts.size:])
             
-            # Encontrar speaker activo en este momento
-            active_speaker = None
-            for speaker_seg in speaker_segments:
-                if (speaker_seg['start'] <= start_time <= speaker_seg['end'] or
-                    speaker_seg['start'] <= end_time <= speaker_seg['end']):
-                    active_speaker = speaker_seg['speaker']
-                    break
+            # Participante de cada segmento según su speaker (-1: sin pareja o sin turno)
+            participant_positions = {id(participant): idx for idx, participant in enumerate(participants)}
+            assigned = np.array([
+                participant_positions[id(speaker_to_participant[spk_labels[turn]])]
+                if turn >= 0 and spk_labels[turn] in speaker_to_participant else -1
+                for turn in active_turns
+            ], dtype=np.int64)
             
-            if active_speaker and active_speaker in speaker_to_participant:
-                participant = speaker_to_participant[active_speaker]
-                participant['speech_segments'].append({
-                    'start': start_time,
-                    'end': end_time,
-                    'text': text
+            # Sin pareja: el más visible durante el segmento o la aparición más cercana
+            unassigned = assigned < 0
+            if unassigned.any():
+                assigned[unassigned] = self._nearest_participants(
+                    visibility_index, seg_starts[unassigned], seg_ends[unassigned]
+                )
+                logging.getLogger(__name__).info(
+                    f"🔊 {int(unassigned.sum())} segmentos de speakers sin pareja asignados por visibilidad"
+                )
+            
+            # Asignar texto de Whisper según speakers
+            for seg_idx, segment in enumerate(valid_segments):
+                if assigned[seg_idx] < 0:
+                    continue
+                participants[assigned[seg_idx]]['speech_segments'].append({
+                    'start': segment.get('start', 0),
+                    'end': segment.get('end', 0),
+                    'text': segment.get('text', '').strip()
                 })
         
         # Construir transcripción completa
@@ -446,6 +826,68 @@ class AudioSegmentationService:
         
         return participants
     
+    def _nearest_participants(
+        self,
+        visibility_index: List[Dict[str, np.ndarray]],
+        starts: np.ndarray,
+        ends: np.ndarray
+    ) -> np.ndarray:
+        """
+        Participante más visible en cada intervalo; sin solapamiento, el de la
+        aparición más cercana.
+        
+        Returns:
+            Arreglo con el índice del participante (-1 si nadie tiene apariciones)
+        """
+        overlap_matrix = self._compute_overlap_matrix(visibility_index, starts, ends)
+        result = np.argmax(overlap_matrix, axis=0)
+        
+        no_overlap = overlap_matrix.max(axis=0) <= 0
+        if no_overlap.any():
+            distances = self._nearest_appearance_distances(
+                visibility_index, (starts[no_overlap] + ends[no_overlap]) / 2
+            )
+            result[no_overlap] = np.where(
+                np.isfinite(distances.min(axis=0)), np.argmin(distances, axis=0), -1
+            )
+        return result
+    
+    @staticmethod
+    def _active_turns(starts: np.ndarray, ends: np.ndarray, times: np.ndarray) -> np.ndarray:
+        """
+        Índice del turno de speaker que contiene cada instante, usando
+        searchsorted sobre los turnos ordenados por inicio (sin matrices
+        turnos x instantes). Si varios turnos se solapan, gana el que empezó
+        más tarde.
+        
+        Returns:
+            Arreglo con el índice (en el orden original) o -1 si ninguno
+        """
+        result = np.full(times.size, -1, dtype=np.int64)
+        if starts.size == 0 or times.size == 0:
+            return result
+        
+        order = np.argsort(starts, kind='stable')
+        sorted_starts = starts[order]
+        sorted_ends = ends[order]
+        
+        pos = np.searchsorted(sorted_starts, times, side='right') - 1
+        candidate = pos >= 0
+        safe_pos = np.clip(pos, 0, None)
+        
+        # Caso normal (turnos disjuntos): el último turno que empezó antes
+        direct = candidate & (sorted_ends[safe_pos] >= times)
+        result[direct] = order[safe_pos[direct]]
+        
+        # Turnos solapados: un turno anterior más largo puede seguir activo
+        running_end = np.maximum.accumulate(sorted_ends)
+        for i in np.flatnonzero(candidate & ~direct & (running_end[safe_pos] >= times)):
+            k = pos[i]
+            while sorted_ends[k] < times[i]:
+                k -= 1
+            result[i] = order[k]
+        return result
+    
     def _get_huggingface_token(self) -> Optional[str]:
         """
         Obtiene el token de Hugging Face desde settings o variable de entorno.
@@ -471,22 +913,54 @@ class AudioSegmentationService:
     @staticmethod
     def get_recommended_strategy() -> str:
         """
-        Determina la mejor estrategia disponible en el sistema.
+        Determina la estrategia a usar.
+        
+        settings.AUDIO_SEGMENTATION_STRATEGY fija una estrategia concreta; con
+        'auto' (por defecto) se usa pyannote si está instalado y hay token, si
+        no la diarización espectral si librosa y scikit-learn están instalados,
+        y si no VAD + Whisper. La elección se registra en el log.
         
         Returns:
             Nombre de la estrategia recomendada
         """
+        logger = logging.getLogger(__name__)
+        
         try:
-            import pyannote.audio
-            # Si pyannote está instalado, verificar token
-            service = AudioSegmentationService()
-            if service._get_huggingface_token():
+            from django.conf import settings
+            configured = getattr(settings, 'AUDIO_SEGMENTATION_STRATEGY', 'auto')
+        except Exception:
+            configured = 'auto'
+        
+        strategies = (
+            AudioSegmentationService.STRATEGY_PYANNOTE,
+            AudioSegmentationService.STRATEGY_SPECTRAL,
+            AudioSegmentationService.STRATEGY_VAD_WHISPER,
+            AudioSegmentationService.STRATEGY_SIMPLE,
+        )
+        if configured in strategies:
+            return configured
+        if configured != 'auto':
+            logger.warning(f"⚠️ AUDIO_SEGMENTATION_STRATEGY desconocida: {configured!r}. Usando 'auto'")
+        
+        # Comprobar disponibilidad sin importar los paquetes (librosa y torch tardan en cargar)
+        def installed(*modules):
+            try:
+                return all(importlib.util.find_spec(module) is not None for module in modules)
+            except (ImportError, ValueError):
+                return False
+        
+        if installed('pyannote.audio'):
+            if AudioSegmentationService()._get_huggingface_token():
                 return AudioSegmentationService.STRATEGY_PYANNOTE
-            else:
-                print("⚠️ pyannote.audio instalado pero falta HF_TOKEN")
-                return AudioSegmentationService.STRATEGY_VAD_WHISPER
-        except ImportError:
-            return AudioSegmentationService.STRATEGY_VAD_WHISPER
+            logger.warning("⚠️ pyannote.audio instalado pero falta HF_TOKEN")
+        
+        if installed('librosa', 'sklearn'):
+            logger.info(
+                "🔊 Diarización espectral seleccionada automáticamente (librosa y scikit-learn instalados); "
+                "AUDIO_SEGMENTATION_STRATEGY='vad_whisper' la desactiva"
+            )
+            return AudioSegmentationService.STRATEGY_SPECTRAL
+        return AudioSegmentationService.STRATEGY_VAD_WHISPER
     
     @staticmethod
     def install_pyannote_instructions() -> str:
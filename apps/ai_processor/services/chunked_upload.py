@@ -0,0 +1,303 @@
+"""
+Motor de subida por chunks en paralelo a Cloudinary
+Ubicación: apps/ai_processor/services/chunked_upload.py
+
+Envía un archivo grande como rangos (Content-Range) con el mismo
+X-Unique-Upload-Id, varios a la vez sobre una sesión HTTP con pool de
+conexiones compartido por todo el proceso. El último chunk se envía cuando
+todos los anteriores fueron confirmados (Cloudinary ensambla el archivo con
+esa petición y devuelve el resultado final).
+
+El tamaño de chunk se ajusta al throughput medido para que cada petición dure
+alrededor de target_chunk_seconds, dentro de los límites de la API (los
+chunks intermedios deben tener al menos 5MB).
+
+La memoria en vuelo está acotada por proceso (max_inflight_bytes): cada chunk
+ocupa su contenido más el cuerpo multipart que arma requests, y sin límite
+serían max_chunk_size x parallel_chunks x 2 por cada video subido a la vez
+(migrate_to_cloudinary --concurrency). Los chunks esperan turno hasta que
+los anteriores liberan su parte.
+
+La URL del endpoint sale de cloudinary.utils.cloudinary_api_url, que respeta
+la opción upload_prefix de la configuración: apuntándola a un servidor HTTP
+local que emule la API se puede probar el motor sin credenciales reales.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import cloudinary
+import cloudinary.utils
+import requests
+from cloudinary.exceptions import Error as CloudinaryError
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+MIN_CHUNK_SIZE = 5 * 1024 * 1024  # Mínimo de Cloudinary para chunks intermedios
+
+DEFAULT_CONFIG = {
+    'chunk_size': 6000000,
+    'parallel_chunks': 4,
+    'target_chunk_seconds': 8,
+    'max_chunk_size': 64 * 1024 * 1024,
+    'chunk_retries': 3,
+    'request_timeout': 120,
+    'pool_size': 16,
+    'max_inflight_bytes': 256 * 1024 * 1024,
+}
+
+_session = None
+_session_lock = threading.Lock()
+_memory_budget = None
+
+
+def get_upload_config():
+    """Configuración de settings.CLOUD_TRANSFER con valores por defecto"""
+    return {**DEFAULT_CONFIG, **getattr(settings, 'CLOUD_TRANSFER', {})}
+
+
+def get_session():
+    """Sesión HTTP del proceso (las conexiones TLS se reutilizan entre chunks y archivos)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            pool_size = get_upload_config()['pool_size']
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers['User-Agent'] = cloudinary.get_user_agent()
+            _session = session
+        return _session
+
+
+def get_memory_budget():
+    """Presupuesto de memoria de chunks en vuelo compartido por todas las subidas del proceso"""
+    global _memory_budget
+    with _session_lock:
+        if _memory_budget is None:
+            _memory_budget = _MemoryBudget(get_upload_config()['max_inflight_bytes'])
+        return _memory_budget
+
+
+class ChunkedUploader:
+    """
+    Subida de un archivo por rangos en paralelo.
+
+    Uso:
+        ChunkedUploader(parallel_chunks=4).upload(path, upload_id, params)
+    """
+
+    SMOOTHING = 0.5  # Peso de la última medición en el throughput estimado
+
+    def __init__(self, chunk_size=None, parallel_chunks=None, target_chunk_seconds=None,
+                 max_chunk_size=None, chunk_retries=None, timeout=None, credentials=None,
+                 session=None, min_chunk_size=MIN_CHUNK_SIZE, memory_budget=None):
+        config = get_upload_config()
+        self.min_chunk_size = min_chunk_size
+        self.chunk_size = max(chunk_size or config['chunk_size'], min_chunk_size)
+        self.parallel_chunks = max(parallel_chunks or config['parallel_chunks'], 1)
+        self.target_chunk_seconds = target_chunk_seconds or config['target_chunk_seconds']
+        self.max_chunk_size = max(max_chunk_size or config['max_chunk_size'], self.chunk_size)
+        self.chunk_retries = chunk_retries if chunk_retries is not None else config['chunk_retries']
+        self.timeout = timeout or config['request_timeout']
+        self.credentials = credentials or {}  # api_key/api_secret/cloud_name de otra cuenta
+        self.session = session or get_session()
+        self.memory_budget = memory_budget or get_memory_budget()
+
+        self._throughput = None  # bytes/s por conexión
+        self._stats_lock = threading.Lock()
+
+    def upload(self, path, upload_id, params, resource_type='video', start_offset=0, on_progress=None):
+        """
+        Sube el archivo desde start_offset.
+
+        Args:
+            params: Parámetros de subida (folder, public_id, eager, ...)
+            on_progress: Callback (bytes_confirmados, bytes_totales); los bytes
+                confirmados son el prefijo contiguo ya recibido por Cloudinary
+
+        Returns:
+            dict: Respuesta de Cloudinary al último chunk
+
+        Raises:
+            CloudinaryError: Si un chunk falla tras agotar los reintentos
+        """
+        total = os.path.getsize(path)
+        name = os.path.basename(path)
+        options = {**self.credentials, 'resource_type': resource_type}
+        url = cloudinary.utils.cloudinary_api_url('upload', **options)
+        upload_params = cloudinary.utils.build_upload_params(**params)
+
+        acknowledged = _AckTracker(start_offset)
+        offset = start_offset
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.parallel_chunks, thread_name_prefix='cloudinary-chunk') as pool:
+            pending = set()
+            while offset < total:
+                size = self._next_chunk_size()
+                if total - offset <= size:
+                    break  # Lo que queda es el último chunk
+
+                # Esperar a que haya memoria (la liberan los chunks enviados, de este u otros videos)
+                while not self.memory_budget.acquire(self._chunk_cost(size), timeout=1):
+                    done = {future for future in pending if future.done()}
+                    pending -= done
+                    self._collect(done, acknowledged, total, on_progress)
+
+                pending.add(pool.submit(
+                    self._send_chunk, url, path, name, offset, size, total, upload_id, upload_params, options
+                ))
+                offset += size
+
+                if len(pending) >= self.parallel_chunks:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._collect(done, acknowledged, total, on_progress)
+
+            done, _ = wait(pending)
+            self._collect(done, acknowledged, total, on_progress)
+
+        # Último chunk: Cloudinary responde con el recurso completo
+        self.memory_budget.acquire(self._chunk_cost(total - offset))
+        _, _, result = self._send_chunk(
+            url, path, name, offset, total - offset, total, upload_id, upload_params, options
+        )
+        acknowledged.add(offset, total)
+        if on_progress:
+            on_progress(total, total)
+
+        elapsed = time.monotonic() - started
+        logger.info(
+            f"📦 Subida por chunks completada: {(total - start_offset) / (1024 * 1024):.1f}MB en "
+            f"{elapsed:.1f}s ({self.parallel_chunks} en paralelo, chunks de hasta {self.chunk_size // (1024 * 1024)}MB)"
+        )
+        return result
+
+    def _collect(self, done, acknowledged, total, on_progress):
+        """Registra chunks terminados; propaga el primer error"""
+        for future in done:
+            start, end = future.result()[:2]
+            prefix = acknowledged.add(start, end)
+            if on_progress:
+                on_progress(prefix, total)
+
+    @staticmethod
+    def _chunk_cost(size):
+        """Memoria de un chunk en vuelo: los bytes leídos y su copia en el cuerpo multipart"""
+        return 2 * size
+
+    def _next_chunk_size(self):
+        """Tamaño del próximo chunk según el throughput medido"""
+        with self._stats_lock:
+            if self._throughput:
+                target = int(self._throughput * self.target_chunk_seconds)
+                self.chunk_size = min(max(target, self.min_chunk_size), self.max_chunk_size)
+            return self.chunk_size
+
+    def _record_throughput(self, size, seconds):
+        with self._stats_lock:
+            measured = size / max(seconds, 1e-3)
+            if self._throughput is None:
+                self._throughput = measured
+            else:
+                self._throughput = self.SMOOTHING * measured + (1 - self.SMOOTHING) * self._throughput
+
+    def _send_chunk(self, url, path, name, start, size, total, upload_id, upload_params, options):
+        """
+        Envía un rango del archivo con reintentos; devuelve (inicio, fin, respuesta)
+
+        El llamador ya reservó self._chunk_cost(size) en el presupuesto de
+        memoria; se libera al terminar, con éxito o no.
+        """
+        try:
+            return self._post_chunk(url, path, name, start, size, total, upload_id, upload_params, options)
+        finally:
+            self.memory_budget.release(self._chunk_cost(size))
+
+    def _post_chunk(self, url, path, name, start, size, total, upload_id, upload_params, options):
+        with open(path, 'rb') as f:
+            f.seek(start)
+            data = f.read(size)
+        end = start + len(data)
+        headers = {
+            'Content-Range': f'bytes {start}-{end - 1}/{total}',
+            'X-Unique-Upload-Id': upload_id,
+        }
+
+        last_error = None
+        for attempt in range(self.chunk_retries + 1):
+            if attempt:
+                time.sleep(min(2 ** attempt, 30))
+            try:
+                # La firma incluye el timestamp: se genera en cada intento
+                signed = cloudinary.utils.sign_request(upload_params, options)
+                began = time.monotonic()
+                response = self.session.post(
+                    url, data=signed, files={'file': (name, data)}, headers=headers, timeout=self.timeout
+                )
+                result = response.json()
+                if response.status_code >= 400 or 'error' in result:
+                    message = result.get('error', {}).get('message', response.text[:200])
+                    if response.status_code < 500 and response.status_code != 429:
+                        raise CloudinaryError(f"Chunk {headers['Content-Range']} rechazado: {message}")
+                    raise requests.HTTPError(f"HTTP {response.status_code}: {message}")
+
+                self._record_throughput(len(data), time.monotonic() - began)
+                return start, end, result
+
+            except CloudinaryError:
+                raise
+            except (requests.RequestException, ValueError) as e:
+                last_error = e
+                logger.warning(
+                    f"⚠️ Chunk {headers['Content-Range']} falló (intento {attempt + 1}): {e}"
+                )
+
+        raise CloudinaryError(f"Chunk {headers['Content-Range']} falló tras {self.chunk_retries + 1} intentos: {last_error}")
+
+
+class _AckTracker:
+    """Prefijo contiguo de bytes confirmados a partir de rangos que terminan en desorden"""
+
+    def __init__(self, start):
+        self.prefix = start
+        self._ranges = {}
+
+    def add(self, start, end):
+        self._ranges[start] = end
+        while self.prefix in self._ranges:
+            self.prefix = self._ranges.pop(self.prefix)
+        return self.prefix
+
+
+class _MemoryBudget:
+    """
+    Semáforo de bytes: limita la memoria de los chunks en vuelo
+
+    Una reserva mayor que el límite espera a que no haya nada en vuelo (así
+    un chunk enorme nunca bloquea para siempre).
+    """
+
+    def __init__(self, limit):
+        self.limit = max(int(limit), 1)
+        self.in_use = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, amount, timeout=None):
+        """Reserva `amount` bytes; False si no se consiguió antes de timeout"""
+        amount = min(amount, self.limit)
+        with self._condition:
+            acquired = self._condition.wait_for(lambda: self.in_use + amount <= self.limit, timeout=timeout)
+            if acquired:
+                self.in_use += amount
+            return acquired
+
+    def release(self, amount):
+        with self._condition:
+            self.in_use = max(self.in_use - min(amount, self.limit), 0)
+            self._condition.notify_all()
@@ -0,0 +1,331 @@
+"""
+Subida de videos a Cloudinary en segundo plano
+Ubicación: apps/ai_processor/services/cloud_transfer_service.py
+
+Las vistas solo encolan un CloudTransferJob; un hilo worker por proceso (o el
+comando process_cloud_transfers) toma las transferencias pendientes y sube el
+video por chunks. Cada chunk confirmado se registra en la base de datos, de
+modo que un reintento (tras un error o un reinicio del servidor) continúa
+desde el último byte confirmado. Los fallos se reintentan con backoff
+exponencial hasta max_attempts.
+"""
+import logging
+import os
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'chunk_size': 6000000,
+    'max_attempts': 5,
+    'backoff_base': 30,
+    'backoff_max': 1800,
+    'lease_seconds': 600,
+    'in_process_worker': True,
+}
+
+
+class CloudTransferService:
+    """
+    Cola de transferencias a Cloudinary respaldada por CloudTransferJob.
+
+    Solo hay un worker por proceso: enqueue() lo despierta (o lo inicia) y
+    el hilo termina cuando no quedan transferencias pendientes.
+    """
+
+    IDLE_POLL_SECONDS = 60  # Espera máxima entre revisiones si hay reintentos programados
+
+    _worker = None
+    _worker_lock = threading.Lock()
+    _wake_event = threading.Event()
+
+    @staticmethod
+    def get_config():
+        """Configuración de settings.CLOUD_TRANSFER con valores por defecto"""
+        return {**DEFAULT_CONFIG, **getattr(settings, 'CLOUD_TRANSFER', {})}
+
+    @classmethod
+    def enqueue(cls, presentation):
+        """
+        Encolar la subida del video de una presentación.
+
+        Returns:
+            CloudTransferJob creado (o el ya activo para la presentación),
+            None si no hay nada que subir
+        """
+        from apps.ai_processor.models import CloudTransferJob
+
+        if presentation.is_stored_in_cloud or not presentation.video_file:
+            return None
+
+        job = presentation.cloud_transfer_jobs.filter(status__in=['PENDING', 'RUNNING']).first()
+        if job is None:
+            job = CloudTransferJob.objects.create(
+                presentation=presentation,
+                next_attempt_at=timezone.now(),
+                upload_id=uuid.uuid4().hex,
+                bytes_total=presentation.video_file.size,
+            )
+            type(presentation).objects.filter(pk=presentation.pk).update(cloud_transfer_status='PENDING')
+            presentation.cloud_transfer_status = 'PENDING'
+            logger.info(f"📥 Transferencia a Cloudinary encolada: presentación {presentation.pk}")
+
+        if cls.get_config()['in_process_worker']:
+            # El worker no debe ver el job antes de que la transacción se confirme
+            transaction.on_commit(cls.ensure_worker)
+
+        return job
+
+    @classmethod
+    def ensure_worker(cls):
+        """Despierta el worker del proceso o lo inicia si no está corriendo"""
+        with cls._worker_lock:
+            cls._wake_event.set()
+            if cls._worker is not None and cls._worker.is_alive():
+                return
+            cls._worker = threading.Thread(
+                target=cls._run_worker, name='cloud-transfer-worker', daemon=True
+            )
+            cls._worker.start()
+
+    @classmethod
+    def _run_worker(cls):
+        """Procesa transferencias hasta vaciar la cola"""
+        try:
+            while True:
+                cls._wake_event.clear()
+                processed = cls.process_due_jobs()
+                if processed:
+                    continue
+
+                wait = cls._seconds_until_next_job()
+                if wait is None:
+                    with cls._worker_lock:
+                        # Un enqueue pudo llegar justo ahora: no salir sin revisarlo
+                        if not cls._wake_event.is_set():
+                            cls._worker = None
+                            return
+                    continue
+
+                cls._wake_event.wait(timeout=min(wait, cls.IDLE_POLL_SECONDS))
+        except Exception as e:
+            logger.error(f"❌ Error en el worker de transferencias: {e}")
+            with cls._worker_lock:
+                cls._worker = None
+        finally:
+            connection.close()
+
+    @classmethod
+    def process_due_jobs(cls, limit=None):
+        """
+        Procesa las transferencias que ya deben ejecutarse (una a la vez).
+
+        Returns:
+            int: Número de transferencias procesadas
+        """
+        processed = 0
+        while limit is None or processed < limit:
+            close_old_connections()
+            job = cls._claim_next_job()
+            if job is None:
+                break
+            cls._process_job(job)
+            processed += 1
+        return processed
+
+    @classmethod
+    def _claim_next_job(cls):
+        """
+        Toma la siguiente transferencia pendiente, o una RUNNING cuyo worker
+        dejó de dar señales (lease vencido).
+
+        La toma es un UPDATE condicionado al estado leído, así dos workers
+        (hilo y comando, o varios procesos) nunca suben el mismo video.
+        """
+        from apps.ai_processor.models import CloudTransferJob
+
+        now = timezone.now()
+        stale_before = now - timedelta(seconds=cls.get_config()['lease_seconds'])
+        candidates = CloudTransferJob.objects.filter(
+            Q(status='PENDING', next_attempt_at__lte=now) |
+            Q(status='RUNNING', locked_at__lt=stale_before)
+        ).order_by('next_attempt_at')
+
+        for job in candidates[:5]:
+            claimed = CloudTransferJob.objects.filter(
+                pk=job.pk, status=job.status, locked_at=job.locked_at
+            ).update(
+                status='RUNNING',
+                locked_at=now,
+                attempts=job.attempts + 1,
+                started_at=job.started_at or now,
+                attempt_started_at=now,
+            )
+            if claimed:
+                job.refresh_from_db()
+                return job
+        return None
+
+    @classmethod
+    def _seconds_until_next_job(cls):
+        """Segundos hasta el próximo reintento programado (None si la cola está vacía)"""
+        from apps.ai_processor.models import CloudTransferJob
+
+        waits = []
+        next_attempt = CloudTransferJob.objects.filter(status='PENDING').order_by('next_attempt_at').values_list(
+            'next_attempt_at', flat=True
+        ).first()
+        if next_attempt is not None:
+            waits.append(max((next_attempt - timezone.now()).total_seconds(), 0))
+        if CloudTransferJob.objects.filter(status='RUNNING').exists():
+            # Tomada por otro worker: revisar cuando venza su lease
+            waits.append(cls.get_config()['lease_seconds'])
+        return min(waits) if waits else None
+
+    @classmethod
+    def _process_job(cls, job):
+        """Sube el video de una transferencia, reanudando desde bytes_acknowledged"""
+        from apps.ai_processor.models import CloudTransferJob
+        from apps.ai_processor.services.cloudinary_service import CloudinaryService
+
+        config = cls.get_config()
+        presentation = job.presentation
+        jobs = CloudTransferJob.objects.filter(pk=job.pk)
+
+        if presentation.is_stored_in_cloud:
+            jobs.update(status='DONE', locked_at=None, **cls._attempt_finished(job))
+            return
+
+        type(presentation).objects.filter(pk=presentation.pk).update(cloud_transfer_status='UPLOADING')
+
+        def on_chunk(acknowledged, total):
+            # Avance confirmado + renovación del lease
+            jobs.update(bytes_acknowledged=acknowledged, bytes_total=total, locked_at=timezone.now())
+
+        try:
+            video_path = presentation.video_file.path
+            if not os.path.exists(video_path):
+                raise FileNotFoundError(f"No existe el archivo {video_path}")
+
+            if job.bytes_acknowledged >= os.path.getsize(video_path):
+                # Se confirmó el último chunk pero no se guardó el resultado: subir de nuevo
+                job.upload_id = uuid.uuid4().hex
+                job.bytes_acknowledged = 0
+                jobs.update(upload_id=job.upload_id, bytes_acknowledged=0)
+
+            folder, public_id = presentation.cloudinary_upload_target()
+            logger.info(
+                f"📤 Transferencia {job.pk} (intento {job.attempts}): "
+                f"{presentation.title} desde el byte {job.bytes_acknowledged}"
+            )
+            result = CloudinaryService.upload_video_chunked(
+                video_path,
+                upload_id=job.upload_id,
+                folder=folder,
+                public_id=public_id,
+                start_offset=job.bytes_acknowledged,
+                chunk_size=config['chunk_size'],
+                on_chunk=on_chunk,
+            )
+
+            with transaction.atomic():
+                presentation.apply_cloudinary_result(result)
+                jobs.update(status='DONE', locked_at=None, last_error='', **cls._attempt_finished(job))
+
+            logger.info(f"✅ Transferencia {job.pk} completada: {result['public_id']}")
+
+            # Con la copia en la nube, los originales locales pueden liberarse (periódico, no crítico)
+            from apps.presentaciones.storage_lifecycle import run_if_due
+            run_if_due()
+
+        except Exception as e:
+            cls._handle_failure(job, presentation, e, config)
+
+    @staticmethod
+    def _attempt_finished(job):
+        """
+        Campos para cerrar el intento en curso: fin y tiempo activo acumulado
+        (sin las esperas de backoff entre intentos)
+        """
+        now = timezone.now()
+        elapsed = (now - job.attempt_started_at).total_seconds() if job.attempt_started_at else 0
+        return {
+            'finished_at': now,
+            'active_seconds': F('active_seconds') + max(elapsed, 0),
+        }
+
+    @classmethod
+    def _handle_failure(cls, job, presentation, error, config):
+        """Programa un reintento con backoff exponencial o marca la transferencia como fallida"""
+        from apps.ai_processor.models import CloudTransferJob
+
+        jobs = CloudTransferJob.objects.filter(pk=job.pk)
+        job.refresh_from_db(fields=['bytes_acknowledged'])
+
+        # Un archivo inexistente no se arregla reintentando
+        permanent = isinstance(error, FileNotFoundError)
+
+        if permanent or job.attempts >= config['max_attempts']:
+            jobs.update(status='FAILED', locked_at=None, last_error=str(error), **cls._attempt_finished(job))
+            type(presentation).objects.filter(pk=presentation.pk).update(cloud_transfer_status='FAILED')
+            logger.error(f"❌ Transferencia {job.pk} fallida tras {job.attempts} intento(s): {error}")
+            return
+
+        delay = min(config['backoff_base'] * 2 ** (job.attempts - 1), config['backoff_max'])
+        attempt = cls._attempt_finished(job)
+        jobs.update(
+            status='PENDING',
+            locked_at=None,
+            active_seconds=attempt['active_seconds'],
+            next_attempt_at=timezone.now() + timedelta(seconds=delay),
+            last_error=str(error),
+        )
+        type(presentation).objects.filter(pk=presentation.pk).update(cloud_transfer_status='PENDING')
+        logger.warning(
+            f"⚠️ Transferencia {job.pk} falló (intento {job.attempts}, "
+            f"{job.bytes_acknowledged} bytes confirmados); reintento en {delay}s: {error}"
+        )
+
+    @classmethod
+    def get_stats(cls, window_hours=24):
+        """
+        Estado de la cola de transferencias.
+
+        Returns:
+            dict con profundidad de la cola, transferencias recientes y
+            throughput medio (MB/s) de las completadas en la ventana
+        """
+        from apps.ai_processor.models import CloudTransferJob
+
+        now = timezone.now()
+        since = now - timedelta(hours=window_hours)
+        jobs = CloudTransferJob.objects.all()
+
+        # Throughput con el tiempo de los intentos, no con las esperas entre reintentos
+        completed = jobs.filter(status='DONE', finished_at__gte=since)
+        totals = completed.filter(active_seconds__gt=0).aggregate(
+            total_bytes=Sum('bytes_total'), total_seconds=Sum('active_seconds')
+        )
+        total_bytes = totals['total_bytes'] or 0
+        total_seconds = totals['total_seconds'] or 0
+
+        oldest_pending = jobs.filter(status='PENDING').order_by('created_at').values_list('created_at', flat=True).first()
+
+        return {
+            'pending': jobs.filter(status='PENDING').count(),
+            'running': jobs.filter(status='RUNNING').count(),
+            'scheduled_retries': jobs.filter(status='PENDING', attempts__gt=0).count(),
+            'completed_last_window': completed.count(),
+            'failed_last_window': jobs.filter(status='FAILED', finished_at__gte=since).count(),
+            'window_hours': window_hours,
+            'throughput_mb_s': round(total_bytes / total_seconds / (1024 * 1024), 2) if total_seconds else None,
+            'oldest_pending_seconds': int((now - oldest_pending).total_seconds()) if oldest_pending else 0,
+            'worker_alive': cls._worker is not None and cls._worker.is_alive(),
+        }
@@ -1,42 +1,113 @@
 import cloudinary
 import cloudinary.uploader
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+import itertools
 import logging
 
 logger = logging.getLogger(__name__)
 
 class CloudinaryRotationService:
-    """Servicio para rotar entre múltiples cuentas de Cloudinary"""
+    """
+    Servicio para rotar entre múltiples cuentas de Cloudinary
     
-    _current_account_index = 0
-    _upload_count = 0
-    _uploads_per_account = 10  # Cambiar de cuenta cada 10 uploads
+    Las credenciales de la cuenta elegida se pasan en cada llamada al SDK
+    (cloud_name, api_key, api_secret) en lugar de reconfigurar
+    cloudinary.config() global, así hilos concurrentes nunca mezclan cuentas.
+    La cuenta de cada archivo subido se guarda en CloudinaryAsset.
+    """
+    
+    _uploads_per_account = 10  # Cambiar de cuenta cada 10 uploads (round robin)
+    _upload_counter = itertools.count()  # next() es atómico: no hace falta lock
+    
+    USAGE_CACHE_KEY = 'cloudinary_account_usage'
+    USAGE_CACHE_TIMEOUT = 60
+    
+    @staticmethod
+    def get_accounts():
+        """Cuentas configuradas en settings.CLOUDINARY_ACCOUNTS"""
+        return settings.CLOUDINARY_ACCOUNTS
     
     @classmethod
-    def get_current_account(cls):
-        """Obtiene la cuenta actual de Cloudinary"""
-        if not settings.CLOUDINARY_ACCOUNTS:
+    def get_account(cls, name):
+        """Cuenta por nombre (None si ya no está configurada)"""
+        return next((a for a in cls.get_accounts() if a['name'] == name), None)
+    
+    @staticmethod
+    def credentials(account):
+        """Opciones del SDK para operar sobre una cuenta concreta"""
+        return {
+            'cloud_name': account['cloud_name'],
+            'api_key': account['api_key'],
+            'api_secret': account['api_secret'],
+        }
+    
+    @classmethod
+    def pick_account(cls):
+        """
+        Cuenta para la próxima subida
+        
+        Estrategia según settings.CLOUDINARY_ROTATION_STRATEGY:
+            - 'round_robin' (default): cambia de cuenta cada _uploads_per_account subidas
+            - 'least_used': la cuenta con menos bytes registrados en CloudinaryAsset
+        """
+        accounts = cls.get_accounts()
+        if not accounts:
             return None
-        return settings.CLOUDINARY_ACCOUNTS[cls._current_account_index]
+        if len(accounts) == 1:
+            return accounts[0]
+        
+        if getattr(settings, 'CLOUDINARY_ROTATION_STRATEGY', 'round_robin') == 'least_used':
+            usage = cls.get_usage()
+            return min(accounts, key=lambda a: usage.get(a['name'], 0))
+        
+        turn = next(cls._upload_counter) // cls._uploads_per_account
+        return accounts[turn % len(accounts)]
     
     @classmethod
-    def rotate_account(cls):
-        """Rota a la siguiente cuenta de Cloudinary"""
-        if len(settings.CLOUDINARY_ACCOUNTS) <= 1:
-            return
+    def get_usage(cls):
+        """Bytes registrados por cuenta (cacheado unos segundos)"""
+        from apps.ai_processor.models import CloudinaryAsset
         
-        cls._current_account_index = (cls._current_account_index + 1) % len(settings.CLOUDINARY_ACCOUNTS)
-        account = cls.get_current_account()
+        usage = cache.get(cls.USAGE_CACHE_KEY)
+        if usage is None:
+            usage = dict(
+                CloudinaryAsset.objects.values('account_name')
+                .annotate(total=Sum('bytes'))
+                .values_list('account_name', 'total')
+            )
+            cache.set(cls.USAGE_CACHE_KEY, usage, timeout=cls.USAGE_CACHE_TIMEOUT)
+        return usage
+    
+    @classmethod
+    def record_asset(cls, result, account, resource_type='video'):
+        """Registra en qué cuenta quedó un archivo recién subido"""
+        from apps.ai_processor.models import CloudinaryAsset
         
-        # Reconfigurar Cloudinary con la nueva cuenta
-        cloudinary.config(
-            cloud_name=account['cloud_name'],
-            api_key=account['api_key'],
-            api_secret=account['api_secret'],
-            secure=True
+        if not result or not result.get('public_id') or not account:
+            return
+        
+        CloudinaryAsset.objects.update_or_create(
+            public_id=result['public_id'],
+            resource_type=result.get('resource_type') or resource_type,
+            defaults={
+                'account_name': account['name'],
+                'cloud_name': account['cloud_name'],
+                'bytes': result.get('bytes') or 0,
+            }
         )
+        cache.delete(cls.USAGE_CACHE_KEY)
+    
+    @classmethod
+    def account_for(cls, public_id, resource_type='video'):
+        """Cuenta donde está guardado un archivo (None si no está registrado)"""
+        from apps.ai_processor.models import CloudinaryAsset
         
-        logger.info(f"Cloudinary rotado a cuenta: {account['name']} ({account['cloud_name']})")
+        account_name = CloudinaryAsset.objects.filter(
+            public_id=public_id, resource_type=resource_type
+        ).values_list('account_name', flat=True).first()
+        return cls.get_account(account_name) if account_name else None
     
     @classmethod
     def upload_with_rotation(cls, file, **options):
@@ -50,59 +121,64 @@ class CloudinaryRotationService:
         Returns:
             Resultado del upload de Cloudinary
         """
+        account = cls.pick_account()
+        if account is None:
+            raise Exception("No hay cuentas de Cloudinary configuradas")
+        
+        resource_type = options.get('resource_type', 'image')
+        
         try:
-            # Verificar si hay cuentas configuradas
-            if not settings.CLOUDINARY_ACCOUNTS:
-                raise Exception("No hay cuentas de Cloudinary configuradas")
-            
-            # Rotar cuenta si es necesario
-            cls._upload_count += 1
-            if cls._upload_count % cls._uploads_per_account == 0:
-                cls.rotate_account()
-            
-            account = cls.get_current_account()
             logger.info(f"Subiendo archivo a Cloudinary ({account['name']})")
-            
-            # Subir archivo
-            result = cloudinary.uploader.upload(file, **options)
-            
-            logger.info(f"Archivo subido exitosamente a {account['cloud_name']}")
-            return result
-            
+            result = cloudinary.uploader.upload(file, **options, **cls.credentials(account))
+        
         except Exception as e:
-            logger.error(f"Error al subir archivo a Cloudinary: {str(e)}")
+            logger.error(f"Error al subir archivo a Cloudinary ({account['name']}): {str(e)}")
             
             # Intentar con la siguiente cuenta
-            if len(settings.CLOUDINARY_ACCOUNTS) > 1:
-                logger.info("Intentando con la siguiente cuenta...")
-                cls.rotate_account()
-                try:
-                    result = cloudinary.uploader.upload(file, **options)
-                    logger.info("Archivo subido en segundo intento")
-                    return result
-                except Exception as e2:
-                    logger.error(f"Segundo intento fallido: {str(e2)}")
-                    raise
-            else:
+            accounts = cls.get_accounts()
+            if len(accounts) <= 1:
                 raise
+            
+            account = accounts[(accounts.index(account) + 1) % len(accounts)]
+            logger.info(f"Intentando con la cuenta {account['name']}...")
+            if hasattr(file, 'seek'):
+                file.seek(0)
+            try:
+                result = cloudinary.uploader.upload(file, **options, **cls.credentials(account))
+                logger.info("Archivo subido en segundo intento")
+            except Exception as e2:
+                logger.error(f"Segundo intento fallido: {str(e2)}")
+                raise
+        
+        cls.record_asset(result, account, resource_type)
+        logger.info(f"Archivo subido exitosamente a {account['cloud_name']}")
+        return result
     
     @classmethod
     def delete_with_rotation(cls, public_id, **options):
-        """Elimina un archivo intentando con todas las cuentas"""
-        for account in settings.CLOUDINARY_ACCOUNTS:
+        """
+        Elimina un archivo en la cuenta donde está registrado (una sola llamada)
+        
+        Los archivos subidos antes de existir el registro se buscan en todas
+        las cuentas.
+        """
+        from apps.ai_processor.models import CloudinaryAsset
+        
+        resource_type = options.get('resource_type', 'image')
+        account = cls.account_for(public_id, resource_type)
+        candidates = [account] if account else cls.get_accounts()
+        
+        for candidate in candidates:
             try:
-                cloudinary.config(
-                    cloud_name=account['cloud_name'],
-                    api_key=account['api_key'],
-                    api_secret=account['api_secret'],
-                    secure=True
-                )
-                result = cloudinary.uploader.destroy(public_id, **options)
+                result = cloudinary.uploader.destroy(public_id, **options, **cls.credentials(candidate))
+                if result.get('result') in ('ok', 'not found') and account:
+                    CloudinaryAsset.objects.filter(public_id=public_id, resource_type=resource_type).delete()
+                    cache.delete(cls.USAGE_CACHE_KEY)
                 if result.get('result') == 'ok':
-                    logger.info(f"Archivo eliminado de {account['cloud_name']}")
+                    logger.info(f"Archivo eliminado de {candidate['cloud_name']}")
                     return result
             except Exception as e:
-                logger.warning(f"No se pudo eliminar de {account['cloud_name']}: {str(e)}")
+                logger.warning(f"No se pudo eliminar de {candidate['cloud_name']}: {str(e)}")
         
         logger.error(f"No se pudo eliminar el archivo {public_id} de ninguna cuenta")
-        return {'result': 'not found'}
\ No newline at end of file
+        return {'result': 'not found'}
@@ -8,9 +8,15 @@ import cloudinary.api
 from django.conf import settings
 import logging
 import os
+import uuid
+
+from .chunked_upload import ChunkedUploader
+from .cloudinary_rotation_service import CloudinaryRotationService
 
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 6000000  # 6MB chunks para videos grandes
+
 class CloudinaryService:
     """
     Servicio para gestionar la subida, descarga y eliminación de archivos en Cloudinary
@@ -54,42 +60,20 @@ class CloudinaryService:
         try:
             logger.info(f"📤 Subiendo video a Cloudinary...")
             
-            upload_params = {
-                'resource_type': 'video',
-                'folder': folder,
-                'chunk_size': 6000000,  # 6MB chunks para videos grandes
-                'eager': [
-                    {
-                        'width': 1280,
-                        'height': 720,
-                        'crop': 'limit',
-                        'quality': 'auto',
-                        'fetch_format': 'auto'
-                    }
-                ],
-                'eager_async': True,  # Procesamiento asíncrono
-                'overwrite': True,
-                'invalidate': True,
-            }
-            
-            if public_id:
-                upload_params['public_id'] = public_id
+            upload_params = CloudinaryService._video_upload_params(folder, public_id)
             
-            result = cloudinary.uploader.upload(video_file, **upload_params)
+            if isinstance(video_file, (str, os.PathLike)) and os.path.getsize(video_file) > CHUNK_SIZE:
+                # Archivos grandes: chunks en paralelo sobre la sesión compartida
+                upload_params.pop('resource_type')
+                result = ChunkedUploader().upload(video_file, uuid.uuid4().hex, upload_params)
+            else:
+                upload_params['chunk_size'] = CHUNK_SIZE
+                result = cloudinary.uploader.upload(video_file, **upload_params)
             
+            CloudinaryService._record_upload(result)
             logger.info(f"✅ Video subido exitosamente: {result.get('public_id')}")
             
-            return {
-                'public_id': result.get('public_id'),
-                'url': result.get('url'),
-                'secure_url': result.get('secure_url'),
-                'format': result.get('format'),
-                'duration': result.get('duration'),
-                'size': result.get('bytes'),
-                'width': result.get('width'),
-                'height': result.get('height'),
-                'created_at': result.get('created_at'),
-            }
+            return CloudinaryService._format_video_result(result)
             
         except cloudinary.exceptions.Error as e:
             logger.error(f"❌ Error de Cloudinary subiendo video: {e}")
@@ -98,6 +82,92 @@ class CloudinaryService:
             logger.error(f"❌ Error inesperado subiendo video: {e}")
             return None
     
+    @staticmethod
+    def upload_video_chunked(video_path, upload_id, folder='presentations', public_id=None,
+                             start_offset=0, chunk_size=CHUNK_SIZE, on_chunk=None, parallel_chunks=None):
+        """
+        Subir video por chunks con la API de subida por partes de Cloudinary
+        
+        Todas las partes comparten el X-Unique-Upload-Id, por lo que una subida
+        interrumpida puede continuar desde start_offset (último byte confirmado).
+        Los chunks se envían en paralelo (ver ChunkedUploader).
+        
+        Args:
+            video_path: Ruta local del video
+            upload_id: Identificador de la subida (el mismo en cada reintento)
+            start_offset: Byte desde el que continuar
+            chunk_size: Tamaño inicial de chunk (luego se adapta al throughput)
+            on_chunk: Callback (bytes_confirmados, bytes_totales) tras cada chunk
+            parallel_chunks: Chunks simultáneos (default: settings.CLOUD_TRANSFER)
+            
+        Returns:
+            dict: Información del video (mismo formato que upload_video)
+            
+        Raises:
+            Exception: Si falla la subida de algún chunk (el llamador reintenta)
+        """
+        if not CloudinaryService.is_configured():
+            raise RuntimeError("Cloudinary no está configurado")
+        
+        upload_params = CloudinaryService._video_upload_params(folder, public_id)
+        upload_params.pop('resource_type')
+        
+        uploader = ChunkedUploader(chunk_size=chunk_size, parallel_chunks=parallel_chunks)
+        result = uploader.upload(
+            video_path, upload_id, upload_params, start_offset=start_offset, on_progress=on_chunk
+        )
+        
+        CloudinaryService._record_upload(result)
+        logger.info(f"✅ Video subido por chunks: {result.get('public_id')}")
+        return CloudinaryService._format_video_result(result)
+    
+    @staticmethod
+    def _record_upload(result, resource_type='video'):
+        """Registrar el archivo en la cuenta primaria (la de la configuración global)"""
+        accounts = CloudinaryRotationService.get_accounts()
+        if accounts:
+            CloudinaryRotationService.record_asset(result, accounts[0], resource_type)
+    
+    @staticmethod
+    def _video_upload_params(folder, public_id=None):
+        """Parámetros de subida de videos (incluye la versión optimizada 720p)"""
+        upload_params = {
+            'resource_type': 'video',
+            'folder': folder,
+            'eager': [
+                {
+                    'width': 1280,
+                    'height': 720,
+                    'crop': 'limit',
+                    'quality': 'auto',
+                    'fetch_format': 'auto'
+                }
+            ],
+            'eager_async': True,  # Procesamiento asíncrono
+            'overwrite': True,
+            'invalidate': True,
+        }
+        
+        if public_id:
+            upload_params['public_id'] = public_id
+        
+        return upload_params
+    
+    @staticmethod
+    def _format_video_result(result):
+        """Datos relevantes de la respuesta de Cloudinary para un video"""
+        return {
+            'public_id': result.get('public_id'),
+            'url': result.get('url'),
+            'secure_url': result.get('secure_url'),
+            'format': result.get('format'),
+            'duration': result.get('duration'),
+            'size': result.get('bytes'),
+            'width': result.get('width'),
+            'height': result.get('height'),
+            'created_at': result.get('created_at'),
+        }
+    
     @staticmethod
     def upload_image(image_file, folder='participant_photos', public_id=None):
         """
@@ -174,14 +244,22 @@ class CloudinaryService:
             logger.error("❌ Cloudinary no está configurado")
             return False
         
+        from apps.ai_processor.models import CloudinaryAsset
+        
         try:
+            # Con varias cuentas, ir directo a la cuenta registrada del archivo
+            account = CloudinaryRotationService.account_for(public_id, resource_type)
+            credentials = CloudinaryRotationService.credentials(account) if account else {}
+            
             result = cloudinary.uploader.destroy(
                 public_id,
                 resource_type=resource_type,
-                invalidate=True
+                invalidate=True,
+                **credentials
             )
             
             if result.get('result') == 'ok':
+                CloudinaryAsset.objects.filter(public_id=public_id, resource_type=resource_type).delete()
                 logger.info(f"✅ Archivo eliminado de Cloudinary: {public_id}")
                 return True
             elif result.get('result') == 'not found':
@@ -319,7 +397,11 @@ class CloudinaryService:
             return None
         
         try:
-            result = cloudinary.api.resource(public_id, resource_type=resource_type)
+            # Con varias cuentas, consultar la cuenta registrada del archivo
+            account = CloudinaryRotationService.account_for(public_id, resource_type)
+            credentials = CloudinaryRotationService.credentials(account) if account else {}
+            
+            result = cloudinary.api.resource(public_id, resource_type=resource_type, **credentials)
             
             return {
                 'public_id': result.get('public_id'),
@@ -27,8 +27,13 @@ except ImportError:
     print("⚠️ sentence-transformers no está instalado. El análisis de coherencia estará limitado.")
 
 import numpy as np
+import hashlib
 import logging
+import re
 from django.conf import settings
+from django.core.cache import cache
+
+from .keyword_analyzer import depth_analyzer, get_keyword_analyzer
 
 logger = logging.getLogger(__name__)
 
@@ -39,10 +44,21 @@ class CoherenceAnalyzer:
     
     Prioridad de análisis:
     1. IA Avanzada (Groq) - Si está configurado GROQ_API_KEY
-    2. Sentence Transformers - Fallback si no hay Groq
-    3. Análisis básico - Último recurso
+    2. Motor local por rúbrica - Si el docente lo elige en AIConfiguration,
+       si no hay Groq o para los participantes en que Groq falla
+    3. Sentence Transformers - Fallback si no hay modelo para el motor local
+    4. Análisis básico - Último recurso
     """
     
+    EMBEDDING_MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
+    
+    # Ventanas de oraciones para textos largos (el modelo trunca a ~128 tokens)
+    SENTENCE_WINDOW_WORDS = 80
+    ENCODE_BATCH_SIZE = 32
+    
+    # Cache de embeddings del tema de cada asignación
+    TOPIC_EMBEDDING_CACHE_TIMEOUT = 60 * 60 * 24  # 24 horas
+    
     def __init__(self):
         """
         Inicializa el analizador con el modelo de embeddings y/o IA avanzada
@@ -58,12 +74,21 @@ class CoherenceAnalyzer:
                 logger.warning(f"⚠️ No se pudo activar IA avanzada: {e}")
         
         # Inicializar modelo de embeddings como fallback
+        self.rubric_engine = None
         if SENTENCE_TRANSFORMERS_AVAILABLE:
             try:
                 # Modelo multilingüe optimizado para español
                 logger.info("🤖 Cargando modelo de análisis semántico...")
-                self.model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+                self.model = SentenceTransformer(self.EMBEDDING_MODEL_NAME)
                 self.model_loaded = True
+                
+                # Reutilizar el modelo para compactar transcripciones largas antes de Groq
+                if self.advanced_service:
+                    self.advanced_service.set_embedding_model(self.model)
+                
+                # Motor de evaluación local sobre el mismo modelo
+                from .rubric_scoring_service import RubricScoringEngine
+                self.rubric_engine = RubricScoringEngine(self.model, model_name=self.EMBEDDING_MODEL_NAME)
                 logger.info("✅ Modelo cargado exitosamente")
             except Exception as e:
                 logger.error(f"❌ Error cargando modelo: {str(e)}")
@@ -72,7 +97,8 @@ class CoherenceAnalyzer:
             self.model_loaded = False
             logger.warning("⚠️ Modelo de análisis semántico no disponible")
     
-    def analizar_grupo(self, participaciones, tema, descripcion_tema="", max_score=20.0, assignment=None):
+    def analizar_grupo(self, participaciones, tema, descripcion_tema="", max_score=20.0, assignment=None,
+                       progress_callback=None):
         """
         Analiza la coherencia de cada estudiante individualmente
         
@@ -92,21 +118,49 @@ class CoherenceAnalyzer:
             descripcion_tema: Descripción detallada del tema (instrucciones de la asignación)
             max_score: Puntaje máximo de la asignación (default 20.0)
             assignment: Objeto Assignment completo (opcional, para configuración de IA)
+            progress_callback: Función (etiqueta, score 0-100) llamada con el score parcial
+                de cada participante en cuanto la IA lo entrega (opcional)
         
         Returns:
             Lista de resultados individuales con calificaciones
         """
         logger.info(f"📊 Analizando coherencia de {len(participaciones)} participantes (puntaje máximo: {max_score})")
         
+        config_ia = self._obtener_configuracion_ia(assignment)
+        motor = getattr(config_ia, 'evaluation_engine', 'groq')
+        
+        # Motor local elegido por el docente: no se usa Groq
+        if motor == 'local' and self.rubric_engine:
+            try:
+                return self._analizar_con_motor_local(
+                    participaciones, tema, descripcion_tema, max_score, assignment,
+                    config_ia=config_ia, progress_callback=progress_callback
+                )
+            except Exception as e:
+                logger.error(f"❌ Error con el motor local: {e}. Usando fallback...", exc_info=True)
+        
         # PRIORIDAD 1: IA Avanzada (Groq)
-        if self.advanced_service:
+        elif self.advanced_service:
             try:
                 logger.info("🚀 Usando IA Avanzada (Groq) para análisis de coherencia")
-                return self._analizar_con_ia_avanzada(participaciones, tema, descripcion_tema, max_score, assignment)
+                return self._analizar_con_ia_avanzada(
+                    participaciones, tema, descripcion_tema, max_score, assignment,
+                    progress_callback=progress_callback
+                )
             except Exception as e:
                 logger.error(f"❌ Error con IA avanzada: {e}. Usando fallback...")
         
-        # PRIORIDAD 2: Sentence Transformers
+        # PRIORIDAD 2: Motor local por rúbrica (sin Groq disponible)
+        if self.rubric_engine and motor != 'local':
+            try:
+                return self._analizar_con_motor_local(
+                    participaciones, tema, descripcion_tema, max_score, assignment,
+                    config_ia=config_ia, progress_callback=progress_callback
+                )
+            except Exception as e:
+                logger.error(f"❌ Error con el motor local: {e}. Usando fallback...", exc_info=True)
+        
+        # PRIORIDAD 3: Sentence Transformers
         if not self.model_loaded:
             logger.warning("⚠️ Usando análisis básico por falta de modelo")
             return self._analizar_grupo_basico(participaciones, tema, descripcion_tema, max_score)
@@ -115,20 +169,25 @@ class CoherenceAnalyzer:
         logger.info("🤖 Usando Sentence Transformers para análisis")
         
         resultados = []
-        texto_tema = f"{tema}. {descripcion_tema}"
         
         try:
-            # Generar embedding del tema una sola vez
-            embedding_tema = self.model.encode([texto_tema])
+            # Embedding del tema (cacheado por asignación)
+            embedding_tema = self._obtener_embedding_tema(tema, descripcion_tema, assignment)
+            
+            # Embeddings de todos los participantes en una sola llamada a encode
+            embeddings_participantes = self._codificar_transcripciones(
+                [participacion['texto_transcrito'] for participacion in participaciones]
+            )
             
             # Evaluar cada participante
-            for idx, participacion in enumerate(participaciones, 1):
+            for participacion, embedding_estudiante in zip(participaciones, embeddings_participantes):
                 logger.info(f"🔍 Evaluando {participacion['etiqueta']}...")
                 resultado_individual = self._evaluar_estudiante(
                     participacion,
                     embedding_tema,
                     tema,
-                    descripcion_tema
+                    descripcion_tema,
+                    embedding_estudiante=embedding_estudiante
                 )
                 resultados.append(resultado_individual)
             
@@ -143,7 +202,86 @@ class CoherenceAnalyzer:
         
         return resultados
     
-    def _evaluar_estudiante(self, participacion, embedding_tema, tema, descripcion_tema):
+    def _obtener_embedding_tema(self, tema, descripcion_tema, assignment=None):
+        """
+        Retorna el embedding del tema, reutilizando el cache de la asignación.
+        
+        La entrada se guarda con un hash de título, descripción e instrucciones;
+        Assignment.save() la elimina cuando la asignación cambia.
+        """
+        if assignment is not None and assignment.pk:
+            contenido = [assignment.title or '', assignment.description or '', assignment.instructions or '']
+            cache_key = assignment.topic_embedding_cache_key
+        else:
+            contenido = [tema or '', descripcion_tema or '']
+            cache_key = None
+        
+        huella = hashlib.sha256(
+            '\x1f'.join([self.EMBEDDING_MODEL_NAME] + contenido).encode('utf-8')
+        ).hexdigest()
+        if cache_key is None:
+            cache_key = f'topic_embedding_{huella}'
+        
+        cached = cache.get(cache_key)
+        if cached and cached.get('hash') == huella:
+            logger.info("♻️ Embedding del tema obtenido del cache")
+            return cached['embedding']
+        
+        embedding_tema = self.model.encode([f"{tema}. {descripcion_tema}"])
+        cache.set(cache_key, {'hash': huella, 'embedding': embedding_tema}, timeout=self.TOPIC_EMBEDDING_CACHE_TIMEOUT)
+        return embedding_tema
+    
+    def _dividir_en_ventanas(self, texto):
+        """Divide un texto en ventanas de oraciones de hasta SENTENCE_WINDOW_WORDS palabras"""
+        oraciones = [o for o in re.split(r'(?<=[.!?])\s+', texto.strip()) if o]
+        
+        ventanas = []
+        actual = []
+        for oracion in oraciones:
+            palabras = oracion.split()
+            # Oraciones demasiado largas se cortan por palabras
+            while len(palabras) > self.SENTENCE_WINDOW_WORDS:
+                if actual:
+                    ventanas.append(' '.join(actual))
+                    actual = []
+                ventanas.append(' '.join(palabras[:self.SENTENCE_WINDOW_WORDS]))
+                palabras = palabras[self.SENTENCE_WINDOW_WORDS:]
+            
+            if actual and len(actual) + len(palabras) > self.SENTENCE_WINDOW_WORDS:
+                ventanas.append(' '.join(actual))
+                actual = []
+            actual.extend(palabras)
+        
+        if actual:
+            ventanas.append(' '.join(actual))
+        return ventanas
+    
+    def _codificar_transcripciones(self, textos):
+        """
+        Codifica las transcripciones de todos los participantes en un único batch.
+        
+        Cada texto se divide en ventanas de oraciones y su embedding es la media
+        de sus ventanas. Textos sin contenido suficiente retornan None.
+        """
+        ventanas = []
+        rangos = []
+        for texto in textos:
+            inicio = len(ventanas)
+            if texto and len(texto.strip()) >= 20:
+                ventanas.extend(self._dividir_en_ventanas(texto))
+            rangos.append((inicio, len(ventanas)))
+        
+        if not ventanas:
+            return [None] * len(textos)
+        
+        embeddings = self.model.encode(ventanas, batch_size=self.ENCODE_BATCH_SIZE)
+        
+        return [
+            embeddings[inicio:fin].mean(axis=0, keepdims=True) if fin > inicio else None
+            for inicio, fin in rangos
+        ]
+    
+    def _evaluar_estudiante(self, participacion, embedding_tema, tema, descripcion_tema, embedding_estudiante=None):
         """Evalúa coherencia de un estudiante individual"""
         texto = participacion['texto_transcrito']
         etiqueta = participacion['etiqueta']
@@ -154,7 +292,7 @@ class CoherenceAnalyzer:
         
         try:
             # 1. COHERENCIA SEMÁNTICA (60% de la nota)
-            coherencia_semantica = self._calcular_coherencia_semantica(texto, embedding_tema)
+            coherencia_semantica = self._calcular_coherencia_semantica(texto, embedding_tema, embedding_estudiante)
             
             # 2. PALABRAS CLAVE (20% de la nota)
             palabras_clave = self._analizar_palabras_clave(texto, tema, descripcion_tema)
@@ -193,9 +331,10 @@ class CoherenceAnalyzer:
             logger.error(f"❌ Error evaluando {etiqueta}: {str(e)}")
             return self._resultado_error(participacion)
     
-    def _calcular_coherencia_semantica(self, texto, embedding_tema):
+    def _calcular_coherencia_semantica(self, texto, embedding_tema, embedding_estudiante=None):
         """Calcula similitud semántica entre texto y tema"""
-        embedding_estudiante = self.model.encode([texto])
+        if embedding_estudiante is None:
+            embedding_estudiante = self._codificar_transcripciones([texto])[0]
         similitud = cosine_similarity(embedding_estudiante, embedding_tema)[0][0]
         
         # Convertir a porcentaje (0-100)
@@ -207,93 +346,12 @@ class CoherenceAnalyzer:
     
     def _analizar_palabras_clave(self, texto, tema, descripcion):
         """Detecta palabras clave del tema en el texto del estudiante"""
-        # Combinar tema y descripción para extraer más palabras clave
-        texto_completo_tema = f"{tema} {descripcion}".lower()
-        palabras_tema = set(texto_completo_tema.split())
-        palabras_texto = set(texto.lower().split())
-        
-        # Filtrar palabras comunes sin valor (stop words)
-        palabras_comunes = {
-            'el', 'la', 'los', 'las', 'un', 'una', 'unos', 'unas',
-            'de', 'en', 'y', 'o', 'pero', 'por', 'para', 'con',
-            'a', 'al', 'del', 'es', 'son', 'está', 'están',
-            'que', 'cual', 'como', 'se', 'su', 'sus', 'mi', 'tu',
-            'te', 'me', 'le', 'les', 'nos', 'lo', 'este', 'esta'
-        }
-        palabras_tema = palabras_tema - palabras_comunes
-        
-        # Filtrar palabras muy cortas (menos de 4 letras)
-        palabras_tema = {p for p in palabras_tema if len(p) >= 4}
-        
-        # Encontrar coincidencias
-        palabras_encontradas = list(palabras_tema.intersection(palabras_texto))
-        
-        # Calcular puntaje
-        if len(palabras_tema) > 0:
-            porcentaje = (len(palabras_encontradas) / len(palabras_tema)) * 100
-            # Puntaje: 100 si encuentra al menos 40% de palabras clave
-            puntaje = min(porcentaje * 2.5, 100)
-        else:
-            puntaje = 50  # Puntaje neutral si no hay palabras clave
-        
-        return {
-            'palabras': palabras_encontradas[:10],  # Limitar a 10 para display
-            'puntaje': puntaje,
-            'total_encontradas': len(palabras_encontradas),
-            'total_tema': len(palabras_tema)
-        }
+        # El analizador de cada asignación se construye una sola vez
+        return get_keyword_analyzer(tema, descripcion).analyze(texto)
     
     def _analizar_profundidad(self, texto):
         """Evalúa la profundidad del contenido basado en longitud y estructura"""
-        palabras = texto.split()
-        num_palabras = len(palabras)
-        
-        # Palabras indicadoras de profundidad y análisis
-        indicadores_profundidad = [
-            'porque', 'debido', 'causa', 'consecuencia', 'resultado',
-            'ejemplo', 'como', 'además', 'también', 'sin embargo',
-            'por lo tanto', 'en conclusión', 'finalmente', 'así',
-            'entonces', 'específicamente', 'particularmente',
-            'significa', 'implica', 'demuestra', 'evidencia',
-            'importante', 'fundamental', 'esencial', 'clave',
-            'primero', 'segundo', 'tercero', 'finalmente'
-        ]
-        
-        texto_lower = texto.lower()
-        indicadores_encontrados = sum(
-            1 for indicador in indicadores_profundidad 
-            if indicador in texto_lower
-        )
-        
-        # Puntaje basado en palabras (30-50% del total)
-        if num_palabras < 20:
-            puntaje_base = 10
-        elif num_palabras < 40:
-            puntaje_base = 30
-        elif num_palabras < 80:
-            puntaje_base = 50
-        elif num_palabras < 150:
-            puntaje_base = 70
-        else:
-            puntaje_base = 85
-        
-        # Bonus por uso de conectores y palabras de análisis (hasta 30% adicional)
-        bonus_conectores = min(indicadores_encontrados * 3, 15)
-        
-        # Bonus por longitud de oraciones (señal de elaboración)
-        oraciones = texto.count('.') + texto.count('?') + texto.count('!')
-        if oraciones > 0:
-            palabras_por_oracion = num_palabras / oraciones
-            if 10 <= palabras_por_oracion <= 25:  # Rango ideal
-                bonus_oraciones = 5
-            else:
-                bonus_oraciones = 0
-        else:
-            bonus_oraciones = 0
-        
-        puntaje_total = min(puntaje_base + bonus_conectores + bonus_oraciones, 100)
-        
-        return puntaje_total
+        return depth_analyzer.analyze(texto)
     
     def _clasificar_coherencia(self, nota_coherencia, coherencia_semantica):
         """Determina nivel y observación según el puntaje"""
@@ -517,7 +575,8 @@ class CoherenceAnalyzer:
         
         return resumen
 
-    def _analizar_con_ia_avanzada(self, participaciones, tema, descripcion_tema, max_score=20.0, assignment=None):
+    def _analizar_con_ia_avanzada(self, participaciones, tema, descripcion_tema, max_score=20.0, assignment=None,
+                                  progress_callback=None):
         """
         Analiza coherencia usando IA avanzada (Groq API)
         
@@ -525,64 +584,48 @@ class CoherenceAnalyzer:
         
         Args:
             assignment: Objeto Assignment para obtener configuración de estrictez
+            progress_callback: Función (etiqueta, score) para reportar scores parciales
         """
         logger.info(f"📊 Análisis con IA avanzada - max_score={max_score}")
         resultados = []
         
-        for participacion in participaciones:
+        # Un prompt por lotes o una petición paralela por participante (según COHERENCE_CONFIG)
+        logger.info(f"🤖 Analizando {len(participaciones)} participantes con IA avanzada...")
+        resultados_ia = self.advanced_service.analyze_participants(
+            [(p['etiqueta'], p['texto_transcrito']) for p in participaciones],
+            assignment_title=tema,
+            assignment_description=descripcion_tema,
+            assignment=assignment,
+            on_partial_score=progress_callback
+        )
+        
+        # Participantes en que Groq falló (error o keys agotadas): motor local si está disponible
+        fallidos = [
+            idx for idx, ai_result in enumerate(resultados_ia)
+            if isinstance(ai_result, Exception) or ai_result.get('error')
+        ]
+        if fallidos and self.rubric_engine:
+            logger.warning(f"⚠️ {len(fallidos)} participante(s) sin respuesta de Groq, usando motor local")
+            try:
+                resultados_locales = self._evaluar_con_motor_local(
+                    [participaciones[idx] for idx in fallidos], tema, descripcion_tema, assignment,
+                    progress_callback=progress_callback
+                )
+                for idx, resultado_local in zip(fallidos, resultados_locales):
+                    resultados_ia[idx] = resultado_local
+            except Exception as e:
+                logger.error(f"❌ Error con el motor local: {e}")
+        
+        for participacion, ai_result in zip(participaciones, resultados_ia):
             etiqueta = participacion['etiqueta']
-            texto = participacion['texto_transcrito']
-            tiempo = participacion['tiempo_participacion']
-            
-            logger.info(f"🤖 Analizando {etiqueta} con IA avanzada...")
             
             try:
-                # Llamar al servicio de IA avanzada con assignment para configuración
-                ai_result = self.advanced_service.analyze_participant_coherence(
-                    participant_name=etiqueta,
-                    transcribed_text=texto,
-                    assignment_title=tema,
-                    assignment_description=descripcion_tema,
-                    assignment=assignment
-                )
-                
-                # Convertir score de 0-100 a nota de 0-max_score (dinámico según asignación)
-                coherence_score = ai_result['coherence_score']  # 0-100
-                nota_sobre_max = (coherence_score / 100) * max_score  # 0-max_score
+                # Timeout o error de la petición concurrente
+                if isinstance(ai_result, Exception):
+                    raise ai_result
                 
-                # Construir resultado compatible con el formato existente
-                resultado = {
-                    'etiqueta': etiqueta,
-                    'texto_transcrito': texto,
-                    'nota_coherencia': coherence_score,  # 0-100
-                    'calificacion_final': round(nota_sobre_max, 2),  # 0-max_score
-                    'nivel': self._clasificar_nivel(nota_sobre_max),
-                    'observacion': ai_result['feedback'][:200] + '...' if len(ai_result['feedback']) > 200 else ai_result['feedback'],  # Resumen corto
-                    'feedback_ia_avanzada': ai_result['feedback'],  # Feedback completo de IA
-                    'palabras_totales': len(texto.split()),
-                    'tiempo_participacion': tiempo,
-                    'porcentaje_tiempo': 0,  # Se calcula después
-                    'porcentaje_aporte_normalizado': 0,  # Se calcula después
-                    
-                    # Compatibilidad con campos existentes
-                    'coherencia_semantica': coherence_score,
-                    'palabras_clave_encontradas': ai_result.get('key_concepts_covered', []),
-                    'puntaje_palabras_clave': coherence_score,  # Aproximación
-                    'puntaje_profundidad': coherence_score,  # Aproximación
-                    'foto_url': participacion.get('foto_url'),
-                    'time_segments': participacion.get('time_segments', []),  # Preservar segmentos de tiempo
-                    
-                    # Detalles de IA avanzada
-                    'ai_powered': True,
-                    'details': ai_result['details'],
-                    'strengths': ai_result.get('strengths', []),
-                    'improvements': ai_result.get('improvements', []),
-                    'key_concepts_covered': ai_result.get('key_concepts_covered', []),
-                    'missing_elements': ai_result.get('missing_elements', [])
-                }
-                
-                resultados.append(resultado)
-                logger.info(f"✅ {etiqueta}: {coherence_score:.1f}% coherencia")
+                resultados.append(self._construir_resultado_evaluacion(participacion, ai_result, max_score))
+                logger.info(f"✅ {etiqueta}: {ai_result['coherence_score']:.1f}% coherencia")
                 
             except Exception as e:
                 logger.error(f"❌ Error analizando {etiqueta} con IA: {e}")
@@ -592,25 +635,126 @@ class CoherenceAnalyzer:
                 )
                 resultados.append(resultado_basico)
         
-        # Calcular porcentajes relativos
-        if resultados:
-            tiempo_total = sum(r['tiempo_participacion'] for r in resultados)
-            for resultado in resultados:
-                resultado['porcentaje_tiempo'] = (
-                    (resultado['tiempo_participacion'] / tiempo_total * 100) 
-                    if tiempo_total > 0 else 0
-                )
-                # Calcular aporte considerando tiempo Y calidad
-                tiempo_pct = resultado['porcentaje_tiempo']
-                coherencia = resultado.get('nota_coherencia', 0)  # Usar 'nota_coherencia' en lugar de 'coherence_score'
-                coherencia_factor = coherencia / 100
-                aporte_real = tiempo_pct * coherencia_factor
-                resultado['porcentaje_aporte_normalizado'] = round(aporte_real, 2)
-                
-                logger.info(f"   📈 {resultado['etiqueta']}: Tiempo={tiempo_pct:.1f}% × Coherencia={coherencia:.1f}% = Aporte={aporte_real:.1f}%")
+        self._calcular_aportes(resultados)
+        return resultados
+    
+    def _analizar_con_motor_local(self, participaciones, tema, descripcion_tema, max_score=20.0, assignment=None,
+                                  config_ia=None, progress_callback=None):
+        """
+        Analiza coherencia con el motor local por rúbrica (sin llamadas a Groq)
+        
+        Args:
+            config_ia: AIConfiguration del docente (para el nivel de estrictez)
+            progress_callback: Función (etiqueta, score) para reportar scores parciales
+        """
+        logger.info(f"🧮 Análisis con motor local por rúbrica - max_score={max_score}")
+        evaluaciones = self._evaluar_con_motor_local(
+            participaciones, tema, descripcion_tema, assignment,
+            config_ia=config_ia, progress_callback=progress_callback
+        )
         
+        resultados = [
+            self._construir_resultado_evaluacion(participacion, evaluacion, max_score)
+            for participacion, evaluacion in zip(participaciones, evaluaciones)
+        ]
+        self._calcular_aportes(resultados)
         return resultados
     
+    def _evaluar_con_motor_local(self, participaciones, tema, descripcion_tema, assignment=None,
+                                 config_ia=None, progress_callback=None):
+        """Evalúa en batch con RubricScoringEngine y retorna dicts en formato de IA avanzada"""
+        if config_ia is None:
+            config_ia = self._obtener_configuracion_ia(assignment)
+        
+        estrictez = 'moderate'
+        if assignment is not None and assignment.strictness_level:
+            estrictez = assignment.strictness_level
+        elif config_ia is not None:
+            estrictez = config_ia.strictness_level
+        
+        return self.rubric_engine.evaluate_participants(
+            [(p['etiqueta'], p['texto_transcrito']) for p in participaciones],
+            assignment_title=tema,
+            assignment_description=descripcion_tema,
+            assignment=assignment,
+            strictness_level=estrictez,
+            on_partial_score=progress_callback
+        )
+    
+    def _obtener_configuracion_ia(self, assignment=None):
+        """AIConfiguration del docente de la asignación (o None)"""
+        if assignment is None or not assignment.course or not assignment.course.teacher:
+            return None
+        try:
+            from apps.presentaciones.models import AIConfiguration
+            return AIConfiguration.objects.filter(teacher=assignment.course.teacher).first()
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo obtener configuración de IA: {e}")
+            return None
+    
+    def _construir_resultado_evaluacion(self, participacion, ai_result, max_score=20.0):
+        """Convierte un resultado de Groq o del motor local al formato de resultados existente"""
+        etiqueta = participacion['etiqueta']
+        texto = participacion['texto_transcrito']
+        tiempo = participacion['tiempo_participacion']
+        
+        # Convertir score de 0-100 a nota de 0-max_score (dinámico según asignación)
+        coherence_score = ai_result['coherence_score']  # 0-100
+        nota_sobre_max = (coherence_score / 100) * max_score  # 0-max_score
+        
+        # Construir resultado compatible con el formato existente
+        resultado = {
+            'etiqueta': etiqueta,
+            'texto_transcrito': texto,
+            'nota_coherencia': coherence_score,  # 0-100
+            'calificacion_final': round(nota_sobre_max, 2),  # 0-max_score
+            'nivel': self._clasificar_nivel(nota_sobre_max),
+            'observacion': ai_result['feedback'][:200] + '...' if len(ai_result['feedback']) > 200 else ai_result['feedback'],  # Resumen corto
+            'feedback_ia_avanzada': ai_result['feedback'],  # Feedback completo de IA
+            'palabras_totales': len(texto.split()),
+            'tiempo_participacion': tiempo,
+            'porcentaje_tiempo': 0,  # Se calcula después
+            'porcentaje_aporte_normalizado': 0,  # Se calcula después
+            
+            # Compatibilidad con campos existentes
+            'coherencia_semantica': coherence_score,
+            'palabras_clave_encontradas': ai_result.get('key_concepts_covered', []),
+            'puntaje_palabras_clave': coherence_score,  # Aproximación
+            'puntaje_profundidad': coherence_score,  # Aproximación
+            'foto_url': participacion.get('foto_url'),
+            'time_segments': participacion.get('time_segments', []),  # Preservar segmentos de tiempo
+            
+            # Detalles de IA avanzada (o del motor local)
+            'ai_powered': ai_result.get('ai_powered', True),
+            'evaluation_engine': ai_result['details'].get('engine', 'groq'),
+            'details': ai_result['details'],
+            'strengths': ai_result.get('strengths', []),
+            'improvements': ai_result.get('improvements', []),
+            'key_concepts_covered': ai_result.get('key_concepts_covered', []),
+            'missing_elements': ai_result.get('missing_elements', [])
+        }
+        return resultado
+    
+    def _calcular_aportes(self, resultados):
+        """Calcula porcentajes de tiempo y aporte (tiempo × coherencia) de cada participante"""
+        if not resultados:
+            return
+        
+        tiempo_total = sum(r['tiempo_participacion'] for r in resultados)
+        for resultado in resultados:
+            resultado['porcentaje_tiempo'] = (
+                (resultado['tiempo_participacion'] / tiempo_total * 100) 
+                if tiempo_total > 0 else 0
+            )
+            # Calcular aporte considerando tiempo Y calidad
+            tiempo_pct = resultado['porcentaje_tiempo']
+            coherencia = resultado.get('nota_coherencia', 0)  # Usar 'nota_coherencia' en lugar de 'coherence_score'
+            coherencia_factor = coherencia / 100
+            aporte_real = tiempo_pct * coherencia_factor
+            resultado['porcentaje_aporte_normalizado'] = round(aporte_real, 2)
+            
+            logger.info(f"   📈 {resultado['etiqueta']}: Tiempo={tiempo_pct:.1f}% × Coherencia={coherencia:.1f}% = Aporte={aporte_real:.1f}%")
+    
     def _clasificar_nivel(self, nota):
         """Clasifica el nivel de desempeño según la nota (0-20)"""
         if nota >= 18:
@@ -665,182 +809,6 @@ class CoherenceAnalyzer:
         Returns:
             str: Conclusión grupal generada por IA o mensaje predeterminado
         """
-        if not resultados_participantes:
-            return "No se encontraron participantes para analizar."
-        
-        try:
-            # Intentar usar GROQ para generar conclusión dinámica
-            from apps.ai_processor.services.groq_key_manager import GroqKeyManager
-            from groq import Groq
-            
-            key_manager = GroqKeyManager()
-            groq_api_key = key_manager.get_current_key()
-            
-            if not groq_api_key:
-                logger.warning("No hay API key de GROQ disponible, usando conclusión básica")
-                return self._generar_conclusion_basica(resultados_participantes)
-            
-            # Preparar datos del grupo para el prompt
-            num_participantes = len(resultados_participantes)
-            coherencia_promedio = np.mean([r['nota_coherencia'] for r in resultados_participantes])
-            calificacion_promedio = np.mean([r['calificacion_final'] for r in resultados_participantes])
-            
-            # Información de cada participante
-            info_participantes = []
-            for idx, r in enumerate(resultados_participantes, 1):
-                info_participantes.append(
-                    f"{idx}. {r['etiqueta']}: {r['calificacion_final']:.1f}/{max_score} pts "
-                    f"(Coherencia: {r['nota_coherencia']:.1f}%, Tiempo: {r['porcentaje_tiempo']:.1f}%)"
-                )
-            
-            participantes_texto = "\n".join(info_participantes)
-            
-            # Identificar puntos fuertes y débiles
-            mejor_participante = max(resultados_participantes, key=lambda x: x['calificacion_final'])
-            peor_participante = min(resultados_participantes, key=lambda x: x['calificacion_final'])
-            participante_mas_tiempo = max(resultados_participantes, key=lambda x: x['porcentaje_tiempo'])
-            
-            # Calcular desviación estándar de coherencia para ver dispersión
-            coherencias = [r['nota_coherencia'] for r in resultados_participantes]
-            desviacion_coherencia = np.std(coherencias)
-            
-            # Determinar si la coherencia es baja, media o alta
-            if coherencia_promedio < 50:
-                nivel_comprension = "BAJA - El grupo NO logró demostrar comprensión adecuada del tema"
-            elif coherencia_promedio < 70:
-                nivel_comprension = "MEDIA - El grupo demostró comprensión parcial del tema"
-            else:
-                nivel_comprension = "ALTA - El grupo demostró buena comprensión del tema"
-            
-            # Analizar equilibrio de participación
-            tiempos = [r['porcentaje_tiempo'] for r in resultados_participantes]
-            desviacion_tiempo = np.std(tiempos)
-            if desviacion_tiempo > 20:
-                equilibrio_participacion = "DESIGUAL - Hay gran diferencia en el tiempo de participación"
-            elif desviacion_tiempo > 10:
-                equilibrio_participacion = "MODERADO - La participación está medianamente equilibrada"
-            else:
-                equilibrio_participacion = "EQUILIBRADO - Todos participaron de forma similar"
-            
-            # Construir prompt para GROQ con análisis crítico
-            prompt = f"""Eres un evaluador académico OBJETIVO y CRÍTICO que analiza presentaciones grupales. Debes generar una conclusión REALISTA basada en las métricas.
-
-**Tema asignado:** {tema}
-
-**Descripción completa:** {descripcion_tema[:300]}
-
-**Resultados de cada participante ({num_participantes}):**
-{participantes_texto}
-
-**ANÁLISIS CRÍTICO:**
-- Coherencia promedio: {coherencia_promedio:.1f}% → {nivel_comprension}
-- Calificación promedio: {calificacion_promedio:.1f}/{max_score}
-- Dispersión en coherencia: {desviacion_coherencia:.1f}% ({"Alta variabilidad" if desviacion_coherencia > 15 else "Moderada" if desviacion_coherencia > 8 else "Baja variabilidad"})
-- Distribución de tiempo: {equilibrio_participacion}
-- Mejor participante: {mejor_participante['etiqueta']} ({mejor_participante['nota_coherencia']:.1f}% coherencia)
-- Participante más débil: {peor_participante['etiqueta']} ({peor_participante['nota_coherencia']:.1f}% coherencia)
-
-**INSTRUCCIONES IMPORTANTES:**
-1. Si la coherencia promedio es MENOR a 50%, di claramente que el grupo NO cumplió adecuadamente con el tema
-2. Si la coherencia promedio es 50-69%, di que cumplieron PARCIALMENTE pero necesitan mejorar
-3. Si la coherencia promedio es 70% o más, di que cumplieron bien
-4. Sé ESPECÍFICO sobre qué aspectos fallaron o destacaron
-5. Si hay gran variabilidad (desviación >15%), menciona que algunos participantes estuvieron mejor que otros
-6. Si la participación es muy desigual (desviación tiempo >20%), señálalo como área crítica de mejora
-7. NO uses frases genéricas como "comprensión básica" cuando los datos muestran bajo rendimiento
-8. Máximo 3-4 oraciones, directas y constructivas
-
-Genera SOLO la conclusión grupal, sin títulos ni formato adicional:"""
-
-            client = Groq(api_key=groq_api_key)
-            
-            response = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """Eres un evaluador académico EXPERTO y OBJETIVO. Tu trabajo es dar retroalimentación REALISTA basada en métricas concretas.
-
-REGLAS IMPORTANTES:
-- Si los datos muestran bajo rendimiento, sé HONESTO al señalarlo
-- NO uses eufemismos vagos como "comprensión básica" cuando la coherencia es menor a 50%
-- Sé ESPECÍFICO: menciona qué falló y qué se puede mejorar
-- Mantén un tono profesional pero directo
-- La retroalimentación debe ser CONSTRUCTIVA pero REALISTA
-- NO infles los logros si las métricas no los respaldan"""
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.6,  # Reducido para respuestas más consistentes y objetivas
-                max_tokens=300,   # Aumentado para conclusiones más detalladas
-                top_p=0.9,
-                stream=False
-            )
-            
-            conclusion = response.choices[0].message.content.strip()
-            
-            # Verificar que la conclusión no esté vacía
-            if conclusion and len(conclusion) > 20:
-                logger.info(f"✅ Conclusión grupal generada con GROQ ({len(conclusion)} caracteres)")
-                return conclusion
-            else:
-                logger.warning("Conclusión de GROQ muy corta, usando básica")
-                return self._generar_conclusion_basica(resultados_participantes)
-                
-        except Exception as e:
-            logger.error(f"Error al generar conclusión con GROQ: {str(e)}")
-            return self._generar_conclusion_basica(resultados_participantes)
-    
-    def _generar_conclusion_basica(self, resultados_participantes):
-        """
-        Genera una conclusión básica cuando GROQ no está disponible
-        """
-        if not resultados_participantes:
-            return "No hay participantes para evaluar."
-        
-        coherencia_promedio = np.mean([r['nota_coherencia'] for r in resultados_participantes])
-        calificacion_promedio = np.mean([r['calificacion_final'] for r in resultados_participantes])
-        num_participantes = len(resultados_participantes)
-        
-        # Análisis de dispersión
-        coherencias = [r['nota_coherencia'] for r in resultados_participantes]
-        desviacion_coherencia = np.std(coherencias)
-        
-        # Análisis de equilibrio de tiempo
-        tiempos = [r['porcentaje_tiempo'] for r in resultados_participantes]
-        desviacion_tiempo = np.std(tiempos)
-        
-        # Generar conclusión basada en métricas reales
-        if coherencia_promedio >= 80:
-            conclusion = f"El grupo ({num_participantes} participantes) demostró excelente dominio del tema con {coherencia_promedio:.1f}% de coherencia promedio. "
-            if desviacion_coherencia < 10:
-                conclusion += "Todos los integrantes mantuvieron un nivel consistentemente alto. "
-            else:
-                conclusion += "Aunque algunos participantes destacaron más que otros, el nivel general fue sobresaliente. "
-            conclusion += "Se recomienda mantener este nivel de preparación y profundización temática."
-            
-        elif coherencia_promedio >= 70:
-            conclusion = f"El grupo logró cumplir adecuadamente con el tema asignado, alcanzando {coherencia_promedio:.1f}% de coherencia promedio. "
-            if desviacion_coherencia > 15:
-                conclusion += "Sin embargo, se observa variabilidad significativa entre participantes, lo que sugiere preparación desigual. "
-            conclusion += "Se sugiere profundizar más en los conceptos clave y asegurar que todos los integrantes dominen el tema de forma equilibrada."
-            
-        elif coherencia_promedio >= 50:
-            conclusion = f"El grupo cumplió parcialmente con el tema, obteniendo {coherencia_promedio:.1f}% de coherencia promedio. "
-            if calificacion_promedio < 12:
-                conclusion += "Las calificaciones individuales reflejan que varios participantes no lograron desarrollar el tema con suficiente profundidad. "
-            if desviacion_tiempo > 20:
-                conclusion += "Además, la participación fue muy desigual, lo cual afectó el desempeño grupal. "
-            conclusion += "Se recomienda mejorar la preparación temática, estructurar mejor el contenido y equilibrar la participación de todos los miembros."
-            
-        else:
-            conclusion = f"El grupo NO logró cumplir adecuadamente con el tema asignado, alcanzando solo {coherencia_promedio:.1f}% de coherencia promedio. "
-            conclusion += "Los análisis individuales muestran falta de comprensión de los conceptos fundamentales y desarrollo insuficiente del contenido. "
-            if desviacion_coherencia > 15:
-                conclusion += "La gran variabilidad entre participantes indica preparación muy desigual. "
-            conclusion += "Es crítico revisar los conceptos básicos del tema, mejorar la preparación grupal y asegurar que todos los integrantes comprendan y puedan explicar los puntos clave antes de la presentación."
+        from .group_conclusion_service import GroupConclusionService
         
-        return conclusion
+        return GroupConclusionService.generate(resultados_participantes, tema, descripcion_tema, max_score=max_score)
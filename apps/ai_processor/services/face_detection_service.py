@@ -680,14 +680,15 @@ class FaceDetectionService:
             frames_with_faces = 0
             frame_count = 0
             processed_frames = 0
+            step = max(int(round(fps)), 1) if fps > 0 else 30
             
             while cap.isOpened():
                 ret, frame = cap.read()
                 if not ret:
                     break
                 
-                # Procesar cada 30 frames
-                if frame_count % 30 == 0:
+                # Procesar un frame por segundo (cada 30 frames a 30 fps, cada 10 en el proxy)
+                if frame_count % step == 0:
                     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
                     faces = face_cascade.detectMultiScale(gray, 1.1, 4)
                     
@@ -770,8 +771,10 @@ class FaceDetectionService:
                 sample_rate = 15  # 60fps → ~4 fps procesados (antes 6 → ~10fps)
             elif fps > 25:
                 sample_rate = 8   # 30fps → ~4 fps procesados (antes 3 → ~10fps)
+            elif fps > 12:
+                sample_rate = 5   # 13-25fps → ~3-5 fps procesados (antes 2)
             else:
-                sample_rate = 5   # <25fps → ~5 fps procesados (antes 2)
+                sample_rate = 2   # Proxy de análisis (10 fps constantes) → 5 fps procesados
             
             logger.info(f"📊 Video: {duration:.1f}s, {fps:.1f} FPS (corregido si necesario) → sample_rate={sample_rate} (ULTRA-RÁPIDO)")
             
@@ -8,17 +8,270 @@ Características:
 - Rotación automática ante rate limits
 - Cache de keys fallidas (evita reintentos innecesarios)
 - Reset automático de keys después de 60 segundos
+- Token buckets por key (requests y tokens por minuto) con espera proactiva
+- Estado compartido entre procesos (bloqueos y contadores) vía cache de Django
 - Logging detallado de cambios de key
+
+Límites entre procesos: con Redis (REDIS_URL) cada petición además reserva
+su cupo en contadores por minuto compartidos (INCR atómico), así que los
+límites de GROQ_RATE_LIMITS valen para todos los workers juntos. Sin Redis la
+cache compartida es de disco, donde incr es leer + escribir (no atómico): los
+límites se aplican por proceso, divididos entre worker_processes, y el cursor
+de rotación y los contadores son locales de cada proceso.
 """
 
 import os
+import re
+import hashlib
 import time
+import threading
 from typing import Optional, List
 from datetime import datetime, timedelta
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Límites por defecto del plan gratuito de Groq (ver docs/CAPACIDAD_GROQ_30_KEYS.txt)
+DEFAULT_RATE_LIMITS = {
+    'requests_per_minute': 30,
+    'tokens_per_minute': 6000,
+    # Procesos que usan las mismas keys (sin Redis los límites se reparten entre ellos)
+    'worker_processes': int(os.getenv('WEB_CONCURRENCY', '1') or 1),
+}
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estima los tokens de un texto con tiktoken (cl100k_base como aproximación).
+    
+    Si tiktoken no está disponible usa ~4 caracteres por token.
+    """
+    global _tokenizer
+    
+    if not text:
+        return 0
+    
+    with _tokenizer_lock:
+        if _tokenizer is None:
+            try:
+                import tiktoken
+                _tokenizer = tiktoken.get_encoding('cl100k_base')
+            except Exception as e:
+                logger.warning(f"⚠️ tiktoken no disponible ({e}), usando estimación por caracteres")
+                _tokenizer = False
+    
+    if _tokenizer:
+        return len(_tokenizer.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def estimate_messages_tokens(messages: list, max_tokens: int = 0) -> int:
+    """Estima los tokens de una petición de chat (prompt + respuesta máxima)."""
+    prompt_tokens = sum(estimate_tokens(m.get('content', '')) + 4 for m in messages)
+    return prompt_tokens + (max_tokens or 0)
+
+
+def _parse_reset_seconds(value) -> Optional[float]:
+    """Convierte valores como '7.66s', '2m59.56s', '120ms' o '30' a segundos."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r'([\d.]+)(ms|h|m|s)', value):
+        matched = True
+        amount = float(amount)
+        total += {'h': 3600, 'm': 60, 's': 1, 'ms': 0.001}[unit] * amount
+    return total if matched else None
+
+
+class SharedKeyState:
+    """
+    Estado de las keys compartido entre procesos/workers.
+    
+    Guarda bloqueos (cooldowns) en la cache de Django indicada por
+    GROQ_KEY_STATE_CACHE. Los contadores de uso, el cursor de rotación y las
+    ventanas de rate limit solo se comparten si la cache es Redis (`atomic`):
+    en otras caches incr es leer + escribir y los procesos se pisarían. Las
+    keys nunca se guardan en claro (se usa un hash).
+    
+    Si la cache no está disponible, todas las operaciones degradan a no-op
+    y el gestor sigue funcionando solo con su estado local.
+    """
+    
+    PREFIX = 'groq_keys'
+    WINDOW_SECONDS = 60
+    
+    def __init__(self, keys: List[str]):
+        self.ids = {key: hashlib.sha256(key.encode()).hexdigest()[:12] for key in keys}
+        self._cache = None
+    
+    @property
+    def atomic(self) -> bool:
+        """True si la cache compartida tiene incrementos atómicos entre procesos (Redis)."""
+        try:
+            from django.core.cache.backends.redis import RedisCache
+            return isinstance(self._get_cache(), RedisCache)
+        except Exception:
+            return False
+    
+    def _get_cache(self):
+        if self._cache is None:
+            from django.conf import settings
+            from django.core.cache import caches
+            
+            alias = getattr(settings, 'GROQ_KEY_STATE_CACHE', 'default')
+            try:
+                self._cache = caches[alias]
+            except Exception:
+                self._cache = caches['default']
+        return self._cache
+    
+    def _name(self, kind: str, key: str = None) -> str:
+        if key is None:
+            return f'{self.PREFIX}:{kind}'
+        return f'{self.PREFIX}:{kind}:{self.ids[key]}'
+    
+    def get_cooldowns(self) -> dict:
+        """Devuelve {key: timestamp_hasta} de las keys bloqueadas por cualquier proceso."""
+        names = {self._name('cooldown', key): key for key in self.ids}
+        try:
+            values = self._get_cache().get_many(list(names))
+        except Exception as e:
+            logger.debug(f"Estado compartido de Groq no disponible: {e}")
+            return {}
+        return {names[name]: until for name, until in values.items()}
+    
+    def set_cooldown(self, key: str, until: float):
+        """Bloquea la key para todos los procesos hasta el timestamp indicado."""
+        seconds = max(1, int(until - time.time()) + 1)
+        try:
+            self._get_cache().set(self._name('cooldown', key), until, timeout=seconds)
+        except Exception as e:
+            logger.debug(f"No se pudo compartir el bloqueo de la key: {e}")
+    
+    def incr(self, key: str, field: str, delta: int = 1) -> Optional[int]:
+        """Incrementa un contador compartido de la key (requests, failures...)."""
+        return self._incr(self._name(field, key), delta)
+    
+    def next_cursor(self) -> Optional[int]:
+        """Avanza el cursor de rotación compartido (round-robin entre procesos)."""
+        return self._incr(self._name('cursor'), 1)
+    
+    def _incr(self, name: str, delta: int, timeout=None) -> Optional[int]:
+        if not self.atomic:
+            return None  # Sin incr atómico: los procesos se pisarían, se usa el estado local
+        try:
+            cache = self._get_cache()
+            cache.add(name, 0, timeout=timeout)
+            return cache.incr(name, delta)
+        except Exception as e:
+            logger.debug(f"No se pudo actualizar el contador compartido {name}: {e}")
+            return None
+    
+    def reserve(self, key: str, tokens: int, requests_limit: float, tokens_limit: float) -> float:
+        """
+        Reserva 1 request y `tokens` en la ventana del minuto actual de la key
+        (compartida por todos los procesos)
+        
+        Returns:
+            0 si se reservó (o no hay estado compartido atómico); si la ventana
+            está llena, segundos hasta la siguiente
+        """
+        window = int(time.time() // self.WINDOW_SECONDS)
+        requests_name = self._name(f'rpm:{window}', key)
+        tokens_name = self._name(f'tpm:{window}', key)
+        timeout = self.WINDOW_SECONDS * 2
+        
+        requests = self._incr(requests_name, 1, timeout=timeout)
+        if requests is None:
+            return 0.0
+        used = self._incr(tokens_name, tokens, timeout=timeout)
+        
+        # Una petición más grande que el límite entero pasa sola en una ventana vacía
+        over_tokens = used is not None and used > tokens_limit and used != tokens
+        if requests <= requests_limit and not over_tokens:
+            return 0.0
+        
+        self._incr(requests_name, -1, timeout=timeout)
+        if used is not None:
+            self._incr(tokens_name, -tokens, timeout=timeout)
+        return self.WINDOW_SECONDS - time.time() % self.WINDOW_SECONDS
+    
+    def adjust_tokens(self, key: str, delta: int):
+        """Corrige los tokens reservados en la ventana actual con el consumo real."""
+        if delta:
+            window = int(time.time() // self.WINDOW_SECONDS)
+            self._incr(self._name(f'tpm:{window}', key), delta, timeout=self.WINDOW_SECONDS * 2)
+    
+    def get_counters(self, field: str) -> dict:
+        """Devuelve {key: valor} del contador compartido indicado."""
+        if not self.atomic:
+            return {}
+        names = {self._name(field, key): key for key in self.ids}
+        try:
+            values = self._get_cache().get_many(list(names))
+        except Exception:
+            return {}
+        return {names[name]: value for name, value in values.items()}
+
+
+class TokenBucket:
+    """
+    Token bucket con recarga continua.
+    
+    El saldo puede quedar negativo (deuda) cuando se consume más de lo
+    disponible o cuando el servidor indica que hay que esperar.
+    """
+    
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+            self.updated = now
+    
+    def available(self, now: float) -> float:
+        self._refill(now)
+        return self.tokens
+    
+    def wait_time(self, amount: float, now: float) -> float:
+        """Segundos hasta que haya saldo para consumir amount."""
+        self._refill(now)
+        deficit = min(amount, self.capacity) - self.tokens
+        return max(0.0, deficit / self.refill_per_second)
+    
+    def consume(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= amount
+    
+    def refund(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + amount)
+    
+    def sync(self, remaining: float, now: float):
+        """Ajusta el saldo al valor informado por el servidor (si es menor)."""
+        self._refill(now)
+        self.tokens = min(self.tokens, float(remaining))
+    
+    def block_for(self, seconds: float, now: float, amount: float = 1.0):
+        """Fuerza una espera de `seconds` antes de poder consumir `amount`."""
+        self._refill(now)
+        self.tokens = min(self.tokens, amount - seconds * self.refill_per_second)
+
 
 class GroqKeyManager:
     """
@@ -27,17 +280,44 @@ class GroqKeyManager:
     Funcionalidades:
     1. Carga múltiples keys desde variables de entorno
     2. Rotación automática cuando una key falla
-    3. Cache temporal de keys fallidas (60s)
+    3. Cache temporal de keys fallidas (60s), compartida entre procesos
     4. Estadísticas de uso por key
+    
+    Usar siempre get_groq_key_manager() para obtener la instancia compartida.
     """
     
     def __init__(self):
         """Inicializa el gestor cargando todas las keys disponibles."""
         self.keys = self._load_keys()
-        self.current_key_index = 0
-        self.failed_keys = {}  # {key: timestamp_when_failed}
+        # Sin cursor compartido, cada proceso empieza la rotación en una key distinta
+        self.current_key_index = os.getpid() % len(self.keys) if self.keys else 0
+        self.failed_keys = {}  # {key: timestamp_hasta_desbloqueo}
         self.key_stats = {key: {'requests': 0, 'failures': 0} for key in self.keys}
         self.reset_timeout = 60  # Segundos antes de reintentar una key fallida
+        self._lock = threading.RLock()  # Acceso concurrente desde varios hilos
+        self.shared = SharedKeyState(self.keys)  # Bloqueos y contadores entre procesos
+        self._clients = {}  # Clientes de Groq reutilizados por key
+        
+        # Token buckets por key: requests/min y tokens/min. Con ventanas
+        # compartidas (Redis) cada proceso usa el límite entero y las ventanas
+        # reparten el cupo; sin ellas el límite se divide entre los procesos
+        limits = self._load_rate_limits()
+        processes = 1 if self.shared.atomic else max(int(limits['worker_processes']), 1)
+        self.shared_requests_per_minute = limits['requests_per_minute']
+        self.shared_tokens_per_minute = limits['tokens_per_minute']
+        self.requests_per_minute = limits['requests_per_minute'] / processes
+        self.tokens_per_minute = limits['tokens_per_minute'] / processes
+        if processes > 1:
+            logger.info(
+                f"🔑 Límites de Groq por proceso ({processes} procesos, sin Redis): "
+                f"{self.requests_per_minute:.1f} req/min y {self.tokens_per_minute:.0f} tokens/min por key"
+            )
+        self.request_buckets = {
+            key: TokenBucket(self.requests_per_minute, self.requests_per_minute / 60.0) for key in self.keys
+        }
+        self.token_buckets = {
+            key: TokenBucket(self.tokens_per_minute, self.tokens_per_minute / 60.0) for key in self.keys
+        }
         
         if self.keys:
             logger.info(f"🔑 Gestor de Groq iniciado con {len(self.keys)} API keys disponibles")
@@ -71,6 +351,16 @@ class GroqKeyManager:
         
         return keys
     
+    def _load_rate_limits(self) -> dict:
+        """Lee GROQ_RATE_LIMITS de settings (si existe) sobre los valores por defecto."""
+        limits = dict(DEFAULT_RATE_LIMITS)
+        try:
+            from django.conf import settings
+            limits.update(getattr(settings, 'GROQ_RATE_LIMITS', {}) or {})
+        except Exception:
+            pass
+        return limits
+    
     def get_current_key(self) -> Optional[str]:
         """
         Obtiene la API key actual válida.
@@ -83,51 +373,263 @@ class GroqKeyManager:
         if not self.keys:
             return None
         
-        # Limpiar keys fallidas antiguas (> reset_timeout segundos)
-        self._cleanup_failed_keys()
-        
-        # Buscar una key válida (no fallida)
-        attempts = 0
-        max_attempts = len(self.keys)
-        
-        while attempts < max_attempts:
-            current_key = self.keys[self.current_key_index]
+        with self._lock:
+            # Limpiar keys fallidas antiguas (> reset_timeout segundos)
+            self._cleanup_failed_keys()
             
-            # Verificar si la key está disponible
-            if current_key not in self.failed_keys:
-                # Incrementar contador de uso
-                self.key_stats[current_key]['requests'] += 1
-                return current_key
+            # Buscar una key válida (no fallida)
+            attempts = 0
+            max_attempts = len(self.keys)
             
-            # Key fallida, probar la siguiente
-            self.current_key_index = (self.current_key_index + 1) % len(self.keys)
-            attempts += 1
+            while attempts < max_attempts:
+                current_key = self.keys[self.current_key_index]
+                
+                # Verificar si la key está disponible
+                if current_key not in self.failed_keys:
+                    # Incrementar contador de uso
+                    self._record_request(current_key)
+                    return current_key
+                
+                # Key fallida, probar la siguiente
+                self.current_key_index = (self.current_key_index + 1) % len(self.keys)
+                attempts += 1
         
         # Todas las keys han fallado recientemente
         logger.warning("⚠️ Todas las API keys de Groq están temporalmente bloqueadas")
         logger.info(f"⏱️ Las keys se resetearán en {self.reset_timeout}s")
         return None
     
-    def mark_key_as_failed(self, key: str, error_message: str = ""):
+    def get_next_key(self) -> Optional[str]:
+        """
+        Obtiene una key válida y avanza el índice (round-robin).
+        
+        Llamadas consecutivas devuelven keys distintas, de modo que las
+        peticiones concurrentes se reparten entre todas las keys disponibles.
+        
+        Returns:
+            API key válida o None si no hay keys disponibles
+        """
+        if not self.keys:
+            return None
+        
+        with self._lock:
+            self._cleanup_failed_keys()
+            
+            # Cursor compartido: los distintos procesos también se reparten las keys
+            cursor = self.shared.next_cursor()
+            if cursor is not None:
+                self.current_key_index = cursor % len(self.keys)
+            
+            for _ in range(len(self.keys)):
+                key = self.keys[self.current_key_index]
+                self.current_key_index = (self.current_key_index + 1) % len(self.keys)
+                
+                if key not in self.failed_keys:
+                    self._record_request(key)
+                    return key
+        
+        logger.warning("⚠️ Todas las API keys de Groq están temporalmente bloqueadas")
+        return None
+    
+    def acquire_key(self, estimated_tokens: int = 0, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Reserva capacidad en la key con más margen disponible.
+        
+        Consume 1 request y estimated_tokens de los buckets de la key elegida.
+        Si todas las keys están saturadas, espera exactamente hasta que alguna
+        tenga saldo (en lugar de fallar), como máximo `timeout` segundos.
+        
+        Args:
+            estimated_tokens: Tokens estimados de la petición (prompt + max_tokens)
+            timeout: Espera máxima en segundos (None = sin límite)
+        
+        Returns:
+            API key reservada o None si no hay keys o se agotó el timeout
+        """
+        if not self.keys:
+            return None
+        
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        while True:
+            with self._lock:
+                self._cleanup_failed_keys()
+                now = time.monotonic()
+                
+                best_key = None
+                best_headroom = None
+                min_wait = None
+                
+                for key in self.keys:
+                    if key in self.failed_keys:
+                        wait = self.failed_keys[key] - time.time()
+                    else:
+                        req_bucket = self.request_buckets[key]
+                        tok_bucket = self.token_buckets[key]
+                        wait = max(
+                            req_bucket.wait_time(1, now),
+                            tok_bucket.wait_time(estimated_tokens, now)
+                        )
+                        
+                        if wait <= 0:
+                            # Margen restante (fracción) tras consumir esta petición
+                            headroom = min(
+                                (req_bucket.available(now) - 1) / req_bucket.capacity,
+                                (tok_bucket.available(now) - estimated_tokens) / tok_bucket.capacity
+                            )
+                            if best_headroom is None or headroom > best_headroom:
+                                best_key = key
+                                best_headroom = headroom
+                    
+                    if min_wait is None or wait < min_wait:
+                        min_wait = wait
+                
+                if best_key is not None:
+                    # Cupo compartido con los demás procesos (ventana por minuto)
+                    window_wait = self.shared.reserve(
+                        best_key, estimated_tokens,
+                        self.shared_requests_per_minute, self.shared_tokens_per_minute
+                    )
+                    if window_wait > 0:
+                        # Otros procesos agotaron la ventana: no usar la key hasta la siguiente
+                        self.request_buckets[best_key].block_for(window_wait, now)
+                        continue
+                    
+                    self.request_buckets[best_key].consume(1, now)
+                    self.token_buckets[best_key].consume(estimated_tokens, now)
+                    self._record_request(best_key)
+                    return best_key
+            
+            # Todas las keys saturadas: esperar lo justo
+            sleep_for = max(min_wait or 0.0, 0.05)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning("⚠️ Todas las API keys de Groq están saturadas (timeout de espera agotado)")
+                    return None
+                sleep_for = min(sleep_for, remaining)
+            
+            logger.info(f"⏳ Keys de Groq saturadas, esperando {sleep_for:.2f}s")
+            time.sleep(sleep_for)
+    
+    def record_usage(self, key: str, estimated_tokens: int, actual_tokens: Optional[int]):
+        """
+        Corrige el bucket de tokens con el consumo real informado por la API.
+        
+        Devuelve al bucket la diferencia si se reservó de más (o la descuenta si faltó).
+        """
+        if key not in self.token_buckets or actual_tokens is None:
+            return
+        
+        with self._lock:
+            now = time.monotonic()
+            difference = estimated_tokens - actual_tokens
+            if difference > 0:
+                self.token_buckets[key].refund(difference, now)
+            elif difference < 0:
+                self.token_buckets[key].consume(-difference, now)
+        self.shared.adjust_tokens(key, -difference)
+    
+    def update_from_headers(self, key: str, headers) -> Optional[float]:
+        """
+        Sincroniza los buckets con las cabeceras de rate limit de la respuesta.
+        
+        Usa x-ratelimit-remaining-requests / x-ratelimit-remaining-tokens y
+        Retry-After / x-ratelimit-reset-* cuando la key está agotada.
+        
+        Returns:
+            Segundos de Retry-After si la respuesta lo indicó, si no None
+        """
+        if key not in self.request_buckets or not headers:
+            return None
+        
+        def _header(name):
+            try:
+                return headers.get(name)
+            except Exception:
+                return None
+        
+        retry_after = _parse_reset_seconds(_header('retry-after'))
+        
+        with self._lock:
+            now = time.monotonic()
+            for bucket, kind in ((self.request_buckets[key], 'requests'), (self.token_buckets[key], 'tokens')):
+                remaining = _header(f'x-ratelimit-remaining-{kind}')
+                if remaining is None:
+                    continue
+                try:
+                    remaining = float(remaining)
+                except ValueError:
+                    continue
+                
+                bucket.sync(remaining, now)
+                if remaining <= 0:
+                    reset = _parse_reset_seconds(_header(f'x-ratelimit-reset-{kind}'))
+                    if reset:
+                        bucket.block_for(reset, now)
+            
+            if retry_after:
+                self.request_buckets[key].block_for(retry_after, now)
+        
+        return retry_after
+    
+    def mark_key_as_failed(self, key: str, error_message: str = "", retry_after: Optional[float] = None):
         """
         Marca una key como fallida temporalmente.
         
-        La key será evitada durante reset_timeout segundos.
+        La key será evitada durante reset_timeout segundos, o durante
+        retry_after segundos si el servidor lo indicó.
         
         Args:
             key: API key que falló
             error_message: Mensaje de error (opcional)
+            retry_after: Segundos indicados por Retry-After (opcional)
         """
         if key in self.keys:
-            self.failed_keys[key] = time.time()
-            self.key_stats[key]['failures'] += 1
-            
-            key_index = self.keys.index(key) + 1
-            logger.warning(f"❌ API Key #{key_index} falló: {error_message}")
-            logger.info(f"🔄 Rotando a siguiente key...")
-            
-            # Rotar a la siguiente key
-            self._rotate_to_next_key()
+            with self._lock:
+                blocked_for = retry_after or self.reset_timeout
+                until = time.time() + blocked_for
+                self.failed_keys[key] = until
+                self.key_stats[key]['failures'] += 1
+                if retry_after:
+                    self.request_buckets[key].block_for(retry_after, time.monotonic())
+                
+                # Los demás procesos dejan de usar la key hasta el mismo momento
+                self.shared.set_cooldown(key, until)
+                self.shared.incr(key, 'failures')
+                
+                key_index = self.keys.index(key) + 1
+                logger.warning(f"❌ API Key #{key_index} falló: {error_message} (bloqueada {blocked_for:.0f}s)")
+                logger.info(f"🔄 Rotando a siguiente key...")
+                
+                # Rotar a la siguiente key
+                self._rotate_to_next_key()
+    
+    def _record_request(self, key: str):
+        """Cuenta una petición en las estadísticas locales y compartidas."""
+        self.key_stats[key]['requests'] += 1
+        self.shared.incr(key, 'requests')
+    
+    def get_client(self, api_key: str = None):
+        """
+        Obtiene un cliente de Groq para la API key indicada (o la actual).
+        
+        Los clientes se reutilizan por key para aprovechar las conexiones HTTP abiertas.
+        """
+        from groq import Groq
+        
+        if api_key is None:
+            api_key = self.get_current_key()
+        if not api_key:
+            raise ValueError("No hay API keys de Groq disponibles")
+        
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is None:
+                client = Groq(api_key=api_key)
+                self._clients[api_key] = client
+        
+        return client
     
     def _rotate_to_next_key(self):
         """Rota al siguiente índice de key disponible."""
@@ -140,15 +642,21 @@ class GroqKeyManager:
     
     def _cleanup_failed_keys(self):
         """
-        Limpia keys fallidas que han superado el timeout de reset.
+        Limpia keys fallidas cuyo bloqueo ya expiró e incorpora los
+        bloqueos registrados por otros procesos.
         
-        Permite reintentar keys después de reset_timeout segundos.
+        Permite reintentar keys después de reset_timeout segundos (o Retry-After).
         """
         current_time = time.time()
+        
+        for key, until in self.shared.get_cooldowns().items():
+            if until > current_time and until > self.failed_keys.get(key, 0):
+                self.failed_keys[key] = until
+        
         keys_to_remove = []
         
-        for key, failed_time in self.failed_keys.items():
-            if current_time - failed_time > self.reset_timeout:
+        for key, until in self.failed_keys.items():
+            if current_time >= until:
                 keys_to_remove.append(key)
         
         for key in keys_to_remove:
@@ -169,6 +677,13 @@ class GroqKeyManager:
                 'key_details': [...]
             }
         """
+        with self._lock:
+            self._cleanup_failed_keys()
+        
+        # Contadores compartidos entre procesos (si no, los locales)
+        shared_requests = self.shared.get_counters('requests')
+        shared_failures = self.shared.get_counters('failures')
+        
         stats = {
             'total_keys': len(self.keys),
             'active_keys': len(self.keys) - len(self.failed_keys),
@@ -186,8 +701,8 @@ class GroqKeyManager:
                 'key_preview': key_masked,
                 'is_current': is_current,
                 'is_failed': is_failed,
-                'requests': self.key_stats[key]['requests'],
-                'failures': self.key_stats[key]['failures']
+                'requests': shared_requests.get(key, self.key_stats[key]['requests']),
+                'failures': shared_failures.get(key, self.key_stats[key]['failures'])
             })
         
         return stats
@@ -219,6 +734,7 @@ class GroqKeyManager:
 
 # Instancia global del gestor
 _groq_key_manager = None
+_groq_key_manager_lock = threading.Lock()
 
 
 def get_groq_key_manager() -> GroqKeyManager:
@@ -231,7 +747,9 @@ def get_groq_key_manager() -> GroqKeyManager:
     global _groq_key_manager
     
     if _groq_key_manager is None:
-        _groq_key_manager = GroqKeyManager()
+        with _groq_key_manager_lock:
+            if _groq_key_manager is None:
+                _groq_key_manager = GroqKeyManager()
     
     return _groq_key_manager
 
@@ -0,0 +1,333 @@
+"""
+Servicio de conclusión grupal
+Ubicación: apps/ai_processor/services/group_conclusion_service.py
+
+Genera la conclusión grupal de una presentación (Groq con fallback básico)
+y la persiste en la Presentation, regenerándola solo cuando cambian las
+calificaciones de los participantes.
+"""
+import hashlib
+import json
+import logging
+
+import numpy as np
+from django.conf import settings
+
+from .llm_cache_service import LLMCacheService
+
+logger = logging.getLogger(__name__)
+
+GROUP_CONCLUSION_MODEL = "llama-3.3-70b-versatile"
+GROUP_CONCLUSION_TEMPERATURE = 0.6
+
+
+class GroupConclusionService:
+    """
+    Conclusión grupal de una presentación a partir de los resultados individuales
+    """
+    
+    @staticmethod
+    def build_results(participants):
+        """
+        Convierte los Participant guardados al formato usado por generate().
+        
+        Args:
+            participants: Iterable de Participant
+        """
+        return [
+            {
+                'etiqueta': p.label,
+                'nota_coherencia': p.coherence_score or 0,
+                'calificacion_final': p.ai_grade or 0,
+                'porcentaje_tiempo': p.time_percentage or 0,
+                'tiempo_participacion': p.participation_time or 0
+            }
+            for p in participants
+        ]
+    
+    @staticmethod
+    def compute_signature(resultados_participantes, tema, descripcion_tema, max_score):
+        """Hash de los datos que determinan la conclusión (cambia si cambian las notas)."""
+        payload = json.dumps(
+            {
+                'participants': resultados_participantes,
+                'tema': tema,
+                'descripcion': descripcion_tema,
+                'max_score': max_score,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def get_or_generate(presentation, participants=None, save=True):
+        """
+        Devuelve la conclusión persistida de la presentación o la regenera.
+        
+        Solo llama a la IA si no hay conclusión guardada o si las calificaciones
+        de los participantes cambiaron desde que se generó.
+        
+        Args:
+            presentation: Presentation a evaluar
+            participants: Participantes ya cargados (default: presentation.participants)
+            save: Guardar la conclusión regenerada en la BD
+        
+        Returns:
+            str: Conclusión grupal
+        """
+        if participants is None:
+            participants = presentation.participants.all()
+        
+        # Orden de aparición (Persona 1, Persona 2...) para que la firma sea estable
+        participants = sorted(
+            participants,
+            key=lambda p: int(p.label.split()[-1]) if p.label.split()[-1].isdigit() else 0
+        )
+        
+        resultados_participantes = GroupConclusionService.build_results(participants)
+        assignment = presentation.assignment
+        tema = assignment.title if assignment else "Presentación"
+        descripcion_tema = assignment.description if assignment else ""
+        max_score = float(assignment.max_score) if assignment else 20.0
+        
+        signature = GroupConclusionService.compute_signature(
+            resultados_participantes, tema, descripcion_tema, max_score
+        )
+        if presentation.group_conclusion and presentation.group_conclusion_signature == signature:
+            return presentation.group_conclusion
+        
+        conclusion = GroupConclusionService.generate(
+            resultados_participantes, tema, descripcion_tema, max_score=max_score
+        )
+        
+        presentation.group_conclusion = conclusion
+        presentation.group_conclusion_signature = signature
+        if save and presentation.pk:
+            # update() evita disparar las señales post_save de la presentación
+            type(presentation).objects.filter(pk=presentation.pk).update(
+                group_conclusion=conclusion,
+                group_conclusion_signature=signature
+            )
+        
+        return conclusion
+    
+    @staticmethod
+    def generate(resultados_participantes, tema, descripcion_tema, max_score=20.0):
+        """
+        Genera una conclusión grupal personalizada usando IA de GROQ
+        
+        Args:
+            resultados_participantes: Lista de resultados de análisis individual
+            tema: Título del tema
+            descripcion_tema: Descripción detallada del tema
+            max_score: Puntaje máximo de la asignación (default: 20.0)
+            
+        Returns:
+            str: Conclusión grupal generada por IA o mensaje predeterminado
+        """
+        if not resultados_participantes:
+            return "No se encontraron participantes para analizar."
+        
+        groq_api_key = None
+        try:
+            # Intentar usar GROQ para generar conclusión dinámica
+            from .groq_key_manager import get_groq_key_manager, estimate_tokens
+            
+            key_manager = get_groq_key_manager()
+            
+            if not key_manager.keys:
+                logger.warning("No hay API key de GROQ disponible, usando conclusión básica")
+                return GroupConclusionService.generate_basic(resultados_participantes)
+            
+            # Preparar datos del grupo para el prompt
+            num_participantes = len(resultados_participantes)
+            coherencia_promedio = np.mean([r['nota_coherencia'] for r in resultados_participantes])
+            calificacion_promedio = np.mean([r['calificacion_final'] for r in resultados_participantes])
+            
+            # Información de cada participante
+            info_participantes = []
+            for idx, r in enumerate(resultados_participantes, 1):
+                info_participantes.append(
+                    f"{idx}. {r['etiqueta']}: {r['calificacion_final']:.1f}/{max_score} pts "
+                    f"(Coherencia: {r['nota_coherencia']:.1f}%, Tiempo: {r['porcentaje_tiempo']:.1f}%)"
+                )
+            
+            participantes_texto = "\n".join(info_participantes)
+            
+            # Identificar puntos fuertes y débiles
+            mejor_participante = max(resultados_participantes, key=lambda x: x['calificacion_final'])
+            peor_participante = min(resultados_participantes, key=lambda x: x['calificacion_final'])
+            participante_mas_tiempo = max(resultados_participantes, key=lambda x: x['porcentaje_tiempo'])
+            
+            # Calcular desviación estándar de coherencia para ver dispersión
+            coherencias = [r['nota_coherencia'] for r in resultados_participantes]
+            desviacion_coherencia = np.std(coherencias)
+            
+            # Determinar si la coherencia es baja, media o alta
+            if coherencia_promedio < 50:
+                nivel_comprension = "BAJA - El grupo NO logró demostrar comprensión adecuada del tema"
+            elif coherencia_promedio < 70:
+                nivel_comprension = "MEDIA - El grupo demostró comprensión parcial del tema"
+            else:
+                nivel_comprension = "ALTA - El grupo demostró buena comprensión del tema"
+            
+            # Analizar equilibrio de participación
+            tiempos = [r['porcentaje_tiempo'] for r in resultados_participantes]
+            desviacion_tiempo = np.std(tiempos)
+            if desviacion_tiempo > 20:
+                equilibrio_participacion = "DESIGUAL - Hay gran diferencia en el tiempo de participación"
+            elif desviacion_tiempo > 10:
+                equilibrio_participacion = "MODERADO - La participación está medianamente equilibrada"
+            else:
+                equilibrio_participacion = "EQUILIBRADO - Todos participaron de forma similar"
+            
+            # Construir prompt para GROQ con análisis crítico
+            prompt = f"""Eres un evaluador académico OBJETIVO y CRÍTICO que analiza presentaciones grupales. Debes generar una conclusión REALISTA basada en las métricas.
+
+**Tema asignado:** {tema}
+
+**Descripción completa:** {descripcion_tema[:300]}
+
+**Resultados de cada participante ({num_participantes}):**
+{participantes_texto}
+
+**ANÁLISIS CRÍTICO:**
+- Coherencia promedio: {coherencia_promedio:.1f}% → {nivel_comprension}
+- Calificación promedio: {calificacion_promedio:.1f}/{max_score}
+- Dispersión en coherencia: {desviacion_coherencia:.1f}% ({"Alta variabilidad" if desviacion_coherencia > 15 else "Moderada" if desviacion_coherencia > 8 else "Baja variabilidad"})
+- Distribución de tiempo: {equilibrio_participacion}
+- Mejor participante: {mejor_participante['etiqueta']} ({mejor_participante['nota_coherencia']:.1f}% coherencia)
+- Participante más débil: {peor_participante['etiqueta']} ({peor_participante['nota_coherencia']:.1f}% coherencia)
+
+**INSTRUCCIONES IMPORTANTES:**
+1. Si la coherencia promedio es MENOR a 50%, di claramente que el grupo NO cumplió adecuadamente con el tema
+2. Si la coherencia promedio es 50-69%, di que cumplieron PARCIALMENTE pero necesitan mejorar
+3. Si la coherencia promedio es 70% o más, di que cumplieron bien
+4. Sé ESPECÍFICO sobre qué aspectos fallaron o destacaron
+5. Si hay gran variabilidad (desviación >15%), menciona que algunos participantes estuvieron mejor que otros
+6. Si la participación es muy desigual (desviación tiempo >20%), señálalo como área crítica de mejora
+7. NO uses frases genéricas como "comprensión básica" cuando los datos muestran bajo rendimiento
+8. Máximo 3-4 oraciones, directas y constructivas
+
+Genera SOLO la conclusión grupal, sin títulos ni formato adicional:"""
+
+            messages = [
+                {
+                    "role": "system",
+                    "content": """Eres un evaluador académico EXPERTO y OBJETIVO. Tu trabajo es dar retroalimentación REALISTA basada en métricas concretas.
+
+REGLAS IMPORTANTES:
+- Si los datos muestran bajo rendimiento, sé HONESTO al señalarlo
+- NO uses eufemismos vagos como "comprensión básica" cuando la coherencia es menor a 50%
+- Sé ESPECÍFICO: menciona qué falló y qué se puede mejorar
+- Mantén un tono profesional pero directo
+- La retroalimentación debe ser CONSTRUCTIVA pero REALISTA
+- NO infles los logros si las métricas no los respaldan"""
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+            
+            # Misma petición ya respondida: reutilizar sin consumir cuota
+            cache_key = LLMCacheService.build_key(GROUP_CONCLUSION_MODEL, GROUP_CONCLUSION_TEMPERATURE, messages)
+            cached_conclusion = LLMCacheService.get(cache_key)
+            if cached_conclusion:
+                return cached_conclusion
+            
+            # Reservar capacidad en la key con más margen (rate limiter compartido)
+            # (prompt + ~200 tokens de mensaje de sistema + 300 de respuesta)
+            groq_api_key = key_manager.acquire_key(
+                estimate_tokens(prompt) + 500,
+                timeout=settings.COHERENCE_CONFIG.get('rate_limit_wait', 60)
+            )
+            if not groq_api_key:
+                logger.warning("Keys de GROQ saturadas, usando conclusión básica")
+                return GroupConclusionService.generate_basic(resultados_participantes)
+            
+            client = key_manager.get_client(groq_api_key)
+            
+            response = client.chat.completions.create(
+                model=GROUP_CONCLUSION_MODEL,
+                messages=messages,
+                temperature=GROUP_CONCLUSION_TEMPERATURE,  # Reducido para respuestas más consistentes y objetivas
+                max_tokens=300,   # Aumentado para conclusiones más detalladas
+                top_p=0.9,
+                stream=False
+            )
+            
+            conclusion = response.choices[0].message.content.strip()
+            
+            # Verificar que la conclusión no esté vacía
+            if conclusion and len(conclusion) > 20:
+                logger.info(f"✅ Conclusión grupal generada con GROQ ({len(conclusion)} caracteres)")
+                usage = getattr(response, 'usage', None)
+                LLMCacheService.set(
+                    cache_key, GROUP_CONCLUSION_MODEL, conclusion,
+                    total_tokens=getattr(usage, 'total_tokens', None)
+                )
+                return conclusion
+            else:
+                logger.warning("Conclusión de GROQ muy corta, usando básica")
+                return GroupConclusionService.generate_basic(resultados_participantes)
+                
+        except Exception as e:
+            logger.error(f"Error al generar conclusión con GROQ: {str(e)}")
+            if groq_api_key and ('rate_limit' in str(e).lower() or '429' in str(e)):
+                key_manager.mark_key_as_failed(groq_api_key, f"Rate limit: {e}")
+            return GroupConclusionService.generate_basic(resultados_participantes)
+    
+    @staticmethod
+    def generate_basic(resultados_participantes):
+        """
+        Genera una conclusión básica cuando GROQ no está disponible
+        """
+        if not resultados_participantes:
+            return "No hay participantes para evaluar."
+        
+        coherencia_promedio = np.mean([r['nota_coherencia'] for r in resultados_participantes])
+        calificacion_promedio = np.mean([r['calificacion_final'] for r in resultados_participantes])
+        num_participantes = len(resultados_participantes)
+        
+        # Análisis de dispersión
+        coherencias = [r['nota_coherencia'] for r in resultados_participantes]
+        desviacion_coherencia = np.std(coherencias)
+        
+        # Análisis de equilibrio de tiempo
+        tiempos = [r['porcentaje_tiempo'] for r in resultados_participantes]
+        desviacion_tiempo = np.std(tiempos)
+        
+        # Generar conclusión basada en métricas reales
+        if coherencia_promedio >= 80:
+            conclusion = f"El grupo ({num_participantes} participantes) demostró excelente dominio del tema con {coherencia_promedio:.1f}% de coherencia promedio. "
+            if desviacion_coherencia < 10:
+                conclusion += "Todos los integrantes mantuvieron un nivel consistentemente alto. "
+            else:
+                conclusion += "Aunque algunos participantes destacaron más que otros, el nivel general fue sobresaliente. "
+            conclusion += "Se recomienda mantener este nivel de preparación y profundización temática."
+            
+        elif coherencia_promedio >= 70:
+            conclusion = f"El grupo logró cumplir adecuadamente con el tema asignado, alcanzando {coherencia_promedio:.1f}% de coherencia promedio. "
+            if desviacion_coherencia > 15:
+                conclusion += "Sin embargo, se observa variabilidad significativa entre participantes, lo que sugiere preparación desigual. "
+            conclusion += "Se sugiere profundizar más en los conceptos clave y asegurar que todos los integrantes dominen el tema de forma equilibrada."
+            
+        elif coherencia_promedio >= 50:
+            conclusion = f"El grupo cumplió parcialmente con el tema, obteniendo {coherencia_promedio:.1f}% de coherencia promedio. "
+            if calificacion_promedio < 12:
+                conclusion += "Las calificaciones individuales reflejan que varios participantes no lograron desarrollar el tema con suficiente profundidad. "
+            if desviacion_tiempo > 20:
+                conclusion += "Además, la participación fue muy desigual, lo cual afectó el desempeño grupal. "
+            conclusion += "Se recomienda mejorar la preparación temática, estructurar mejor el contenido y equilibrar la participación de todos los miembros."
+            
+        else:
+            conclusion = f"El grupo NO logró cumplir adecuadamente con el tema asignado, alcanzando solo {coherencia_promedio:.1f}% de coherencia promedio. "
+            conclusion += "Los análisis individuales muestran falta de comprensión de los conceptos fundamentales y desarrollo insuficiente del contenido. "
+            if desviacion_coherencia > 15:
+                conclusion += "La gran variabilidad entre participantes indica preparación muy desigual. "
+            conclusion += "Es crítico revisar los conceptos básicos del tema, mejorar la preparación grupal y asegurar que todos los integrantes comprendan y puedan explicar los puntos clave antes de la presentación."
+        
+        return conclusion
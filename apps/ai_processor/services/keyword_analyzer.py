@@ -0,0 +1,163 @@
+"""
+Analizadores precompilados de palabras clave y profundidad
+Ubicación: apps/ai_processor/services/keyword_analyzer.py
+
+El conjunto de palabras clave de una asignación (normalizado, sin tildes y
+con raíces en español) se construye una sola vez y se reutiliza para todos
+los participantes y re-análisis. Los indicadores de profundidad se buscan en
+una sola pasada con una expresión regular compilada y límites de palabra, de
+modo que "así" ya no coincide dentro de "clasificación".
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+# Palabras comunes sin valor (stop words), ya sin tildes
+STOPWORDS = frozenset({
+    'el', 'la', 'los', 'las', 'un', 'una', 'unos', 'unas',
+    'de', 'en', 'y', 'o', 'pero', 'por', 'para', 'con',
+    'a', 'al', 'del', 'es', 'son', 'esta', 'estan',
+    'que', 'cual', 'como', 'se', 'su', 'sus', 'mi', 'tu',
+    'te', 'me', 'le', 'les', 'nos', 'lo', 'este',
+})
+
+# Palabras indicadoras de profundidad y análisis
+DEPTH_INDICATORS = (
+    'porque', 'debido', 'causa', 'consecuencia', 'resultado',
+    'ejemplo', 'como', 'además', 'también', 'sin embargo',
+    'por lo tanto', 'en conclusión', 'finalmente', 'así',
+    'entonces', 'específicamente', 'particularmente',
+    'significa', 'implica', 'demuestra', 'evidencia',
+    'importante', 'fundamental', 'esencial', 'clave',
+    'primero', 'segundo', 'tercero',
+)
+
+# Sufijos flexivos y derivativos frecuentes, del más largo al más corto
+SUFFIXES = (
+    'abilidades', 'ibilidades', 'abilidad', 'ibilidad',
+    'amientos', 'imientos', 'aciones', 'uciones', 'idades', 'amiento', 'imiento',
+    'adoras', 'adores', 'ancias', 'encias', 'mente', 'acion', 'ucion', 'idad',
+    'adora', 'ador', 'ancia', 'encia', 'istas', 'ista', 'ismos', 'ismo',
+    'ables', 'ibles', 'able', 'ible', 'ivas', 'ivos', 'iva', 'ivo',
+    'osas', 'osos', 'osa', 'oso', 'es', 's',
+)
+MIN_STEM_LENGTH = 4
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def fold_text(text):
+    """Minúsculas y sin tildes"""
+    normalized = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in normalized if not unicodedata.combining(c))
+
+
+def stem(word):
+    """Raíz aproximada de una palabra española ya normalizada"""
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            word = word[:-len(suffix)]
+            break
+    # Vocal final (género/número): "empresa" y "empresas" comparten raíz
+    if len(word) > MIN_STEM_LENGTH and word[-1] in 'aeo':
+        word = word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Palabras normalizadas del texto"""
+    return _WORD_RE.findall(fold_text(text))
+
+
+class KeywordAnalyzer:
+    """
+    Palabras clave de una asignación con sus raíces.
+
+    Usar get_keyword_analyzer() para reutilizar la instancia de cada asignación.
+    """
+
+    MIN_KEYWORD_LENGTH = 4
+
+    def __init__(self, tema, descripcion=''):
+        # raíz -> primera forma que aparece en la asignación (para mostrar)
+        self.keywords = {}
+        for word in tokenize(f"{tema} {descripcion}"):
+            if len(word) < self.MIN_KEYWORD_LENGTH or word in STOPWORDS:
+                continue
+            self.keywords.setdefault(stem(word), word)
+
+    def analyze(self, texto):
+        """
+        Detecta palabras clave del tema en el texto del estudiante.
+
+        Returns:
+            dict con palabras, puntaje, total_encontradas y total_tema
+        """
+        raices_texto = {stem(word) for word in tokenize(texto)}
+        encontradas = [palabra for raiz, palabra in self.keywords.items() if raiz in raices_texto]
+
+        if self.keywords:
+            porcentaje = (len(encontradas) / len(self.keywords)) * 100
+            # Puntaje: 100 si encuentra al menos 40% de palabras clave
+            puntaje = min(porcentaje * 2.5, 100)
+        else:
+            puntaje = 50  # Puntaje neutral si no hay palabras clave
+
+        return {
+            'palabras': encontradas[:10],  # Limitar a 10 para display
+            'puntaje': puntaje,
+            'total_encontradas': len(encontradas),
+            'total_tema': len(self.keywords),
+        }
+
+
+class DepthAnalyzer:
+    """Puntaje de profundidad por longitud, conectores y tamaño de oraciones"""
+
+    def __init__(self, indicadores=DEPTH_INDICATORS):
+        normalizados = sorted({fold_text(i) for i in indicadores}, key=len, reverse=True)
+        # Frases de varias palabras admiten cualquier espacio entre ellas
+        alternativas = '|'.join(r'\s+'.join(map(re.escape, i.split())) for i in normalizados)
+        self.pattern = re.compile(rf'\b(?:{alternativas})\b')
+
+    def indicators_found(self, texto):
+        """Indicadores distintos presentes en el texto (una sola pasada)"""
+        return {' '.join(m.group(0).split()) for m in self.pattern.finditer(fold_text(texto))}
+
+    def analyze(self, texto):
+        """Evalúa la profundidad del contenido basado en longitud y estructura"""
+        num_palabras = len(texto.split())
+        indicadores_encontrados = len(self.indicators_found(texto))
+
+        # Puntaje basado en palabras (30-50% del total)
+        if num_palabras < 20:
+            puntaje_base = 10
+        elif num_palabras < 40:
+            puntaje_base = 30
+        elif num_palabras < 80:
+            puntaje_base = 50
+        elif num_palabras < 150:
+            puntaje_base = 70
+        else:
+            puntaje_base = 85
+
+        # Bonus por uso de conectores y palabras de análisis
+        bonus_conectores = min(indicadores_encontrados * 3, 15)
+
+        # Bonus por longitud de oraciones (señal de elaboración)
+        oraciones = texto.count('.') + texto.count('?') + texto.count('!')
+        bonus_oraciones = 0
+        if oraciones > 0 and 10 <= num_palabras / oraciones <= 25:  # Rango ideal
+            bonus_oraciones = 5
+
+        return min(puntaje_base + bonus_conectores + bonus_oraciones, 100)
+
+
+@lru_cache(maxsize=256)
+def get_keyword_analyzer(tema, descripcion=''):
+    """KeywordAnalyzer de una asignación (construido una vez por contenido)"""
+    return KeywordAnalyzer(tema or '', descripcion or '')
+
+
+# Los indicadores no dependen de la asignación: una sola instancia compilada
+depth_analyzer = DepthAnalyzer()
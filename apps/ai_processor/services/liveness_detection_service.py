@@ -38,12 +38,13 @@ class LivenessDetectionService:
         """
         self.max_frames_to_analyze = 300  # Analizar primeros 10 segundos (a 30fps)
         
-    def analyze_video(self, video_path):
+    def analyze_video(self, video_path, probe=None):
         """
         Analiza un video para determinar si es en vivo o pregrabado
         
         Args:
             video_path (str): Ruta al archivo de video
+            probe (dict): Presentation.video_probe (evita reabrir el archivo)
             
         Returns:
             dict: Resultados del análisis de liveness
@@ -52,7 +53,7 @@ class LivenessDetectionService:
         
         try:
             # 1. Análisis de metadatos del archivo
-            metadata_score = self._analyze_metadata(video_path)
+            metadata_score = self._analyze_metadata(video_path, probe)
             
             # 2. Análisis de características del video
             video_features = self._analyze_video_features(video_path)
@@ -110,12 +111,13 @@ class LivenessDetectionService:
                 'type_display': 'Desconocido'
             }
     
-    def _analyze_metadata(self, video_path):
+    def _analyze_metadata(self, video_path, probe=None):
         """
         Analiza metadatos del archivo para detectar indicios de grabación en vivo
         
         Args:
             video_path (str): Ruta al archivo
+            probe (dict): Sondeo del video con fps y frame_count (opcional)
             
         Returns:
             float: Score de 0-100 (mayor = más probable en vivo)
@@ -139,13 +141,18 @@ class LivenessDetectionService:
             elif time_diff > 300:  # Más de 5 minutos
                 score -= 20
             
-            # Obtener propiedades del video con OpenCV
-            cap = cv2.VideoCapture(video_path)
+            # Propiedades del video: del sondeo guardado o, sin él, con OpenCV
+            if probe:
+                fps = probe['video']['fps']
+                frame_count = probe['video']['frame_count']
+            else:
+                cap = cv2.VideoCapture(video_path)
+                fps = cap.get(cv2.CAP_PROP_FPS) if cap.isOpened() else 0
+                frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+                cap.release()
             
-            if cap.isOpened():
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                duration = frame_count / fps if fps > 0 else 0
+            if fps > 0:
+                duration = frame_count / fps
                 
                 # Videos en vivo suelen tener FPS estándar (30, 60)
                 if fps in [30, 60, 25, 50]:
@@ -156,8 +163,6 @@ class LivenessDetectionService:
                     score -= 10
                 elif 60 <= duration <= 600:  # 1-10 minutos (rango normal)
                     score += 5
-                
-                cap.release()
             
         except Exception as e:
             logger.warning(f"⚠️ Error analizando metadatos: {str(e)}")
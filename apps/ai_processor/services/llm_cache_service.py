@@ -0,0 +1,124 @@
+"""
+Cache persistente de respuestas de Groq
+Ubicación: apps/ai_processor/services/llm_cache_service.py
+
+Evita repetir peticiones idénticas (mismo modelo, temperatura y prompts)
+guardando la respuesta en la base de datos con un TTL. Las entradas expiradas
+se borran al guardar nuevas (como mucho cada LLM_CACHE_PURGE_INTERVAL) o con
+el comando purge_llm_cache.
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 60 * 60 * 24 * 7  # 7 días
+DEFAULT_PURGE_INTERVAL = 60 * 60 * 6  # 6 horas
+PURGE_CACHE_KEY = 'llm_cache:last_purge'
+
+
+class LLMCacheService:
+    """
+    Lectura/escritura de respuestas de IA en la tabla LLMResponseCache.
+
+    Los errores de base de datos nunca interrumpen el análisis: se registran
+    y se continúa como si no hubiera cache.
+    """
+
+    @staticmethod
+    def build_key(model, temperature, messages):
+        """
+        Genera la clave de cache a partir de modelo, temperatura y mensajes
+        (prompt de sistema + prompt de usuario).
+        """
+        payload = json.dumps(
+            {'model': model, 'temperature': temperature, 'messages': messages},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get(cache_key):
+        """
+        Obtiene la respuesta guardada si existe y no ha expirado.
+
+        Returns:
+            str con la respuesta o None
+        """
+        from apps.ai_processor.models import LLMResponseCache
+
+        try:
+            entries = LLMResponseCache.objects.filter(cache_key=cache_key, expires_at__gt=timezone.now())
+            response = entries.values_list('response', flat=True).first()
+            if response is not None:
+                entries.update(hits=F('hits') + 1)
+                logger.info(f"♻️ Respuesta de IA obtenida de cache ({cache_key[:12]})")
+            return response
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo leer la cache de IA: {e}")
+            return None
+
+    @staticmethod
+    def set(cache_key, model, response, total_tokens=None, ttl=None):
+        """Guarda (o reemplaza) la respuesta con su fecha de expiración."""
+        from apps.ai_processor.models import LLMResponseCache
+
+        if ttl is None:
+            ttl = getattr(settings, 'LLM_CACHE_TTL', DEFAULT_TTL)
+
+        try:
+            LLMResponseCache.objects.update_or_create(
+                cache_key=cache_key,
+                defaults={
+                    'model': model,
+                    'response': response,
+                    'total_tokens': total_tokens,
+                    'expires_at': timezone.now() + timedelta(seconds=ttl),
+                }
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo guardar la respuesta en cache: {e}")
+            return
+
+        LLMCacheService.purge_if_due()
+
+    @staticmethod
+    def purge_expired():
+        """
+        Elimina las entradas expiradas.
+
+        Returns:
+            int: Cantidad de entradas eliminadas
+        """
+        from apps.ai_processor.models import LLMResponseCache
+
+        deleted, _ = LLMResponseCache.objects.filter(expires_at__lte=timezone.now()).delete()
+        if deleted:
+            logger.info(f"🧹 {deleted} respuestas de IA expiradas eliminadas de la cache")
+        return deleted
+
+    @staticmethod
+    def purge_if_due():
+        """
+        Ejecuta purge_expired() si pasó LLM_CACHE_PURGE_INTERVAL desde la
+        última vez en este proceso (0 lo desactiva; queda el comando purge_llm_cache)
+
+        Returns:
+            int con las entradas eliminadas o None si no tocaba
+        """
+        interval = getattr(settings, 'LLM_CACHE_PURGE_INTERVAL', DEFAULT_PURGE_INTERVAL)
+        if not interval or not cache.add(PURGE_CACHE_KEY, True, timeout=interval):
+            return None
+        try:
+            return LLMCacheService.purge_expired()
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo purgar la cache de IA: {e}")
+            return None
@@ -0,0 +1,263 @@
+"""
+Motor de evaluación local (sin conexión) por rúbrica
+Ubicación: apps/ai_processor/services/rubric_scoring_service.py
+
+Evalúa la coherencia sin llamar a Groq: divide la descripción e instrucciones
+de la asignación en ítems de rúbrica, codifica ítems y oraciones de la
+transcripción con el modelo MiniLM ya cargado y calcula una matriz de
+similitud. De ella salen la cobertura de cada ítem (máxima alineación con
+alguna oración), la relevancia del discurso y la fluidez entre oraciones,
+calibradas a la escala 0-100 del formato de la IA avanzada.
+"""
+import hashlib
+import logging
+import re
+import threading
+
+import numpy as np
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Mismos pesos que la evaluación con Groq (ver advanced_coherence_service)
+SCORE_WEIGHTS = {
+    'thematic_coherence': 0.40,
+    'depth_understanding': 0.30,
+    'content_relevance': 0.20,
+    'structure_clarity': 0.10,
+}
+
+# Rango de similitud coseno que se lleva a 0-100 según el nivel de estrictez
+CALIBRATION = {
+    'strict': (0.20, 0.65),
+    'moderate': (0.15, 0.60),
+    'lenient': (0.10, 0.55),
+}
+
+# Similitud entre oraciones consecutivas (fluidez del discurso)
+STRUCTURE_CALIBRATION = (0.10, 0.50)
+
+
+class RubricScoringEngine:
+    """
+    Evaluación de coherencia local basada en la rúbrica de la asignación.
+
+    Todas las oraciones de todos los participantes se codifican en una sola
+    llamada a encode; los embeddings de la rúbrica se cachean por asignación.
+    """
+
+    MIN_TEXT_LENGTH = 20
+    MIN_ITEM_WORDS = 3
+    MAX_RUBRIC_ITEMS = 12
+    MAX_SENTENCE_WORDS = 40
+    ENCODE_BATCH_SIZE = 64
+
+    # Similitud mínima para considerar cubierto un ítem de la rúbrica
+    COVERAGE_THRESHOLD = 0.45
+
+    RUBRIC_CACHE_TIMEOUT = 60 * 60 * 24  # 24 horas
+
+    def __init__(self, model, model_name=''):
+        self.model = model
+        self.model_name = model_name
+        self._lock = threading.Lock()  # Un encode a la vez por motor
+
+    def evaluate_participants(self, participants, assignment_title, assignment_description,
+                              assignment=None, strictness_level='moderate', on_partial_score=None):
+        """
+        Evalúa a todos los participantes en batch.
+
+        Args:
+            participants: Lista de tuplas (participant_name, transcribed_text)
+            strictness_level: 'strict', 'moderate' o 'lenient' (define la calibración)
+            on_partial_score: Callback (participant_name, score) por participante
+
+        Returns:
+            Lista en el mismo orden con dicts en el formato de AdvancedCoherenceService
+        """
+        rubric_items = self.extract_rubric_items(assignment_title, assignment_description)
+        topic_embedding, rubric_embeddings = self._get_rubric_embeddings(
+            assignment_title, assignment_description, rubric_items, assignment
+        )
+
+        sentences_by_participant = []
+        all_sentences = []
+        for _, text in participants:
+            sentences = []
+            if text and len(text.strip()) >= self.MIN_TEXT_LENGTH:
+                sentences = self._split_sentences(text)
+            sentences_by_participant.append((len(all_sentences), len(all_sentences) + len(sentences)))
+            all_sentences.extend(sentences)
+
+        sentence_embeddings = self._encode(all_sentences) if all_sentences else None
+        low, high = CALIBRATION.get(strictness_level, CALIBRATION['moderate'])
+
+        results = []
+        for (name, text), (start, end) in zip(participants, sentences_by_participant):
+            if start == end:
+                results.append(self._insufficient_text_response(name))
+            else:
+                results.append(self._score(
+                    name, sentence_embeddings[start:end], topic_embedding,
+                    rubric_items, rubric_embeddings, low, high
+                ))
+
+            if on_partial_score:
+                on_partial_score(name, results[-1]['coherence_score'])
+
+        return results
+
+    def extract_rubric_items(self, title, description):
+        """
+        Ítems de la rúbrica: líneas, viñetas y oraciones de la descripción e
+        instrucciones. Sin ítems suficientes, el propio tema es la rúbrica.
+        """
+        items = []
+        seen = set()
+        for line in re.split(r'\n+', description or ''):
+            line = re.sub(r'^\s*(?:[-*•·]|\d+[.)]|[a-zA-Z][.)])\s+', '', line).strip()
+            for sentence in re.split(r'(?<=[.!?;:])\s+', line):
+                sentence = sentence.strip(' .;:')
+                key = sentence.lower()
+                if len(sentence.split()) < self.MIN_ITEM_WORDS or key in seen:
+                    continue
+                seen.add(key)
+                items.append(sentence)
+
+        if not items:
+            items = [f"{title}. {description}".strip(' .') if description else title]
+
+        return items[:self.MAX_RUBRIC_ITEMS]
+
+    def _get_rubric_embeddings(self, title, description, rubric_items, assignment=None):
+        """
+        Embeddings normalizados del tema y de los ítems de la rúbrica.
+
+        Se cachean con un hash del contenido; Assignment.save() elimina la
+        entrada cuando la asignación cambia.
+        """
+        huella = hashlib.sha256(
+            '\x1f'.join([self.model_name, title or '', description or ''] + rubric_items).encode('utf-8')
+        ).hexdigest()
+        if assignment is not None and assignment.pk:
+            cache_key = assignment.rubric_embedding_cache_key
+        else:
+            cache_key = f'rubric_embedding_{huella}'
+
+        cached = cache.get(cache_key)
+        if cached and cached.get('hash') == huella:
+            return cached['topic'], cached['items']
+
+        embeddings = self._encode([f"{title}. {description}"] + rubric_items)
+        topic_embedding, rubric_embeddings = embeddings[0], embeddings[1:]
+        cache.set(
+            cache_key,
+            {'hash': huella, 'topic': topic_embedding, 'items': rubric_embeddings},
+            timeout=self.RUBRIC_CACHE_TIMEOUT
+        )
+        return topic_embedding, rubric_embeddings
+
+    def _score(self, name, sentence_embeddings, topic_embedding, rubric_items, rubric_embeddings, low, high):
+        """Puntajes de un participante a partir de la matriz ítems × oraciones"""
+        similarity = rubric_embeddings @ sentence_embeddings.T
+
+        # Cobertura: mejor alineación de cada ítem con alguna oración
+        coverage = similarity.max(axis=1)
+        covered = coverage >= self.COVERAGE_THRESHOLD
+
+        # Relevancia: cuánto del discurso se alinea con algún ítem o con el tema
+        sentence_alignment = np.maximum(similarity.max(axis=0), sentence_embeddings @ topic_embedding)
+
+        # Tema: similitud del discurso completo (centroide) con el tema
+        centroid = sentence_embeddings.mean(axis=0)
+        centroid /= np.linalg.norm(centroid) or 1.0
+
+        # Estructura: continuidad entre oraciones consecutivas
+        if len(sentence_embeddings) > 1:
+            flow = float(np.mean(np.sum(sentence_embeddings[:-1] * sentence_embeddings[1:], axis=1)))
+            structure = _calibrate(flow, *STRUCTURE_CALIBRATION)
+        else:
+            structure = 50.0
+
+        details = {
+            'thematic_coherence': round(_calibrate(float(centroid @ topic_embedding), low, high), 1),
+            'depth_understanding': round(float(np.mean([_calibrate(float(c), low, high) for c in coverage])), 1),
+            'content_relevance': round(float(np.mean([_calibrate(float(s), low, high) for s in sentence_alignment])), 1),
+            'structure_clarity': round(structure, 1),
+        }
+        coherence_score = sum(details[field] * weight for field, weight in SCORE_WEIGHTS.items())
+        coherence_score = round(max(0.0, min(100.0, coherence_score)), 1)
+
+        covered_items = [item for item, ok in zip(rubric_items, covered) if ok]
+        missing_items = [item for item, ok in zip(rubric_items, covered) if not ok]
+        details.update({
+            'engine': 'local',
+            'rubric_coverage': [
+                {'item': item, 'similarity': round(float(c), 3)}
+                for item, c in zip(rubric_items, coverage)
+            ],
+        })
+
+        return {
+            'coherence_score': coherence_score,
+            'feedback': self._build_feedback(name, coherence_score, covered_items, missing_items),
+            'details': details,
+            'strengths': [f"Aborda: {item}" for item in covered_items[:3]],
+            'improvements': [f"Desarrollar: {item}" for item in missing_items[:3]],
+            'key_concepts_covered': covered_items,
+            'missing_elements': missing_items,
+            'ai_powered': False,
+            'participant_name': name,
+        }
+
+    def _build_feedback(self, name, score, covered_items, missing_items):
+        """Retroalimentación breve a partir de la cobertura de la rúbrica"""
+        total = len(covered_items) + len(missing_items)
+        feedback = (
+            f"Evaluación local de {name}: {score:.1f}% de coherencia. "
+            f"Cubre {len(covered_items)} de {total} puntos de la asignación."
+        )
+        if missing_items:
+            feedback += f" Puntos con poca o ninguna mención: {'; '.join(missing_items[:3])}."
+        return feedback
+
+    def _insufficient_text_response(self, name):
+        """Resultado para participantes sin texto suficiente"""
+        return {
+            'coherence_score': 0.0,
+            'feedback': f"{name} no tiene suficiente texto transcrito para evaluar.",
+            'details': {field: 0.0 for field in SCORE_WEIGHTS} | {'engine': 'local'},
+            'strengths': [],
+            'improvements': ['Participar con mayor extensión en la exposición'],
+            'key_concepts_covered': [],
+            'missing_elements': [],
+            'ai_powered': False,
+            'participant_name': name,
+        }
+
+    def _split_sentences(self, text):
+        """Divide en oraciones y parte las que superan MAX_SENTENCE_WORDS palabras"""
+        sentences = []
+        for raw in re.split(r'(?<=[.!?¿¡;])\s+', text.strip()):
+            words = raw.split()
+            for start in range(0, len(words), self.MAX_SENTENCE_WORDS):
+                chunk = words[start:start + self.MAX_SENTENCE_WORDS]
+                if chunk:
+                    sentences.append(' '.join(chunk))
+        return sentences
+
+    def _encode(self, texts):
+        """Codifica en un único batch con embeddings normalizados"""
+        with self._lock:
+            embeddings = self.model.encode(
+                texts,
+                batch_size=self.ENCODE_BATCH_SIZE,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+        return np.asarray(embeddings, dtype=np.float32)
+
+
+def _calibrate(similarity, low, high):
+    """Lleva una similitud coseno del rango [low, high] a 0-100"""
+    return float(np.clip((similarity - low) / (high - low), 0.0, 1.0) * 100)
@@ -0,0 +1,239 @@
+"""
+Compactación de transcripciones antes de la evaluación con IA
+Ubicación: apps/ai_processor/services/transcript_compactor.py
+
+Si una transcripción supera el presupuesto de tokens, construye un resumen
+extractivo: conserva las oraciones más centrales (similitud de embeddings con
+el resto del discurso) y las que mencionan entidades o palabras clave de la
+asignación, respetando el orden original.
+"""
+import logging
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+from .groq_key_manager import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Palabras sin valor para detectar palabras clave de la asignación
+STOPWORDS = {
+    'el', 'la', 'los', 'las', 'un', 'una', 'unos', 'unas',
+    'de', 'en', 'y', 'o', 'pero', 'por', 'para', 'con',
+    'a', 'al', 'del', 'es', 'son', 'esta', 'estan',
+    'que', 'cual', 'como', 'se', 'su', 'sus', 'mi', 'tu',
+    'te', 'me', 'le', 'les', 'nos', 'lo', 'este', 'esta',
+    'sobre', 'debe', 'deben', 'cada', 'entre', 'tema', 'presentacion',
+    'exposicion', 'estudiante', 'estudiantes', 'video', 'minutos',
+}
+
+# Verbos de instrucción de las descripciones ("Explique...", "Incluya..."):
+# dicen qué hacer, no de qué trata la asignación
+INSTRUCTION_WORDS = {
+    'explique', 'expliquen', 'describa', 'describan', 'incluya', 'incluyan',
+    'considere', 'consideren', 'mencione', 'mencionen', 'analice', 'analicen',
+    'presente', 'presenten', 'desarrolle', 'desarrollen', 'indique', 'indiquen',
+    'utilice', 'utilicen', 'justifique', 'justifiquen', 'responda', 'respondan',
+    'compare', 'comparen', 'identifique', 'identifiquen', 'defina', 'definan',
+    'realice', 'realicen', 'elabore', 'elaboren', 'prepare', 'preparen',
+}
+
+
+def _fold(text):
+    """Minúsculas y sin tildes (para comparar palabras clave)."""
+    normalized = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in normalized if not unicodedata.combining(c))
+
+
+class TranscriptCompactor:
+    """
+    Reduce transcripciones largas a un presupuesto de tokens.
+
+    Usa el modelo de embeddings ya cargado por CoherenceAnalyzer (si se
+    asigna en `model`); sin modelo, la centralidad se aproxima por la
+    frecuencia de las palabras de cada oración en todo el texto.
+    """
+
+    # Oraciones más largas se parten (Whisper a veces no puntúa)
+    MAX_SENTENCE_WORDS = 40
+    SPLIT_SENTENCE_WORDS = 30
+    GAP_MARKER = '[...]'
+    GAP_MARKER_TOKENS = 3
+
+    # Oraciones casi idénticas a una ya elegida no aportan información
+    DUPLICATE_SIMILARITY = 0.92
+
+    def __init__(self, model=None, token_budget=900):
+        self.model = model
+        self.token_budget = token_budget
+        self._lock = threading.Lock()  # El modelo se comparte entre hilos
+
+    def compact(self, text, assignment_title='', assignment_description=''):
+        """
+        Compacta el texto si supera el presupuesto de tokens.
+
+        Returns:
+            Tupla (texto, stats) con stats:
+                - compacted: bool
+                - original_tokens / compacted_tokens: int
+                - sentences_total / sentences_kept / keyword_sentences: int
+        """
+        original_tokens = estimate_tokens(text)
+        stats = {
+            'compacted': False,
+            'original_tokens': original_tokens,
+            'compacted_tokens': original_tokens,
+        }
+
+        if original_tokens <= self.token_budget:
+            return text, stats
+
+        sentences = self._split_sentences(text)
+        if len(sentences) < 2:
+            return text, stats
+
+        sentence_tokens = [estimate_tokens(s) for s in sentences]
+        centrality, embeddings = self._centrality(sentences)
+
+        keywords = self._assignment_keywords(assignment_title, assignment_description)
+        has_keyword = [
+            bool(keywords & set(re.findall(r'\w+', _fold(s)))) for s in sentences
+        ]
+
+        # Primero las oraciones con palabras clave, luego el resto; ambas por centralidad
+        order = sorted(
+            range(len(sentences)),
+            key=lambda i: (not has_keyword[i], -centrality[i])
+        )
+
+        selected = []
+        seen_texts = set()
+        used_tokens = 0
+        for i in order:
+            # Cada oración puede ir precedida de un marcador [...]
+            cost = sentence_tokens[i] + self.GAP_MARKER_TOKENS
+            if used_tokens + cost > self.token_budget:
+                continue
+
+            folded = _fold(sentences[i])
+            if folded in seen_texts:
+                continue
+            if embeddings is not None and selected:
+                if float(np.max(embeddings[selected] @ embeddings[i])) >= self.DUPLICATE_SIMILARITY:
+                    continue
+
+            selected.append(i)
+            seen_texts.add(folded)
+            used_tokens += cost
+
+        selected.sort()
+        compacted = self._join(sentences, selected)
+        compacted_tokens = estimate_tokens(compacted)
+
+        stats.update({
+            'compacted': True,
+            'compacted_tokens': compacted_tokens,
+            'sentences_total': len(sentences),
+            'sentences_kept': len(selected),
+            'keyword_sentences': sum(1 for i in selected if has_keyword[i]),
+            'method': 'embeddings' if self.model is not None else 'frecuencia',
+        })
+        logger.info(
+            f"✂️ Transcripción compactada: {original_tokens} → {compacted_tokens} tokens "
+            f"({len(selected)}/{len(sentences)} oraciones)"
+        )
+
+        return compacted, stats
+
+    def _split_sentences(self, text):
+        """Divide en oraciones y parte las que superan MAX_SENTENCE_WORDS palabras."""
+        sentences = []
+        for raw in re.split(r'(?<=[.!?¿¡;])\s+', text.strip()):
+            words = raw.split()
+            if not words:
+                continue
+            if len(words) <= self.MAX_SENTENCE_WORDS:
+                sentences.append(' '.join(words))
+            else:
+                for start in range(0, len(words), self.SPLIT_SENTENCE_WORDS):
+                    sentences.append(' '.join(words[start:start + self.SPLIT_SENTENCE_WORDS]))
+        return sentences
+
+    def _centrality(self, sentences):
+        """
+        Centralidad de cada oración (similitud media con las demás).
+
+        Returns:
+            Tupla (centralidad, embeddings normalizados o None)
+        """
+        if self.model is not None:
+            try:
+                with self._lock:
+                    embeddings = self.model.encode(
+                        sentences,
+                        batch_size=32,
+                        normalize_embeddings=True,
+                        show_progress_bar=False
+                    )
+                embeddings = np.asarray(embeddings)
+                similarity = embeddings @ embeddings.T
+                return similarity.mean(axis=1), embeddings
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudieron calcular embeddings para compactar: {e}")
+
+        # Sin modelo: peso de las palabras de la oración en todo el texto
+        folded = [re.findall(r'\w+', _fold(s)) for s in sentences]
+        counts = {}
+        for words in folded:
+            for word in words:
+                if word not in STOPWORDS and len(word) >= 4:
+                    counts[word] = counts.get(word, 0) + 1
+        centrality = np.array([
+            sum(counts.get(w, 0) for w in words) / (len(words) or 1) for words in folded
+        ])
+        return centrality, None
+
+    def _assignment_keywords(self, title, description):
+        """
+        Palabras clave y entidades del título y la descripción.
+
+        Las palabras de contenido (sin tildes, sin stopwords ni verbos de
+        instrucción, 4+ letras) salen de ambos textos. Además se agregan como
+        entidades las siglas y las palabras con mayúscula en mitad de una
+        oración (al inicio de oración la mayúscula no indica nombre propio).
+        """
+        keywords = set()
+        for text in (title, description):
+            keywords.update(
+                w for w in re.findall(r'\w+', _fold(text or ''))
+                if len(w) >= 4 and w not in STOPWORDS and w not in INSTRUCTION_WORDS
+            )
+
+        for text in (title, description):
+            for match in re.finditer(r'\b[A-ZÁÉÍÓÚÑ][\wáéíóúñÁÉÍÓÚÑ]+\b', text or ''):
+                word = match.group()
+                folded = _fold(word)
+                if folded in STOPWORDS or folded in INSTRUCTION_WORDS:
+                    continue
+                preceding = text[:match.start()].rstrip()
+                sentence_start = not preceding or preceding[-1] in '.!?¿¡:;\n'
+                if word.isupper() or not sentence_start:
+                    keywords.add(folded)
+        return keywords
+
+    def _join(self, sentences, selected):
+        """Une las oraciones elegidas marcando los saltos con [...]"""
+        parts = []
+        previous = None
+        for i in selected:
+            if previous is not None and i != previous + 1:
+                parts.append(self.GAP_MARKER)
+            parts.append(sentences[i])
+            previous = i
+        if selected and selected[0] != 0:
+            parts.insert(0, self.GAP_MARKER)
+        if selected and selected[-1] != len(sentences) - 1:
+            parts.append(self.GAP_MARKER)
+        return ' '.join(parts)
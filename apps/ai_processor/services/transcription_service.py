@@ -34,6 +34,9 @@ except Exception as e:
     print(f"⚠️ No se pudo configurar FFmpeg automáticamente: {e}")
 
 class TranscriptionService:
+    # Formato compacto de timestamps por palabra; la fila i corresponde a word_texts[i]
+    WORD_DTYPE = [('start', 'f4'), ('end', 'f4')]
+    
     def __init__(self):
         # Usar modelo pequeño (más rápido, menos preciso)
         # Especificar device explícitamente para evitar errores de meta tensor
@@ -123,6 +126,12 @@ class TranscriptionService:
         import subprocess
         
         try:
+            # WAV mono 16 kHz (audio del proxy de análisis): se lee sin FFmpeg
+            audio_data = self._read_pcm16_wav(audio_path)
+            if audio_data is not None:
+                logger.info(f"✅ Audio WAV 16 kHz leído directamente: {len(audio_data)} samples")
+                return self._transcribe_samples(audio_data)
+            
             # Obtener FFmpeg path
             try:
                 import imageio_ffmpeg
@@ -154,20 +163,7 @@ class TranscriptionService:
             audio_data = np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
             logger.info(f"✅ Audio cargado: {len(audio_data)} samples")
             
-            # Transcribir con Whisper usando el array numpy directamente
-            logger.info("🤖 Iniciando transcripción con Whisper...")
-            transcription_result = self.model.transcribe(
-                audio_data,
-                language="es",  # Español
-                word_timestamps=True,  # Timestamps por palabra
-                verbose=False
-            )
-            
-            return {
-                'text': transcription_result['text'],
-                'segments': transcription_result['segments'],
-                'language': transcription_result['language']
-            }
+            return self._transcribe_samples(audio_data)
             
         except subprocess.CalledProcessError as e:
             logger.error(f"Error en FFmpeg al cargar audio: {e.stderr.decode() if e.stderr else str(e)}")
@@ -176,15 +172,55 @@ class TranscriptionService:
             logger.error(f"Error en transcripción: {str(e)}")
             raise Exception(f"Error transcribiendo audio: {str(e)}")
     
-    def transcribe_video(self, video_path):
+    def _transcribe_samples(self, audio_data):
+        """Transcribe PCM float32 16kHz con Whisper usando el array numpy directamente"""
+        logger.info("🤖 Iniciando transcripción con Whisper...")
+        transcription_result = self.model.transcribe(
+            audio_data,
+            language="es",  # Español
+            word_timestamps=True,  # Timestamps por palabra
+            verbose=False
+        )
+        
+        return {
+            'text': transcription_result['text'],
+            'segments': transcription_result['segments'],
+            'language': transcription_result['language'],
+            'audio_samples': audio_data,  # PCM float32 16kHz compartido con la segmentación
+            'sample_rate': 16000
+        }
+    
+    @staticmethod
+    def _read_pcm16_wav(audio_path):
+        """
+        Samples float32 de un WAV PCM 16-bit mono a 16 kHz
+        Returns: numpy array o None si el archivo tiene otro formato
+        """
+        import numpy as np
+        import wave
+        
+        try:
+            with wave.open(audio_path, 'rb') as wav:
+                if wav.getnchannels() != 1 or wav.getsampwidth() != 2 or wav.getframerate() != 16000:
+                    return None
+                frames = wav.readframes(wav.getnframes())
+        except (wave.Error, EOFError, OSError):
+            return None
+        return np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768.0
+    
+    def transcribe_video(self, video_path, audio_path=None):
         """
         Transcribe un video completo (extrae audio + transcribe)
+        
+        Args:
+            audio_path: Audio ya extraído (proxy de análisis); no se borra al terminar
         """
-        audio_path = None
+        extracted_path = None
         try:
-            # 1. Extraer audio del video
-            logger.info(f"Extrayendo audio de: {video_path}")
-            audio_path = self.extract_audio_from_video(video_path)
+            # 1. Extraer audio del video (salvo que ya venga extraído)
+            if not audio_path:
+                logger.info(f"Extrayendo audio de: {video_path}")
+                audio_path = extracted_path = self.extract_audio_from_video(video_path)
             
             # 2. Transcribir audio
             logger.info("Iniciando transcripción...")
@@ -200,12 +236,19 @@ class TranscriptionService:
                     'speaker': None  # Se asignará más tarde con detección de hablantes
                 })
             
+            # 4. Conservar timestamps por palabra en formato compacto
+            words, word_texts = self._build_word_array(transcription['segments'])
+            
             return {
                 'text': transcription['text'],  # Cambio: 'text' en lugar de 'full_text'
                 'full_text': transcription['text'],  # Mantener compatibilidad
                 'segments': processed_segments,
                 'language': transcription['language'],
-                'duration': processed_segments[-1]['end'] if processed_segments else 0
+                'duration': processed_segments[-1]['end'] if processed_segments else 0,
+                'audio_samples': transcription.get('audio_samples'),
+                'sample_rate': transcription.get('sample_rate', 16000),
+                'words': words,             # (start, end) por palabra
+                'word_texts': word_texts    # Texto de cada palabra (misma posición que en 'words')
             }
             
         except Exception as e:
@@ -214,12 +257,35 @@ class TranscriptionService:
         
         finally:
             # Limpiar archivo temporal de audio
-            if audio_path and os.path.exists(audio_path):
+            if extracted_path and os.path.exists(extracted_path):
                 try:
-                    os.unlink(audio_path)
+                    os.unlink(extracted_path)
                 except:
                     pass
 
+    def _build_word_array(self, segments):
+        """
+        Aplana las palabras de Whisper en un arreglo estructurado compacto.
+        
+        Returns:
+            Tupla (arreglo numpy con campos start/end, lista con el texto de
+            cada palabra en la misma posición)
+        """
+        import numpy as np
+        
+        word_texts = []
+        rows = []
+        for segment in segments:
+            for word in segment.get('words') or []:
+                text = word.get('word', '')
+                if not text.strip():
+                    continue
+                rows.append((word.get('start', 0), word.get('end', 0)))
+                word_texts.append(text)
+        
+        words = np.array(rows, dtype=self.WORD_DTYPE)
+        return words, word_texts
+
     def format_transcription_for_display(self, segments):
         """
         Formatea la transcripción para mostrar en la interfaz
@@ -1,3 +1,204 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from apps.ai_processor.services.chunked_upload import ChunkedUploader, _MemoryBudget
+
+KB = 1024
+
+
+class _FakeCloudinary(ThreadingHTTPServer):
+    """
+    Servidor HTTP local que emula el endpoint de subida por chunks
+
+    Registra cada petición (Content-Range, contenido, llegada y fin), confirma
+    los chunks intermedios y responde al último con el recurso completo.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, delay=None):
+        super().__init__(('127.0.0.1', 0), _FakeCloudinaryHandler)
+        self.delay = delay or (lambda start: 0)
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+class _FakeCloudinaryHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        server = self.server
+        arrived = time.monotonic()
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            content_range = self.headers['Content-Range']
+            start, end = (int(value) for value in content_range.split(' ')[1].split('/')[0].split('-'))
+            total = int(content_range.split('/')[1])
+            time.sleep(server.delay(start))
+        finally:
+            with server.lock:
+                server.active -= 1
+
+        with server.lock:
+            server.requests.append({
+                'start': start,
+                'end': end + 1,
+                'data': _multipart_file(body, self.headers['Content-Type']),
+                'upload_id': self.headers['X-Unique-Upload-Id'],
+                'arrived': arrived,
+                'finished': time.monotonic(),
+            })
+        result = {'public_id': 'test/video', 'bytes': total} if end + 1 == total else {'done': False}
+        payload = json.dumps(result).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def _multipart_file(body, content_type):
+    """Contenido del campo 'file' de un cuerpo multipart/form-data"""
+    boundary = content_type.split('boundary=')[1].encode()
+    for part in body.split(b'--' + boundary):
+        headers, _, content = part.partition(b'\r\n\r\n')
+        if b'name="file"' in headers:
+            return content[:-2]  # Sin el \r\n que precede al siguiente separador
+    return b''
+
+
+class ChunkedUploaderTests(SimpleTestCase):
+    """ChunkedUploader contra un servidor HTTP local (sin credenciales reales)"""
+
+    CHUNK = 64 * KB
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.mp4')
+        self.content = os.urandom(10 * self.CHUNK + 123)
+        with os.fdopen(handle, 'wb') as f:
+            f.write(self.content)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def _serve(self, delay=None):
+        server = _FakeCloudinary(delay)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def _uploader(self, server, **kwargs):
+        options = {
+            'chunk_size': self.CHUNK,
+            'max_chunk_size': self.CHUNK,
+            'parallel_chunks': 4,
+            'chunk_retries': 0,
+            'min_chunk_size': self.CHUNK,
+            'memory_budget': _MemoryBudget(64 * 1024 * KB),
+            'credentials': {
+                'cloud_name': 'demo',
+                'api_key': 'key',
+                'api_secret': 'secret',
+                'upload_prefix': server.url,
+            },
+        }
+        options.update(kwargs)
+        return ChunkedUploader(**options)
+
+    def _assembled(self, server, start=0):
+        """Bytes recibidos ordenados por rango; falla si hay huecos o solapes"""
+        data = b''
+        offset = start
+        for request in sorted(server.requests, key=lambda r: r['start']):
+            self.assertEqual(request['start'], offset)
+            self.assertEqual(len(request['data']), request['end'] - request['start'])
+            data += request['data']
+            offset = request['end']
+        return data
+
+    def test_parallel_chunks_finish_out_of_order(self):
+        # El primer chunk tarda más: los siguientes se confirman antes
+        server = self._serve(delay=lambda start: 0.3 if start == 0 else 0.01)
+        progress = []
+
+        result = self._uploader(server).upload(
+            self.path, 'upload-1', {'folder': 'test'},
+            on_progress=lambda done, total: progress.append(done)
+        )
+
+        self.assertEqual(result['public_id'], 'test/video')
+        self.assertEqual(self._assembled(server), self.content)
+        self.assertEqual({r['upload_id'] for r in server.requests}, {'upload-1'})
+        finished = [r['start'] for r in sorted(server.requests, key=lambda r: r['finished'])]
+        self.assertNotEqual(finished, sorted(finished))
+        # El progreso es el prefijo contiguo confirmado: nunca retrocede
+        self.assertEqual(progress, sorted(progress))
+        self.assertEqual(progress[-1], len(self.content))
+
+    def test_final_chunk_sent_after_all_others_acknowledged(self):
+        server = self._serve(delay=lambda start: 0.05)
+
+        self._uploader(server).upload(self.path, 'upload-2', {'folder': 'test'})
+
+        final = [r for r in server.requests if r['end'] == len(self.content)]
+        self.assertEqual(len(final), 1)
+        others = [r for r in server.requests if r is not final[0]]
+        self.assertGreaterEqual(final[0]['arrived'], max(r['finished'] for r in others))
+
+    def test_chunk_size_adapts_to_throughput(self):
+        server = self._serve()
+        uploader = self._uploader(server, max_chunk_size=4 * self.CHUNK, parallel_chunks=1)
+
+        uploader.upload(self.path, 'upload-3', {'folder': 'test'})
+
+        sizes = [r['end'] - r['start'] for r in sorted(server.requests, key=lambda r: r['start'])]
+        self.assertEqual(sizes[0], self.CHUNK)
+        # En local el throughput es alto: los chunks crecen hasta el máximo
+        self.assertEqual(max(sizes[:-1]), 4 * self.CHUNK)
+        self.assertTrue(all(self.CHUNK <= size <= 4 * self.CHUNK for size in sizes[:-1]))
+        self.assertEqual(self._assembled(server), self.content)
+
+    def test_resume_from_start_offset(self):
+        server = self._serve()
+        start_offset = 3 * self.CHUNK
+        progress = []
+
+        self._uploader(server).upload(
+            self.path, 'upload-4', {'folder': 'test'}, start_offset=start_offset,
+            on_progress=lambda done, total: progress.append(done)
+        )
+
+        self.assertEqual(min(r['start'] for r in server.requests), start_offset)
+        self.assertEqual(self._assembled(server, start=start_offset), self.content[start_offset:])
+        self.assertTrue(all(done >= start_offset for done in progress))
+
+    def test_memory_budget_caps_chunks_in_flight(self):
+        server = self._serve(delay=lambda start: 0.05)
+        # Cada chunk cuenta el doble (contenido + cuerpo multipart): caben dos
+        budget = _MemoryBudget(2 * 2 * self.CHUNK)
+
+        self._uploader(server, parallel_chunks=4, memory_budget=budget).upload(
+            self.path, 'upload-5', {'folder': 'test'}
+        )
+
+        self.assertLessEqual(server.max_active, 2)
+        self.assertEqual(budget.in_use, 0)
+        self.assertEqual(self._assembled(server), self.content)
@@ -0,0 +1,291 @@
+# apps/presentaciones/analysis_proxy.py
+"""
+Proxy de análisis: copia del video normalizada para las etapas de IA
+
+Los videos llegan como WebM VP8/VP9 (grabación en vivo) o MP4 arbitrarios,
+algunos con FPS declarados incorrectos. Decodificarlos a resolución completa
+en cada etapa es caro en CPU. El proxy se genera una vez al empezar el
+análisis:
+
+- Video H.264 de baja resolución (alto máx. 640), 10 fps constantes, con
+  un keyframe por segundo y ajustado para decodificación rápida
+  (-tune fastdecode: sin CABAC ni deblocking, sin B-frames).
+- Audio WAV mono 16 kHz, el formato que usa Whisper (sin extraerlo de nuevo).
+
+La detección de rostros y la transcripción usan el proxy; la detección de
+liveness sigue usando el original porque mide ruido del sensor y metadatos
+del contenedor, que el re-encode altera.
+
+Se usa FFmpeg (imageio_ffmpeg, como TranscriptionService). Sin FFmpeg, el
+video se re-muestrea con OpenCV a FPS constantes según los timestamps reales
+de cada frame (sin audio: la transcripción extrae el audio del original).
+"""
+import logging
+import os
+import shutil
+import subprocess
+import time
+
+import cv2
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+PROXY_VERSION = 1
+PROXY_DIR = 'proxies'
+
+DEFAULT_CONFIG = {
+    'enabled': True,
+    'max_height': 640,
+    'fps': 10,
+    'keyframe_seconds': 1,
+    'crf': 28,
+    'preset': 'veryfast',
+    'audio_sample_rate': 16000,
+    'timeout': 1800,
+}
+
+
+def get_config():
+    """Configuración de settings.ANALYSIS_PROXY con valores por defecto"""
+    return {**DEFAULT_CONFIG, **getattr(settings, 'ANALYSIS_PROXY', {})}
+
+
+def get_ffmpeg_exe():
+    """Ejecutable de FFmpeg (imageio_ffmpeg o PATH) o None"""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return shutil.which('ffmpeg')
+
+
+def proxy_file_path(proxy, kind):
+    """Ruta absoluta del video ('video') o audio ('audio') del proxy si existe"""
+    name = (proxy or {}).get(kind)
+    if not name:
+        return None
+    path = default_storage.path(name)
+    return path if os.path.exists(path) else None
+
+
+def is_proxy_current(proxy, video_path):
+    """True si el proxy guardado corresponde al video actual y sus archivos existen"""
+    if not proxy or proxy.get('version') != PROXY_VERSION or not proxy_file_path(proxy, 'video'):
+        return False
+    if proxy.get('audio') and not proxy_file_path(proxy, 'audio'):
+        return False
+    try:
+        return (proxy['source']['size'] == os.path.getsize(video_path) and
+                proxy['source']['mtime'] == os.path.getmtime(video_path))
+    except (KeyError, OSError):
+        return False
+
+
+def build_analysis_proxy(presentation_id, video_path):
+    """
+    Genera el proxy de análisis de un video
+
+    Returns:
+        dict serializable para Presentation.analysis_proxy
+
+    Raises:
+        IOError: Si no se pudo generar el video del proxy
+    """
+    config = get_config()
+    base = f'{PROXY_DIR}/{presentation_id}'
+    directory = default_storage.path(base)
+    os.makedirs(directory, exist_ok=True)
+
+    video_name = f'{base}/proxy.mp4'
+    audio_name = f'{base}/audio.wav'
+    # Temporales con la extensión final (OpenCV elige el contenedor por ella)
+    video_tmp = default_storage.path(f'{base}/proxy.tmp.mp4')
+    audio_tmp = default_storage.path(f'{base}/audio.tmp.wav')
+
+    started = time.monotonic()
+    ffmpeg = get_ffmpeg_exe()
+    try:
+        if ffmpeg:
+            encoder = 'ffmpeg'
+            has_audio = _transcode_ffmpeg(ffmpeg, video_path, video_tmp, audio_tmp, config)
+        else:
+            encoder = 'opencv'
+            has_audio = False
+            _transcode_opencv(video_path, video_tmp, config)
+
+        os.replace(video_tmp, default_storage.path(video_name))
+        if has_audio:
+            os.replace(audio_tmp, default_storage.path(audio_name))
+        elif os.path.exists(default_storage.path(audio_name)):
+            os.remove(default_storage.path(audio_name))
+    finally:
+        for tmp in (video_tmp, audio_tmp):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        if not os.listdir(directory):
+            os.rmdir(directory)  # Falló la primera generación: no dejar la carpeta vacía
+
+    elapsed = time.monotonic() - started
+    cap = cv2.VideoCapture(default_storage.path(video_name))
+    try:
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+
+    data = {
+        'version': PROXY_VERSION,
+        'encoder': encoder,
+        'video': video_name,
+        'audio': audio_name if has_audio else None,
+        'width': width,
+        'height': height,
+        'fps': fps,
+        'frame_count': frame_count,
+        'size': os.path.getsize(default_storage.path(video_name)),
+        'transcode_seconds': round(elapsed, 2),
+        'source': {
+            'size': os.path.getsize(video_path),
+            'mtime': os.path.getmtime(video_path),
+        },
+    }
+    logger.info(
+        f"🎞️ Proxy de análisis generado para presentación {presentation_id} ({encoder}): "
+        f"{width}x{height} a {fps:.0f} fps, {data['size'] / (1024 * 1024):.1f} MB en {elapsed:.1f}s"
+    )
+    return data
+
+
+def _transcode_ffmpeg(ffmpeg, video_path, video_out, audio_out, config):
+    """
+    Video y audio del proxy en una sola pasada de FFmpeg
+
+    Returns:
+        True si se generó el audio (False si el video no tiene pista de audio)
+    """
+    fps = config['fps']
+    gop = max(int(fps * config['keyframe_seconds']), 1)
+    video_args = [
+        '-map', '0:v:0', '-an',
+        '-vf', f"fps={fps},scale=-2:'min({config['max_height']},ih)':flags=fast_bilinear",
+        '-c:v', 'libx264', '-preset', config['preset'], '-tune', 'fastdecode',
+        '-crf', str(config['crf']), '-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0',
+        '-bf', '0', '-pix_fmt', 'yuv420p', '-movflags', '+faststart',
+        '-f', 'mp4', video_out,
+    ]
+    audio_args = [
+        '-map', '0:a:0', '-vn',
+        '-ac', '1', '-ar', str(config['audio_sample_rate']), '-c:a', 'pcm_s16le',
+        '-f', 'wav', audio_out,
+    ]
+    base = [ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', '-i', video_path]
+
+    result = subprocess.run(
+        base + video_args + audio_args,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=config['timeout']
+    )
+    if result.returncode == 0:
+        return True
+
+    # Sin pista de audio la segunda salida no tiene streams: solo video
+    logger.warning(f"⚠️ FFmpeg falló con audio, reintentando solo video: {result.stderr[-300:]}")
+    result = subprocess.run(
+        base + video_args,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=config['timeout']
+    )
+    if result.returncode != 0:
+        raise IOError(f"FFmpeg no pudo generar el proxy: {result.stderr[-500:]}")
+    return False
+
+
+def _transcode_opencv(video_path, video_out, config):
+    """
+    Re-muestreo a FPS constantes con OpenCV (sin audio)
+
+    Cada frame de salida toma el último frame de entrada cuyo timestamp real
+    no supera el instante de salida, así los FPS declarados incorrectos no
+    afectan la duración.
+    """
+    fps = config['fps']
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"No se pudo abrir el video: {video_path}")
+
+    writer = None
+    try:
+        source_fps = cap.get(cv2.CAP_PROP_FPS)
+        next_time = 0.0
+        index = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            if timestamp <= 0 and index and source_fps > 0:
+                timestamp = index / source_fps  # Contenedor sin timestamps
+            index += 1
+
+            if writer is None:
+                height, width = frame.shape[:2]
+                if height > config['max_height']:
+                    width = int(width * config['max_height'] / height) // 2 * 2
+                    height = config['max_height']
+                size = (width, height)
+                writer = cv2.VideoWriter(video_out, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+                if not writer.isOpened():
+                    raise IOError("OpenCV no pudo crear el video del proxy")
+
+            if timestamp + 1e-6 < next_time:
+                continue
+
+            resized = cv2.resize(frame, size, interpolation=cv2.INTER_AREA) if frame.shape[1::-1] != size else frame
+            while next_time <= timestamp + 1e-6:
+                writer.write(resized)  # Repite el frame si el original tiene huecos
+                next_time += 1 / fps
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+
+    if writer is None:
+        raise IOError(f"El video no tiene frames legibles: {video_path}")
+
+
+def benchmark_decode(video_path, max_seconds=None):
+    """
+    Mide la decodificación secuencial de un video (todas sus frames)
+
+    Returns:
+        dict con frames, segundos y frames por segundo decodificados
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"No se pudo abrir el video: {video_path}")
+
+    frames = 0
+    started = time.monotonic()
+    try:
+        while cap.grab() and cap.retrieve()[0]:
+            frames += 1
+            if max_seconds and time.monotonic() - started > max_seconds:
+                break
+    finally:
+        cap.release()
+    seconds = time.monotonic() - started
+    return {
+        'frames': frames,
+        'seconds': round(seconds, 3),
+        'fps': round(frames / seconds, 1) if seconds > 0 else 0,
+    }
+
+
+def delete_analysis_proxy(presentation_id):
+    """Borra la carpeta del proxy de una presentación"""
+    directory = default_storage.path(f'{PROXY_DIR}/{presentation_id}')
+    if os.path.isdir(directory):
+        shutil.rmtree(directory)
@@ -3,6 +3,7 @@ from django.core.validators import FileExtensionValidator
 from django.utils import timezone
 from .models import Presentation, Assignment, Course
 from .validators import validate_video_file
+from .upload_handlers import adopt_streamed_video
 
 class PresentationUploadForm(forms.ModelForm):
     """Formulario para subir presentaciones"""
@@ -43,6 +44,8 @@ class PresentationUploadForm(forms.ModelForm):
     
     def __init__(self, *args, **kwargs):
         user = kwargs.pop('user', None)
+        # Rechazos del StreamingVideoUploadHandler (request.upload_errors)
+        self._upload_errors = kwargs.pop('upload_errors', None) or {}
         super().__init__(*args, **kwargs)
         
         # Guardar el usuario para usarlo en la validación
@@ -85,6 +88,10 @@ class PresentationUploadForm(forms.ModelForm):
     def clean_video_file(self):
         video = self.cleaned_data.get('video_file')
         
+        # El video se rechazó mientras se recibía (formato o tamaño)
+        if 'video_file' in self._upload_errors:
+            raise forms.ValidationError(self._upload_errors['video_file'])
+        
         # Solo validar si no es edición o si se está subiendo un nuevo archivo
         if not video and not self.instance.pk:
             raise forms.ValidationError('Debes seleccionar un archivo de video.')
@@ -131,6 +138,17 @@ class PresentationUploadForm(forms.ModelForm):
                         )
         
         return cleaned_data
+    
+    def save(self, commit=True):
+        presentation = super().save(commit=False)
+        
+        # El video ya está en su ruta final: solo se asigna el nombre
+        adopt_streamed_video(presentation, self.cleaned_data.get('video_file'))
+        
+        if commit:
+            presentation.save()
+            self._save_m2m()
+        return presentation
 
 class CourseForm(forms.ModelForm):
     """Formulario para crear/editar cursos (solo docentes)"""
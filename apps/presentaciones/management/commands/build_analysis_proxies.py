@@ -0,0 +1,119 @@
+"""
+Comando para generar los proxies de análisis de presentaciones existentes
+
+Con --benchmark decodifica el original y el proxy de cada video y muestra la
+velocidad de decodificación de ambos (frames por segundo y segundos de
+video decodificados por segundo).
+"""
+from django.core.management.base import BaseCommand
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Genera los proxies de análisis (video normalizado y audio 16 kHz) de las presentaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--presentation',
+            type=int,
+            default=None,
+            help='ID de una presentación concreta',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerar también los proxies vigentes',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Máximo de presentaciones a procesar',
+        )
+        parser.add_argument(
+            '--benchmark',
+            action='store_true',
+            help='Comparar la velocidad de decodificación del original y del proxy',
+        )
+
+    def handle(self, *args, **options):
+        from apps.presentaciones.analysis_proxy import benchmark_decode, proxy_file_path
+        from apps.presentaciones.models import Presentation
+
+        presentations = Presentation.objects.filter(
+            video_file__isnull=False
+        ).exclude(
+            video_file=''
+        ).order_by('id')
+
+        if options['presentation']:
+            presentations = presentations.filter(id=options['presentation'])
+        elif not options['force'] and not options['benchmark']:
+            presentations = presentations.filter(analysis_proxy__isnull=True)
+        if options['limit']:
+            presentations = presentations[:options['limit']]
+
+        generated = 0
+        errors = 0
+        totals = {'original': 0.0, 'proxy': 0.0, 'duration': 0.0}
+        started = time.monotonic()
+
+        for presentation in presentations.iterator():
+            try:
+                video_path = presentation.video_file.path
+            except NotImplementedError:
+                continue
+            if not os.path.exists(video_path):
+                self.stdout.write(self.style.WARNING(f'  ⚠️  {presentation.title} (ID {presentation.id}): sin archivo local'))
+                continue
+
+            if options['force']:
+                presentation.analysis_proxy = None
+            proxy = presentation.ensure_analysis_proxy()
+            proxy_path = proxy_file_path(proxy, 'video')
+            if not proxy_path:
+                errors += 1
+                self.stdout.write(self.style.ERROR(f'  ❌ {presentation.title} (ID {presentation.id}): no se pudo generar'))
+                continue
+
+            generated += 1
+            original_mb = os.path.getsize(video_path) / (1024 * 1024)
+            self.stdout.write(
+                f"  🎞️  {presentation.title} (ID {presentation.id}): {proxy['width']}x{proxy['height']} "
+                f"{proxy['fps']:.0f} fps, {original_mb:.1f} MB → {proxy['size'] / (1024 * 1024):.1f} MB "
+                f"({proxy['encoder']}, audio {'sí' if proxy.get('audio') else 'no'})"
+            )
+
+            if options['benchmark']:
+                original = benchmark_decode(video_path)
+                reduced = benchmark_decode(proxy_path)
+                duration = proxy['frame_count'] / proxy['fps'] if proxy['fps'] else 0
+                totals['original'] += original['seconds']
+                totals['proxy'] += reduced['seconds']
+                totals['duration'] += duration
+                speedup = original['seconds'] / reduced['seconds'] if reduced['seconds'] else 0
+                self.stdout.write(
+                    f"      decodificación: original {original['frames']} frames en {original['seconds']:.2f}s "
+                    f"({original['fps']:.0f} fps), proxy {reduced['frames']} frames en {reduced['seconds']:.2f}s "
+                    f"({reduced['fps']:.0f} fps) → {speedup:.1f}x más rápido"
+                )
+
+        elapsed = time.monotonic() - started
+
+        # Resumen
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(self.style.SUCCESS(f'✅ Proxies: {generated}'))
+        self.stdout.write(self.style.ERROR(f'❌ Errores: {errors}'))
+        if options['benchmark'] and totals['proxy'] > 0:
+            self.stdout.write(
+                f"⏱️  Decodificación de {totals['duration']:.0f}s de video: original {totals['original']:.1f}s "
+                f"({totals['duration'] / totals['original']:.0f}x tiempo real), "
+                f"proxy {totals['proxy']:.1f}s ({totals['duration'] / totals['proxy']:.0f}x tiempo real), "
+                f"{totals['original'] / totals['proxy']:.1f}x más rápido"
+            )
+        self.stdout.write(f'⏱️  {elapsed:.1f}s en total')
+        self.stdout.write('='*50)
@@ -0,0 +1,50 @@
+"""
+Comando de gestión para descartar subidas reanudables abandonadas
+
+Marca como expiradas las subidas sin actividad durante
+settings.RESUMABLE_UPLOADS['expiry_hours'] y borra sus archivos parciales.
+Pensado para ejecutarse periódicamente (cron); crear una subida nueva también
+expira las abandonadas.
+"""
+from django.core.management.base import BaseCommand
+import os
+import time
+
+
+class Command(BaseCommand):
+    help = 'Expira las subidas reanudables abandonadas y borra sus archivos parciales'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--orphans',
+            action='store_true',
+            help='Borrar también archivos parciales sin subida activa asociada',
+        )
+
+    def handle(self, *args, **options):
+        # Importar aquí para evitar imports pesados al inicio
+        from django.core.files.storage import default_storage
+        from apps.presentaciones.models import ResumableUpload
+        from apps.presentaciones.resumable_uploads import expire_abandoned, get_config
+
+        expired = expire_abandoned()
+        self.stdout.write(self.style.SUCCESS(f'✅ Subidas expiradas: {expired}'))
+
+        if options['orphans']:
+            partial_dir = default_storage.path(get_config()['partial_dir'])
+            if not os.path.isdir(partial_dir):
+                return
+
+            active = {
+                os.path.basename(name)
+                for name in ResumableUpload.objects.filter(status='ACTIVE').values_list('partial_name', flat=True)
+            }
+            # Solo archivos sin modificar desde hace expiry_hours (no tocar subidas recién creadas)
+            cutoff = time.time() - get_config()['expiry_hours'] * 3600
+            removed = 0
+            for entry in os.listdir(partial_dir):
+                path = os.path.join(partial_dir, entry)
+                if entry.endswith('.part') and entry not in active and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            self.stdout.write(self.style.SUCCESS(f'🗑️ Archivos parciales huérfanos eliminados: {removed}'))
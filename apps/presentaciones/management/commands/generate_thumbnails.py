@@ -1,120 +1,228 @@
 """
 Comando para generar miniaturas de videos que no las tienen
+
+Las miniaturas se extraen con un solo seek al keyframe más cercano
+(VideoValidator.generate_thumbnail, el mismo código que la subida) en un pool
+de hilos: OpenCV libera el GIL al decodificar, así que varios videos avanzan a
+la vez. Los cambios se guardan por lotes con bulk_update y, tras cada lote, se
+escribe un checkpoint: si el comando se interrumpe, la siguiente ejecución
+continúa desde el último lote guardado.
+
+Con --derivatives se generan en cambio las miniaturas WebP y el sprite de
+previsualización (media_derivatives) de las presentaciones analizadas antes
+de que existieran.
 """
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.core.management.base import BaseCommand
-from apps.presentaciones.models import Presentation
+from concurrent.futures import ThreadPoolExecutor
+import json
 import os
-from PIL import Image
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def _thumbnail_name(presentation_id):
+    """Nombre fijo por presentación: regenerar sobrescribe en lugar de duplicar"""
+    return f'thumbnails/thumb_{presentation_id}.jpg'
+
+
+def _extract(presentation):
+    """
+    Genera la miniatura de una presentación (se ejecuta en los hilos del pool,
+    sin acceder a la base de datos)
+
+    Returns:
+        (presentation, nombre de la miniatura o None, error o None)
+    """
+    from apps.presentaciones.validators import VideoValidator
+
+    try:
+        video_path = presentation.video_file.path
+        if not os.path.exists(video_path):
+            return presentation, None, f'Archivo no existe: {video_path}'
+        
+        
+        name = _thumbnail_name(presentation.id)
+        output_path = default_storage.path(name)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        
+        if VideoValidator.generate_thumbnail(video_path, output_path=output_path, probe=presentation.video_probe):
+            return presentation, name, None
+        return presentation, None, 'No se pudo leer el frame'
+    except Exception as e:
+        return presentation, None, str(e)
+
+
+def _extract_derivatives(presentation):
+    """
+    Genera las miniaturas WebP y el sprite de una presentación (en los hilos del pool)
+
+    Returns:
+        (presentation, datos de media_derivatives o None, error o None)
+    """
+    from apps.presentaciones.media_derivatives import generate_media_derivatives
+
+    try:
+        video_path = presentation.video_file.path
+        if not os.path.exists(video_path):
+            return presentation, None, f'Archivo no existe: {video_path}'
+        
+        data = generate_media_derivatives(
+            presentation.id, video_path, probe=presentation.video_probe, sha256=presentation.video_sha256
+        )
+        return presentation, data, None
+    except Exception as e:
+        return presentation, None, str(e)
+
+
 class Command(BaseCommand):
     help = 'Genera miniaturas para videos que no las tienen'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=min(os.cpu_count() or 1, 8),
+            help='Videos procesados a la vez',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Presentaciones por lote (se guardan juntas con bulk_update)',
+        )
+        parser.add_argument(
+            '--derivatives',
+            action='store_true',
+            help='Generar las miniaturas WebP y el sprite (media_derivatives) en lugar de la miniatura JPEG',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerar también las miniaturas existentes',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Máximo de presentaciones a procesar',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=None,
+            help='Archivo donde se guarda el progreso (uno distinto por modo si no se indica)',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignorar el checkpoint y empezar desde el principio',
+        )
+
     def handle(self, *args, **options):
+        from apps.presentaciones.models import Presentation
+        
+        batch_size = max(options['batch_size'], 1)
+        workers = max(options['workers'], 1)
+        derivatives = options['derivatives']
+        checkpoint_path = options['checkpoint'] or os.path.join(
+            settings.MEDIA_ROOT, '.generate_derivatives.json' if derivatives else '.generate_thumbnails.json'
+        )
+        
+        checkpoint = {'last_id': 0, 'failed': []}
+        if not options['restart'] and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            self.stdout.write(self.style.WARNING(
+                f"⏯️  Continuando desde el checkpoint (ID > {checkpoint['last_id']}, "
+                f"{len(checkpoint['failed'])} con error)"
+            ))
+        
         presentations = Presentation.objects.filter(
             video_file__isnull=False
         ).exclude(
             video_file=''
-        )
+        ).only('id', 'title', 'video_file', 'video_thumbnail', 'video_probe', 'video_sha256').order_by('id')
         
-        total = presentations.count()
-        self.stdout.write(f'Encontradas {total} presentaciones con video')
+        if options['force']:
+            pass
+        elif derivatives:
+            presentations = presentations.filter(media_derivatives__isnull=True)
+        else:
+            # Omitir las que ya tienen miniatura (local o en Cloudinary)
+            presentations = presentations.exclude(
+                cloudinary_thumbnail_url__gt=''
+            ).exclude(
+                video_thumbnail__gt=''
+            )
+        
+        pending = presentations.filter(id__gt=checkpoint['last_id'])
+        total = pending.count()
+        if options['limit']:
+            total = min(total, options['limit'])
+        self.stdout.write(f'Encontradas {total} presentaciones sin miniatura ({workers} hilos, lotes de {batch_size})')
         
         generated = 0
-        skipped = 0
         errors = 0
+        processed = 0
+        started = time.monotonic()
         
-        for presentation in presentations:
-            # Verificar si ya tiene thumbnail
-            has_thumbnail = (
-                presentation.cloudinary_thumbnail_url or 
-                (presentation.video_thumbnail and presentation.video_thumbnail.name)
-            )
-            
-            if has_thumbnail:
-                skipped += 1
-                continue
-            
-            try:
-                # Intentar generar thumbnail
-                self.stdout.write(f'Generando thumbnail para: {presentation.title}')
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbnail') as pool:
+            while processed < total:
+                batch = list(pending.filter(id__gt=checkpoint['last_id'])[:min(batch_size, total - processed)])
+                if not batch:
+                    break
                 
-                # Verificar que el archivo existe
-                if not os.path.exists(presentation.video_file.path):
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f'  ⚠️ Archivo no existe: {presentation.video_file.path}'
-                        )
-                    )
-                    errors += 1
-                    continue
+                to_update = []
+                for presentation, result, error in pool.map(_extract_derivatives if derivatives else _extract, batch):
+                    if result:
+                        if derivatives:
+                            presentation.media_derivatives = result
+                        else:
+                            presentation.video_thumbnail.name = result
+                        to_update.append(presentation)
+                    else:
+                        errors += 1
+                        checkpoint['failed'].append(presentation.id)
+                        self.stdout.write(self.style.ERROR(f'  ❌ {presentation.title} (ID {presentation.id}): {error}'))
                 
-                # Generar thumbnail usando moviepy
-                try:
-                    from moviepy.editor import VideoFileClip
-                    from django.core.files import File
-                    import tempfile
-                    
-                    # Cargar video
-                    clip = VideoFileClip(presentation.video_file.path)
-                    
-                    # Obtener frame del segundo 1 (o 0 si el video es muy corto)
-                    time_position = min(1.0, clip.duration / 2)
-                    frame = clip.get_frame(time_position)
-                    
-                    # Convertir a imagen PIL
-                    img = Image.fromarray(frame)
-                    
-                    # Redimensionar a tamaño de thumbnail
-                    img.thumbnail((320, 240), Image.Resampling.LANCZOS)
-                    
-                    # Guardar en archivo temporal
-                    with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp_file:
-                        img.save(tmp_file.name, 'JPEG', quality=85)
-                        tmp_path = tmp_file.name
-                    
-                    # Guardar en el modelo
-                    with open(tmp_path, 'rb') as f:
-                        filename = f'thumb_{presentation.id}.jpg'
-                        presentation.video_thumbnail.save(
-                            filename,
-                            File(f),
-                            save=True
-                        )
-                    
-                    # Limpiar
-                    clip.close()
-                    os.remove(tmp_path)
-                    
-                    generated += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'  ✅ Thumbnail generado exitosamente'
-                        )
-                    )
-                    
-                except ImportError:
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f'  ⚠️ moviepy no está instalado. Instalalo con: pip install moviepy'
-                        )
-                    )
-                    errors += 1
-                    break
-                    
-            except Exception as e:
-                errors += 1
+                Presentation.objects.bulk_update(to_update, ['media_derivatives' if derivatives else 'video_thumbnail'])
+                generated += len(to_update)
+                processed += len(batch)
+                
+                # Checkpoint después de guardar el lote
+                checkpoint['last_id'] = batch[-1].id
+                self._save_checkpoint(checkpoint_path, checkpoint)
+                
+                elapsed = time.monotonic() - started
                 self.stdout.write(
-                    self.style.ERROR(
-                        f'  ❌ Error generando thumbnail: {str(e)}'
-                    )
+                    f'  📸 {processed}/{total} ({processed / elapsed:.1f} videos/s)'
                 )
         
+        elapsed = time.monotonic() - started
+        # Solo si no queda nada después del checkpoint (con --limit puede quedar):
+        # la próxima ejecución empieza de cero
+        finished = not pending.filter(id__gt=checkpoint['last_id']).exists()
+        if finished and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        
         # Resumen
         self.stdout.write('\n' + '='*50)
         self.stdout.write(self.style.SUCCESS(f'✅ Generados: {generated}'))
-        self.stdout.write(self.style.WARNING(f'⏭️  Omitidos (ya tenían): {skipped}'))
         self.stdout.write(self.style.ERROR(f'❌ Errores: {errors}'))
+        if processed:
+            self.stdout.write(
+                f'⏱️  {elapsed:.1f}s en total, {processed / elapsed:.1f} videos/s, '
+                f'{elapsed * 1000 / processed:.0f} ms por video'
+            )
         self.stdout.write('='*50)
+
+    @staticmethod
+    def _save_checkpoint(path, checkpoint):
+        """Escritura atómica del checkpoint (un corte no lo deja a medias)"""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,132 @@
+"""
+Comando para liberar los videos originales locales que ya están en Cloudinary
+
+Aplica las políticas de storage_lifecycle (antigüedad y uso del disco). Con
+--interval se ejecuta de forma continua (para usarlo como servicio o con
+in_process_interval_minutes en 0); con --rehydrate descarga de nuevo el
+original de una presentación.
+"""
+from django.core.management.base import BaseCommand, CommandError
+import json
+import time
+
+
+class Command(BaseCommand):
+    help = 'Libera los videos originales locales que ya están en Cloudinary (antigüedad, LRU y uso del disco)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Mostrar qué originales se liberarían sin borrarlos',
+        )
+        parser.add_argument(
+            '--max-idle-days',
+            type=int,
+            default=None,
+            help='Liberar originales sin uso durante estos días (0 desactiva la política por antigüedad)',
+        )
+        parser.add_argument(
+            '--high-watermark',
+            type=float,
+            default=None,
+            help='Uso del disco (0-1) a partir del cual se liberan originales por LRU',
+        )
+        parser.add_argument(
+            '--low-watermark',
+            type=float,
+            default=None,
+            help='Uso del disco (0-1) hasta el que se liberan originales por LRU',
+        )
+        parser.add_argument(
+            '--no-verify',
+            action='store_true',
+            help='No comprobar la copia en Cloudinary antes de borrar',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=None,
+            help='Repetir cada N minutos (modo continuo)',
+        )
+        parser.add_argument(
+            '--rehydrate',
+            type=int,
+            default=None,
+            metavar='ID',
+            help='Descargar de Cloudinary el original de una presentación',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Mostrar el estado del almacenamiento y terminar',
+        )
+
+    def handle(self, *args, **options):
+        from apps.presentaciones import storage_lifecycle
+
+        if options['stats']:
+            self.stdout.write(json.dumps(storage_lifecycle.get_stats(), indent=2))
+            return
+
+        if options['rehydrate']:
+            self._rehydrate(options['rehydrate'])
+            return
+
+        overrides = {}
+        if options['max_idle_days'] is not None:
+            overrides['max_idle_days'] = options['max_idle_days']
+        if options['high_watermark'] is not None:
+            overrides['high_watermark'] = options['high_watermark']
+        if options['low_watermark'] is not None:
+            overrides['low_watermark'] = options['low_watermark']
+        if options['no_verify']:
+            overrides['verify_cloud'] = False
+
+        if not options['interval']:
+            self._run(storage_lifecycle, options['dry_run'], overrides)
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"🧹 Ciclo de almacenamiento cada {options['interval']} min (Ctrl+C para salir)"
+        ))
+        try:
+            while True:
+                self._run(storage_lifecycle, options['dry_run'], overrides)
+                time.sleep(options['interval'] * 60)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\n⏹️  Detenido'))
+
+    def _run(self, storage_lifecycle, dry_run, overrides):
+        report = storage_lifecycle.run(dry_run=dry_run, config=overrides)
+
+        prefix = '🔎 [simulación] ' if dry_run else ''
+        for presentation_id, reason in report['skipped'].items():
+            self.stdout.write(self.style.WARNING(f'  ⏭️  ID {presentation_id}: {reason}'))
+
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}✅ Liberados por antigüedad: {len(report['evicted_age'])}, "
+            f"por espacio (LRU): {len(report['evicted_watermark'])}"
+        ))
+        self.stdout.write(
+            f"💾 {report['freed_bytes'] / (1024 * 1024):.1f} MB liberados, "
+            f"disco {report['usage_before']:.0%} → {report['usage_after']:.0%}"
+        )
+        self.stdout.write('='*50)
+
+    def _rehydrate(self, presentation_id):
+        from apps.presentaciones.models import Presentation
+
+        try:
+            presentation = Presentation.objects.get(pk=presentation_id)
+        except Presentation.DoesNotExist:
+            raise CommandError(f'No existe la presentación {presentation_id}')
+
+        started = time.monotonic()
+        video_path = presentation.ensure_local_video()
+        if not video_path:
+            raise CommandError('No se pudo obtener el original (ver el log)')
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Original disponible en {video_path} ({time.monotonic() - started:.1f}s)'
+        ))
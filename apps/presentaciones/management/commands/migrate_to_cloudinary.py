@@ -2,6 +2,7 @@
 Comando de gestión para migrar videos existentes a Cloudinary
 """
 from django.core.management.base import BaseCommand, CommandError
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,6 +27,12 @@ class Command(BaseCommand):
             default=None,
             help='Limitar el número de videos a migrar',
         )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Videos subidos a la vez (cada uno además envía sus chunks en paralelo; la memoria en vuelo la acota CLOUD_TRANSFER["max_inflight_bytes"])',
+        )
 
     def handle(self, *args, **options):
         # Importar aquí para evitar imports pesados al inicio
@@ -74,8 +81,11 @@ class Command(BaseCommand):
         failed = 0
         skipped = 0
         
+        concurrency = max(options['concurrency'], 1)
+        to_upload = []
+        
         self.stdout.write('\n' + '=' * 70)
-        self.stdout.write('  🔄 INICIANDO MIGRACIÓN')
+        self.stdout.write(f'  🔄 INICIANDO MIGRACIÓN ({concurrency} a la vez)')
         self.stdout.write('=' * 70 + '\n')
         
         for i, presentation in enumerate(presentations, 1):
@@ -105,22 +115,28 @@ class Command(BaseCommand):
                 migrated += 1
                 continue
             
-            # Migrar a Cloudinary
-            try:
-                result = presentation.upload_to_cloudinary()
-                
-                if result:
-                    self.stdout.write(self.style.SUCCESS('   ✅ Migrado exitosamente'))
-                    self.stdout.write(f'      Public ID: {presentation.cloudinary_public_id}')
-                    self.stdout.write(f'      URL: {presentation.cloudinary_url[:80]}...')
-                    migrated += 1
-                else:
-                    self.stdout.write(self.style.ERROR('   ❌ Error en la migración'))
-                    failed += 1
+            to_upload.append(presentation)
+        
+        # Migrar a Cloudinary (en paralelo según --concurrency)
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = {pool.submit(self._upload, p): p for p in to_upload}
+            for future in as_completed(futures):
+                presentation = futures[future]
+                try:
+                    result = future.result()
                     
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f'   ❌ Error: {e}'))
-                failed += 1
+                    if result:
+                        self.stdout.write(self.style.SUCCESS(f'   ✅ Migrado exitosamente: {presentation.title}'))
+                        self.stdout.write(f'      Public ID: {presentation.cloudinary_public_id}')
+                        self.stdout.write(f'      URL: {presentation.cloudinary_url[:80]}...')
+                        migrated += 1
+                    else:
+                        self.stdout.write(self.style.ERROR(f'   ❌ Error en la migración: {presentation.title}'))
+                        failed += 1
+                        
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f'   ❌ Error ({presentation.title}): {e}'))
+                    failed += 1
         
         # Resumen final
         self.stdout.write('\n' + '=' * 70)
@@ -147,3 +163,12 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING('⚠️  MIGRACIÓN COMPLETADA CON ADVERTENCIAS'))
         
         self.stdout.write('=' * 70 + '\n')
+    
+    def _upload(self, presentation):
+        """Sube un video desde un hilo del pool (con su propia conexión a la BD)"""
+        from django.db import connection
+        
+        try:
+            return presentation.upload_to_cloudinary()
+        finally:
+            connection.close()
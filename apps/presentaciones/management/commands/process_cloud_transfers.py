@@ -0,0 +1,56 @@
+"""
+Comando de gestión para procesar la cola de subidas a Cloudinary
+
+Útil cuando settings.CLOUD_TRANSFER['in_process_worker'] es False (las
+transferencias no se procesan dentro del servidor web) o para retomar
+transferencias que quedaron pendientes tras un reinicio.
+"""
+from django.core.management.base import BaseCommand
+import json
+import time
+
+
+class Command(BaseCommand):
+    help = 'Procesa las transferencias de videos a Cloudinary pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Procesar las transferencias pendientes y terminar',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=10,
+            help='Segundos entre revisiones de la cola (modo continuo)',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Mostrar el estado de la cola y terminar',
+        )
+
+    def handle(self, *args, **options):
+        # Importar aquí para evitar imports pesados al inicio
+        from apps.ai_processor.services.cloud_transfer_service import CloudTransferService
+
+        if options['stats']:
+            self.stdout.write(json.dumps(CloudTransferService.get_stats(), indent=2))
+            return
+
+        if options['once']:
+            processed = CloudTransferService.process_due_jobs()
+            self.stdout.write(self.style.SUCCESS(f'✅ Transferencias procesadas: {processed}'))
+            return
+
+        self.stdout.write(self.style.SUCCESS('☁️ Procesando transferencias a Cloudinary (Ctrl+C para salir)'))
+        try:
+            while True:
+                processed = CloudTransferService.process_due_jobs()
+                if processed:
+                    self.stdout.write(f'   📤 {processed} transferencia(s) procesada(s)')
+                else:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\n⏹️  Detenido'))
@@ -0,0 +1,34 @@
+"""
+Comando de gestión para borrar las respuestas de IA expiradas (LLMResponseCache)
+
+Las entradas también se purgan al guardar respuestas nuevas (como mucho cada
+settings.LLM_CACHE_PURGE_INTERVAL); este comando sirve para cron o para
+limpiar la tabla a mano.
+"""
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Borra las respuestas de IA expiradas de la cache en base de datos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Mostrar cuántas entradas se borrarían sin borrarlas',
+        )
+
+    def handle(self, *args, **options):
+        # Importar aquí para evitar imports pesados al inicio
+        from django.utils import timezone
+        from apps.ai_processor.models import LLMResponseCache
+        from apps.ai_processor.services.llm_cache_service import LLMCacheService
+
+        if options['dry_run']:
+            expired = LLMResponseCache.objects.filter(expires_at__lte=timezone.now()).count()
+            self.stdout.write(f'🔎 Respuestas expiradas: {expired}')
+            return
+
+        deleted = LLMCacheService.purge_expired()
+        remaining = LLMResponseCache.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'✅ Respuestas expiradas eliminadas: {deleted} (quedan {remaining})'))
@@ -0,0 +1,219 @@
+# apps/presentaciones/media_derivatives.py
+"""
+Derivados de imagen de los videos (miniaturas WebP y sprite de scrubbing)
+
+Se generan una vez durante el análisis y se guardan en
+MEDIA_ROOT/derivatives/<id>/ junto con sus URLs en
+Presentation.media_derivatives, así las páginas con muchas tarjetas solo
+leen un valor guardado (sin construir URLs de Cloudinary en cada render).
+
+- Miniaturas en varios anchos (srcset); no se generan anchos mayores que el
+  video original.
+- Sprite: una sola imagen con frames equiespaciados en una grilla, para
+  previsualizar el video al pasar el mouse sin descargarlo.
+
+Los nombres incluyen una etiqueta derivada del contenido del video: si el
+video cambia, cambian las URLs, por lo que se pueden servir con caché de
+larga duración (media_derivative_view).
+"""
+import hashlib
+import logging
+import os
+
+import cv2
+import numpy as np
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+from .video_probe import VideoProbe, is_probe_current, read_thumbnail_frame
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_VERSION = 1
+DERIVATIVES_DIR = 'derivatives'
+
+THUMBNAIL_WIDTHS = (160, 320, 640)
+DEFAULT_THUMBNAIL_WIDTH = 320  # URL principal (get_thumbnail_url)
+
+SPRITE_MAX_TILES = 24
+SPRITE_COLUMNS = 6
+SPRITE_TILE_WIDTH = 160
+SPRITE_MIN_INTERVAL = 1.0  # Segundos mínimos entre frames del sprite (videos cortos: menos tiles)
+
+WEBP_QUALITY = 80
+
+
+def derivative_url(name):
+    """URL de un derivado servida con caché de larga duración"""
+    return reverse('presentations:media_derivative', args=[name[len(DERIVATIVES_DIR) + 1:]])
+
+
+def _content_tag(video_path, sha256=''):
+    """Etiqueta corta que cambia cuando cambia el video"""
+    if not sha256:
+        stat = os.stat(video_path)
+        sha256 = hashlib.sha256(f'{stat.st_size}-{stat.st_mtime}'.encode()).hexdigest()
+    return sha256[:10]
+
+
+def _resize(frame, width):
+    height = max(int(round(frame.shape[0] * width / frame.shape[1] / 2)) * 2, 2)
+    return cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def _write_webp(frame, name):
+    """Escribe la imagen de forma atómica en el almacenamiento local"""
+    ok, encoded = cv2.imencode('.webp', frame, [cv2.IMWRITE_WEBP_QUALITY, WEBP_QUALITY])
+    if not ok:
+        raise IOError(f'No se pudo codificar {name} como WebP')
+    path = default_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(encoded.tobytes())
+    os.replace(tmp_path, path)
+
+
+def _read_sprite_frames(video_path, probe, count, interval):
+    """
+    Frames equiespaciados
+
+    Si hay un keyframe a menos de medio intervalo de la posición se usa ese
+    (decodificar un keyframe es barato); si no, se busca el frame exacto.
+    """
+    keyframes = (probe or {}).get('keyframes') or []
+    frames = []
+
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        for i in range(count):
+            position = (i + 0.5) * interval
+            target = int(position * fps) if fps > 0 else 0
+            keyframe = VideoProbe.nearest_keyframe(keyframes, target) if keyframes else None
+            if keyframe is not None and fps > 0 and (target - keyframe) / fps <= interval / 2:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            else:
+                cap.set(cv2.CAP_PROP_POS_MSEC, position * 1000)
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+    finally:
+        cap.release()
+    return frames
+
+
+def generate_media_derivatives(presentation_id, video_path, probe=None, sha256=''):
+    """
+    Genera las miniaturas WebP y el sprite de un video
+
+    Returns:
+        dict serializable para Presentation.media_derivatives
+
+    Raises:
+        IOError: Si no se pudo leer ningún frame del video
+    """
+    if not is_probe_current(probe, video_path):
+        probe = None  # Sondeo de otra versión del archivo: sus keyframes no valen
+    tag = _content_tag(video_path, sha256)
+    base = f'{DERIVATIVES_DIR}/{presentation_id}'
+
+    frame = read_thumbnail_frame(video_path, probe=probe)
+    if frame is None:
+        raise IOError(f'No se pudo leer el frame de la miniatura: {video_path}')
+
+    source_width = frame.shape[1]
+    widths = [w for w in THUMBNAIL_WIDTHS if w <= source_width] or [source_width]
+
+    thumbnails = []
+    for width in widths:
+        resized = _resize(frame, width) if width != source_width else frame
+        name = f'{base}/thumb_{width}_{tag}.webp'
+        _write_webp(resized, name)
+        thumbnails.append({
+            'width': width,
+            'height': resized.shape[0],
+            'name': name,
+            'url': derivative_url(name),
+        })
+
+    main = max((t for t in thumbnails if t['width'] <= DEFAULT_THUMBNAIL_WIDTH), key=lambda t: t['width'],
+               default=thumbnails[0])
+
+    data = {
+        'version': DERIVATIVES_VERSION,
+        'tag': tag,
+        'thumbnails': thumbnails,
+        'thumbnail_url': main['url'],
+        'srcset': ', '.join(f"{t['url']} {t['width']}w" for t in thumbnails),
+        'sprite': _generate_sprite(video_path, probe, base, tag),
+    }
+
+    _remove_stale(base, {t['name'] for t in thumbnails} | ({data['sprite']['name']} if data['sprite'] else set()))
+
+    logger.info(
+        f"🖼️ Derivados generados para presentación {presentation_id}: "
+        f"{len(thumbnails)} miniaturas, sprite de {data['sprite']['count'] if data['sprite'] else 0} frames"
+    )
+    return data
+
+
+def _generate_sprite(video_path, probe, base, tag):
+    """Grilla de frames equiespaciados (None si el video no tiene duración conocida)"""
+    duration = ((probe or {}).get('container') or {}).get('duration')
+    if not duration:
+        cap = cv2.VideoCapture(video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        duration = cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps if fps > 0 else 0
+        cap.release()
+    if duration <= 0:
+        return None
+
+    count = max(min(SPRITE_MAX_TILES, int(duration / SPRITE_MIN_INTERVAL)), 1)
+    interval = duration / count
+    frames = _read_sprite_frames(video_path, probe, count, interval)
+    if not frames:
+        return None
+
+    tiles = [_resize(f, SPRITE_TILE_WIDTH) for f in frames]
+    tile_height = tiles[0].shape[0]
+    columns = min(SPRITE_COLUMNS, len(tiles))
+    rows = -(-len(tiles) // columns)
+
+    sheet = np.zeros((rows * tile_height, columns * SPRITE_TILE_WIDTH, 3), dtype=np.uint8)
+    for index, tile in enumerate(tiles):
+        row, column = divmod(index, columns)
+        tile = tile[:tile_height]
+        sheet[row * tile_height:row * tile_height + tile.shape[0],
+              column * SPRITE_TILE_WIDTH:(column + 1) * SPRITE_TILE_WIDTH] = tile
+
+    name = f'{base}/sprite_{tag}.webp'
+    _write_webp(sheet, name)
+    return {
+        'name': name,
+        'url': derivative_url(name),
+        'count': len(tiles),
+        'columns': columns,
+        'rows': rows,
+        'tile_width': SPRITE_TILE_WIDTH,
+        'tile_height': tile_height,
+        'interval': round(interval, 3),
+    }
+
+
+def _remove_stale(base, keep):
+    """Borra derivados de versiones anteriores del video"""
+    directory = default_storage.path(base)
+    for entry in os.listdir(directory):
+        if f'{base}/{entry}' not in keep:
+            os.remove(os.path.join(directory, entry))
+
+
+def delete_media_derivatives(presentation_id):
+    """Borra la carpeta de derivados de una presentación"""
+    directory = default_storage.path(f'{DERIVATIVES_DIR}/{presentation_id}')
+    if os.path.isdir(directory):
+        for entry in os.listdir(directory):
+            os.remove(os.path.join(directory, entry))
+        os.rmdir(directory)
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentaciones', '0016_assignment_strictness_level'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='presentation',
+            name='group_conclusion',
+            field=models.TextField(blank=True, verbose_name='Conclusión grupal IA'),
+        ),
+        migrations.AddField(
+            model_name='presentation',
+            name='group_conclusion_signature',
+            field=models.CharField(blank=True, help_text='Hash de las calificaciones usadas para generar la conclusión grupal', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentaciones', '0017_presentation_group_conclusion_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiconfiguration',
+            name='evaluation_engine',
+            field=models.CharField(choices=[('groq', 'IA avanzada (Groq)'), ('local', 'Motor local por rúbrica (sin conexión)')], default='groq', help_text='El motor local no consume cuota de Groq; con Groq se usa como respaldo', max_length=10, verbose_name='Motor de evaluación'),
+        ),
+    ]
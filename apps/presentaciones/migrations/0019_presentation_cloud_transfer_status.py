@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentaciones', '0018_aiconfiguration_evaluation_engine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='presentation',
+            name='cloud_transfer_status',
+            field=models.CharField(blank=True, choices=[('PENDING', 'En cola'), ('UPLOADING', 'Subiendo'), ('DONE', 'Completada'), ('FAILED', 'Fallida')], help_text='Estado de la subida en segundo plano a Cloudinary', max_length=10, verbose_name='Transferencia a la nube'),
+        ),
+    ]
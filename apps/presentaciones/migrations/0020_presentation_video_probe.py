@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentaciones', '0019_presentation_cloud_transfer_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='presentation',
+            name='video_probe',
+            field=models.JSONField(blank=True, help_text='Metadatos del contenedor, streams, índice de keyframes e integridad (ver VideoProbe)', null=True, verbose_name='Sondeo del video'),
+        ),
+    ]
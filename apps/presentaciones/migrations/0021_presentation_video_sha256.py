@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentaciones', '0020_presentation_video_probe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='presentation',
+            name='video_sha256',
+            field=models.CharField(blank=True, db_index=True, help_text='Calculado mientras se recibe el archivo', max_length=64, verbose_name='SHA-256 del video'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:30
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentaciones', '0021_presentation_video_sha256'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumableUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='Nombre del archivo')),
+                ('content_type', models.CharField(blank=True, max_length=100, verbose_name='Tipo MIME')),
+                ('total_size', models.BigIntegerField(verbose_name='Tamaño total (bytes)')),
+                ('offset', models.BigIntegerField(default=0, verbose_name='Bytes recibidos')),
+                ('partial_name', models.CharField(max_length=255, verbose_name='Archivo parcial')),
+                ('sniffed_format', models.CharField(blank=True, max_length=10, verbose_name='Formato detectado')),
+                ('form_data', models.JSONField(default=dict, verbose_name='Datos del formulario')),
+                ('status', models.CharField(choices=[('ACTIVE', 'En curso'), ('COMPLETED', 'Completada'), ('EXPIRED', 'Expirada'), ('FAILED', 'Fallida')], default='ACTIVE', max_length=10, verbose_name='Estado')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Expira el')),
+                ('presentation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resumable_uploads', to='presentaciones.presentation', verbose_name='Presentación creada')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumable_uploads', to=settings.AUTH_USER_MODEL, verbose_name='Estudiante')),
+            ],
+            options={
+                'verbose_name': 'Subida reanudable',
+                'verbose_name_plural': 'Subidas reanudables',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='presentacio_status_f44896_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentaciones', '0022_resumableupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='presentation',
+            name='media_derivatives',
+            field=models.JSONField(blank=True, help_text='Miniaturas WebP en varios anchos y sprite de previsualización, con sus URLs', null=True, verbose_name='Derivados de imagen'),
+        ),
+    ]
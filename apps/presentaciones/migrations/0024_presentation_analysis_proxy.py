@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentaciones', '0023_presentation_media_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='presentation',
+            name='analysis_proxy',
+            field=models.JSONField(blank=True, help_text='Video normalizado (baja resolución, FPS constantes) y audio 16 kHz que usan las etapas de IA', null=True, verbose_name='Proxy de análisis'),
+        ),
+    ]
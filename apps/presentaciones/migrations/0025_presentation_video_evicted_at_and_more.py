@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presentaciones', '0024_presentation_analysis_proxy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='presentation',
+            name='video_evicted_at',
+            field=models.DateTimeField(blank=True, help_text='El original local se borró porque está en Cloudinary; se descarga de nuevo si se necesita', null=True, verbose_name='Original local liberado el'),
+        ),
+        migrations.AddField(
+            model_name='presentation',
+            name='video_last_accessed_at',
+            field=models.DateTimeField(blank=True, help_text='Última vez que se usó el video original local (política LRU de storage_lifecycle)', null=True, verbose_name='Último uso del original'),
+        ),
+    ]
@@ -3,10 +3,15 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 import os
+import uuid
 
 def upload_to_presentations(instance, filename):
     """Función para definir la ruta de upload de videos"""
-    return f'presentations/{instance.student.username}/{timezone.now().year}/{timezone.now().month}/{filename}'
+    return upload_to_presentations_path(instance.student.username, filename)
+
+def upload_to_presentations_path(username, filename):
+    """Ruta de un video según el estudiante (también la usa StreamingVideoUploadHandler)"""
+    return f'presentations/{username}/{timezone.now().year}/{timezone.now().month}/{filename}'
 
 class Course(models.Model):
     """Modelo para los cursos"""
@@ -97,6 +102,22 @@ class Assignment(models.Model):
     def __str__(self):
         return f"{self.course.code} - {self.title}"
     
+    def save(self, *args, **kwargs):
+        """Override save para invalidar el embedding del tema cacheado"""
+        super().save(*args, **kwargs)
+        from django.core.cache import cache
+        cache.delete_many([self.topic_embedding_cache_key, self.rubric_embedding_cache_key])
+    
+    @property
+    def topic_embedding_cache_key(self):
+        """Clave del cache del embedding del tema usado en el análisis de coherencia"""
+        return f'assignment_topic_embedding_{self.pk}'
+    
+    @property
+    def rubric_embedding_cache_key(self):
+        """Clave del cache de los embeddings de la rúbrica (motor de evaluación local)"""
+        return f'assignment_rubric_embedding_{self.pk}'
+    
     @property
     def is_expired(self):
         return timezone.now() > self.due_date
@@ -184,6 +205,18 @@ class Presentation(models.Model):
         verbose_name="Almacenado en la nube",
         help_text="Indica si el video está en Cloudinary"
     )
+    cloud_transfer_status = models.CharField(
+        max_length=10,
+        choices=[
+            ('PENDING', 'En cola'),
+            ('UPLOADING', 'Subiendo'),
+            ('DONE', 'Completada'),
+            ('FAILED', 'Fallida'),
+        ],
+        blank=True,
+        verbose_name="Transferencia a la nube",
+        help_text="Estado de la subida en segundo plano a Cloudinary"
+    )
     
     transcript = models.TextField(blank=True, verbose_name="Transcripción automática")
     
@@ -194,6 +227,43 @@ class Presentation(models.Model):
     video_height = models.IntegerField(null=True, blank=True, verbose_name="Alto del video")
     video_fps = models.FloatField(null=True, blank=True, verbose_name="FPS del video")
     file_size = models.BigIntegerField(null=True, blank=True, verbose_name="Tamaño del archivo (bytes)")
+    video_sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        verbose_name="SHA-256 del video",
+        help_text="Calculado mientras se recibe el archivo"
+    )
+    video_probe = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name="Sondeo del video",
+        help_text="Metadatos del contenedor, streams, índice de keyframes e integridad (ver VideoProbe)"
+    )
+    media_derivatives = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name="Derivados de imagen",
+        help_text="Miniaturas WebP en varios anchos y sprite de previsualización, con sus URLs"
+    )
+    analysis_proxy = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name="Proxy de análisis",
+        help_text="Video normalizado (baja resolución, FPS constantes) y audio 16 kHz que usan las etapas de IA"
+    )
+    video_last_accessed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Último uso del original",
+        help_text="Última vez que se usó el video original local (política LRU de storage_lifecycle)"
+    )
+    video_evicted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Original local liberado el",
+        help_text="El original local se borró porque está en Cloudinary; se descarga de nuevo si se necesita"
+    )
     
     # Estado y timestamps
     status = models.CharField(
@@ -324,6 +394,17 @@ class Presentation(models.Model):
         help_text="Tipo de grabación detectado"
     )
     
+    # Conclusión grupal generada por IA (se regenera solo si cambian las notas)
+    group_conclusion = models.TextField(
+        blank=True,
+        verbose_name="Conclusión grupal IA"
+    )
+    group_conclusion_signature = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="Hash de las calificaciones usadas para generar la conclusión grupal"
+    )
+    
     class Meta:
         verbose_name = 'Presentación'
         verbose_name_plural = 'Presentaciones'
@@ -355,19 +436,31 @@ class Presentation(models.Model):
     
     def get_thumbnail_url(self):
         """
-        Obtener URL de la miniatura (Cloudinary o local)
+        Obtener URL de la miniatura (derivado WebP, Cloudinary o local)
+        Solo lee URLs guardadas: no se construyen URLs en cada render
         """
-        # Si está en Cloudinary, regenerar URL de thumbnail correctamente
-        if self.is_stored_in_cloud and self.cloudinary_public_id:
-            from apps.ai_processor.services import CloudinaryService
-            # Regenerar thumbnail URL usando el método correcto
-            return CloudinaryService.get_video_thumbnail_url(self.cloudinary_public_id)
+        if self.media_derivatives and self.media_derivatives.get('thumbnail_url'):
+            return self.media_derivatives['thumbnail_url']
         elif self.cloudinary_thumbnail_url:
             return self.cloudinary_thumbnail_url
+        elif self.is_stored_in_cloud and self.cloudinary_public_id:
+            # Videos subidos antes de guardar la URL de la miniatura
+            from apps.ai_processor.services import CloudinaryService
+            return CloudinaryService.get_video_thumbnail_url(self.cloudinary_public_id)
         elif self.video_thumbnail:
             return self.video_thumbnail.url
         return None
     
+    @property
+    def thumbnail_srcset(self):
+        """srcset con las miniaturas WebP en todos los anchos generados"""
+        return (self.media_derivatives or {}).get('srcset', '')
+    
+    @property
+    def sprite_sheet(self):
+        """Datos del sprite de previsualización (url, grilla y segundos por frame) o None"""
+        return (self.media_derivatives or {}).get('sprite')
+    
     def upload_to_cloudinary(self):
         """
         Subir video a Cloudinary si no está ya subido
@@ -389,29 +482,17 @@ class Presentation(models.Model):
         try:
             logger.info(f"Subiendo video a Cloudinary: {self.title}")
             
-            # Crear carpeta específica para el estudiante
-            folder = f'presentations/{self.student.username}'
+            folder, public_id = self.cloudinary_upload_target()
             
             # Subir video
             result = CloudinaryService.upload_video(
                 self.video_file.path,
                 folder=folder,
-                public_id=f"{self.id}_{self.title[:50]}"  # ID único
+                public_id=public_id
             )
             
             if result:
-                # Guardar información de Cloudinary
-                self.cloudinary_public_id = result['public_id']
-                self.cloudinary_url = result['secure_url']
-                self.is_stored_in_cloud = True
-                
-                # Generar URL de miniatura automática usando el servicio de Cloudinary
-                self.cloudinary_thumbnail_url = CloudinaryService.get_video_thumbnail_url(
-                    result['public_id']
-                )
-                
-                self.save(update_fields=['cloudinary_public_id', 'cloudinary_url', 
-                                        'cloudinary_thumbnail_url', 'is_stored_in_cloud'])
+                self.apply_cloudinary_result(result)
                 
                 logger.info(f"✅ Video subido a Cloudinary: {result['public_id']}")
                 return result
@@ -423,6 +504,160 @@ class Presentation(models.Model):
             logger.error(f"Error en upload_to_cloudinary: {e}")
             return None
     
+    def ensure_video_probe(self):
+        """
+        Sondeo del video local, reutilizando el guardado si sigue vigente
+        Returns: dict del sondeo o None si no hay archivo local legible
+        """
+        from .video_probe import VideoProbe, is_probe_current
+        import logging
+        import os
+        
+        if not self.video_file:
+            return None
+        
+        try:
+            video_path = self.video_file.path
+        except NotImplementedError:
+            return None  # Almacenamiento remoto: no hay archivo local
+        
+        if not os.path.exists(video_path):
+            return None
+        
+        if is_probe_current(self.video_probe, video_path):
+            return self.video_probe
+        
+        try:
+            self.video_probe = VideoProbe.run(video_path).data
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"⚠️ No se pudo sondear el video: {e}")
+            return None
+        
+        if self.pk:
+            type(self).objects.filter(pk=self.pk).update(video_probe=self.video_probe)
+        return self.video_probe
+    
+    def generate_media_derivatives(self):
+        """
+        Genera las miniaturas WebP y el sprite a partir del video local
+        Returns: dict guardado en media_derivatives o None si no se pudo
+        """
+        from .media_derivatives import generate_media_derivatives
+        import logging
+        import os
+        
+        if not self.video_file:
+            return None
+        
+        try:
+            video_path = self.video_file.path
+        except NotImplementedError:
+            return None  # Almacenamiento remoto: no hay archivo local
+        
+        if not os.path.exists(video_path):
+            return None
+        
+        try:
+            self.media_derivatives = generate_media_derivatives(
+                self.pk, video_path, probe=self.ensure_video_probe(), sha256=self.video_sha256
+            )
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"⚠️ No se pudieron generar los derivados del video: {e}")
+            return None
+        
+        if self.pk:
+            type(self).objects.filter(pk=self.pk).update(media_derivatives=self.media_derivatives)
+        return self.media_derivatives
+    
+    def ensure_analysis_proxy(self):
+        """
+        Proxy de análisis del video local, reutilizando el guardado si sigue vigente
+        Returns: dict del proxy o None si no se pudo generar (las etapas usan el original)
+        """
+        from .analysis_proxy import build_analysis_proxy, get_config, is_proxy_current
+        import logging
+        import os
+        
+        if not self.video_file or not get_config()['enabled']:
+            return None
+        
+        try:
+            video_path = self.video_file.path
+        except NotImplementedError:
+            return None  # Almacenamiento remoto: no hay archivo local
+        
+        if not os.path.exists(video_path):
+            return None
+        
+        if is_proxy_current(self.analysis_proxy, video_path):
+            return self.analysis_proxy
+        
+        try:
+            self.analysis_proxy = build_analysis_proxy(self.pk, video_path)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"⚠️ No se pudo generar el proxy de análisis: {e}")
+            return None
+        
+        if self.pk:
+            type(self).objects.filter(pk=self.pk).update(analysis_proxy=self.analysis_proxy)
+        return self.analysis_proxy
+    
+    def ensure_local_video(self):
+        """
+        Ruta del video original local, descargándolo de Cloudinary si se liberó
+        (storage_lifecycle) y registrando el uso para la política LRU
+        Returns: ruta local o None si no hay archivo local ni copia en la nube
+        """
+        from django.utils import timezone
+        from .storage_lifecycle import rehydrate
+        import logging
+        import os
+        
+        if not self.video_file:
+            return None
+        
+        try:
+            video_path = self.video_file.path
+        except NotImplementedError:
+            return None  # Almacenamiento remoto: no hay archivo local
+        
+        if os.path.exists(video_path):
+            self.video_last_accessed_at = timezone.now()
+            if self.pk:
+                type(self).objects.filter(pk=self.pk).update(video_last_accessed_at=self.video_last_accessed_at)
+            return video_path
+        
+        if not (self.is_stored_in_cloud and self.cloudinary_url):
+            return None
+        
+        try:
+            return rehydrate(self)
+        except Exception as e:
+            logging.getLogger(__name__).error(f"❌ No se pudo descargar el original desde Cloudinary: {e}")
+            return None
+    
+    def cloudinary_upload_target(self):
+        """Carpeta (una por estudiante) y public_id único del video en Cloudinary"""
+        return f'presentations/{self.student.username}', f"{self.id}_{self.title[:50]}"
+    
+    def apply_cloudinary_result(self, result):
+        """Guardar la información de un video ya subido a Cloudinary"""
+        from apps.ai_processor.services import CloudinaryService
+        
+        self.cloudinary_public_id = result['public_id']
+        self.cloudinary_url = result['secure_url']
+        self.is_stored_in_cloud = True
+        self.cloud_transfer_status = 'DONE'
+        
+        # Generar URL de miniatura automática usando el servicio de Cloudinary
+        self.cloudinary_thumbnail_url = CloudinaryService.get_video_thumbnail_url(
+            result['public_id']
+        )
+        
+        self.save(update_fields=['cloudinary_public_id', 'cloudinary_url', 
+                                'cloudinary_thumbnail_url', 'is_stored_in_cloud',
+                                'cloud_transfer_status'])
+    
     def delete_from_cloudinary(self):
         """
         Eliminar video de Cloudinary
@@ -495,6 +730,21 @@ class Presentation(models.Model):
         }
         return status_classes.get(self.status, 'bg-secondary')
     
+    @property
+    def video_size(self):
+        """
+        Tamaño del video en bytes (el guardado al subir; el original local
+        puede haberse liberado por storage_lifecycle)
+        """
+        if self.file_size:
+            return self.file_size
+        if self.video_file and not self.video_evicted_at:
+            try:
+                return self.video_file.size
+            except (OSError, NotImplementedError):
+                return None
+        return None
+    
     @property
     def file_size_mb(self):
         """Devuelve el tamaño del archivo en MB"""
@@ -544,8 +794,83 @@ class Presentation(models.Model):
             except Exception as e:
                 logger.error(f"Error eliminando miniatura: {e}")
         
+        # Eliminar miniaturas WebP y sprite
+        if self.media_derivatives:
+            try:
+                from .media_derivatives import delete_media_derivatives
+                delete_media_derivatives(self.pk)
+            except Exception as e:
+                logger.error(f"Error eliminando derivados: {e}")
+        
+        # Eliminar proxy de análisis
+        if self.analysis_proxy:
+            try:
+                from .analysis_proxy import delete_analysis_proxy
+                delete_analysis_proxy(self.pk)
+            except Exception as e:
+                logger.error(f"Error eliminando proxy de análisis: {e}")
+        
         super().delete(*args, **kwargs)
 
+class ResumableUpload(models.Model):
+    """
+    Subida reanudable de un video (protocolo por offsets, ver resumable_uploads.py)
+    
+    Los bytes se acumulan en partial_name; al completarse el archivo se mueve a
+    la ruta definitiva y se crea la Presentation con los datos del formulario.
+    """
+    STATUS_CHOICES = [
+        ('ACTIVE', 'En curso'),
+        ('COMPLETED', 'Completada'),
+        ('EXPIRED', 'Expirada'),
+        ('FAILED', 'Fallida'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    student = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='resumable_uploads',
+        verbose_name="Estudiante"
+    )
+    filename = models.CharField(max_length=255, verbose_name="Nombre del archivo")
+    content_type = models.CharField(max_length=100, blank=True, verbose_name="Tipo MIME")
+    total_size = models.BigIntegerField(verbose_name="Tamaño total (bytes)")
+    offset = models.BigIntegerField(default=0, verbose_name="Bytes recibidos")
+    partial_name = models.CharField(max_length=255, verbose_name="Archivo parcial")
+    sniffed_format = models.CharField(max_length=10, blank=True, verbose_name="Formato detectado")
+    form_data = models.JSONField(default=dict, verbose_name="Datos del formulario")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='ACTIVE', verbose_name="Estado")
+    error = models.TextField(blank=True, verbose_name="Error")
+    presentation = models.ForeignKey(
+        Presentation,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='resumable_uploads',
+        verbose_name="Presentación creada"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Expira el")
+    
+    class Meta:
+        verbose_name = "Subida reanudable"
+        verbose_name_plural = "Subidas reanudables"
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'expires_at'])]
+    
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.total_size}) - {self.get_status_display()}"
+    
+    @property
+    def is_complete(self):
+        return self.offset >= self.total_size
+    
+    @property
+    def progress_percent(self):
+        return round(self.offset * 100 / self.total_size, 1) if self.total_size else 0
+
 class AIAnalysis(models.Model):
     """Modelo para almacenar análisis detallados de IA"""
     presentation = models.OneToOneField(
@@ -954,6 +1279,11 @@ class AIConfiguration(models.Model):
         ('lenient', 'Suave'),
     ]
     
+    EVALUATION_ENGINES = [
+        ('groq', 'IA avanzada (Groq)'),
+        ('local', 'Motor local por rúbrica (sin conexión)'),
+    ]
+    
     teacher = models.OneToOneField(
         User,
         on_delete=models.CASCADE,
@@ -984,6 +1314,15 @@ class AIConfiguration(models.Model):
         verbose_name="Temperatura del modelo"
     )
     
+    # Motor de evaluación de coherencia
+    evaluation_engine = models.CharField(
+        max_length=10,
+        choices=EVALUATION_ENGINES,
+        default='groq',
+        verbose_name="Motor de evaluación",
+        help_text="El motor local no consume cuota de Groq; con Groq se usa como respaldo"
+    )
+    
     # Configuración de detección facial
     face_detection_confidence = models.FloatField(
         default=0.7,
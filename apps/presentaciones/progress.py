@@ -0,0 +1,163 @@
+# apps/presentaciones/progress.py
+"""
+Progreso del análisis de presentaciones (pub/sub en proceso)
+
+Los productores (AIService, tareas en segundo plano) publican el estado con
+publish_progress(); se guarda en el cache (para otros procesos y para el
+endpoint de consulta) y se notifica a los suscriptores del stream SSE.
+
+Cada suscriptor solo guarda una bandera de "hay cambios": si llegan varias
+actualizaciones antes de que el cliente lea, recibe únicamente la última
+(coalescencia por presentación).
+
+Hay dos formas de escuchar: listen() (asíncrona, bajo ASGI cada cliente
+espera en el event loop) y listen_sync() (generador normal para WSGI, donde
+un stream asíncrono se acumularía entero en memoria antes de enviarse). Bajo
+WSGI cada cliente ocupa un hilo del worker, por eso su duración es corta y el
+cliente se reconecta.
+"""
+import asyncio
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_TIMEOUT = 3600  # Segundos que el progreso permanece en cache
+TERMINAL_STATUSES = {'ANALYZED', 'FAILED', 'GRADED'}
+KEEPALIVE_SECONDS = 5  # El cliente pasa a polling si no recibe nada en ~3 keepalives
+
+
+def progress_cache_key(presentation_id):
+    """Clave del cache con el último progreso de la presentación"""
+    return f'presentation_progress_{presentation_id}'
+
+
+def is_finished(data):
+    """True si el progreso corresponde a un análisis terminado (con éxito o no)"""
+    return bool(data) and (data.get('status') in TERMINAL_STATUSES or data.get('progress', 0) >= 100)
+
+
+class ProgressBroker:
+    """
+    Distribuye el progreso de cada presentación a los streams abiertos.
+
+    publish() puede llamarse desde cualquier hilo; los suscriptores son
+    corrutinas que se despiertan en su propio event loop o hilos que esperan
+    un threading.Event (loop None).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # presentation_id -> set de (loop o None, Event)
+
+    def publish(self, presentation_id, data):
+        """Guarda el progreso y despierta a los suscriptores de la presentación"""
+        cache.set(progress_cache_key(presentation_id), data, timeout=PROGRESS_TIMEOUT)
+
+        with self._lock:
+            subscribers = list(self._subscribers.get(presentation_id, ()))
+
+        for loop, event in subscribers:
+            if loop is None:
+                event.set()
+                continue
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # El loop del suscriptor ya se cerró
+
+    async def snapshot(self, presentation_id):
+        """Último progreso publicado (el cache es la fuente de verdad)"""
+        return await cache.aget(progress_cache_key(presentation_id))
+
+    async def listen(self, presentation_id, initial=None, keepalive=KEEPALIVE_SECONDS, max_duration=600):
+        """
+        Generador asíncrono con los cambios de progreso de la presentación.
+
+        Emite None cada `keepalive` segundos sin cambios (para mantener viva la
+        conexión). En ese momento también revisa el cache, por si el análisis
+        corre en otro proceso y no hubo aviso en este. Termina cuando el análisis finaliza o tras
+        `max_duration` segundos (el cliente se reconecta).
+        """
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        subscriber = (loop, event)
+        with self._lock:
+            self._subscribers.setdefault(presentation_id, set()).add(subscriber)
+
+        deadline = loop.time() + max_duration
+        last_sent = None
+        try:
+            while True:
+                event.clear()
+                data = await self.snapshot(presentation_id) or initial
+                if data is not None and data != last_sent:
+                    last_sent = data
+                    yield data
+                    if is_finished(data):
+                        return
+                else:
+                    yield None
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=min(keepalive, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._unsubscribe(presentation_id, subscriber)
+
+    def listen_sync(self, presentation_id, initial=None, keepalive=KEEPALIVE_SECONDS, max_duration=60):
+        """
+        Versión síncrona de listen() para servidores WSGI
+
+        Mismo protocolo (None = keepalive). Cada cliente ocupa un hilo del
+        worker mientras dure, por eso max_duration es corto: el cliente se
+        reconecta solo (retry del stream SSE).
+        """
+        event = threading.Event()
+        subscriber = (None, event)
+        with self._lock:
+            self._subscribers.setdefault(presentation_id, set()).add(subscriber)
+
+        deadline = time.monotonic() + max_duration
+        last_sent = None
+        try:
+            while True:
+                event.clear()
+                data = cache.get(progress_cache_key(presentation_id)) or initial
+                if data is not None and data != last_sent:
+                    last_sent = data
+                    yield data
+                    if is_finished(data):
+                        return
+                else:
+                    yield None
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                event.wait(timeout=min(keepalive, remaining))
+        finally:
+            self._unsubscribe(presentation_id, subscriber)
+
+    def _unsubscribe(self, presentation_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(presentation_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[presentation_id]
+
+
+broker = ProgressBroker()
+
+
+def publish_progress(presentation_id, data):
+    """Publica el progreso del análisis de una presentación"""
+    broker.publish(presentation_id, data)
@@ -0,0 +1,310 @@
+# apps/presentaciones/resumable_uploads.py
+"""
+Subidas reanudables de videos (protocolo por offsets, similar a tus)
+
+Flujo:
+    1. POST   api/uploads/                 -> crea la subida (valida el formulario)
+    2. PATCH  api/uploads/<id>/            -> envía bytes desde Upload-Offset
+       HEAD   api/uploads/<id>/            -> consulta el offset tras un corte
+    3. POST   api/uploads/<id>/complete/   -> ensambla el archivo y crea la Presentation
+
+Los bytes se escriben en un archivo parcial de MEDIA_ROOT/uploads_partial. Si
+la conexión se corta a mitad de un chunk, lo recibido hasta ese momento se
+conserva y el cliente continúa desde el offset que devuelve el servidor.
+
+Al completar, el archivo parcial se mueve (sin copiarlo) a la ruta definitiva
+del video y se entrega como StreamedVideoFile, el mismo objeto que produce
+StreamingVideoUploadHandler, así el formulario y la vista de subida lo tratan
+igual que a una subida normal.
+
+Las subidas sin actividad durante expiry_hours se marcan como expiradas y se
+borra su archivo parcial (comando cleanup_resumable_uploads o al crear otra).
+"""
+import hashlib
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import ResumableUpload, upload_to_presentations_path
+from .upload_handlers import SNIFF_BYTES, StreamedVideoFile, sniff_video_format
+from .validators import VideoValidator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'chunk_size': 8 * 1024 * 1024,        # Tamaño sugerido al cliente
+    'max_chunk_size': 64 * 1024 * 1024,   # Máximo aceptado por petición
+    'expiry_hours': 24,                   # Sin actividad durante este tiempo: expira
+    'max_active_per_student': 3,
+    'partial_dir': 'uploads_partial',
+}
+
+READ_BLOCK_SIZE = 1024 * 1024  # Lectura del cuerpo de la petición por bloques (memoria acotada)
+
+
+class ResumableUploadError(Exception):
+    """
+    Error del protocolo de subida reanudable
+
+    Atributos:
+        status: código HTTP de la respuesta
+        offset: offset actual del servidor (para que el cliente se resincronice)
+    """
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.offset = offset
+
+
+def get_config():
+    """Configuración de settings.RESUMABLE_UPLOADS con valores por defecto"""
+    return {**DEFAULT_CONFIG, **getattr(settings, 'RESUMABLE_UPLOADS', {})}
+
+
+def partial_path(upload):
+    return default_storage.path(upload.partial_name)
+
+
+def create_upload(user, filename, total_size, content_type='', form_data=None):
+    """
+    Crea una subida reanudable (o retoma la que el estudiante dejó a medias
+    para el mismo archivo y asignación)
+
+    Returns:
+        ResumableUpload
+
+    Raises:
+        ResumableUploadError: Formato, tamaño o límite de subidas no válidos
+    """
+    config = get_config()
+    form_data = form_data or {}
+
+    extension = os.path.splitext(filename)[1].lstrip('.').lower()
+    if extension not in VideoValidator.ALLOWED_FORMATS:
+        raise ResumableUploadError(
+            f'❌ Formato de video no permitido: {extension}. '
+            f'Formatos aceptados: {", ".join(VideoValidator.ALLOWED_FORMATS)}'
+        )
+    if total_size < VideoValidator.MIN_FILE_SIZE:
+        raise ResumableUploadError(
+            f'❌ El archivo es demasiado pequeño ({total_size / 1024:.1f} KB). '
+            f'Tamaño mínimo: {VideoValidator.MIN_FILE_SIZE / 1024:.0f} KB'
+        )
+    if total_size > VideoValidator.MAX_FILE_SIZE:
+        max_mb = VideoValidator.MAX_FILE_SIZE / (1024 * 1024)
+        raise ResumableUploadError(
+            f'❌ El archivo es demasiado grande. Tamaño máximo permitido: {max_mb:.0f} MB', status=413
+        )
+
+    expire_abandoned()
+
+    # Mismo archivo y asignación que una subida en curso: se continúa esa
+    existing = ResumableUpload.objects.filter(
+        student=user,
+        status='ACTIVE',
+        filename=filename,
+        total_size=total_size,
+        form_data__assignment=form_data.get('assignment'),
+    ).first()
+    if existing and os.path.exists(partial_path(existing)):
+        existing.form_data = form_data
+        existing.expires_at = timezone.now() + timedelta(hours=config['expiry_hours'])
+        existing.save(update_fields=['form_data', 'expires_at', 'updated_at'])
+        logger.info(f"🔁 Subida reanudable retomada: {existing.id} ({existing.offset}/{total_size} bytes)")
+        return existing
+
+    active = ResumableUpload.objects.filter(student=user, status='ACTIVE').count()
+    if active >= config['max_active_per_student']:
+        raise ResumableUploadError(
+            '❌ Tienes demasiadas subidas en curso. Espera a que terminen o cancélalas.', status=429
+        )
+
+    upload = ResumableUpload(
+        student=user,
+        filename=os.path.basename(filename)[:255],
+        content_type=content_type[:100],
+        total_size=total_size,
+        form_data=form_data,
+        expires_at=timezone.now() + timedelta(hours=config['expiry_hours']),
+    )
+    upload.partial_name = f"{config['partial_dir']}/{upload.id}.part"
+    path = partial_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'xb').close()
+    upload.save()
+
+    logger.info(
+        f"📤 Subida reanudable creada: {upload.id} ({filename}, {total_size / (1024 * 1024):.1f} MB)"
+    )
+    return upload
+
+
+def write_chunk(upload, offset, stream, length):
+    """
+    Escribe length bytes de stream a partir de offset
+
+    Si la lectura se interrumpe (corte de red), se conservan los bytes
+    recibidos y el offset avanza hasta ahí.
+
+    Returns:
+        Nuevo offset
+
+    Raises:
+        ResumableUploadError: Offset distinto al del servidor (409), chunk
+            demasiado grande (413), contenido no reconocido (415) o subida
+            no activa (404/410)
+    """
+    config = get_config()
+
+    if upload.status != 'ACTIVE':
+        raise ResumableUploadError('La subida ya no está activa.', status=410, offset=upload.offset)
+    if offset != upload.offset:
+        raise ResumableUploadError(
+            f'Offset incorrecto: el servidor tiene {upload.offset} bytes.', status=409, offset=upload.offset
+        )
+    if length > config['max_chunk_size']:
+        raise ResumableUploadError('Chunk demasiado grande.', status=413, offset=upload.offset)
+    if offset + length > upload.total_size:
+        raise ResumableUploadError('El chunk excede el tamaño declarado.', status=413, offset=upload.offset)
+
+    path = partial_path(upload)
+    if not os.path.exists(path):
+        mark_failed(upload, 'El archivo parcial ya no existe')
+        raise ResumableUploadError('La subida ya no está disponible.', status=410)
+
+    written = 0
+    interrupted = None
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        while written < length:
+            try:
+                data = stream.read(min(READ_BLOCK_SIZE, length - written))
+            except OSError as e:
+                interrupted = e  # Cliente desconectado: se guarda lo recibido
+                break
+            if not data:
+                break
+            f.write(data)
+            written += len(data)
+
+    new_offset = offset + written
+    updated = ResumableUpload.objects.filter(pk=upload.pk, status='ACTIVE', offset=offset).update(
+        offset=new_offset,
+        expires_at=timezone.now() + timedelta(hours=config['expiry_hours']),
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        # Otra petición avanzó la subida mientras se escribía este chunk
+        upload.refresh_from_db(fields=['offset', 'status'])
+        raise ResumableUploadError('Subida modificada por otra petición.', status=409, offset=upload.offset)
+    upload.offset = new_offset
+
+    if interrupted:
+        logger.warning(f"⚠️ Chunk interrumpido en {upload.id}: {written} de {length} bytes guardados ({interrupted})")
+
+    # Cabecera del contenedor: se rechaza pronto lo que no es un video
+    if not upload.sniffed_format and new_offset >= min(SNIFF_BYTES, upload.total_size):
+        with open(path, 'rb') as f:
+            sniffed = sniff_video_format(f.read(SNIFF_BYTES))
+        if sniffed is None:
+            mark_failed(upload, 'Contenido no reconocido')
+            raise ResumableUploadError('❌ El archivo no es un video válido (contenido no reconocido).', status=415)
+        upload.sniffed_format = sniffed
+        ResumableUpload.objects.filter(pk=upload.pk).update(sniffed_format=sniffed)
+
+    return new_offset
+
+
+def claim_for_assembly(upload):
+    """
+    Marca la subida como completada si recibió todos los bytes (una sola
+    petición de completar gana aunque el cliente la repita)
+
+    Returns:
+        True si esta petición debe ensamblar el archivo
+    """
+    if not upload.is_complete:
+        return False
+    claimed = ResumableUpload.objects.filter(
+        pk=upload.pk, status='ACTIVE', offset=upload.total_size
+    ).update(status='COMPLETED', updated_at=timezone.now())
+    if claimed:
+        upload.status = 'COMPLETED'
+    return bool(claimed)
+
+
+def assemble(upload):
+    """
+    Mueve el archivo parcial a la ruta definitiva del video
+
+    Returns:
+        StreamedVideoFile listo para PresentationUploadForm (se elimina al
+        cerrarlo si ninguna presentación lo adopta)
+    """
+    source = partial_path(upload)
+    if os.path.getsize(source) > upload.total_size:
+        os.truncate(source, upload.total_size)
+
+    sha256 = hashlib.sha256()
+    with open(source, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BLOCK_SIZE), b''):
+            sha256.update(block)
+
+    # Mismo esquema de nombres que Presentation.video_file; os.link no
+    # sobrescribe si otra subida tomó el nombre entre medio
+    name = default_storage.generate_filename(upload_to_presentations_path(upload.student.username, upload.filename))
+    while True:
+        name = default_storage.get_available_name(name)
+        target = default_storage.path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(source, target)
+            break
+        except FileExistsError:
+            continue
+    os.remove(source)
+
+    logger.info(f"🧩 Subida reanudable ensamblada: {upload.id} -> {name}")
+    return StreamedVideoFile(
+        open(target, 'rb'),
+        storage_name=name,
+        name=os.path.basename(name),
+        content_type=upload.content_type,
+        size=upload.total_size,
+        charset=None,
+        sha256=sha256.hexdigest(),
+        sniffed_format=upload.sniffed_format or None,
+    )
+
+
+def mark_failed(upload, error, status='FAILED'):
+    """Marca la subida como terminada sin éxito y borra el archivo parcial"""
+    path = partial_path(upload)
+    if os.path.exists(path):
+        os.remove(path)
+    upload.status = status
+    upload.error = error
+    upload.save(update_fields=['status', 'error', 'updated_at'])
+
+
+def expire_abandoned(now=None):
+    """
+    Expira las subidas activas sin actividad reciente
+
+    Returns:
+        int: Subidas expiradas
+    """
+    now = now or timezone.now()
+    expired = 0
+    for upload in ResumableUpload.objects.filter(status='ACTIVE', expires_at__lt=now):
+        mark_failed(upload, 'Subida abandonada', status='EXPIRED')
+        expired += 1
+    if expired:
+        logger.info(f"🗑️ Subidas reanudables expiradas: {expired}")
+    return expired
@@ -0,0 +1,362 @@
+# apps/presentaciones/storage_lifecycle.py
+"""
+Ciclo de vida de los videos originales en el disco local
+
+Cuando un video ya está en Cloudinary y el análisis dejó sus artefactos
+locales (proxy de análisis, miniaturas), el original en MEDIA_ROOT solo se
+necesita para un reanálisis. Este módulo libera esos originales:
+
+- Por antigüedad: originales sin uso durante max_idle_days.
+- Por espacio: si el disco supera high_watermark, se liberan los usados hace
+  más tiempo (LRU) hasta bajar de low_watermark.
+
+Antes de borrar un original se comprueba que la copia de Cloudinary existe y
+tiene el mismo tamaño. El último uso (video_last_accessed_at) se actualiza
+cada vez que algo pide el original con Presentation.ensure_local_video().
+
+Si un reanálisis necesita un original liberado, ensure_local_video() lo
+descarga por streaming desde Cloudinary a su ruta original (que actúa como
+caché local: vuelve a quedar sujeta a estas mismas políticas). Se restaura
+su fecha de modificación para que el sondeo y el proxy guardados sigan
+vigentes.
+
+Se ejecuta con el comando manage_video_storage o, cada
+in_process_interval_minutes, desde el worker de transferencias a Cloudinary.
+Los videos analizados antes de existir el proxy no se liberan hasta generarlo
+(comando build_analysis_proxies).
+"""
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .analysis_proxy import is_proxy_current
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'max_idle_days': 30,                 # Política por antigüedad (0 la desactiva)
+    'min_idle_hours': 24,                # Nunca se libera un original usado hace menos
+    'high_watermark': 0.85,              # Uso del disco que activa la liberación LRU
+    'low_watermark': 0.75,               # Se libera hasta bajar de este uso
+    'verify_cloud': True,                # Comprobar la copia en Cloudinary antes de borrar
+    'in_process_interval_minutes': 60,   # 0: solo con el comando manage_video_storage
+    'download_timeout': 60,              # Segundos sin recibir datos al rehidratar
+    'rehydrate_wait_seconds': 900,       # Espera máxima a una rehidratación de otro proceso
+}
+
+# Estados en los que el análisis terminó (el original ya no se está leyendo)
+EVICTABLE_STATUSES = ('ANALYZED', 'GRADED', 'FAILED', 'REJECTED')
+
+DOWNLOAD_BLOCK_SIZE = 1024 * 1024
+RUN_CACHE_KEY = 'storage_lifecycle:last_run'
+
+_rehydrate_locks = {}
+_rehydrate_locks_guard = threading.Lock()
+
+
+def get_config():
+    """Configuración de settings.STORAGE_LIFECYCLE con valores por defecto"""
+    return {**DEFAULT_CONFIG, **getattr(settings, 'STORAGE_LIFECYCLE', {})}
+
+
+def disk_usage():
+    """Fracción usada del disco de MEDIA_ROOT"""
+    usage = shutil.disk_usage(settings.MEDIA_ROOT)
+    return usage.used / usage.total if usage.total else 0
+
+
+def _candidates():
+    """Presentaciones con original local y copia en Cloudinary, de la menos a la más usada recientemente"""
+    from .models import Presentation
+
+    return Presentation.objects.filter(
+        is_stored_in_cloud=True,
+        video_evicted_at__isnull=True,
+        status__in=EVICTABLE_STATUSES,
+    ).exclude(
+        cloudinary_public_id__isnull=True
+    ).exclude(
+        cloudinary_public_id=''
+    ).exclude(
+        video_file=''
+    ).exclude(
+        video_file__isnull=True
+    ).annotate(
+        last_used_at=Coalesce('video_last_accessed_at', 'uploaded_at', 'created_at')
+    ).order_by(F('last_used_at').asc(), 'id')
+
+
+def check_evictable(presentation, verify_cloud=True):
+    """
+    Motivo por el que no se puede liberar el original (None si se puede)
+    """
+    from apps.ai_processor.services import CloudinaryService
+
+    try:
+        video_path = presentation.video_file.path
+    except NotImplementedError:
+        return 'almacenamiento sin rutas locales'
+    if not os.path.exists(video_path):
+        return 'no hay archivo local'
+    if not is_proxy_current(presentation.analysis_proxy, video_path):
+        return 'sin proxy de análisis vigente'
+
+    if verify_cloud:
+        info = CloudinaryService.get_file_info(presentation.cloudinary_public_id)
+        if not info:
+            return 'copia en Cloudinary no encontrada'
+        if info.get('size') != os.path.getsize(video_path):
+            return f"tamaño en Cloudinary distinto ({info.get('size')} bytes)"
+    return None
+
+
+def evict(presentation, cutoff, dry_run=False):
+    """
+    Borra el original local de una presentación
+
+    Args:
+        cutoff: El original solo se borra si no se usó después de este momento
+
+    Returns:
+        Bytes liberados (0 si otro proceso lo liberó, lo rehidrató o empezó
+        a usarlo después de elegirlo)
+    """
+    video_path = presentation.video_file.path
+    size = os.path.getsize(video_path)
+    if dry_run:
+        return size
+
+    # La marca primero: ensure_local_video() ve el original como liberado y lo
+    # rehidrata. Las condiciones se repiten en el mismo UPDATE: un reanálisis
+    # que empezó después de elegir los candidatos (estado PROCESSING, último
+    # uso renovado) conserva su original
+    marked = type(presentation).objects.filter(
+        Q(video_last_accessed_at__isnull=True) | Q(video_last_accessed_at__lte=cutoff),
+        pk=presentation.pk,
+        video_evicted_at__isnull=True,
+        status__in=EVICTABLE_STATUSES,
+    ).update(video_evicted_at=timezone.now())
+    if not marked:
+        return 0
+
+    os.remove(video_path)
+    presentation.video_evicted_at = timezone.now()
+    logger.info(
+        f"🧹 Original local liberado: presentación {presentation.pk} "
+        f"({size / (1024 * 1024):.1f} MB, copia en {presentation.cloudinary_public_id})"
+    )
+    return size
+
+
+def run(dry_run=False, config=None, now=None):
+    """
+    Aplica las políticas de antigüedad y de espacio
+
+    Returns:
+        dict con originales liberados por política, bytes liberados, omitidos
+        (id -> motivo) y uso del disco antes y después
+    """
+    config = {**get_config(), **(config or {})}
+    now = now or timezone.now()
+
+    report = {
+        'evicted_age': [],
+        'evicted_watermark': [],
+        'freed_bytes': 0,
+        'skipped': {},
+        'usage_before': disk_usage(),
+    }
+    total = shutil.disk_usage(settings.MEDIA_ROOT).total
+    usage = report['usage_before']
+
+    def try_evict(presentation, policy, cutoff):
+        nonlocal usage
+        reason = check_evictable(presentation, verify_cloud=config['verify_cloud'])
+        if reason:
+            report['skipped'][presentation.pk] = reason
+            return
+        try:
+            freed = evict(presentation, cutoff, dry_run=dry_run)
+        except OSError as e:
+            report['skipped'][presentation.pk] = str(e)
+            return
+        if freed:
+            report[policy].append(presentation.pk)
+            report['freed_bytes'] += freed
+            usage = usage - freed / total if dry_run else disk_usage()
+
+    # 1. Antigüedad
+    if config['max_idle_days']:
+        cutoff = now - timedelta(days=config['max_idle_days'])
+        for presentation in _candidates().filter(last_used_at__lt=cutoff):
+            try_evict(presentation, 'evicted_age', cutoff)
+
+    # 2. Espacio (LRU): solo si el disco supera el umbral alto
+    if usage > config['high_watermark']:
+        logger.warning(
+            f"💾 Disco al {usage:.0%} (umbral {config['high_watermark']:.0%}): liberando originales por LRU"
+        )
+        cutoff = now - timedelta(hours=config['min_idle_hours'])
+        for presentation in _candidates().filter(last_used_at__lt=cutoff):
+            if usage <= config['low_watermark']:
+                break
+            if presentation.pk in report['skipped'] or presentation.pk in report['evicted_age']:
+                continue
+            try_evict(presentation, 'evicted_watermark', cutoff)
+
+    report['usage_after'] = usage
+    evicted = len(report['evicted_age']) + len(report['evicted_watermark'])
+    if evicted:
+        logger.info(
+            f"🧹 Ciclo de almacenamiento{' (simulado)' if dry_run else ''}: {evicted} originales, "
+            f"{report['freed_bytes'] / (1024 * 1024):.1f} MB liberados, disco {report['usage_before']:.0%} → {usage:.0%}"
+        )
+    return report
+
+
+def run_if_due():
+    """
+    Ejecuta run() si pasaron in_process_interval_minutes desde la última vez
+    (llamado desde el worker de transferencias a Cloudinary; no crítico)
+    """
+    interval = get_config()['in_process_interval_minutes']
+    if not interval or not cache.add(RUN_CACHE_KEY, time.time(), timeout=interval * 60):
+        return None
+    try:
+        return run()
+    except Exception as e:
+        logger.error(f"❌ Error en el ciclo de almacenamiento: {e}")
+        return None
+
+
+def _lock_for(presentation_id):
+    with _rehydrate_locks_guard:
+        return _rehydrate_locks.setdefault(presentation_id, threading.Lock())
+
+
+def rehydrate(presentation):
+    """
+    Descarga por streaming el original desde Cloudinary a su ruta local
+
+    Se verifica el tamaño (y el SHA-256 si se calculó al subir) antes de
+    dejar el archivo en su ruta definitiva.
+
+    Returns:
+        Ruta local del video
+
+    Raises:
+        IOError: Sin copia en Cloudinary, descarga fallida o contenido distinto
+    """
+    from apps.ai_processor.services.chunked_upload import get_session
+
+    config = get_config()
+    video_path = presentation.video_file.path
+
+    with _lock_for(presentation.pk):
+        if os.path.exists(video_path):
+            return video_path
+        if not (presentation.is_stored_in_cloud and presentation.cloudinary_url):
+            raise IOError(f"El video de la presentación {presentation.pk} no está en Cloudinary")
+
+        tmp_path = f'{video_path}.rehydrate'
+        os.makedirs(os.path.dirname(video_path), exist_ok=True)
+        try:
+            tmp = open(tmp_path, 'xb')
+        except FileExistsError:
+            # Otro proceso está descargando el mismo video
+            return _wait_for_rehydration(video_path, tmp_path, config)
+
+        source = (presentation.analysis_proxy or {}).get('source') or {}
+        expected_size = source.get('size') or presentation.file_size
+        sha256 = hashlib.sha256()
+        size = 0
+        started = time.monotonic()
+        try:
+            with tmp:
+                logger.info(f"☁️ Rehidratando original de la presentación {presentation.pk} desde Cloudinary")
+                with get_session().get(
+                    presentation.cloudinary_url, stream=True, timeout=config['download_timeout']
+                ) as response:
+                    response.raise_for_status()
+                    for block in response.iter_content(DOWNLOAD_BLOCK_SIZE):
+                        tmp.write(block)
+                        sha256.update(block)
+                        size += len(block)
+
+            if expected_size and size != expected_size:
+                raise IOError(f"Tamaño descargado distinto: {size} de {expected_size} bytes")
+            if presentation.video_sha256 and sha256.hexdigest() != presentation.video_sha256:
+                raise IOError("El SHA-256 del video descargado no coincide con el original")
+
+            # Misma fecha de modificación que el original: el sondeo y el proxy siguen vigentes
+            if source.get('mtime') and size == source.get('size'):
+                os.utime(tmp_path, (time.time(), source['mtime']))
+            os.replace(tmp_path, video_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    now = timezone.now()
+    type(presentation).objects.filter(pk=presentation.pk).update(video_evicted_at=None, video_last_accessed_at=now)
+    presentation.video_evicted_at = None
+    presentation.video_last_accessed_at = now
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"✅ Original rehidratado: presentación {presentation.pk} "
+        f"({size / (1024 * 1024):.1f} MB en {elapsed:.1f}s)"
+    )
+    return video_path
+
+
+def _wait_for_rehydration(video_path, tmp_path, config):
+    """Espera a que otro proceso termine de descargar el original"""
+    deadline = time.monotonic() + config['rehydrate_wait_seconds']
+    while time.monotonic() < deadline:
+        if os.path.exists(video_path):
+            return video_path
+        try:
+            idle = time.time() - os.path.getmtime(tmp_path)
+        except FileNotFoundError:
+            if os.path.exists(video_path):
+                return video_path
+            raise IOError("La rehidratación del otro proceso falló")
+        if idle > config['download_timeout'] * 2:
+            os.remove(tmp_path)  # Descarga abandonada (proceso terminado)
+            raise IOError("Rehidratación abandonada por otro proceso, reintentar")
+        time.sleep(1)
+    raise IOError("Tiempo de espera agotado esperando la rehidratación del video")
+
+
+def get_stats():
+    """Originales locales y liberados, con su tamaño, y uso del disco"""
+    from .models import Presentation
+
+    local_bytes = 0
+    local = 0
+    for name in Presentation.objects.filter(video_evicted_at__isnull=True).exclude(
+        video_file=''
+    ).exclude(video_file__isnull=True).values_list('video_file', flat=True).iterator():
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        if os.path.exists(path):
+            local += 1
+            local_bytes += os.path.getsize(path)
+
+    return {
+        'local_originals': local,
+        'local_bytes': local_bytes,
+        'evicted_originals': Presentation.objects.filter(video_evicted_at__isnull=False).count(),
+        'local_with_cloud_copy': _candidates().count(),
+        'disk_usage': round(disk_usage(), 4),
+    }
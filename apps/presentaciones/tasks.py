@@ -5,7 +5,8 @@ Usando threading para evitar dependencia de Celery
 """
 import threading
 import logging
-from django.core.cache import cache
+
+from .progress import publish_progress
 
 logger = logging.getLogger(__name__)
 
@@ -22,21 +23,21 @@ def process_presentation_async(presentation_id):
             presentation = Presentation.objects.get(id=presentation_id)
             
             # Actualizar progreso: 0%
-            cache.set(f'presentation_progress_{presentation_id}', {
+            publish_progress(presentation_id, {
                 'status': 'PROCESSING',
                 'progress': 0,
                 'step': 'Iniciando análisis...'
-            }, timeout=3600)
+            })
             
             # Iniciar análisis
             ai_service = AIService()
             
             # Actualizar progreso: 10%
-            cache.set(f'presentation_progress_{presentation_id}', {
+            publish_progress(presentation_id, {
                 'status': 'PROCESSING',
                 'progress': 10,
                 'step': 'Analizando autenticidad (liveness)...'
-            }, timeout=3600)
+            })
             
             # El análisis completo se hace en AIService
             # Podemos monitorear el progreso desde ahí
@@ -44,11 +45,11 @@ def process_presentation_async(presentation_id):
             
             if success:
                 # Actualizar progreso: 100%
-                cache.set(f'presentation_progress_{presentation_id}', {
+                publish_progress(presentation_id, {
                     'status': 'ANALYZED',
                     'progress': 100,
                     'step': 'Análisis completado ✅'
-                }, timeout=3600)
+                })
                 
                 logger.info(f"✅ Presentación {presentation_id} procesada exitosamente")
             else:
@@ -56,28 +57,28 @@ def process_presentation_async(presentation_id):
                 presentation.refresh_from_db()
                 error_msg = presentation.ai_feedback if presentation.status == 'FAILED' else 'Error desconocido'
                 
-                cache.set(f'presentation_progress_{presentation_id}', {
+                publish_progress(presentation_id, {
                     'status': 'FAILED',
                     'progress': 0,
                     'step': f'Error: {error_msg[:50]}...'
-                }, timeout=3600)
+                })
                 
                 logger.error(f"❌ Error al procesar presentación {presentation_id}: {error_msg}")
         
         except Exception as e:
             logger.error(f"❌ Error crítico en tarea asíncrona: {str(e)}", exc_info=True)
-            cache.set(f'presentation_progress_{presentation_id}', {
+            publish_progress(presentation_id, {
                 'status': 'FAILED',
                 'progress': 0,
                 'step': f'Error: {str(e)[:50]}...'
-            }, timeout=3600)
+            })
             
             # Actualizar presentación en DB
             try:
                 presentation = Presentation.objects.get(id=presentation_id)
                 presentation.status = 'FAILED'
                 presentation.ai_feedback = f"Error en análisis: {str(e)}"
-                presentation.save()
+                presentation.save(update_fields=['status', 'ai_feedback', 'updated_at'])
             except:
                 pass
     
@@ -94,8 +95,8 @@ def update_progress(presentation_id, progress, step):
     """
     Helper para actualizar el progreso desde AIService
     """
-    cache.set(f'presentation_progress_{presentation_id}', {
+    publish_progress(presentation_id, {
         'status': 'PROCESSING',
         'progress': progress,
         'step': step
-    }, timeout=3600)
+    })
@@ -23,6 +23,15 @@ def get_thumbnail_url(presentation):
     """
     return presentation.get_thumbnail_url()
 
+@register.simple_tag
+def get_thumbnail_srcset(presentation):
+    """
+    Obtiene el srcset de las miniaturas WebP generadas durante el análisis
+    
+    Usage: <img srcset="{% get_thumbnail_srcset presentation %}" sizes="100px">
+    """
+    return presentation.thumbnail_srcset
+
 @register.filter
 def is_in_cloud(presentation):
     """
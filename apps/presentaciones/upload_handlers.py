@@ -0,0 +1,228 @@
+# apps/presentaciones/upload_handlers.py
+"""
+Manejador de subida que escribe los videos directamente en su ruta final
+
+Los chunks del multipart se escriben en el archivo definitivo de MEDIA_ROOT
+a medida que llegan (la memoria usada no depende del tamaño del video).
+Durante la escritura se calcula el SHA-256, se revisa la cabecera del
+contenedor y se controla el tamaño, de modo que los archivos con formato o
+tamaño no permitidos se rechazan sin terminar de recibirlos.
+
+El formulario (o la vista) adopta el archivo asignando su nombre al
+FileField, sin copiarlo. Si al terminar la petición ninguna presentación
+lo referencia (formulario inválido, error al guardar), se elimina.
+"""
+import hashlib
+import logging
+import os
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopFutureHandlers
+
+from .validators import VideoValidator
+
+logger = logging.getLogger(__name__)
+
+# Campos de formulario que reciben videos de presentaciones
+VIDEO_FIELD_NAMES = {'video_file'}
+
+# Bytes necesarios para reconocer el contenedor
+SNIFF_BYTES = 16
+
+
+def sniff_video_format(header):
+    """
+    Formato del contenedor según sus primeros bytes
+
+    Returns:
+        'mp4', 'mov', 'webm', 'avi' o None si no es un video reconocido
+    """
+    if len(header) >= 12 and header[4:8] == b'ftyp':
+        return 'mov' if header[8:10] == b'qt' else 'mp4'
+    if header[4:8] in (b'moov', b'mdat', b'wide', b'free'):
+        return 'mov'  # QuickTime antiguo sin caja ftyp
+    if header[:4] == b'\x1a\x45\xdf\xa3':
+        return 'webm'  # EBML (WebM / Matroska)
+    if header[:4] == b'RIFF' and header[8:12] == b'AVI ':
+        return 'avi'
+    return None
+
+
+class StreamedVideoFile(UploadedFile):
+    """
+    Video ya escrito en el almacenamiento definitivo
+
+    Atributos extra:
+        storage_name: nombre relativo en default_storage (asignable al FileField)
+        sha256: hash hexadecimal del contenido
+        sniffed_format: formato detectado en la cabecera
+    """
+
+    def __init__(self, file, storage_name, name, content_type, size, charset,
+                 content_type_extra=None, sha256='', sniffed_format=None):
+        super().__init__(file, name, content_type, size, charset, content_type_extra)
+        self.storage_name = storage_name
+        self.sha256 = sha256
+        self.sniffed_format = sniffed_format
+
+    def temporary_file_path(self):
+        return default_storage.path(self.storage_name)
+
+    def close(self):
+        """Cierra el archivo y lo elimina si ninguna presentación lo adoptó"""
+        from .models import Presentation
+
+        try:
+            return self.file.close()
+        finally:
+            path = self.temporary_file_path()
+            if os.path.exists(path) and not Presentation.objects.filter(video_file=self.storage_name).exists():
+                os.remove(path)
+                logger.info(f"🗑️ Video subido sin presentación eliminado: {self.storage_name}")
+
+
+def adopt_streamed_video(presentation, uploaded):
+    """
+    Asigna al FileField el video ya escrito por el manejador (sin copiarlo)
+
+    Returns:
+        True si el archivo venía del StreamingVideoUploadHandler
+    """
+    if not isinstance(uploaded, StreamedVideoFile):
+        return False
+    presentation.video_file = uploaded.storage_name
+    presentation.video_sha256 = uploaded.sha256
+    return True
+
+
+class StreamingVideoUploadHandler(FileUploadHandler):
+    """
+    Escribe los videos de presentaciones directamente en MEDIA_ROOT
+
+    Los rechazos se guardan en request.upload_errors (campo -> mensaje) para
+    que el formulario muestre el motivo.
+    """
+
+    chunk_size = 1024 * 1024  # 1MB por escritura (memoria acotada)
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.active = False
+        self._stream = None
+        self._storage_name = None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None,
+                 content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.active = False
+
+        user = getattr(self.request, 'user', None)
+        if field_name not in VIDEO_FIELD_NAMES or not (user and user.is_authenticated):
+            return  # Otros archivos: siguen los manejadores por defecto
+
+        try:
+            default_storage.path('')
+        except NotImplementedError:
+            return  # Almacenamiento sin rutas locales
+
+        extension = os.path.splitext(file_name)[1].lstrip('.').lower()
+        if extension not in VideoValidator.ALLOWED_FORMATS:
+            self._reject(
+                f'❌ Formato de video no permitido: {extension}. '
+                f'Formatos aceptados: {", ".join(VideoValidator.ALLOWED_FORMATS)}'
+            )
+
+        self._open_destination(user, file_name)
+        self.active = True
+        self.sha256 = hashlib.sha256()
+        self.header = b''
+        self.sniffed_format = None
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+
+        if self.sniffed_format is None:
+            self.header += raw_data[:SNIFF_BYTES - len(self.header)]
+            if len(self.header) >= SNIFF_BYTES:
+                self.sniffed_format = sniff_video_format(self.header)
+                if self.sniffed_format is None:
+                    self._reject('❌ El archivo no es un video válido (contenido no reconocido).')
+
+        if start + len(raw_data) > VideoValidator.MAX_FILE_SIZE:
+            max_mb = VideoValidator.MAX_FILE_SIZE / (1024 * 1024)
+            self._reject(f'❌ El archivo es demasiado grande. Tamaño máximo permitido: {max_mb:.0f} MB')
+
+        self.sha256.update(raw_data)
+        self._stream.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        self.active = False
+
+        # Archivos de menos de SNIFF_BYTES: validate_size los rechaza en el formulario
+        # (aquí ya no se puede omitir el archivo, el multipart terminó de leerlo)
+        if self.sniffed_format is None:
+            self.sniffed_format = sniff_video_format(self.header)
+
+        self._stream.flush()
+        self._stream.seek(0)
+        logger.info(
+            f"📥 Video recibido en disco: {self._storage_name} "
+            f"({file_size / (1024 * 1024):.1f} MB, {self.sniffed_format})"
+        )
+        return StreamedVideoFile(
+            self._stream,
+            storage_name=self._storage_name,
+            name=os.path.basename(self._storage_name),
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+            sha256=self.sha256.hexdigest(),
+            sniffed_format=self.sniffed_format,
+        )
+
+    def upload_interrupted(self):
+        if self.active:
+            self._discard()
+
+    def _open_destination(self, user, file_name):
+        """Crea el archivo definitivo (mismo esquema de rutas que Presentation.video_file)"""
+        from .models import upload_to_presentations_path
+
+        name = default_storage.generate_filename(upload_to_presentations_path(user.username, file_name))
+        while True:
+            name = default_storage.get_available_name(name)
+            path = default_storage.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                self._stream = open(path, 'xb+')
+                break
+            except FileExistsError:
+                continue  # Otra subida tomó el nombre entre medio
+        self._storage_name = name
+
+    def _discard(self):
+        """Cierra y elimina el archivo parcial"""
+        if self._stream is not None:
+            self._stream.close()
+            path = default_storage.path(self._storage_name)
+            if os.path.exists(path):
+                os.remove(path)
+            self._stream = None
+        self.active = False
+
+    def _reject(self, message):
+        """Descarta el archivo y sigue procesando el resto del formulario"""
+        self._discard()
+        if self.request is not None:
+            if not hasattr(self.request, 'upload_errors'):
+                self.request.upload_errors = {}
+            self.request.upload_errors[self.field_name] = message
+        logger.warning(f"🚫 Subida rechazada ({self.file_name}): {message}")
+        raise SkipFile()
@@ -7,6 +7,9 @@ urlpatterns = [
     # URLs para estudiantes
     path('upload/', views.upload_presentation_view, name='upload_presentation'),
     path('live-record/', views.live_record_view, name='live_record'),  # API para grabación en vivo (usado por tab en upload)
+    path('api/uploads/', views.resumable_upload_create_view, name='resumable_upload_create'),
+    path('api/uploads/<uuid:upload_id>/', views.resumable_upload_view, name='resumable_upload'),
+    path('api/uploads/<uuid:upload_id>/complete/', views.resumable_upload_complete_view, name='resumable_upload_complete'),
     path('my-presentations/', views.my_presentations_view, name='my_presentations'),
     path('presentation/<int:presentation_id>/', views.presentation_detail_view, name='presentation_detail'),
     path('presentation/<int:presentation_id>/edit/', views.edit_presentation_view, name='edit_presentation'),
@@ -31,7 +34,10 @@ urlpatterns = [
     # APIs AJAX
     path('api/assignment-details/', views.get_assignment_details, name='get_assignment_details'),
     path('api/presentation-progress/<int:presentation_id>/', views.get_presentation_progress, name='presentation_progress'),
+    path('api/presentation-progress/<int:presentation_id>/stream/', views.presentation_progress_stream, name='presentation_progress_stream'),
     path('api/improve-instructions-ai/', views.improve_instructions_ai_view, name='improve_instructions_ai'),
+    path('api/cloud-transfers/stats/', views.cloud_transfer_stats_view, name='cloud_transfer_stats'),
+    path('media/derivatives/<path:path>', views.media_derivative_view, name='media_derivative'),
 
     # URL para transcripciones
     path('transcription/<int:presentation_id>/', views.presentation_transcription, name='presentation_transcription'),
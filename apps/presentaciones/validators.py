@@ -10,6 +10,8 @@ from django.core.files.uploadedfile import UploadedFile
 from django.conf import settings
 import logging
 
+from .video_probe import VideoProbe, read_thumbnail_frame
+
 logger = logging.getLogger(__name__)
 
 
@@ -93,12 +95,13 @@ class VideoValidator:
             )
     
     @staticmethod
-    def validate_video_properties(video_path):
+    def validate_video_properties(video_path, probe=None):
         """
         Valida propiedades del video usando OpenCV
         
         Args:
             video_path: Ruta al archivo de video
+            probe: VideoProbe ya ejecutado (evita volver a abrir el archivo)
             
         Returns:
             dict: Propiedades del video validadas
@@ -107,25 +110,19 @@ class VideoValidator:
             ValidationError: Si el video está corrupto o no cumple requisitos
         """
         try:
-            cap = cv2.VideoCapture(video_path)
-            
-            if not cap.isOpened():
-                raise ValidationError(
-                    '❌ No se pudo abrir el archivo de video. '
-                    'El archivo puede estar corrupto o en un formato no soportado.'
-                )
+            if probe is None:
+                probe = VideoProbe.run(video_path)
             
             # Obtener propiedades
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            video = probe.data['video']
+            fps = video['fps']
+            total_frames = video['frame_count']
+            width = video['width']
+            height = video['height']
             
             # Calcular duración
             duration = total_frames / fps if fps > 0 else 0
             
-            cap.release()
-            
             # Validar que se obtuvieron valores válidos
             if fps <= 0 or total_frames <= 0 or width <= 0 or height <= 0:
                 raise ValidationError(
@@ -168,6 +165,13 @@ class VideoValidator:
                 'is_valid': True
             }
             
+        except ValidationError:
+            raise
+        except IOError:
+            raise ValidationError(
+                '❌ No se pudo abrir el archivo de video. '
+                'El archivo puede estar corrupto o en un formato no soportado.'
+            )
         except cv2.error as e:
             logger.error(f"Error OpenCV validando video: {str(e)}")
             raise ValidationError(
@@ -181,41 +185,43 @@ class VideoValidator:
             )
     
     @staticmethod
-    def validate_video_integrity(video_path):
+    def validate_video_integrity(video_path, probe=None):
         """
         Verifica la integridad del video intentando leer algunos frames
         
+        Los frames verificados son keyframes distribuidos por el video
+        (leídos durante el sondeo, ver VideoProbe).
+        
         Args:
             video_path: Ruta al archivo de video
+            probe: VideoProbe ya ejecutado (evita volver a abrir el archivo)
             
         Raises:
             ValidationError: Si el video está corrupto
         """
         try:
-            cap = cv2.VideoCapture(video_path)
-            
-            if not cap.isOpened():
-                raise ValidationError('❌ Video corrupto: no se puede abrir')
+            if probe is None:
+                probe = VideoProbe.run(video_path)
             
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            integrity = probe.data['integrity']
+            total_frames = probe.data['video']['frame_count']
             
-            # Intentar leer 5 frames distribuidos por el video
-            test_frames = [0, total_frames // 4, total_frames // 2, 
-                          3 * total_frames // 4, total_frames - 1]
+            if integrity['failed_frames'] or not integrity['checked_frames']:
+                frame_num = integrity['failed_frames'][0] if integrity['failed_frames'] else 0
+                raise ValidationError(
+                    f'❌ Video corrupto: no se pudo leer el frame {frame_num}/{total_frames}'
+                )
             
-            for frame_num in test_frames:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
-                ret, frame = cap.read()
-                
-                if not ret or frame is None:
-                    cap.release()
-                    raise ValidationError(
-                        f'❌ Video corrupto: no se pudo leer el frame {frame_num}/{total_frames}'
-                    )
+            if integrity['truncated']:
+                logger.warning(
+                    f"Video posiblemente truncado: {total_frames} de "
+                    f"{probe.data['video']['declared_frame_count']} frames declarados"
+                )
             
-            cap.release()
             logger.info("Integridad del video verificada correctamente")
             
+        except IOError:
+            raise ValidationError('❌ Video corrupto: no se puede abrir')
         except cv2.error as e:
             raise ValidationError(f'❌ Video corrupto: {str(e)}')
         except Exception as e:
@@ -224,7 +230,7 @@ class VideoValidator:
             raise ValidationError(f'❌ Error validando integridad: {str(e)}')
     
     @staticmethod
-    def generate_thumbnail(video_path, output_path=None, time_position=2.0):
+    def generate_thumbnail(video_path, output_path=None, time_position=2.0, frame=None, probe=None):
         """
         Genera un thumbnail del video
         
@@ -232,26 +238,17 @@ class VideoValidator:
             video_path: Ruta al archivo de video
             output_path: Ruta donde guardar el thumbnail (opcional)
             time_position: Posición en segundos para extraer el frame
+            frame: Frame ya decodificado (VideoProbe.thumbnail_frame)
+            probe: Sondeo guardado (Presentation.video_probe) para buscar por keyframe
             
         Returns:
             str: Ruta al thumbnail generado o None si falla
         """
         try:
-            cap = cv2.VideoCapture(video_path)
-            
-            if not cap.isOpened():
-                logger.error("No se pudo abrir el video para generar thumbnail")
-                return None
-            
-            # Posicionar en el tiempo especificado
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_num = int(time_position * fps)
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
+            if frame is None:
+                frame = read_thumbnail_frame(video_path, time_position, probe)
             
-            ret, frame = cap.read()
-            cap.release()
-            
-            if not ret or frame is None:
+            if frame is None:
                 logger.error("No se pudo leer el frame para thumbnail")
                 return None
             
@@ -303,7 +300,8 @@ class VideoValidator:
             'integrity_valid': False,
             'thumbnail_generated': False,
             'video_properties': None,
-            'thumbnail_path': None
+            'thumbnail_path': None,
+            'probe': None
         }
         
         # Validación 1: Formato
@@ -316,17 +314,27 @@ class VideoValidator:
         
         # Validaciones avanzadas (requieren archivo guardado)
         if video_path and os.path.exists(video_path):
+            # Un solo sondeo del archivo para todas las validaciones
+            try:
+                probe = VideoProbe.run(video_path)
+            except IOError:
+                raise ValidationError(
+                    '❌ No se pudo abrir el archivo de video. '
+                    'El archivo puede estar corrupto o en un formato no soportado.'
+                )
+            result['probe'] = probe.data
+            
             # Validación 3: Propiedades
-            properties = cls.validate_video_properties(video_path)
+            properties = cls.validate_video_properties(video_path, probe)
             result['properties_valid'] = True
             result['video_properties'] = properties
             
             # Validación 4: Integridad
-            cls.validate_video_integrity(video_path)
+            cls.validate_video_integrity(video_path, probe)
             result['integrity_valid'] = True
             
             # Generación de thumbnail
-            thumbnail_path = cls.generate_thumbnail(video_path)
+            thumbnail_path = cls.generate_thumbnail(video_path, frame=probe.thumbnail_frame)
             if thumbnail_path:
                 result['thumbnail_generated'] = True
                 result['thumbnail_path'] = thumbnail_path
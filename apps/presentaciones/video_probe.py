@@ -0,0 +1,219 @@
+# apps/presentaciones/video_probe.py
+"""
+Sondeo único de archivos de video
+
+Reemplaza las aperturas repetidas de cv2.VideoCapture (propiedades,
+integridad, miniatura, metadatos de liveness) por un solo sondeo cuyo
+resultado se guarda en Presentation.video_probe y reutilizan las etapas
+siguientes.
+
+El sondeo recorre el contenedor una vez en modo "raw" (solo demultiplexa
+paquetes, sin decodificar) para contar frames y construir el índice de
+keyframes. Después, las lecturas de verificación y la miniatura se hacen
+sobre keyframes: decodificar un keyframe no requiere decodificar los frames
+anteriores, a diferencia de un seek a un frame arbitrario.
+"""
+import logging
+import os
+from bisect import bisect_right
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+PROBE_VERSION = 1
+MAX_KEYFRAMES_STORED = 5000
+
+# Posiciones (fracción de la duración) verificadas al leer el video
+INTEGRITY_POSITIONS = (0, 0.25, 0.5, 0.75, 1.0)
+
+
+class VideoProbe:
+    """
+    Resultado del sondeo de un video.
+
+    Atributos:
+        data: dict serializable (se guarda en Presentation.video_probe)
+        thumbnail_frame: frame BGR decodificado para la miniatura (o None)
+    """
+
+    def __init__(self, data, thumbnail_frame=None):
+        self.data = data
+        self.thumbnail_frame = thumbnail_frame
+
+    @property
+    def is_readable(self):
+        return self.data.get('integrity', {}).get('ok', False)
+
+    @classmethod
+    def run(cls, video_path, thumbnail_time=2.0):
+        """
+        Sondea el video: metadatos del contenedor, índice de keyframes,
+        verificación de frames y frame de miniatura.
+
+        Returns:
+            VideoProbe
+
+        Raises:
+            IOError: Si el archivo no se puede abrir
+        """
+        raw = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+        if not raw.isOpened():
+            raise IOError(f"No se pudo abrir el video: {video_path}")
+
+        try:
+            fps = raw.get(cv2.CAP_PROP_FPS)
+            declared_frames = int(raw.get(cv2.CAP_PROP_FRAME_COUNT))
+            fourcc = int(raw.get(cv2.CAP_PROP_FOURCC))
+            bitrate = raw.get(cv2.CAP_PROP_BITRATE)
+            width = int(raw.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(raw.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+            # Una sola pasada por los paquetes: conteo real e índice de keyframes
+            keyframes = []
+            packets = 0
+            while raw.grab():
+                if raw.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                    keyframes.append(packets)
+                packets += 1
+        finally:
+            raw.release()
+
+        frame_count = packets or declared_frames
+        duration = frame_count / fps if fps > 0 else 0
+
+        data = {
+            'version': PROBE_VERSION,
+            'container': {
+                'format': os.path.splitext(video_path)[1].lstrip('.').lower(),
+                'size': os.path.getsize(video_path),
+                'bitrate_kbps': round(bitrate, 1) if bitrate else None,
+                'duration': round(duration, 3),
+                'mtime': os.path.getmtime(video_path),
+            },
+            'video': {
+                'codec': fourcc.to_bytes(4, 'little').decode('ascii', 'replace').strip('\x00') if fourcc else '',
+                'width': width,
+                'height': height,
+                'fps': fps,
+                'frame_count': frame_count,
+                'declared_frame_count': declared_frames,
+            },
+            'keyframes': keyframes[:MAX_KEYFRAMES_STORED],
+            'keyframe_count': len(keyframes),
+        }
+
+        thumbnail_frame = cls._read_keyframes(video_path, data, fps, thumbnail_time)
+
+        logger.info(
+            f"🔎 Video sondeado: {duration:.1f}s, {width}x{height}, {fps:.1f} FPS, "
+            f"{frame_count} frames, {len(keyframes)} keyframes"
+        )
+        return cls(data, thumbnail_frame)
+
+    @staticmethod
+    def nearest_keyframe(keyframes, frame_number):
+        """Último keyframe en o antes de frame_number (0 si no hay índice)"""
+        index = bisect_right(keyframes, frame_number) - 1
+        return keyframes[index] if index >= 0 else 0
+
+    @classmethod
+    def _read_keyframes(cls, video_path, data, fps, thumbnail_time):
+        """
+        Decodifica los keyframes de verificación y el de la miniatura con
+        una sola apertura del decodificador.
+
+        Returns:
+            Frame de la miniatura (o None)
+        """
+        keyframes = data['keyframes']
+        frame_count = data['video']['frame_count']
+        last_frame = max(frame_count - 1, 0)
+
+        targets = sorted({
+            cls.nearest_keyframe(keyframes, int(position * last_frame))
+            for position in INTEGRITY_POSITIONS
+        })
+        thumbnail_target = cls.nearest_keyframe(keyframes, int(thumbnail_time * fps)) if fps > 0 else 0
+
+        checked = []
+        failed = []
+        thumbnail_frame = None
+
+        cap = cv2.VideoCapture(video_path)
+        try:
+            if not cap.isOpened():
+                failed = targets
+            else:
+                for frame_number in sorted(set(targets) | {thumbnail_target}):
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+                    ret, frame = cap.read()
+                    ok = ret and frame is not None
+
+                    if frame_number in targets:
+                        (checked if ok else failed).append(frame_number)
+                    if frame_number == thumbnail_target and ok:
+                        thumbnail_frame = frame
+        finally:
+            cap.release()
+
+        data['integrity'] = {
+            'ok': bool(checked) and not failed,
+            'checked_frames': checked,
+            'failed_frames': failed,
+            # Menos paquetes que los declarados por el contenedor: archivo truncado
+            'truncated': bool(data['video']['declared_frame_count']) and
+                         frame_count < 0.9 * data['video']['declared_frame_count'],
+        }
+        data['thumbnail'] = {
+            'frame': thumbnail_target if thumbnail_frame is not None else None,
+            'time': round(thumbnail_target / fps, 3) if fps > 0 and thumbnail_frame is not None else None,
+        }
+        return thumbnail_frame
+
+
+def read_thumbnail_frame(video_path, time_position=2.0, probe=None):
+    """
+    Decodifica el frame de la miniatura con un solo seek (sin recorrer el archivo)
+
+    Con un sondeo vigente (is_probe_current) se usa su índice de keyframes;
+    sin él, o si el archivo cambió desde el sondeo, el seek por tiempo de
+    FFmpeg salta al keyframe anterior y decodifica solo hasta el frame pedido.
+
+    Returns:
+        Frame BGR o None si no se pudo leer
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        if fps > 0 and frame_count > 0:
+            time_position = min(time_position, frame_count / fps / 2)  # Videos cortos: la mitad
+
+        if fps > 0 and probe and probe.get('keyframes') and is_probe_current(probe, video_path):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, VideoProbe.nearest_keyframe(probe['keyframes'], int(time_position * fps)))
+        elif time_position > 0:
+            cap.set(cv2.CAP_PROP_POS_MSEC, time_position * 1000)
+
+        ret, frame = cap.read()
+        if not ret and time_position > 0:
+            # Seek fallido (contenedor sin índice): primer frame
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = cap.read()
+        return frame if ret else None
+    finally:
+        cap.release()
+
+
+def is_probe_current(probe, video_path):
+    """True si el sondeo guardado corresponde al archivo actual"""
+    if not probe or probe.get('version') != PROBE_VERSION:
+        return False
+    try:
+        return (probe['container']['size'] == os.path.getsize(video_path) and
+                probe['container']['mtime'] == os.path.getmtime(video_path))
+    except (KeyError, OSError):
+        return False
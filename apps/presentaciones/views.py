@@ -16,6 +16,7 @@ from authentication.decoradores import student_required, teacher_required, admin
 from .models import Presentation, Assignment, Course, AIAnalysis, AIConfiguration
 from .forms import PresentationUploadForm, CourseForm, AssignmentForm
 from .validators import VideoValidator
+from .upload_handlers import adopt_streamed_video
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -24,11 +25,70 @@ logger = logging.getLogger(__name__)
 # VISTAS PARA ESTUDIANTES
 
 
+def _process_uploaded_presentation(request, presentation):
+    """
+    Pasos posteriores a guardar una presentación subida: validación avanzada,
+    metadatos y miniatura, cola de Cloudinary y análisis en segundo plano
+    (comunes a la subida normal y a la reanudable)
+    """
+    # Ejecutar validaciones avanzadas después de guardar (necesitamos la ruta del archivo)
+    try:
+        validator = VideoValidator()
+        validation_result = validator.validate_all(
+            presentation.video_file, presentation.video_file.path
+        )
+        presentation.video_probe = validation_result['probe']
+        
+        # Guardar metadatos del video
+        if validation_result['properties_valid']:
+            props = validation_result['video_properties']
+            presentation.duration_seconds = props.get('duration')
+            presentation.video_fps = props.get('fps')
+            presentation.video_width = props.get('width')
+            presentation.video_height = props.get('height')
+        
+        # Guardar miniatura si se generó
+        if validation_result.get('thumbnail_generated'):
+            from django.core.files import File
+            thumb_path = validation_result.get('thumbnail_path')
+            if thumb_path and os.path.exists(thumb_path):
+                with open(thumb_path, 'rb') as f:
+                    presentation.video_thumbnail.save(
+                        os.path.basename(thumb_path),
+                        File(f),
+                        save=False
+                    )
+        
+        presentation.save()
+        
+    except Exception as val_error:
+        # Si falla la validación avanzada, no bloqueamos pero registramos
+        print(f"Validación avanzada falló (no crítico): {str(val_error)}")
+    
+    # Encolar la subida a Cloudinary (se hace en segundo plano)
+    try:
+        from apps.ai_processor.services import CloudinaryService
+        from apps.ai_processor.services.cloud_transfer_service import CloudTransferService
+        if CloudinaryService.is_configured():
+            if CloudTransferService.enqueue(presentation):
+                messages.info(request, '☁️ El video se subirá a Cloudinary en segundo plano')
+    except Exception as cloud_error:
+        print(f"Error encolando subida a Cloudinary (no crítico): {str(cloud_error)}")
+        messages.warning(request, '⚠️ No se pudo programar la subida a Cloudinary, usando almacenamiento local')
+    
+    # Iniciar análisis asíncrono en segundo plano
+    from .tasks import process_presentation_async
+    process_presentation_async(presentation.id)
+
+
 @student_required
 def upload_presentation_view(request):
     """Vista para que los estudiantes suban presentaciones"""
     if request.method == 'POST':
-        form = PresentationUploadForm(request.POST, request.FILES, user=request.user)
+        form = PresentationUploadForm(
+            request.POST, request.FILES, user=request.user,
+            upload_errors=getattr(request, 'upload_errors', None)
+        )
         if form.is_valid():
             presentation = form.save(commit=False)
             presentation.student = request.user
@@ -40,53 +100,7 @@ def upload_presentation_view(request):
             try:
                 presentation.save()
                 
-                # Ejecutar validaciones avanzadas después de guardar (necesitamos la ruta del archivo)
-                try:
-                    validator = VideoValidator()
-                    validation_result = validator.validate_all(presentation.video_file.path)
-                    
-                    # Guardar metadatos del video
-                    if validation_result['properties_valid']:
-                        props = validation_result['video_properties']
-                        presentation.duration_seconds = props.get('duration')
-                        presentation.video_fps = props.get('fps')
-                        presentation.video_width = props.get('width')
-                        presentation.video_height = props.get('height')
-                    
-                    # Guardar miniatura si se generó
-                    if validation_result.get('thumbnail_generated'):
-                        from django.core.files import File
-                        thumb_path = validation_result.get('thumbnail_path')
-                        if thumb_path and os.path.exists(thumb_path):
-                            with open(thumb_path, 'rb') as f:
-                                presentation.video_thumbnail.save(
-                                    os.path.basename(thumb_path),
-                                    File(f),
-                                    save=False
-                                )
-                    
-                    presentation.save()
-                    
-                except Exception as val_error:
-                    # Si falla la validación avanzada, no bloqueamos pero registramos
-                    print(f"Validación avanzada falló (no crítico): {str(val_error)}")
-                
-                # Subir a Cloudinary automáticamente
-                try:
-                    from apps.ai_processor.services import CloudinaryService
-                    if CloudinaryService.is_configured():
-                        cloudinary_result = presentation.upload_to_cloudinary()
-                        if cloudinary_result:
-                            messages.info(request, '☁️ Video subido a Cloudinary exitosamente')
-                        else:
-                            messages.warning(request, '⚠️ No se pudo subir a Cloudinary, usando almacenamiento local')
-                except Exception as cloud_error:
-                    print(f"Error subiendo a Cloudinary (no crítico): {str(cloud_error)}")
-                    messages.warning(request, '⚠️ No se pudo subir a Cloudinary, usando almacenamiento local')
-                
-                # Iniciar análisis asíncrono en segundo plano
-                from .tasks import process_presentation_async
-                process_presentation_async(presentation.id)
+                _process_uploaded_presentation(request, presentation)
                 
                 messages.success(
                     request, 
@@ -163,6 +177,187 @@ def upload_presentation_view(request):
     
     return render(request, 'presentations/presentations_upload.html', context)
 
+def _resumable_response(upload, data=None, status=200):
+    """Respuesta del protocolo reanudable con las cabeceras de offset"""
+    payload = {
+        'upload_id': str(upload.id),
+        'offset': upload.offset,
+        'total_size': upload.total_size,
+        'status': upload.status,
+        'expires_at': upload.expires_at.isoformat(),
+        **(data or {}),
+    }
+    response = JsonResponse(payload, status=status)
+    response['Upload-Offset'] = str(upload.offset)
+    response['Upload-Length'] = str(upload.total_size)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def _resumable_error(error):
+    """Respuesta JSON para un ResumableUploadError (incluye el offset si se conoce)"""
+    response = JsonResponse({'success': False, 'error': error.message, 'offset': error.offset}, status=error.status)
+    if error.offset is not None:
+        response['Upload-Offset'] = str(error.offset)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@student_required
+@require_http_methods(["POST"])
+def resumable_upload_create_view(request):
+    """
+    Inicia una subida reanudable
+    
+    Recibe los campos del formulario de subida (assignment, title,
+    description) más filename, file_size y content_type. Los datos se
+    validan antes de recibir el video para no descubrir errores tras subir
+    cientos de MB.
+    """
+    from . import resumable_uploads
+    
+    try:
+        total_size = int(request.POST.get('file_size', ''))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Tamaño de archivo inválido'}, status=400)
+    
+    filename = request.POST.get('filename', '').strip()
+    if not filename:
+        return JsonResponse({'success': False, 'error': 'Falta el nombre del archivo'}, status=400)
+    
+    # Validar el formulario sin el video (llega después por chunks)
+    form = PresentationUploadForm(request.POST, user=request.user)
+    form.is_valid()
+    errors = {field: [str(e) for e in error_list] for field, error_list in form.errors.items() if field != 'video_file'}
+    if errors:
+        first_error = next(iter(errors.values()))[0]
+        return JsonResponse({'success': False, 'error': first_error, 'errors': errors}, status=400)
+    
+    form_data = {field: request.POST.get(field, '') for field in ('assignment', 'title', 'description')}
+    
+    try:
+        upload = resumable_uploads.create_upload(
+            request.user, filename, total_size,
+            content_type=request.POST.get('content_type', ''),
+            form_data=form_data,
+        )
+    except resumable_uploads.ResumableUploadError as e:
+        return _resumable_error(e)
+    
+    response = _resumable_response(upload, {
+        'success': True,
+        'chunk_size': resumable_uploads.get_config()['chunk_size'],
+        'url': reverse('presentations:resumable_upload', args=[upload.id]),
+        'complete_url': reverse('presentations:resumable_upload_complete', args=[upload.id]),
+    }, status=201)
+    response['Location'] = reverse('presentations:resumable_upload', args=[upload.id])
+    return response
+
+
+@student_required
+@require_http_methods(["GET", "HEAD", "PATCH", "DELETE"])
+def resumable_upload_view(request, upload_id):
+    """
+    Subida reanudable en curso
+    
+    GET/HEAD: offset actual (Upload-Offset) para continuar tras un corte
+    PATCH: bytes del video a partir de la cabecera Upload-Offset
+    DELETE: cancela la subida y borra el archivo parcial
+    """
+    from . import resumable_uploads
+    from .models import ResumableUpload
+    
+    upload = get_object_or_404(ResumableUpload, id=upload_id, student=request.user)
+    
+    if request.method == 'DELETE':
+        if upload.status == 'ACTIVE':
+            resumable_uploads.mark_failed(upload, 'Cancelada por el estudiante', status='EXPIRED')
+        return _resumable_response(upload)
+    
+    if request.method == 'PATCH':
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers.get('Content-Length', ''))
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Faltan las cabeceras Upload-Offset o Content-Length'}, status=400)
+        
+        try:
+            resumable_uploads.write_chunk(upload, offset, request, length)
+        except resumable_uploads.ResumableUploadError as e:
+            return _resumable_error(e)
+    
+    return _resumable_response(upload)
+
+
+@student_required
+@require_http_methods(["POST"])
+def resumable_upload_complete_view(request, upload_id):
+    """
+    Termina una subida reanudable: ensambla el archivo, crea la presentación
+    con los datos guardados del formulario y sigue el flujo de la subida
+    normal (validación, Cloudinary, análisis de IA)
+    
+    Repetir la petición (p. ej. si se perdió la respuesta) devuelve el mismo resultado.
+    """
+    from . import resumable_uploads
+    from .models import ResumableUpload
+    
+    upload = get_object_or_404(ResumableUpload, id=upload_id, student=request.user)
+    redirect_url = reverse('presentations:my_presentations')
+    
+    if upload.status == 'COMPLETED':
+        if upload.presentation_id:
+            return _resumable_response(upload, {'success': True, 'redirect': redirect_url})
+        return JsonResponse({'success': False, 'error': 'La subida se está procesando'}, status=409)
+    
+    if upload.status != 'ACTIVE':
+        return JsonResponse({'success': False, 'error': upload.error or 'La subida ya no está activa'}, status=410)
+    
+    if not resumable_uploads.claim_for_assembly(upload):
+        upload.refresh_from_db()
+        if upload.status == 'ACTIVE':
+            return _resumable_error(resumable_uploads.ResumableUploadError(
+                f'Faltan bytes: el servidor tiene {upload.offset} de {upload.total_size}.',
+                status=409, offset=upload.offset
+            ))
+        return JsonResponse({'success': False, 'error': 'La subida se está procesando'}, status=409)
+    
+    video_file = None
+    try:
+        video_file = resumable_uploads.assemble(upload)
+        form = PresentationUploadForm(upload.form_data, {'video_file': video_file}, user=request.user)
+        if not form.is_valid():
+            errors = {field: [str(e) for e in error_list] for field, error_list in form.errors.items()}
+            first_error = next(iter(errors.values()))[0]
+            resumable_uploads.mark_failed(upload, first_error)
+            return JsonResponse({'success': False, 'error': first_error, 'errors': errors}, status=400)
+        
+        presentation = form.save(commit=False)
+        presentation.student = request.user
+        presentation.file_size = video_file.size
+        presentation.save()
+        
+        upload.presentation = presentation
+        upload.save(update_fields=['presentation', 'updated_at'])
+        
+        _process_uploaded_presentation(request, presentation)
+        
+    except Exception as e:
+        logger.error(f"Error completando la subida reanudable {upload.id}: {str(e)}")
+        resumable_uploads.mark_failed(upload, str(e))
+        return JsonResponse({'success': False, 'error': f'Error al guardar la presentación: {str(e)}'}, status=500)
+    finally:
+        if video_file is not None:
+            video_file.close()  # Borra el video si no quedó asignado a la presentación
+    
+    messages.success(
+        request,
+        f'✅ Presentación "{presentation.title}" subida exitosamente! '
+        f'El análisis de IA se está procesando en segundo plano.'
+    )
+    return _resumable_response(upload, {'success': True, 'redirect': redirect_url})
+
+
 @student_required
 def my_presentations_view(request):
     """Vista para que los estudiantes vean sus presentaciones"""
@@ -272,34 +467,11 @@ def presentation_detail_view(request, presentation_id):
             else:
                 time_distribution_quality = "Variable"  # Antes era "Desigual"
         
-        # Generar conclusión grupal con IA de GROQ
+        # Conclusión grupal persistida (solo se regenera si cambiaron las notas)
         try:
-            from apps.ai_processor.services.coherence_analyzer import CoherenceAnalyzer
-            
-            # Preparar datos de participantes
-            resultados_participantes = []
-            for p in participants:
-                resultados_participantes.append({
-                    'etiqueta': p.label,
-                    'nota_coherencia': p.coherence_score or 0,
-                    'calificacion_final': p.ai_grade or 0,
-                    'porcentaje_tiempo': p.time_percentage or 0,
-                    'tiempo_participacion': p.participation_time or 0
-                })
-            
-            # Obtener tema y descripción
-            tema = presentation.assignment.title if presentation.assignment else "Presentación"
-            descripcion_tema = presentation.assignment.description if presentation.assignment else ""
+            from apps.ai_processor.services.group_conclusion_service import GroupConclusionService
             
-            # Generar conclusión con IA
-            analyzer = CoherenceAnalyzer()
-            max_score = float(presentation.assignment.max_score) if presentation.assignment else 20.0
-            group_feedback = analyzer.generar_conclusion_grupal(
-                resultados_participantes, 
-                tema, 
-                descripcion_tema,
-                max_score=max_score
-            )
+            group_feedback = GroupConclusionService.get_or_generate(presentation, participants)
             
         except Exception as e:
             logger.error(f"Error al generar conclusión grupal en detail: {str(e)}")
@@ -470,7 +642,10 @@ def edit_presentation_view(request, presentation_id):
         return redirect('presentations:presentation_detail', presentation_id=presentation.id)
     
     if request.method == 'POST':
-        form = PresentationUploadForm(request.POST, request.FILES, instance=presentation, user=request.user)
+        form = PresentationUploadForm(
+            request.POST, request.FILES, instance=presentation, user=request.user,
+            upload_errors=getattr(request, 'upload_errors', None)
+        )
         if form.is_valid():
             # Guardar el video anterior para comparación
             old_video_file = presentation.video_file
@@ -716,34 +891,11 @@ def grade_presentation_detail_view(request, presentation_id):
         if avg_grade:
             suggested_grade = round(avg_grade, 1)
         
-        # Generar conclusión grupal dinámica con IA de GROQ
+        # Conclusión grupal persistida (solo se regenera si cambiaron las notas)
         try:
-            from apps.ai_processor.services.coherence_analyzer import CoherenceAnalyzer
+            from apps.ai_processor.services.group_conclusion_service import GroupConclusionService
             
-            # Preparar datos de participantes para el análisis
-            resultados_participantes = []
-            for p in participants_list:  # Usar la lista ordenada
-                resultados_participantes.append({
-                    'etiqueta': p.label,
-                    'nota_coherencia': p.coherence_score or 0,
-                    'calificacion_final': p.ai_grade or 0,
-                    'porcentaje_tiempo': p.time_percentage or 0,
-                    'tiempo_participacion': p.participation_time or 0
-                })
-            
-            # Obtener tema y descripción
-            tema = presentation.assignment.title if presentation.assignment else "Presentación"
-            descripcion_tema = presentation.assignment.description if presentation.assignment else ""
-            max_score = float(presentation.assignment.max_score) if presentation.assignment else 20.0
-            
-            # Generar conclusión con IA
-            analyzer = CoherenceAnalyzer()
-            suggested_feedback = analyzer.generar_conclusion_grupal(
-                resultados_participantes, 
-                tema, 
-                descripcion_tema,
-                max_score=max_score
-            )
+            suggested_feedback = GroupConclusionService.get_or_generate(presentation, participants_list)
             
         except Exception as e:
             logger.error(f"Error al generar conclusión grupal: {str(e)}")
@@ -1289,6 +1441,70 @@ def admin_presentations_view(request):
     
     return render(request, 'admin/presentations_admin.html', context)
 
+
+@admin_required
+def cloud_transfer_stats_view(request):
+    """API con el estado de la cola de subidas a Cloudinary (profundidad y throughput)"""
+    from apps.ai_processor.services.cloud_transfer_service import CloudTransferService
+    
+    try:
+        window_hours = int(request.GET.get('hours', 24))
+    except ValueError:
+        window_hours = 24
+    
+    return JsonResponse(CloudTransferService.get_stats(window_hours=max(window_hours, 1)))
+
+
+MEDIA_DERIVATIVE_MAX_AGE = 365 * 24 * 3600
+
+
+@login_required
+@require_http_methods(["GET", "HEAD"])
+def media_derivative_view(request, path):
+    """
+    Sirve miniaturas WebP y sprites (MEDIA_ROOT/derivatives) con caché privada de un año
+    
+    Solo para el estudiante dueño de la presentación y el docente del curso.
+    Los nombres incluyen una etiqueta del contenido del video, así que una URL
+    nunca cambia de contenido y el navegador no necesita revalidarla.
+    """
+    from django.conf import settings
+    from django.http import HttpResponse
+    from django.utils._os import safe_join
+    from django.utils.cache import patch_cache_control
+    from django.views.static import serve
+    from .media_derivatives import DERIVATIVES_DIR
+    
+    # Las rutas son <id de presentación>/<archivo>
+    presentation_id = path.split('/', 1)[0]
+    if not presentation_id.isdigit():
+        raise Http404
+    if not Presentation.objects.filter(
+        Q(student=request.user) | Q(assignment__course__teacher=request.user),
+        id=presentation_id
+    ).exists():
+        raise Http404
+    
+    document_root = os.path.join(settings.MEDIA_ROOT, DERIVATIVES_DIR)
+    server = getattr(settings, 'PROTECTED_MEDIA_SERVER', '')
+    if server in ('x-accel', 'x-sendfile'):
+        try:
+            full_path = safe_join(document_root, path)
+        except Exception:
+            raise Http404
+        if not os.path.isfile(full_path):
+            raise Http404
+        # El servidor web envía el archivo; Django solo comprueba los permisos
+        response = HttpResponse(content_type='image/webp')
+        if server == 'x-accel':
+            response['X-Accel-Redirect'] = f"{settings.PROTECTED_MEDIA_INTERNAL_URL}{DERIVATIVES_DIR}/{path}"
+        else:
+            response['X-Sendfile'] = full_path
+    else:
+        response = serve(request, path, document_root=document_root)
+    patch_cache_control(response, private=True, max_age=MEDIA_DERIVATIVE_MAX_AGE, immutable=True)
+    return response
+
 # =====================================================
 # VISTAS AJAX Y API
 # =====================================================
@@ -1351,6 +1567,9 @@ def presentation_transcription(request, presentation_id):
             
             messages.info(request, "Iniciando transcripción real del audio...")
             
+            # Original local (se descarga de Cloudinary si storage_lifecycle lo liberó)
+            presentation.ensure_local_video()
+            
             # Cargar modelo Whisper
             model = whisper.load_model("base")
             
@@ -1611,7 +1830,9 @@ def live_record_view(request):
             assignment_id = request.POST.get('assignment')
             
             if not video_file:
-                return JsonResponse({'success': False, 'error': 'No se recibió el video'}, status=400)
+                # El manejador de subida pudo rechazarlo mientras se recibía
+                error = getattr(request, 'upload_errors', {}).get('video_file', 'No se recibió el video')
+                return JsonResponse({'success': False, 'error': error}, status=400)
             
             if not title:
                 return JsonResponse({'success': False, 'error': 'El título es requerido'}, status=400)
@@ -1643,6 +1864,9 @@ def live_record_view(request):
                 is_live_recording=True  # Marcar como grabación en vivo
             )
             
+            # El video ya está en su ruta final (StreamingVideoUploadHandler)
+            adopt_streamed_video(presentation, video_file)
+            
             if assignment_id:
                 try:
                     assignment = Assignment.objects.get(id=assignment_id)
@@ -1652,24 +1876,25 @@ def live_record_view(request):
             
             presentation.save()
             
-            # Subir a Cloudinary automáticamente (igual que con videos pregrabados)
-            cloudinary_status = {'uploaded': False, 'message': ''}
+            # Encolar la subida a Cloudinary (igual que con videos pregrabados)
+            cloudinary_status = {'uploaded': False, 'queued': False, 'message': ''}
             try:
                 from apps.ai_processor.services import CloudinaryService
+                from apps.ai_processor.services.cloud_transfer_service import CloudTransferService
                 if CloudinaryService.is_configured():
-                    cloudinary_result = presentation.upload_to_cloudinary()
-                    if cloudinary_result:
-                        cloudinary_status['uploaded'] = True
-                        cloudinary_status['message'] = '☁️ Video subido a Cloudinary exitosamente'
-                        logger.info(f'☁️ Video subido a Cloudinary exitosamente: {cloudinary_result.get("public_id")}')
+                    transfer_job = CloudTransferService.enqueue(presentation)
+                    if transfer_job:
+                        cloudinary_status['queued'] = True
+                        cloudinary_status['transfer_id'] = transfer_job.id
+                        cloudinary_status['message'] = '☁️ El video se subirá a Cloudinary en segundo plano'
+                        logger.info(f'☁️ Subida a Cloudinary encolada: transferencia {transfer_job.id}')
                     else:
-                        cloudinary_status['message'] = '⚠️ No se pudo subir a Cloudinary, usando almacenamiento local'
-                        logger.warning('⚠️ No se pudo subir a Cloudinary, usando almacenamiento local')
+                        cloudinary_status['message'] = '⚠️ No hay video para subir a Cloudinary, usando almacenamiento local'
                 else:
                     cloudinary_status['message'] = '⚠️ Cloudinary no configurado, usando almacenamiento local'
             except Exception as cloud_error:
-                cloudinary_status['message'] = f'⚠️ Error al subir a Cloudinary: {str(cloud_error)}'
-                logger.error(f"Error subiendo a Cloudinary (no crítico): {str(cloud_error)}")
+                cloudinary_status['message'] = f'⚠️ Error al encolar la subida a Cloudinary: {str(cloud_error)}'
+                logger.error(f"Error encolando subida a Cloudinary (no crítico): {str(cloud_error)}")
             
             # Iniciar análisis de IA en segundo plano
             from .tasks import process_presentation_async
@@ -1695,42 +1920,133 @@ def live_record_view(request):
     return redirect(f"{reverse('presentations:upload_presentation')}?tab=record")
 
 
+PROGRESS_ACCESS_CACHE_TIMEOUT = 600  # Permiso de ver el progreso, cacheado por sesión
+
+
+def _progress_access_cache_key(request, presentation_id):
+    """Clave del permiso cacheado (None si la petición no tiene sesión)"""
+    session_key = request.session.session_key
+    if not session_key:
+        return None
+    return f'progress_access_{session_key}_{presentation_id}'
+
+
+def _progress_from_status(status):
+    """Progreso a mostrar cuando no hay datos en cache (según el estado guardado)"""
+    return {
+        'status': status,
+        'progress': 100 if status == 'ANALYZED' else 0,
+        'step': {
+            'UPLOADED': 'En cola para análisis...',
+            'PROCESSING': 'Procesando...',
+            'ANALYZED': 'Análisis completado ✅',
+            'FAILED': 'Error en el análisis ❌',
+            'GRADED': 'Calificada ✅'
+        }.get(status, 'Estado desconocido')
+    }
+
+
 @login_required
 def get_presentation_progress(request, presentation_id):
     """
     API endpoint para obtener el progreso del análisis de una presentación
+    
+    El permiso se cachea por sesión: mientras el análisis está en curso, cada
+    consulta se responde desde el cache sin tocar la base de datos.
     """
     from django.core.cache import cache
+    from .progress import progress_cache_key
+    
+    access_key = _progress_access_cache_key(request, presentation_id)
+    allowed = cache.get(access_key) if access_key else None
     
     # Verificar que el usuario tenga permiso
-    try:
-        presentation = Presentation.objects.get(id=presentation_id)
+    if allowed is None:
+        student_id = Presentation.objects.filter(id=presentation_id).values_list('student_id', flat=True).first()
+        if student_id is None:
+            return JsonResponse({'error': 'Presentación no encontrada'}, status=404)
         
         # Solo el estudiante dueño o docentes pueden ver el progreso
-        if request.user != presentation.student and not request.user.groups.filter(name='Docente').exists():
-            return JsonResponse({'error': 'No autorizado'}, status=403)
-        
-        # Obtener progreso del cache
-        progress_data = cache.get(f'presentation_progress_{presentation_id}')
-        
-        if progress_data:
-            return JsonResponse(progress_data)
-        else:
-            # Si no hay datos en cache, verificar el estado de la presentación
-            return JsonResponse({
-                'status': presentation.status,
-                'progress': 100 if presentation.status == 'ANALYZED' else 0,
-                'step': {
-                    'UPLOADED': 'En cola para análisis...',
-                    'PROCESSING': 'Procesando...',
-                    'ANALYZED': 'Análisis completado ✅',
-                    'FAILED': 'Error en el análisis ❌',
-                    'GRADED': 'Calificada ✅'
-                }.get(presentation.status, 'Estado desconocido')
-            })
+        allowed = request.user.id == student_id or request.user.groups.filter(name='Docente').exists()
+        if access_key:
+            cache.set(access_key, allowed, timeout=PROGRESS_ACCESS_CACHE_TIMEOUT)
+    
+    if not allowed:
+        return JsonResponse({'error': 'No autorizado'}, status=403)
     
-    except Presentation.DoesNotExist:
+    # Obtener progreso del cache
+    progress_data = cache.get(progress_cache_key(presentation_id))
+    if progress_data:
+        return JsonResponse(progress_data)
+    
+    # Si no hay datos en cache, verificar el estado de la presentación
+    status = Presentation.objects.filter(id=presentation_id).values_list('status', flat=True).first()
+    if status is None:
         return JsonResponse({'error': 'Presentación no encontrada'}, status=404)
+    return JsonResponse(_progress_from_status(status))
+
+
+@login_required
+async def presentation_progress_stream(request, presentation_id):
+    """
+    Stream SSE (text/event-stream) con el progreso del análisis.
+    
+    Es una vista asíncrona: bajo ASGI (uvicorn) cada cliente conectado espera
+    en el event loop sin ocupar un worker. Bajo WSGI (runserver, gunicorn
+    sync) un iterador asíncrono se acumularía entero antes de enviarse, así
+    que se usa un generador síncrono de corta duración (el cliente se
+    reconecta). Envía un evento por cada cambio de progreso (coalescido), un
+    evento "ping" como keepalive y cierra el stream cuando el análisis termina.
+    """
+    from django.core.cache import cache
+    from django.core.handlers.asgi import ASGIRequest
+    from django.http import StreamingHttpResponse
+    from .progress import broker
+    
+    access_key = _progress_access_cache_key(request, presentation_id)
+    allowed = await cache.aget(access_key) if access_key else None
+    
+    if allowed is None:
+        student_id = await Presentation.objects.filter(id=presentation_id).values_list('student_id', flat=True).afirst()
+        if student_id is None:
+            return JsonResponse({'error': 'Presentación no encontrada'}, status=404)
+        
+        user = await request.auser()
+        allowed = user.id == student_id or await user.groups.filter(name='Docente').aexists()
+        if access_key:
+            await cache.aset(access_key, allowed, timeout=PROGRESS_ACCESS_CACHE_TIMEOUT)
+    
+    if not allowed:
+        return JsonResponse({'error': 'No autorizado'}, status=403)
+    
+    # Estado inicial desde la BD solo si todavía no hay progreso publicado
+    initial = None
+    if await broker.snapshot(presentation_id) is None:
+        status = await Presentation.objects.filter(id=presentation_id).values_list('status', flat=True).afirst()
+        initial = _progress_from_status(status)
+    
+    def format_event(data):
+        # Keepalive como evento con nombre: los comentarios SSE no llegan al
+        # JavaScript y el cliente no podría detectar un stream bloqueado
+        if data is None:
+            return 'event: ping\ndata: {}\n\n'
+        return f'data: {json.dumps(data)}\n\n'
+    
+    async def event_stream():
+        yield 'retry: 3000\n\n'
+        async for data in broker.listen(presentation_id, initial=initial):
+            yield format_event(data)
+    
+    def event_stream_sync():
+        yield 'retry: 1000\n\n'
+        for data in broker.listen_sync(presentation_id, initial=initial):
+            yield format_event(data)
+    
+    stream = event_stream() if isinstance(request, ASGIRequest) else event_stream_sync()
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Evitar que nginx acumule los eventos
+    return response
 
 
 # =====================================================
@@ -1977,15 +2293,12 @@ def improve_instructions_ai_view(request):
                 'error': 'No se proporcionaron instrucciones'
             }, status=400)
         
-        # Importar Groq client
-        from groq import Groq
-        from apps.ai_processor.services.groq_key_manager import GroqKeyManager
+        from apps.ai_processor.services.groq_key_manager import get_groq_key_manager, estimate_tokens
         
-        # Obtener API key usando el sistema de rotación
-        key_manager = GroqKeyManager()
-        groq_api_key = key_manager.get_current_key()
+        # Gestor compartido de API keys (rotación, bloqueos y rate limit)
+        key_manager = get_groq_key_manager()
         
-        if not groq_api_key:
+        if not key_manager.keys:
             return JsonResponse({
                 'success': False,
                 'error': 'API Keys de Groq no configuradas. Contacta al administrador.'
@@ -2041,9 +2354,14 @@ Responde SOLO con las instrucciones mejoradas, sin explicaciones adicionales ni
         last_error = None
         
         for attempt in range(max_retries):
+            # Reservar capacidad en la key con más margen (prompt + respuesta)
+            groq_api_key = key_manager.acquire_key(estimate_tokens(prompt) + 900, timeout=20)
+            if not groq_api_key:
+                last_error = 'Todas las API keys están saturadas, intenta de nuevo en un minuto'
+                break
+            
             try:
-                # Crear cliente Groq con la key actual
-                client = Groq(api_key=groq_api_key)
+                client = key_manager.get_client(groq_api_key)
                 
                 # Hacer petición a Groq API
                 response = client.chat.completions.create(
@@ -2076,10 +2394,7 @@ Responde SOLO con las instrucciones mejoradas, sin explicaciones adicionales ni
                 
                 # Si falla por rate limit, marcar key como fallida y rotar
                 if 'rate_limit' in last_error.lower() or '429' in last_error:
-                    key_manager.mark_key_failed(groq_api_key)
-                    groq_api_key = key_manager.get_current_key()
-                    if not groq_api_key:
-                        break
+                    key_manager.mark_key_as_failed(groq_api_key, f"Rate limit: {last_error}")
                 else:
                     # Si es otro error, no reintentar
                     break
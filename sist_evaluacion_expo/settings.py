@@ -87,6 +87,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'sist_evaluacion_expo.wsgi.application'
 
+# ASGI (necesario para el stream SSE de progreso sin ocupar un worker por cliente)
+ASGI_APPLICATION = 'sist_evaluacion_expo.asgi.application'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -162,14 +165,64 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'uploads'
 
+# Envío de archivos protegidos (miniaturas y sprites) tras comprobar permisos:
+# '' los sirve Django; 'x-accel' delega en nginx (location internal en
+# PROTECTED_MEDIA_INTERNAL_URL con alias a MEDIA_ROOT) y 'x-sendfile' en Apache
+PROTECTED_MEDIA_SERVER = os.getenv('PROTECTED_MEDIA_SERVER', '')
+PROTECTED_MEDIA_INTERNAL_URL = '/protected-media/'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # File upload settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
+# Los videos se escriben directamente en su ruta final mientras se reciben
+# (StreamingVideoUploadHandler); el resto de archivos usa los manejadores de
+# Django y pasa a un archivo temporal por encima de FILE_UPLOAD_MAX_MEMORY_SIZE.
+FILE_UPLOAD_HANDLERS = [
+    'apps.presentaciones.upload_handlers.StreamingVideoUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+FILE_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
+DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB (campos que no son archivos)
+
+# Subidas reanudables por chunks (apps/presentaciones/resumable_uploads.py)
+RESUMABLE_UPLOADS = {
+    'chunk_size': 8 * 1024 * 1024,        # Tamaño de chunk sugerido al navegador
+    'max_chunk_size': 64 * 1024 * 1024,   # Máximo aceptado por petición PATCH
+    'expiry_hours': 24,                   # Subidas sin actividad se descartan tras este tiempo
+    'max_active_per_student': 3,
+}
+
+# Proxy de análisis (apps/presentaciones/analysis_proxy.py): copia normalizada
+# del video que usan la detección de rostros y la transcripción
+ANALYSIS_PROXY = {
+    'enabled': True,
+    'max_height': 640,      # Alto máximo del video (no se agranda)
+    'fps': 10,              # FPS constantes
+    'keyframe_seconds': 1,  # Un keyframe por segundo (seeks baratos)
+    'crf': 28,
+    'preset': 'veryfast',
+}
+
+# Asignación del habla a cada participante (AudioSegmentationService):
+# 'auto' elige pyannote (con HF_TOKEN), si no 'spectral' (librosa + scikit-learn)
+# y si no 'vad_whisper'; también se puede fijar 'pyannote', 'spectral',
+# 'vad_whisper' o 'simple'
+AUDIO_SEGMENTATION_STRATEGY = os.getenv('AUDIO_SEGMENTATION_STRATEGY', 'auto')
+
+# Ciclo de vida de los originales locales (apps/presentaciones/storage_lifecycle.py):
+# se borran cuando están en Cloudinary y se descargan de nuevo si un reanálisis los necesita
+STORAGE_LIFECYCLE = {
+    'max_idle_days': 30,                 # Liberar originales sin uso durante este tiempo (0: desactivado)
+    'min_idle_hours': 24,                # Nunca liberar un original usado hace menos
+    'high_watermark': 0.85,              # Uso del disco que activa la liberación LRU
+    'low_watermark': 0.75,               # Liberar hasta bajar de este uso
+    'verify_cloud': True,                # Comprobar tamaño en Cloudinary antes de borrar
+    'in_process_interval_minutes': 60,   # Revisión desde el worker de transferencias (0: solo el comando)
+}
 
 # Authentication settings
 LOGIN_URL = 'auth:login'
@@ -202,8 +255,53 @@ COHERENCE_CONFIG = {
     'temperature': 0.3,  # Bajo para consistencia
     'max_tokens': 2000,  # Tokens para respuesta detallada
     'timeout': 45,  # Segundos antes de timeout
+    'max_concurrent_requests': 5,  # Peticiones simultáneas a Groq por proceso
+    'participant_timeout': 90,  # Plazo máximo por participante (incluye reintentos)
+    'rate_limit_wait': 60,  # Espera máxima por capacidad cuando todas las keys están saturadas
+    'batch_mode': False,  # True = todos los participantes en un solo prompt (menos tokens por presentación)
+    'batch_max_participants': 6,  # Participantes por prompt en modo por lotes
+    'batch_max_tokens_per_participant': 700,  # Respuesta reservada por participante en modo por lotes
+    'batch_max_tokens': 6000,  # Tope de tokens de respuesta por lote
+    'transcript_token_budget': 900,  # Tokens máximos por transcripción (se resume si los supera)
+    'streaming': True,  # Respuestas en streaming: score parcial temprano y corte de respuestas mal formadas
+    'stream_chunk_timeout': 15,  # Segundos máximos entre chunks del streaming
+}
+
+# Límites por API key de Groq (plan gratuito) usados por los token buckets
+GROQ_RATE_LIMITS = {
+    'requests_per_minute': 30,
+    'tokens_per_minute': 6000,
+    # Sin Redis cada proceso aplica los límites por su cuenta: se dividen entre
+    # este número de workers (gunicorn/uvicorn exportan WEB_CONCURRENCY)
+    'worker_processes': int(os.getenv('WEB_CONCURRENCY', '1') or 1),
 }
 
+# Estado compartido de las keys de Groq (bloqueos, contadores, rotación) entre
+# workers/procesos. Con REDIS_URL se usa Redis (incrementos atómicos, límites
+# globales); si no, una cache en disco que solo comparte los bloqueos (sus
+# incrementos no son atómicos, ver GROQ_RATE_LIMITS['worker_processes']).
+REDIS_URL = os.getenv('REDIS_URL', '')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'groq': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'groq',
+    },
+}
+GROQ_KEY_STATE_CACHE = 'groq'
+
+# Tiempo de vida de las respuestas de IA guardadas en BD (LLMResponseCache)
+LLM_CACHE_TTL = 60 * 60 * 24 * 7  # 7 días
+# Las respuestas expiradas se borran al guardar nuevas, como mucho con esta
+# frecuencia por proceso (0: solo con el comando purge_llm_cache)
+LLM_CACHE_PURGE_INTERVAL = 60 * 60 * 6  # 6 horas
+
 
 # CONFIGURACIÓN DE EMAIL
 
@@ -286,3 +384,18 @@ else:
     print("   - CLOUDINARY_API_KEY")
     print("   - CLOUDINARY_API_SECRET")
 
+# Subida de videos a Cloudinary en segundo plano (CloudTransferService)
+CLOUD_TRANSFER = {
+    'chunk_size': 6000000,          # Bytes por chunk inicial (Cloudinary exige al menos 5MB)
+    'parallel_chunks': 4,           # Chunks de un mismo video enviados a la vez
+    'target_chunk_seconds': 8,      # El tamaño de chunk se adapta para durar ~8s por petición
+    'max_chunk_size': 64 * 1024 * 1024,
+    'pool_size': 16,                # Conexiones HTTP reutilizables hacia Cloudinary
+    'max_inflight_bytes': 256 * 1024 * 1024,  # Memoria de chunks en vuelo por proceso (todas las subidas)
+    'max_attempts': 5,              # Intentos antes de marcar la transferencia como fallida
+    'backoff_base': 30,             # Segundos de espera tras el primer fallo (se duplica)
+    'backoff_max': 1800,            # Espera máxima entre intentos
+    'lease_seconds': 600,           # Una transferencia RUNNING sin avance se retoma tras este tiempo
+    'in_process_worker': True,      # False: solo el comando process_cloud_transfers sube videos
+}
+
@@ -12,70 +12,166 @@ function confirmDelete(presentationId, title) {
     deleteModal.show();
 }
 
-// Función para actualizar progreso de presentación
+// Pintar el progreso recibido (polling o stream SSE)
+function applyProgress(presentationId, data) {
+    const progressBar = document.getElementById(`progress-bar-${presentationId}`);
+    const progressText = document.getElementById(`progress-text-${presentationId}`);
+    const progressStep = document.getElementById(`progress-step-${presentationId}`);
+    
+    if (progressBar && data.progress !== undefined) {
+        progressBar.style.width = data.progress + '%';
+        progressBar.setAttribute('aria-valuenow', data.progress);
+        
+        if (progressText) {
+            progressText.textContent = data.progress + '%';
+        }
+        
+        if (progressStep && data.step) {
+            progressStep.innerHTML = `<i class="fas fa-cog fa-spin me-1"></i>${data.step}`;
+        }
+        
+        // Si completó (100%), recargar página después de 2 segundos
+        if (data.progress >= 100 || data.status === 'ANALYZED') {
+            progressBar.classList.remove('progress-bar-animated');
+            progressBar.classList.add('bg-success');
+            if (progressStep) {
+                progressStep.innerHTML = `<i class="fas fa-check-circle me-1"></i>Completado - Recargando...`;
+            }
+            setTimeout(() => {
+                location.reload();
+            }, 2000);
+        } else if (data.status === 'FAILED') {
+            progressBar.classList.remove('progress-bar-animated', 'bg-info');
+            progressBar.classList.add('bg-danger');
+            if (progressStep) {
+                progressStep.innerHTML = `<i class="fas fa-times-circle me-1"></i>Error en análisis`;
+            }
+        }
+    }
+}
+
+// Función para actualizar progreso de presentación (consulta única)
 function updateProgress(presentationId) {
     fetch(`/presentations/api/presentation-progress/${presentationId}/`)
         .then(response => response.json())
-        .then(data => {
-            const progressBar = document.getElementById(`progress-bar-${presentationId}`);
-            const progressText = document.getElementById(`progress-text-${presentationId}`);
-            const progressStep = document.getElementById(`progress-step-${presentationId}`);
-            
-            if (progressBar && data.progress !== undefined) {
-                progressBar.style.width = data.progress + '%';
-                progressBar.setAttribute('aria-valuenow', data.progress);
-                
-                if (progressText) {
-                    progressText.textContent = data.progress + '%';
-                }
-                
-                if (progressStep && data.step) {
-                    progressStep.innerHTML = `<i class="fas fa-cog fa-spin me-1"></i>${data.step}`;
-                }
-                
-                // Si completó (100%), recargar página después de 2 segundos
-                if (data.progress >= 100 || data.status === 'ANALYZED') {
-                    progressBar.classList.remove('progress-bar-animated');
-                    progressBar.classList.add('bg-success');
-                    if (progressStep) {
-                        progressStep.innerHTML = `<i class="fas fa-check-circle me-1"></i>Completado - Recargando...`;
-                    }
-                    setTimeout(() => {
-                        location.reload();
-                    }, 2000);
-                } else if (data.status === 'FAILED') {
-                    progressBar.classList.remove('progress-bar-animated', 'bg-info');
-                    progressBar.classList.add('bg-danger');
-                    if (progressStep) {
-                        progressStep.innerHTML = `<i class="fas fa-times-circle me-1"></i>Error en análisis`;
-                    }
-                }
-            }
-        })
+        .then(data => applyProgress(presentationId, data))
         .catch(error => {
             console.error('Error al obtener progreso:', error);
         });
 }
 
+// Polling cada 3 segundos (navegadores sin EventSource o si el stream falla)
+function pollProgress(presentationId) {
+    updateProgress(presentationId);
+    const intervalId = setInterval(() => {
+        updateProgress(presentationId);
+    }, 3000);
+    
+    // Guardar ID del intervalo para poder detenerlo
+    window[`progress_interval_${presentationId}`] = intervalId;
+}
+
+// Milisegundos sin eventos (ni keepalives) tras los que el stream se da por bloqueado
+const STREAM_STALL_MS = 12000;
+
+// Recibir el progreso por stream SSE (el servidor avisa cada cambio)
+function watchProgress(presentationId) {
+    if (!window.EventSource) {
+        pollProgress(presentationId);
+        return;
+    }
+    
+    const source = new EventSource(`/presentations/api/presentation-progress/${presentationId}/stream/`);
+    let finished = false;
+    let watchdog = null;
+    
+    // El servidor envía al menos un keepalive ("ping") cada 5 segundos: si no
+    // llega nada en STREAM_STALL_MS el stream está bloqueado (p. ej. un proxy que
+    // acumula la respuesta) y se pasa al polling
+    const fallBackToPolling = () => {
+        clearTimeout(watchdog);
+        source.close();
+        if (!finished) {
+            pollProgress(presentationId);
+        }
+    };
+    const resetWatchdog = () => {
+        clearTimeout(watchdog);
+        watchdog = setTimeout(fallBackToPolling, STREAM_STALL_MS);
+    };
+    resetWatchdog();
+    
+    source.onmessage = (event) => {
+        resetWatchdog();
+        const data = JSON.parse(event.data);
+        applyProgress(presentationId, data);
+        if (data.progress >= 100 || ['ANALYZED', 'FAILED', 'GRADED'].includes(data.status)) {
+            finished = true;
+            clearTimeout(watchdog);
+            source.close();
+        }
+    };
+    source.addEventListener('ping', resetWatchdog);
+    source.onopen = resetWatchdog;
+    source.onerror = () => {
+        // EventSource reintenta solo (el watchdog sigue corriendo mientras tanto);
+        // si el servidor rechazó la conexión, volver al polling
+        if (source.readyState === EventSource.CLOSED) {
+            fallBackToPolling();
+        }
+    };
+}
+
 // Inicializar monitoreo de presentaciones en procesamiento
 function initProgressMonitoring(processingPresentations) {
     if (processingPresentations.length > 0) {
         processingPresentations.forEach(presentationId => {
-            // Actualizar inmediatamente
-            updateProgress(presentationId);
-            
-            // Continuar actualizando cada 3 segundos
-            const intervalId = setInterval(() => {
-                updateProgress(presentationId);
-            }, 3000);
-            
-            // Guardar ID del intervalo para poder detenerlo
-            window[`progress_interval_${presentationId}`] = intervalId;
+            watchProgress(presentationId);
         });
     }
 }
 
+// Previsualización al pasar el mouse sobre la miniatura (sprite generado en el análisis)
+function initThumbnailScrub() {
+    document.querySelectorAll('.presentation-thumbnail[data-sprite-url]').forEach(thumbnail => {
+        const count = parseInt(thumbnail.dataset.spriteCount, 10);
+        const columns = parseInt(thumbnail.dataset.spriteColumns, 10);
+        const rows = parseInt(thumbnail.dataset.spriteRows, 10);
+        let scrub = null;
+        
+        thumbnail.addEventListener('mouseenter', () => {
+            if (!scrub) {
+                // El sprite se descarga solo la primera vez que se usa
+                scrub = document.createElement('div');
+                scrub.className = 'thumbnail-scrub';
+                scrub.style.backgroundImage = `url("${thumbnail.dataset.spriteUrl}")`;
+                scrub.style.backgroundSize = `${columns * 100}% ${rows * 100}%`;
+                thumbnail.appendChild(scrub);
+            }
+            scrub.style.display = 'block';
+        });
+        
+        thumbnail.addEventListener('mousemove', (e) => {
+            const rect = thumbnail.getBoundingClientRect();
+            const index = Math.min(Math.floor((e.clientX - rect.left) / rect.width * count), count - 1);
+            const column = index % columns;
+            const row = Math.floor(index / columns);
+            const x = columns > 1 ? column / (columns - 1) * 100 : 0;
+            const y = rows > 1 ? row / (rows - 1) * 100 : 0;
+            scrub.style.backgroundPosition = `${x}% ${y}%`;
+        });
+        
+        thumbnail.addEventListener('mouseleave', () => {
+            if (scrub) {
+                scrub.style.display = 'none';
+            }
+        });
+    });
+}
+
 // Export functions
 window.confirmDelete = confirmDelete;
+window.initThumbnailScrub = initThumbnailScrub;
 window.updateProgress = updateProgress;
+window.watchProgress = watchProgress;
 window.initProgressMonitoring = initProgressMonitoring;